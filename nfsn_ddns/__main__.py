@@ -2,12 +2,20 @@
 # Copyright nfsn-ddns Contributors
 
 from nfsn_ddns import __version__ as nfsn_ddns_version
+from nfsn_ddns.daemon import daemon
 from nfsn_ddns.defs import Action
 from nfsn_ddns.engine import engine
 from nfsn_ddns.log import err
+from nfsn_ddns.log import LOG_FORMATS
 from nfsn_ddns.log import log
 from nfsn_ddns.log import nfsn_ddns_log_configuration
+from nfsn_ddns.log import nfsn_ddns_log_shutdown
 from nfsn_ddns.log import verbose
+from nfsn_ddns.receiver import receiver
+from nfsn_ddns.status import refresh
+from nfsn_ddns.status import reload
+from nfsn_ddns.status import status
+from nfsn_ddns.stream import stream
 from nfsn_ddns.win32 import enable_ansi_win32
 from pathlib import Path
 import argparse
@@ -27,30 +35,7 @@ def main() -> int:
     retval = 1
 
     try:
-        parser = argparse.ArgumentParser(prog='nfsn-ddns',
-            add_help=False, usage=usage())
-        parser.add_argument('action', nargs='?',
-            type=Action, choices=list(Action))
-        parser.add_argument('--api-login')
-        parser.add_argument('--api-token')
-        parser.add_argument('--cache', action='store_true')
-        parser.add_argument('--cache-days', type=int)
-        parser.add_argument('--cache-file', type=Path)
-        parser.add_argument('--cfg', type=Path)
-        parser.add_argument('--ddns-domain', action='append', nargs='+')
-        parser.add_argument('--help', '-h', action='store_true')
-        parser.add_argument('--ipv4', action='store_true')
-        parser.add_argument('--ipv6', action='store_true')
-        parser.add_argument('--no-cache', action='store_true')
-        parser.add_argument('--no-ipv4', action='store_true')
-        parser.add_argument('--no-ipv6', action='store_true')
-        parser.add_argument('--nocolorout', action='store_true')
-        parser.add_argument('--quiet', action='store_true')
-        parser.add_argument('--timeout', type=int)
-        parser.add_argument('--verbose', '-V', action='store_true')
-        parser.add_argument('--version', action='version',
-            version='%(prog)s ' + nfsn_ddns_version)
-        args = parser.parse_args()
+        args = argument_parser().parse_args()
         if args.help:
             print(usage())
             sys.exit(0)
@@ -59,9 +44,17 @@ def main() -> int:
         if os.environ.get('NO_COLOR'):
             args.nocolorout = True
 
+        # messages are written in the background, in the requested format
+        log_format = args.log_format or \
+            os.environ.get('NFSN_DDNS_LOG_FORMAT') or 'text'
+        if log_format not in LOG_FORMATS:
+            log_format = 'text'
+
         nfsn_ddns_log_configuration(
             nocolor=args.nocolorout,
-            verbose_=args.verbose)
+            verbose_=args.verbose,
+            fmt=log_format,
+            background=True)
 
         # toggle on ansi colors by default for commands
         if not args.nocolorout:
@@ -85,13 +78,86 @@ def main() -> int:
             err(f'missing configuration file: {args.cfg}')
             return 1
 
-        retval = engine(args)
+        match args.action:
+            case Action.DAEMON:
+                retval = daemon(args)
+            case Action.RECEIVE:
+                retval = receiver(args)
+            case Action.REFRESH:
+                retval = refresh(args)
+            case Action.RELOAD:
+                retval = reload(args)
+            case Action.STATUS:
+                retval = status(args)
+            case Action.STREAM:
+                retval = stream(args)
+            case _:
+                retval = engine(args)
     except KeyboardInterrupt:
         print()
+    finally:
+        nfsn_ddns_log_shutdown()
 
     return retval
 
 
+def argument_parser() -> argparse.ArgumentParser:
+    """
+    build the argument parser for this utility
+
+    Returns:
+        the argument parser
+    """
+    parser = argparse.ArgumentParser(prog='nfsn-ddns',
+        add_help=False, usage=usage())
+    parser.add_argument('action', nargs='?',
+        type=Action, choices=list(Action))
+    parser.add_argument('--api-login')
+    parser.add_argument('--api-token')
+    parser.add_argument('--cache', action='store_true')
+    parser.add_argument('--cache-days', type=int)
+    parser.add_argument('--cache-file', type=Path)
+    parser.add_argument('--cfg', type=Path)
+    parser.add_argument('--connect-timeout', type=int)
+    parser.add_argument('--ddns-domain', action='append', nargs='+')
+    parser.add_argument('--deadline', type=int)
+    parser.add_argument('--debounce', type=int)
+    parser.add_argument('--help', '-h', action='store_true')
+    parser.add_argument('--http-record', type=Path)
+    parser.add_argument('--http-replay', type=Path)
+    parser.add_argument('--http-replay-latency', action='store_true')
+    parser.add_argument('--input', type=Path)
+    parser.add_argument('--interval', type=int)
+    parser.add_argument('--ipv4', action='store_true')
+    parser.add_argument('--ipv6', action='store_true')
+    parser.add_argument('--log-format', choices=LOG_FORMATS)
+    parser.add_argument('--metrics-address')
+    parser.add_argument('--metrics-port', type=int)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--no-ipv4', action='store_true')
+    parser.add_argument('--no-ipv6', action='store_true')
+    parser.add_argument('--nocolorout', action='store_true')
+    parser.add_argument('--prefix-interface')
+    parser.add_argument('--prefix-length', type=int)
+    parser.add_argument('--profile', action='store_true')
+    parser.add_argument('--profile-memory', type=Path)
+    parser.add_argument('--profile-stats', type=Path)
+    parser.add_argument('--propagation-timeout', type=int)
+    parser.add_argument('--quiet', action='store_true')
+    parser.add_argument('--receiver-address')
+    parser.add_argument('--receiver-port', type=int)
+    parser.add_argument('--report', choices=['json'])
+    parser.add_argument('--report-file', type=Path)
+    parser.add_argument('--schedule')
+    parser.add_argument('--status-socket', type=Path)
+    parser.add_argument('--timeout', type=int)
+    parser.add_argument('--verbose', '-V', action='store_true')
+    parser.add_argument('--version', action='version',
+        version='%(prog)s ' + nfsn_ddns_version)
+    parser.add_argument('--watch-config', action='store_true')
+    return parser
+
+
 def usage() -> str:
     """
     display the usage for this utility
@@ -106,7 +172,13 @@ def usage() -> str:
 
 (actions)
  check                     Only attempt to check interaction with NFSN
+ daemon                    Run continuously, updating on an interval
  ip                        Only attempt to fetch my external IP
+ receive                   Receive addresses pushed by dyndns2 clients
+ refresh                   Request an immediate run of a running daemon
+ reload                    Request a running daemon to reload its config
+ status                    Report the status of a running daemon
+ stream                    Apply record addresses read from an input
 
 (options)
  --api-login <login>       The API login to authenticate with NFSN
@@ -115,16 +187,40 @@ def usage() -> str:
  --cache-days <duration>   Number of days to consider cache stale
  --cache-file <file>       Cache file when caching public IP
  --cfg <file>              Configuration file to load
+ --connect-timeout <dur>   Number of seconds to connect for a web request
  --ddns-domain <domain>    The domain to be updated
+ --deadline <duration>     Number of seconds a run may take
+ --debounce <duration>     Seconds a new address must be stable for
  -h, --help                Show this help
+ --http-record <file>      Record web interactions into a cassette file
+ --http-replay <file>      Replay web interactions from a cassette file
+ --http-replay-latency     Preserve recorded latencies when replaying
+ --input <file>            Input to read record addresses from (stream)
+ --interval <duration>     Number of seconds between daemon runs
  --ipv4                    Whether to process IPv4 (default on)
  --ipv6                    Whether to process IPv6 (default off)
+ --log-format <format>     Format of messages (text, json or logfmt)
+ --metrics-address <addr>  Address to serve metrics on (daemon)
+ --metrics-port <port>     Port to serve metrics on (daemon)
  --no-cache                Explicitly disable any cache attempts
  --nocolorout              Explicitly disable colorized output
+ --prefix-interface <if>   Interface to detect a delegated IPv6 prefix on
+ --prefix-length <length>  Length of a delegated IPv6 prefix (default 64)
+ --profile                 Report the duration of each phase of a run
+ --profile-memory <file>   Write a tracemalloc snapshot to a file
+ --profile-stats <file>    Write cProfile statistics to a file
+ --propagation-timeout <d> Seconds to wait for changed records to propagate
  --quiet                   Suppress startup banner
+ --receiver-address <addr> Address to receive dyndns2 updates on
+ --receiver-port <port>    Port to receive dyndns2 updates on
+ --report <format>         Write a structured report of each run (json)
+ --report-file <file>      File to write run reports to (over stdout)
+ --schedule <cron>         Cron schedule of daemon runs (over the interval)
+ --status-socket <file>    Socket to serve a daemon's status on
  --timeout <duration>      Number of seconds for any web request
  -V, --verbose             Show additional messages
  --version                 Show the version
+ --watch-config            Reload the daemon when its configuration changes
 """
 
 
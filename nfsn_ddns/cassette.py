@@ -0,0 +1,304 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from collections import defaultdict
+from collections import deque
+from contextvars import ContextVar
+from datetime import timedelta
+from enum import Enum
+from nfsn_ddns.flight import atomic_write
+from nfsn_ddns.log import err
+from nfsn_ddns.log import verbose
+from requests.adapters import DEFAULT_POOLSIZE
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from typing import TYPE_CHECKING
+import base64
+import hashlib
+import json
+import requests
+import threading
+import time
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+    from contextvars import Token  # noqa: F401
+    from pathlib import Path
+    from types import TracebackType
+
+# version of the cassette format
+CASSETTE_VERSION = 1
+
+# the active cassette (if any)
+_ACTIVE_CASSETTE = ContextVar('nfsn_ddns_cassette', default=None)  # type: ContextVar[Cassette | None]
+
+
+class CassetteMode(Enum):
+    # record interactions made over the network
+    RECORD = 'record'
+    # replay previously recorded interactions
+    REPLAY = 'replay'
+
+    def __str__(self) -> str:
+        return self.value
+
+
+class Cassette:
+    def __init__(self, path: Path, mode: CassetteMode, *,
+            latency: bool = False) -> None:
+        """
+        a recording of web interactions
+
+        A cassette records web interactions (the method, URL, a hash of the
+        request body, the response and the time taken) made by sessions
+        created while the cassette is active (see ``new_session``). Recorded
+        interactions can then be replayed without any network access.
+
+        Replayed interactions are matched on the method, URL and request body
+        hash (headers are not considered, since authentication headers are
+        unique for each request). Interactions with the same match are
+        replayed in the order they were recorded.
+
+        .. code-block:: python
+
+            with Cassette(Path('run.cassette'), CassetteMode.RECORD):
+                engine(args)
+
+        Args:
+            path: the cassette file
+            mode: whether to record or replay interactions
+            latency (optional): whether replays preserve recorded latencies
+        """
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.meta = {}  # type: dict[str, str]
+        self.interactions = []  # type: list[dict]
+        self.replayed = []  # type: list[dict]
+        self._lock = threading.Lock()
+        self._queues = defaultdict(deque)  # type: dict[tuple, deque[dict]]
+        self._token = None  # type: Token[Cassette | None] | None
+
+    def __enter__(self) -> Cassette:  # noqa: PYI034
+        self._token = _ACTIVE_CASSETTE.set(self)
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None,
+            exc_value: BaseException | None,
+            traceback: TracebackType | None) -> None:
+        if self._token is not None:
+            _ACTIVE_CASSETTE.reset(self._token)
+            self._token = None
+
+        if self.mode == CassetteMode.RECORD:
+            self.save()
+
+    def load(self) -> bool:
+        """
+        load interactions from the cassette file
+
+        Returns:
+            whether the cassette was loaded
+        """
+        try:
+            with self.path.open(encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            err(f'unable to load cassette: {self.path}\n{e}')
+            return False
+
+        if not isinstance(data, dict) or data.get('version') != CASSETTE_VERSION:
+            err(f'unsupported cassette format: {self.path}')
+            return False
+
+        self.meta = data.get('meta', {})
+        self.interactions = data.get('interactions', [])
+
+        self._queues.clear()
+        for interaction in self.interactions:
+            self._queues[self._key(interaction)].append(interaction)
+
+        verbose('(cassette) loaded {} interactions', len(self.interactions))
+        return True
+
+    def save(self) -> bool:
+        """
+        save recorded interactions to the cassette file
+
+        Returns:
+            whether the cassette was saved
+        """
+        data = {
+            'version': CASSETTE_VERSION,
+            'meta': self.meta,
+            'interactions': self.interactions,
+        }
+
+        content = json.dumps(data, separators=(',', ':'))
+        if not atomic_write(self.path, content):
+            err(f'unable to save cassette: {self.path}')
+            return False
+
+        verbose('(cassette) saved {} interactions', len(self.interactions))
+        return True
+
+    def record(self, request: requests.PreparedRequest,
+            response: requests.Response | None, elapsed: float,
+            error: requests.RequestException | None = None) -> None:
+        """
+        record an interaction
+
+        Args:
+            request: the request made
+            response: the response received (if any)
+            elapsed: the time taken (in seconds)
+            error (optional): the error raised (if any)
+        """
+        interaction = {
+            'method': request.method,
+            'url': request.url,
+            'body': _hash_body(request.body),
+            'elapsed': round(elapsed, 6),
+        }  # type: dict[str, object]
+
+        if response is not None:
+            content = response.content or b''
+            interaction['status'] = response.status_code
+            interaction['reason'] = response.reason
+            interaction['headers'] = dict(response.headers)
+            try:
+                interaction['content'] = content.decode('utf-8')
+            except UnicodeDecodeError:
+                interaction['content_b64'] = \
+                    base64.b64encode(content).decode('ascii')
+        else:
+            interaction['error'] = type(error).__name__
+            interaction['message'] = str(error)
+
+        with self._lock:
+            self.interactions.append(interaction)
+
+    def replay(self, request: requests.PreparedRequest) -> requests.Response:
+        """
+        replay an interaction
+
+        Args:
+            request: the request being made
+
+        Returns:
+            the recorded response
+
+        Raises:
+            ``requests.ConnectionError`` is raised if no interaction has been
+            recorded for the request; otherwise, any recorded error is raised
+        """
+        key = (request.method, request.url, _hash_body(request.body))
+        with self._lock:
+            queue = self._queues.get(key)
+            interaction = queue.popleft() if queue else None
+            if interaction:
+                self.replayed.append(interaction)
+
+        if not interaction:
+            msg = f'no recorded interaction: {request.method} {request.url}'
+            raise requests.ConnectionError(msg, request=request)
+
+        elapsed = interaction.get('elapsed', 0)
+        if self.latency and elapsed:
+            time.sleep(elapsed)
+
+        error = interaction.get('error')
+        if error:
+            exc_type = getattr(requests.exceptions, error, None)
+            if not isinstance(exc_type, type) or \
+                    not issubclass(exc_type, requests.RequestException):
+                exc_type = requests.ConnectionError
+            raise exc_type(interaction.get('message', ''), request=request)
+
+        rsp = requests.Response()
+        rsp.status_code = interaction['status']
+        rsp.reason = interaction.get('reason', '')
+        rsp.headers = CaseInsensitiveDict(interaction.get('headers', {}))
+        rsp.encoding = get_encoding_from_headers(rsp.headers)
+        rsp.url = request.url or ''
+        rsp.request = request
+        rsp.elapsed = timedelta(seconds=elapsed)
+        if 'content_b64' in interaction:
+            rsp._content = base64.b64decode(interaction['content_b64'])  # noqa: SLF001
+        else:
+            rsp._content = interaction.get('content', '').encode('utf-8')  # noqa: SLF001
+        return rsp
+
+    @staticmethod
+    def _key(interaction: dict) -> tuple:
+        return (interaction['method'], interaction['url'], interaction['body'])
+
+
+class CassetteAdapter(HTTPAdapter):
+    def __init__(self, cassette: Cassette, *,
+            pool_connections: int = DEFAULT_POOLSIZE,
+            pool_maxsize: int = DEFAULT_POOLSIZE) -> None:
+        """
+        a requests transport adapter for a cassette
+
+        Records interactions made through this adapter into a cassette, or
+        replays interactions from a cassette without any network access.
+
+        Args:
+            cassette: the cassette
+            pool_connections (optional): the number of pools to cache
+            pool_maxsize (optional): the maximum connections of each pool
+        """
+        super().__init__(pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize)
+        self.cassette = cassette
+
+    def send(self, request: requests.PreparedRequest,
+            stream: bool = False,  # noqa: FBT001,FBT002
+            timeout: float | tuple[float, float] | tuple[float, None] | None = None,
+            verify: bool | str = True,  # noqa: FBT001,FBT002
+            cert: bytes | str | tuple[bytes | str, bytes | str] | None = None,
+            proxies: Mapping[str, str] | None = None) -> requests.Response:
+        if self.cassette.mode == CassetteMode.REPLAY:
+            rsp = self.cassette.replay(request)
+            rsp.connection = self
+            return rsp
+
+        start = time.perf_counter()
+        try:
+            rsp = super().send(request, stream=stream, timeout=timeout,
+                verify=verify, cert=cert, proxies=proxies)
+            _ = rsp.content
+        except requests.RequestException as e:
+            self.cassette.record(request, None, time.perf_counter() - start, e)
+            raise
+
+        self.cassette.record(request, rsp, time.perf_counter() - start)
+        return rsp
+
+
+def active_cassette() -> Cassette | None:
+    """
+    return the active cassette (if any)
+
+    Returns:
+        the cassette
+    """
+    return _ACTIVE_CASSETTE.get()
+
+
+def _hash_body(body: bytes | str | None) -> str:
+    """
+    hash the body of a request
+
+    Args:
+        body: the body
+
+    Returns:
+        the hash
+    """
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    return hashlib.sha256(body or b'').hexdigest()[:16]
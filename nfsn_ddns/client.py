@@ -0,0 +1,392 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from concurrent.futures import wait
+from nfsn_ddns.auth import NfsnAuth
+from nfsn_ddns.deadline import Deadline
+from nfsn_ddns.defs import API_DNS_ENDPOINT
+from nfsn_ddns.defs import DEFAULT_CONCURRENCY
+from nfsn_ddns.defs import DEFAULT_TIMEOUT
+from nfsn_ddns.log import verbose
+from nfsn_ddns.metrics import NFSN_API_DURATION
+from nfsn_ddns.metrics import NFSN_API_HEDGES
+from nfsn_ddns.metrics import NFSN_API_REQUESTS
+from nfsn_ddns.report import report_call
+from nfsn_ddns.session import new_session
+from nfsn_ddns.timing import phase
+from requests.exceptions import RequestException
+from typing import NamedTuple
+from typing import TYPE_CHECKING
+import contextvars
+import threading
+import time
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+    from nfsn_ddns.hedge import LatencyTracker
+    from requests import Response
+    from requests import Session
+    from types import TracebackType
+
+
+class ResourceRecord(NamedTuple):
+    # the name of the record (relative to the domain)
+    name: str
+    # the type of the record (e.g. `A`)
+    type: str
+    # the data of the record
+    data: str
+    # the time-to-live of the record (if known)
+    ttl: int | None = None
+
+
+class NfsnClient:
+    def __init__(self, login: str, token: str, *,
+            endpoint: str | None = None, timeout: float = DEFAULT_TIMEOUT,
+            connect_timeout: float | None = None,
+            deadline: Deadline | None = None,
+            hedge: LatencyTracker | None = None,
+            session: Session | None = None) -> None:
+        """
+        nfsn dns api client
+
+        Provides access to NFSN's DNS API for a single account. Requests are
+        authenticated with `NfsnAuth` and made over a single session, allowing
+        connections to be reused between calls. A session can be provided to
+        share a connection pool between clients (e.g. between accounts).
+        Calls are thread-safe.
+
+        Any failed call raises a ``requests.exceptions.RequestException``
+        (``HTTPError`` for non-successful status codes).
+
+        When a deadline is provided, the timeout of each call is capped by
+        the time remaining, and calls made once the deadline has expired
+        fail with a ``DeadlineExceeded`` exception.
+
+        When a latency tracker is provided, reads (``listRRs``) are hedged:
+        if a read has not completed within the tracker's delay, a second
+        identical (and independently signed) request is issued, where the
+        first response received is used. Writes are never hedged.
+
+        Reads can also be issued speculatively (see `speculate_rrs`), ahead
+        of the call needing them.
+
+        Args:
+            login: the account used to authenticate
+            token: the api token
+            endpoint (optional): the nfsn dns api endpoint
+            timeout (optional): (read) timeout for any requests made
+            connect_timeout (optional): connect timeout for any requests made
+            deadline (optional): the deadline bounding any requests made
+            hedge (optional): the latency tracker used to hedge reads
+            session (optional): the session to issue requests on
+        """
+        self.auth = NfsnAuth(login, token)
+        self.endpoint = (endpoint or API_DNS_ENDPOINT).rstrip('/')
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.deadline = deadline or Deadline()
+        self.hedge = hedge
+        self._owns_session = session is None
+        self.session = session or new_session()
+        self._executor = None  # type: ThreadPoolExecutor | None
+        self._hedge_executor = None  # type: ThreadPoolExecutor | None
+        self._lock = threading.Lock()
+        self._speculative = {}  # type: dict[tuple[str, str | None], Future[list[ResourceRecord]]]
+
+    def __enter__(self) -> NfsnClient:  # noqa: PYI034
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None,
+            exc_value: BaseException | None,
+            traceback: TracebackType | None) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        close the client
+
+        Closes the client's session, if the session is owned by this client.
+        Any speculative read yet to be issued is cancelled, while any read (or
+        hedged request) still in flight is left to complete in the
+        background.
+        """
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+        if self._hedge_executor:
+            self._hedge_executor.shutdown(wait=False)
+
+        if self._owns_session:
+            self.session.close()
+
+    def list_rrs(self, domain: str, name: str | None = None,
+            type_: str | None = None,
+            data: str | None = None) -> list[ResourceRecord]:
+        """
+        list the resource records of a domain
+
+        If a matching speculative read has been issued (see `speculate_rrs`),
+        its records are used instead of issuing a new request; unless the
+        speculative read failed.
+
+        Args:
+            domain: the domain
+            name (optional): only list records with this name
+            type_ (optional): only list records with this type
+            data (optional): only list records with this data
+
+        Returns:
+            the records
+        """
+        if type_ is None and data is None:
+            with self._lock:
+                future = self._speculative.pop((domain, name), None)
+
+            if future is not None:
+                try:
+                    return future.result()
+                except RequestException as e:
+                    verbose('(request) speculative read failed; retrying: {}',
+                        e)
+
+        return self._list_rrs(domain, name, type_, data)
+
+    def speculate_rrs(self, domain: str,
+            name: str | None = None) -> Future[list[ResourceRecord]]:
+        """
+        speculatively list the resource records of a domain
+
+        Issues a ``listRRs`` read in the background, where the next matching
+        call to `list_rrs` uses its records (waiting on the read if still in
+        flight). This allows reads to overlap with other work (e.g. address
+        detection), while also establishing a pooled connection to the api.
+        A read already issued for the same domain and name is not repeated.
+
+        Args:
+            domain: the domain
+            name (optional): only list records with this name
+
+        Returns:
+            the pending read
+        """
+        with self._lock:
+            future = self._speculative.get((domain, name))
+            if future:
+                return future
+
+            if not self._executor:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=DEFAULT_CONCURRENCY,
+                    thread_name_prefix='nfsn-speculate')
+
+            verbose('(request) speculative read: {} ({})', domain, name or '*')
+            # carry the caller's context (e.g. active phase timings)
+            future = self._executor.submit(contextvars.copy_context().run,
+                self._list_rrs, domain, name, None, None)
+            self._speculative[(domain, name)] = future
+            return future
+
+    def _list_rrs(self, domain: str, name: str | None, type_: str | None,
+            data: str | None) -> list[ResourceRecord]:
+        """
+        list the resource records of a domain (always issuing a request)
+
+        Args:
+            domain: the domain
+            name: only list records with this name (if set)
+            type_: only list records with this type (if set)
+            data: only list records with this data (if set)
+
+        Returns:
+            the records
+        """
+        opts = self._opts(name=name, type=type_, data=data)
+        rsp = self._call(domain, 'listRRs', opts, hedge=True)
+
+        records = []
+        for rr_entry in rsp.json() or []:
+            rr_type = rr_entry.get('type')
+            rr_data = rr_entry.get('data')
+            if not rr_type or not rr_data:
+                continue
+
+            try:
+                ttl = int(rr_entry['ttl'])
+            except (KeyError, TypeError, ValueError):
+                ttl = None
+
+            records.append(ResourceRecord(
+                name=rr_entry.get('name') or '',
+                type=rr_type,
+                data=rr_data,
+                ttl=ttl,
+            ))
+
+        return records
+
+    def add_rr(self, domain: str, name: str, type_: str, data: str,
+            ttl: int | None = None) -> None:
+        """
+        add a resource record to a domain
+
+        Args:
+            domain: the domain
+            name: the name of the record
+            type_: the type of the record
+            data: the data of the record
+            ttl (optional): the time-to-live of the record
+        """
+        opts = self._opts(name=name, type=type_, data=data, ttl=ttl)
+        self._call(domain, 'addRR', opts)
+
+    def replace_rr(self, domain: str, name: str, type_: str, data: str,
+            ttl: int | None = None) -> None:
+        """
+        replace the resource record(s) of a name/type with a new value
+
+        Args:
+            domain: the domain
+            name: the name of the record
+            type_: the type of the record
+            data: the new data of the record
+            ttl (optional): the time-to-live of the record
+        """
+        opts = self._opts(name=name, type=type_, data=data, ttl=ttl)
+        self._call(domain, 'replaceRR', opts)
+
+    def remove_rr(self, domain: str, name: str, type_: str, data: str) -> None:
+        """
+        remove a resource record from a domain
+
+        Args:
+            domain: the domain
+            name: the name of the record
+            type_: the type of the record
+            data: the data of the record
+        """
+        opts = self._opts(name=name, type=type_, data=data)
+        self._call(domain, 'removeRR', opts)
+
+    def _call(self, domain: str, method: str, opts: dict[str, str], *,
+            hedge: bool = False) -> Response:
+        """
+        issue an api call
+
+        Args:
+            domain: the domain the call is for
+            method: the api method
+            opts: the form data of the call
+            hedge (optional): whether the call may be hedged (reads only)
+
+        Returns:
+            the response
+        """
+        target_url = f'{self.endpoint}/{domain}/{method}'
+        verbose('(request) {}', target_url)
+
+        status = 'error'
+        start = time.monotonic()
+        try:
+            with phase(f'{method} {domain}'):
+                if hedge and self.hedge:
+                    rsp = self._post_hedged(target_url, opts, self.hedge,
+                        method)
+                else:
+                    rsp = self._post(target_url, opts)
+            status = str(rsp.status_code)
+        finally:
+            elapsed = time.monotonic() - start
+            NFSN_API_DURATION.observe(elapsed, method=method)
+            NFSN_API_REQUESTS.inc(method=method, status=status)
+            report_call(method, domain, status, elapsed)
+
+        rsp.raise_for_status()
+        return rsp
+
+    def _post(self, target_url: str, opts: dict[str, str]) -> Response:
+        """
+        issue a single (signed) request
+
+        Args:
+            target_url: the url of the call
+            opts: the form data of the call
+
+        Returns:
+            the response
+        """
+        timeout = self.deadline.request_timeout(self.timeout,
+            self.connect_timeout)
+        return self.session.post(target_url, data=opts, auth=self.auth,
+            timeout=timeout)
+
+    def _post_hedged(self, target_url: str, opts: dict[str, str],
+            tracker: LatencyTracker, method: str) -> Response:
+        """
+        issue a request, hedged by a second request if slow to respond
+
+        Each request is signed independently (with its own salt and
+        timestamp). The latency of every completed request is observed by
+        the tracker. A request still in flight once a response is used is
+        left to complete in the background.
+
+        Args:
+            target_url: the url of the call
+            opts: the form data of the call
+            tracker: the latency tracker deciding when to hedge
+            method: the api method
+
+        Returns:
+            the first response received
+        """
+
+        def timed_post() -> Response:
+            start = time.monotonic()
+            rsp = self._post(target_url, opts)
+            tracker.observe(time.monotonic() - start)
+            return rsp
+
+        with self._lock:
+            if not self._hedge_executor:
+                # allow each concurrent call to have a request and its hedge
+                # in flight
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=DEFAULT_CONCURRENCY * 2,
+                    thread_name_prefix='nfsn-hedge')
+            executor = self._hedge_executor
+
+        futures = [executor.submit(timed_post)]
+
+        delay = tracker.delay()
+        done, _ = wait(futures, timeout=delay)
+        if not done and not self.deadline.expired():
+            verbose('(request) hedging after {:.3f}s: {}', delay, target_url)
+            NFSN_API_HEDGES.inc(method=method)
+            futures.append(executor.submit(timed_post))
+
+        # use the first successful response (or the first failure)
+        error = None  # type: BaseException | None
+        for future in as_completed(futures):
+            exc = future.exception()
+            if exc is None:
+                return future.result()
+            error = error or exc
+
+        assert error is not None
+        raise error
+
+    @staticmethod
+    def _opts(**kwargs: str | int | None) -> dict[str, str]:
+        """
+        build the form data for an api call
+
+        Args:
+            **kwargs: the options of the call (unset options are dropped)
+
+        Returns:
+            the form data
+        """
+        return {k: str(v) for k, v in kwargs.items() if v is not None}
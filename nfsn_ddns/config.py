@@ -2,13 +2,21 @@
 # Copyright nfsn-ddns Contributors
 
 from __future__ import annotations
+from nfsn_ddns.defs import MAX_PROPAGATION_TIMEOUT
 from nfsn_ddns.defs import NFSN_DDNS_ENV_PREFIX
+from nfsn_ddns.defs import SOCKET_ENDPOINT_SCHEMES
 from nfsn_ddns.log import err
 from nfsn_ddns.log import warn
 from nfsn_ddns.log import verbose
+from nfsn_ddns.sync import RecordSet
+from nfsn_ddns.utils import split_socket_endpoint
 from nfsn_ddns.utils import str2bool
+from nfsn_ddns.verify import parse_nameserver
 from pathlib import Path
+from typing import NamedTuple
 from typing import TYPE_CHECKING
+from urllib.parse import urlparse
+import ipaddress
 import os
 import yaml
 
@@ -16,6 +24,13 @@ if TYPE_CHECKING:
     from argparse import Namespace
 
 
+class ReceiverUser(NamedTuple):
+    # the password of the user
+    password: str
+    # the hostnames the user may update (all if not set)
+    hostnames: frozenset[str] | None = None
+
+
 class Config:
     def __init__(self) -> None:
         """
@@ -42,7 +57,7 @@ class Config:
         """
 
         try:
-            verbose(f'attempting to load configuration file: {path}')
+            verbose('attempting to load configuration file: {}', path)
             with path.open() as f:
                 try:
                     raw_config = yaml.safe_load(f)
@@ -89,8 +104,28 @@ class Config:
         if args.cache_file is not None:
             self.config['cache-file'] = args.cache_file
 
+        if args.connect_timeout is not None:
+            self.config['connect-timeout'] = args.connect_timeout
+
         if args.ddns_domain is not None:
-            self.config['domains'] = args.ddns_domain
+            # flatten domains provided over multiple options (into the same
+            # semicolon-separated form accepted from the environment)
+            domains = []  # type: list[str]
+            for entry in args.ddns_domain:
+                if isinstance(entry, list):
+                    domains.extend(entry)
+                else:
+                    domains.append(entry)
+            self.config['domains'] = ';'.join(domains)
+
+        if args.deadline is not None:
+            self.config['deadline'] = args.deadline
+
+        if args.debounce is not None:
+            self.config['debounce'] = args.debounce
+
+        if args.interval is not None:
+            self.config['interval'] = args.interval
 
         if args.ipv4:
             self.config['ipv4'] = 'true'
@@ -98,6 +133,12 @@ class Config:
         if args.ipv6:
             self.config['ipv6'] = 'true'
 
+        if args.metrics_address is not None:
+            self.config['metrics-address'] = args.metrics_address
+
+        if args.metrics_port is not None:
+            self.config['metrics-port'] = args.metrics_port
+
         if args.no_cache:
             self.config['cache'] = 'false'
 
@@ -107,9 +148,33 @@ class Config:
         if args.no_ipv6:
             self.config['ipv6'] = 'false'
 
+        if args.prefix_interface is not None:
+            self.config['prefix-interface'] = args.prefix_interface
+
+        if args.prefix_length is not None:
+            self.config['prefix-length'] = args.prefix_length
+
+        if args.propagation_timeout is not None:
+            self.config['propagation-timeout'] = args.propagation_timeout
+
+        if args.receiver_address is not None:
+            self.config['receiver-address'] = args.receiver_address
+
+        if args.receiver_port is not None:
+            self.config['receiver-port'] = args.receiver_port
+
+        if args.schedule is not None:
+            self.config['schedule'] = args.schedule
+
+        if args.status_socket is not None:
+            self.config['status-socket'] = args.status_socket
+
         if args.timeout is not None:
             self.config['timeout'] = args.timeout
 
+        if args.watch_config:
+            self.config['watch-config'] = 'true'
+
     def api_login(self) -> str | None:
         """
         returns the configured api login value
@@ -176,6 +241,38 @@ class Config:
         except TypeError:
             return None
 
+    def connect_timeout(self) -> int | None:
+        """
+        returns the configured connect timeout value
+
+        Returns:
+            the connect timeout value
+        """
+        raw_value = self._fetch('connect-timeout')
+        if raw_value is None or raw_value == '':
+            return None
+
+        try:
+            return int(raw_value)
+        except ValueError:
+            return None
+
+    def deadline(self) -> int | None:
+        """
+        returns the configured deadline value
+
+        Returns:
+            the deadline value
+        """
+        raw_value = self._fetch('deadline')
+        if raw_value is None or raw_value == '':
+            return None
+
+        try:
+            return int(raw_value)
+        except ValueError:
+            return None
+
     def ddns_domains(self) -> list[str] | None:
         """
         returns the configured ddns domains value
@@ -194,6 +291,119 @@ class Config:
 
         return domains
 
+    def debounce(self) -> int | None:
+        """
+        returns the configured debounce window value
+
+        Returns:
+            the debounce window value
+        """
+        raw_value = self._fetch('debounce')
+        if not raw_value:
+            return None
+
+        try:
+            return int(raw_value)
+        except ValueError:
+            return None
+
+    def debounce_samples(self) -> int | None:
+        """
+        returns the configured debounce samples value
+
+        Returns:
+            the debounce samples value
+        """
+        raw_value = self._fetch('debounce-samples')
+        if raw_value is None or raw_value == '':
+            return None
+
+        try:
+            return int(raw_value)
+        except ValueError:
+            return None
+
+    def detect_budget(self) -> int | None:
+        """
+        returns the configured detect budget value
+
+        Returns:
+            the detect budget value
+        """
+        raw_value = self._fetch('detect-budget')
+        if raw_value is None or raw_value == '':
+            return None
+
+        try:
+            return int(raw_value)
+        except ValueError:
+            return None
+
+    def fingerprint(self) -> bool | None:
+        """
+        returns the configured fingerprint state value
+
+        Returns:
+            the fingerprint state value
+        """
+        raw_value = self._fetch('fingerprint')
+        if not raw_value:
+            return None
+
+        try:
+            return str2bool(raw_value)
+        except ValueError:
+            return None
+
+    def fingerprint_files(self) -> list[Path] | None:
+        """
+        returns the configured fingerprint files value
+
+        Returns:
+            the fingerprint files value
+        """
+        raw_files = self._fetch('fingerprint-files')
+        if isinstance(raw_files, list):
+            files = [Path(str(entry)) for entry in raw_files]
+        elif isinstance(raw_files, str) and raw_files:
+            files = [Path(entry) for entry in raw_files.split(';')]
+        else:
+            files = None
+
+        return files
+
+    def hedge_percentile(self) -> int | None:
+        """
+        returns the configured hedge percentile value
+
+        Returns:
+            the hedge percentile value
+        """
+        raw_value = self._fetch('hedge-percentile')
+        if raw_value is None or raw_value == '':
+            return None
+
+        try:
+            return int(raw_value)
+        except ValueError:
+            return None
+
+    def interval(self) -> int | None:
+        """
+        returns the configured daemon interval value
+
+        Returns:
+            the interval value
+        """
+        raw_value = self._fetch('interval')
+        if not raw_value:
+            return None
+
+        try:
+            return int(raw_value)
+        except ValueError:
+            return None
+
     def ipv4(self) -> bool | None:
         """
         returns the configured ipv4 state value
@@ -218,7 +428,7 @@ class Config:
             the ipv6 state value
         """
         raw_value = self._fetch('ipv6')
-        if not raw_value:
+        if raw_value is None:
             return None
 
         try:
@@ -226,6 +436,31 @@ class Config:
         except ValueError:
             return None
 
+    def metrics_address(self) -> str | None:
+        """
+        returns the configured metrics address value
+
+        Returns:
+            the address value
+        """
+        return self._fetch('metrics-address')
+
+    def metrics_port(self) -> int | None:
+        """
+        returns the configured metrics port value
+
+        Returns:
+            the port value
+        """
+        raw_value = self._fetch('metrics-port')
+        if raw_value is None or raw_value == '':
+            return None
+
+        try:
+            return int(raw_value)
+        except ValueError:
+            return None
+
     def nfsn_api_endpoint(self) -> str | None:
         """
         returns the configured nfsn api endpoint value
@@ -235,6 +470,22 @@ class Config:
         """
         return self._fetch('nfsn-api-endpoint')
 
+    def nfsn_budget(self) -> int | None:
+        """
+        returns the configured nfsn budget value
+
+        Returns:
+            the nfsn budget value
+        """
+        raw_value = self._fetch('nfsn-budget')
+        if raw_value is None or raw_value == '':
+            return None
+
+        try:
+            return int(raw_value)
+        except ValueError:
+            return None
+
     def myipv4_api_endpoint_cmd(self) -> str | None:
         """
         returns the configured myipv4 api endpoint command value
@@ -293,6 +544,236 @@ class Config:
 
         return endpoints
 
+    def prefix_hosts(self) -> dict[str, str] | None:
+        """
+        returns the configured prefix hosts
+
+        Prefix hosts provide the interface identifier (e.g. ``::1:0:0:0:10``)
+        of each ddns entry whose ``AAAA`` record is derived from a delegated
+        ipv6 prefix. Hosts can also be provided from the environment as an
+        ``<entry>=<interface-id>`` value (``;``-separated).
+
+        Returns:
+            the interface identifiers (by ddns entry)
+        """
+        raw_hosts = self._fetch_object('prefix-hosts')
+        if isinstance(raw_hosts, str):
+            raw_hosts = dict(
+                entry.split('=', 1) for entry in raw_hosts.split(';')
+                if '=' in entry
+            )
+        elif not isinstance(raw_hosts, dict):
+            return None
+
+        return {
+            str(entry).rstrip('.').lower(): str(interface_id)
+            for entry, interface_id in raw_hosts.items()
+        }
+
+    def prefix_interface(self) -> str | None:
+        """
+        returns the configured prefix interface value
+
+        Returns:
+            the interface value
+        """
+        return self._fetch('prefix-interface')
+
+    def prefix_length(self) -> int | None:
+        """
+        returns the configured prefix length value
+
+        Returns:
+            the prefix length value
+        """
+        raw_value = self._fetch('prefix-length')
+        if raw_value is None or raw_value == '':
+            return None
+
+        try:
+            return int(raw_value)
+        except ValueError:
+            return None
+
+    def profiles(self) -> dict[str, Config] | None:
+        """
+        returns the configured profiles
+
+        Profiles allow multiple NFSN accounts (or groups of domains) to be
+        managed by a single instance. Each profile is provided as its own
+        configuration instance, where any option not set by a profile is
+        inherited from this configuration.
+
+        Returns:
+            the profiles (by name)
+        """
+        raw_profiles = self._fetch('profiles', env=False)
+        if not isinstance(raw_profiles, dict):
+            return None
+
+        profiles = {}
+        for name, raw_profile in raw_profiles.items():
+            profile = Config()
+            profile.config = {
+                k: v for k, v in self.config.items() if k != 'profiles'
+            }
+
+            if isinstance(raw_profile, dict):
+                profile.config.update(raw_profile)
+
+            profiles[str(name)] = profile
+
+        return profiles
+
+    def propagation_timeout(self) -> int | None:
+        """
+        returns the configured propagation timeout value
+
+        Returns:
+            the propagation timeout value
+        """
+        raw_value = self._fetch('propagation-timeout')
+        if raw_value is None or raw_value == '':
+            return None
+
+        try:
+            return int(raw_value)
+        except ValueError:
+            return None
+
+    def receiver_address(self) -> str | None:
+        """
+        returns the configured receiver address value
+
+        Returns:
+            the address value
+        """
+        return self._fetch('receiver-address')
+
+    def receiver_port(self) -> int | None:
+        """
+        returns the configured receiver port value
+
+        Returns:
+            the port value
+        """
+        raw_value = self._fetch('receiver-port')
+        if raw_value is None or raw_value == '':
+            return None
+
+        try:
+            return int(raw_value)
+        except ValueError:
+            return None
+
+    def receiver_users(self) -> dict[str, ReceiverUser] | None:
+        """
+        returns the configured receiver users
+
+        Users authenticate dyndns2 clients pushing updates to a receiver.
+        Each user provides a password and may restrict the hostnames it can
+        update (any configured ddns domain otherwise). A user can also be
+        provided from the environment as a ``<user>:<password>`` value
+        (``;``-separated).
+
+        Returns:
+            the users (by name)
+        """
+        raw_users = self._fetch_object('receiver-users')
+        if isinstance(raw_users, str):
+            raw_users = dict(
+                entry.split(':', 1) for entry in raw_users.split(';')
+                if ':' in entry
+            )
+        elif not isinstance(raw_users, dict):
+            return None
+
+        users = {}
+        for name, raw_user in raw_users.items():
+            if isinstance(raw_user, dict):
+                password = raw_user.get('password')
+                raw_hostnames = raw_user.get('hostnames')
+            else:
+                password = raw_user
+                raw_hostnames = None
+
+            if not isinstance(password, str | int) or password == '':
+                continue
+
+            hostnames = None
+            if isinstance(raw_hostnames, list):
+                hostnames = frozenset(
+                    str(hostname).rstrip('.').lower()
+                    for hostname in raw_hostnames
+                )
+
+            users[str(name)] = ReceiverUser(str(password), hostnames)
+
+        return users
+
+    def resolver_ttl(self) -> int | None:
+        """
+        returns the configured resolver ttl value
+
+        Returns:
+            the resolver ttl value
+        """
+        raw_value = self._fetch('resolver-ttl')
+        if raw_value is None or raw_value == '':
+            return None
+
+        try:
+            return int(raw_value)
+        except ValueError:
+            return None
+
+    def schedule(self) -> str | None:
+        """
+        returns the configured schedule value
+
+        The schedule is a cron expression (e.g. ``0 */1 * * *``).
+
+        Returns:
+            the schedule value
+        """
+        raw_value = self._fetch('schedule')
+        if not raw_value:
+            return None
+
+        return str(raw_value)
+
+    def shared_result_age(self) -> int | None:
+        """
+        returns the configured shared result age value
+
+        Returns:
+            the shared result age value
+        """
+        raw_value = self._fetch('shared-result-age')
+        if raw_value is None or raw_value == '':
+            return None
+
+        try:
+            return int(raw_value)
+        except ValueError:
+            return None
+
+    def status_socket(self) -> Path | None:
+        """
+        returns the configured status socket value
+
+        Returns:
+            the status socket value
+        """
+        raw_value = self._fetch('status-socket')
+        if not raw_value:
+            return None
+
+        try:
+            return Path(raw_value)
+        except TypeError:
+            return None
+
     def timeout(self) -> int | None:
         """
         returns the configured timeout value
@@ -317,26 +798,164 @@ class Config:
         engine to operate as expected. For example, configuring the API
         credentials to interact with NFSN. This call will return whether
         the minimum configuration options has been set, and populate stderr
-        with any detected issues.
+        with any detected issues. When profiles are configured, the options
+        of each profile are validated.
 
         Returns:
             whether the configuration is valid
         """
 
+        profiles = self.profiles()
+        if profiles:
+            rv = True
+            for name, profile in profiles.items():
+                prefix = f'(config) ({name})'
+                if not profile._validate_options(prefix):  # noqa: SLF001
+                    rv = False
+
+            return rv
+
+        return self._validate_options('(config)')
+
+    def verify_nameservers(self) -> list[str] | None:
+        """
+        returns the configured verify nameservers value
+
+        Nameservers are provided as a host or address, with an optional port
+        (e.g. ``ns.example.net`` or ``[2001:db8::53]:5353``).
+
+        Returns:
+            the nameservers value
+        """
+        raw_nameservers = self._fetch('verify-nameservers')
+        if isinstance(raw_nameservers, list):
+            nameservers = [str(entry) for entry in raw_nameservers]
+        elif isinstance(raw_nameservers, str) and raw_nameservers:
+            nameservers = raw_nameservers.split(';')
+        else:
+            nameservers = None
+
+        return nameservers
+
+    def watch_config(self) -> bool | None:
+        """
+        returns the configured watch config state value
+
+        Returns:
+            the watch config state value
+        """
+        raw_value = self._fetch('watch-config')
+        if not raw_value:
+            return None
+
+        try:
+            return str2bool(raw_value)
+        except ValueError:
+            return None
+
+    def zones(self) -> dict[str, list[RecordSet]] | None:
+        """
+        returns the configured zones
+
+        Zones provide the desired record sets of each domain to synchronize.
+        Each record set provides a name (empty for the apex), a type, the
+        desired value(s) and an optional time-to-live. Any invalid record set
+        is ignored (see `validate`).
+
+        Returns:
+            the record sets (by domain)
+        """
+        raw_zones = self._fetch_object('zones', env=False)
+        if not isinstance(raw_zones, dict):
+            return None
+
+        zones = {}
+        for domain, raw_record_sets in raw_zones.items():
+            record_sets = []
+            for raw_record_set in raw_record_sets or []:
+                record_set = _parse_record_set(raw_record_set)
+                if record_set:
+                    record_sets.append(record_set)
+
+            zones[str(domain)] = record_sets
+
+        return zones
+
+    def _validate_options(self, prefix: str) -> bool:
+        """
+        validates required options for a single account
+
+        Args:
+            prefix: the prefix to use for any reported issue
+
+        Returns:
+            whether the options are valid
+        """
+
         rv = True
 
         if not self.api_login():
-            err('(config) missing api login value')
+            err(f'{prefix} missing api login value')
             rv = False
 
         if not self.api_token():
-            err('(config) missing api token value')
+            err(f'{prefix} missing api token value')
             rv = False
 
-        if not self.ddns_domains():
-            err('(config) missing ddns domains value')
+        raw_zones = self._fetch_object('zones', env=False)
+        if raw_zones is not None:
+            if not isinstance(raw_zones, dict):
+                err(f'{prefix} zones value is not a map')
+                rv = False
+                raw_zones = {}
+
+            for domain, raw_record_sets in raw_zones.items():
+                if not isinstance(raw_record_sets, list | None):
+                    err(f'{prefix} zone is not a list: {domain}')
+                    rv = False
+                    continue
+
+                for idx, raw_record_set in enumerate(raw_record_sets or []):
+                    if not _parse_record_set(raw_record_set):
+                        err(f'{prefix} invalid record set ({domain}; '
+                            f'index: {idx})')
+                        rv = False
+
+        prefix_hosts = self.prefix_hosts()
+        for entry, interface_id in (prefix_hosts or {}).items():
+            if not _valid_interface_id(interface_id):
+                err(f'{prefix} invalid prefix host interface identifier '
+                    f'({entry}): {interface_id}')
+                rv = False
+
+        if not self.ddns_domains() and not raw_zones and not prefix_hosts:
+            err(f'{prefix} missing ddns domains value')
             rv = False
 
+        endpoints = [
+            *(self.myipv4_api_endpoints() or []),
+            *(self.myipv6_api_endpoints() or []),
+        ]
+        for endpoint in endpoints:
+            scheme = urlparse(endpoint).scheme
+            if scheme in SOCKET_ENDPOINT_SCHEMES and \
+                    not split_socket_endpoint(endpoint):
+                err(f'{prefix} invalid myip api endpoint: {endpoint}')
+                rv = False
+
+        propagation_timeout = self.propagation_timeout()
+        if propagation_timeout is not None and \
+                not 0 < propagation_timeout <= MAX_PROPAGATION_TIMEOUT:
+            err(f'{prefix} invalid propagation timeout: '
+                f'{propagation_timeout}')
+            rv = False
+
+        verify_nameservers = self.verify_nameservers()
+        for nameserver in verify_nameservers or []:
+            if not parse_nameserver(nameserver):
+                err(f'{prefix} invalid verify nameserver: {nameserver}')
+                rv = False
+
         return rv
 
     def _fetch(self, key: str, *, env: bool = True) -> str | None:
@@ -364,3 +983,79 @@ class Config:
             value = os.environ.get(f'{NFSN_DDNS_ENV_PREFIX}{env_key}', None)
 
         return value
+
+    def _fetch_object(self, key: str, *, env: bool = True) -> object:
+        """
+        fetch a specific key (of any value type) from the configuration
+
+        Equivalent to `_fetch`, for keys which may be configured with a
+        structured value (e.g. a map) that needs to be checked by the caller.
+
+        Args:
+            key: the configuration key
+            env (optional): whether to fallback on the environment
+
+        Returns:
+            the key's value
+        """
+        return self._fetch(key, env=env)
+
+
+def _parse_record_set(raw: object) -> RecordSet | None:
+    """
+    parse a configured record set
+
+    Args:
+        raw: the raw record set
+
+    Returns:
+        the record set; ``None`` if the record set is invalid
+    """
+    if not isinstance(raw, dict):
+        return None
+
+    name = raw.get('name', '')
+    rr_type = raw.get('type')
+    raw_data = raw.get('data', [])
+    raw_ttl = raw.get('ttl')
+
+    if not isinstance(name, str) or not isinstance(rr_type, str) \
+            or not rr_type:
+        return None
+
+    if isinstance(raw_data, str | int):
+        raw_data = [raw_data]
+    elif not isinstance(raw_data, list):
+        return None
+
+    ttl = None
+    if raw_ttl is not None:
+        try:
+            ttl = int(raw_ttl)
+        except (TypeError, ValueError):
+            return None
+
+    return RecordSet(
+        name=name,
+        type=rr_type.upper(),
+        data=frozenset(str(value) for value in raw_data),
+        ttl=ttl,
+    )
+
+
+def _valid_interface_id(value: str) -> bool:
+    """
+    check whether a configured interface identifier is valid
+
+    Args:
+        value: the interface identifier
+
+    Returns:
+        whether the interface identifier is valid
+    """
+    try:
+        ipaddress.IPv6Address(value)
+    except ValueError:
+        return False
+
+    return True
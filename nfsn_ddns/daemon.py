@@ -0,0 +1,396 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from argparse import Namespace
+from contextlib import suppress
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from nfsn_ddns.debounce import Debouncer
+from nfsn_ddns.defs import DEFAULT_CFG_FILE
+from nfsn_ddns.defs import DEFAULT_DEBOUNCE_SAMPLES
+from nfsn_ddns.defs import DEFAULT_INTERVAL
+from nfsn_ddns.defs import DEFAULT_METRICS_ADDRESS
+from nfsn_ddns.defs import DEFAULT_RESOLVER_TTL
+from nfsn_ddns.defs import MIN_INTERVAL
+from nfsn_ddns.engine import EngineState
+from nfsn_ddns.engine import engine_async
+from nfsn_ddns.engine import load_config
+from nfsn_ddns.log import err
+from nfsn_ddns.log import log
+from nfsn_ddns.log import verbose
+from nfsn_ddns.log import warn
+from nfsn_ddns.metrics import MetricsServer
+from nfsn_ddns.resolver import ResolverCache
+from nfsn_ddns.schedule import CronSchedule
+from nfsn_ddns.schedule import ScheduleError
+from nfsn_ddns.session import new_session
+from nfsn_ddns.status import DaemonStatus
+from nfsn_ddns.status import StatusServer
+from nfsn_ddns.watch import FileWatcher
+from typing import NamedTuple
+from typing import TYPE_CHECKING
+import asyncio
+import signal
+import sys
+import time
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable
+    from nfsn_ddns.config import Config
+
+
+class DaemonSettings(NamedTuple):
+    # the (validated) configuration of each run
+    cfg: Config
+    # the interval between runs (without a schedule)
+    interval: int
+    # the schedule of runs (if any)
+    schedule: CronSchedule | None
+
+
+def daemon(args: Namespace) -> int:
+    """
+    the nfsn-ddns daemon
+
+    Runs the asynchronous daemon (see `daemon_async`) until interrupted.
+
+    Args:
+        args: arguments provided at runtime
+
+    Returns:
+        the exit code
+    """
+    return asyncio.run(daemon_async(args))
+
+
+async def daemon_async(args: Namespace) -> int:
+    """
+    the nfsn-ddns daemon (asynchronous)
+
+    Runs the engine on a configured interval (or cron schedule), starting
+    with an immediate run. A single session is kept between runs, allowing
+    connections to be reused. Host resolutions are cached between runs as
+    well (see ``ResolverCache``), where configured endpoints are
+    pre-resolved at the start of each run. When debouncing is configured,
+    pending address changes are also kept between runs. If configured, a
+    metrics endpoint and a status socket (see ``StatusServer``) are served
+    for the lifetime of the daemon.
+
+    The configuration is loaded and validated once, when the daemon starts.
+    A hangup request (``SIGHUP``), a ``reload`` command on the status socket
+    or (if configured) a change to the configuration file reloads the
+    configuration. A reloaded configuration is only applied if valid, and
+    replaces the active configuration as a whole for following runs (an
+    active run completes with the configuration it started with). Options
+    of the daemon itself (e.g. the metrics endpoint or the status socket)
+    require a restart to change. A user-defined signal (``SIGUSR1``) or a
+    ``refresh`` command on the status socket triggers an immediate run,
+    where the command responds with the outcome of the run.
+
+    The daemon stops on an interrupt or termination request, abandoning any
+    active run. Termination is handled explicitly, allowing the daemon to run
+    as the init process of a container.
+
+    Args:
+        args: arguments provided at runtime
+
+    Returns:
+        the exit code
+    """
+
+    settings = _load_settings(args)
+    if not settings:
+        return EngineState.BAD_CONFIG
+
+    cfg = settings.cfg
+
+    status_socket = cfg.status_socket()
+    if status_socket and sys.platform == 'win32':
+        err('(config) status sockets are not supported on windows')
+        return EngineState.BAD_CONFIG
+
+    verbose('(config) status-socket: {}', status_socket)
+
+    # pending address changes are tracked in memory between runs
+    debouncer = None
+    debounce = cfg.debounce()
+    if debounce:
+        debounce_samples = cfg.debounce_samples()
+        debouncer = Debouncer(debounce, samples=DEFAULT_DEBOUNCE_SAMPLES
+            if debounce_samples is None else debounce_samples)
+
+    # host resolutions are cached in memory between runs
+    resolver = None
+    resolver_ttl = cfg.resolver_ttl()
+    if resolver_ttl is None:
+        resolver_ttl = DEFAULT_RESOLVER_TTL
+    if resolver_ttl > 0:
+        resolver = ResolverCache(ttl=resolver_ttl)
+
+    loop = asyncio.get_running_loop()
+    status = DaemonStatus()
+    stopping = asyncio.Event()
+    # set when an immediate run is requested
+    refreshing = asyncio.Event()
+    # set when the configuration has been reloaded
+    reloaded = asyncio.Event()
+    # requests waiting on the outcome of the next run
+    waiters = []  # type: list[asyncio.Future[int | None]]
+
+    def reload() -> bool:
+        nonlocal settings
+
+        new_settings = _load_settings(args)
+        if not new_settings:
+            err('configuration reload failed; keeping active configuration')
+            return False
+
+        # swap in the new configuration as a whole
+        settings = new_settings
+        status.last_reload = datetime.now().astimezone()
+        reloaded.set()
+        log('configuration reloaded')
+        return True
+
+    async def handle(command: str) -> dict[str, object]:
+        if command == 'status':
+            return status.render()
+
+        if command == 'refresh':
+            waiter = loop.create_future()
+            waiters.append(waiter)
+            refreshing.set()
+
+            state = await waiter
+            if state is None:
+                return {'error': 'daemon stopped'}
+
+            return {
+                'state': EngineState(state).name.lower(),
+                'addresses': dict(status.addresses),
+            }
+
+        if command == 'reload':
+            if not reload():
+                return {'error': 'invalid configuration'}
+
+            return {'reloaded': True}
+
+        return {'error': f'unknown command: {command}'}
+
+    status_server = None
+    if status_socket:
+        status_server = StatusServer(status_socket, handle)
+        try:
+            await status_server.start()
+        except OSError as e:
+            err(f'unable to serve status on socket: {status_socket}\n{e}')
+            return EngineState.BAD_CONFIG
+
+    metrics_server = None
+    metrics_port = cfg.metrics_port()
+    if metrics_port is not None:
+        metrics_address = cfg.metrics_address() or DEFAULT_METRICS_ADDRESS
+        try:
+            metrics_server = MetricsServer(metrics_address, metrics_port)
+        except OSError as e:
+            err(f'unable to serve metrics on port: {metrics_port}\n{e}')
+            if status_server:
+                await status_server.stop()
+            return EngineState.BAD_CONFIG
+
+        metrics_server.start()
+
+    # reload the configuration when its file changes (if requested)
+    watcher = None
+    if cfg.watch_config():
+        watcher = FileWatcher(args.cfg or DEFAULT_CFG_FILE, reload)
+        if not watcher.start():
+            warn('unable to watch configuration file for changes')
+            watcher = None
+
+    # stop on an interrupt or termination request, reload on a hangup
+    # request and run immediately on a user-defined signal
+    signals = {}
+    if sys.platform != 'win32':
+        signals = {
+            signal.SIGHUP: reload,
+            signal.SIGINT: stopping.set,
+            signal.SIGTERM: stopping.set,
+            signal.SIGUSR1: refreshing.set,
+        }
+    for signum, handler in signals.items():
+        loop.add_signal_handler(signum, handler)
+
+    # each run performs a standard update
+    run_args = Namespace(**vars(args))
+    run_args.action = None
+
+    # requests waiting on the active run
+    active = []  # type: list[asyncio.Future[int | None]]
+
+    try:
+        with new_session(resolver=resolver) as session:
+            while not stopping.is_set():
+                active = list(waiters)
+                waiters.clear()
+                refreshing.clear()
+
+                status.running = True
+                state = await _until_stopped(engine_async(run_args, session,
+                    debouncer, status.addresses, settings.cfg), stopping)
+                status.running = False
+                if state is None:
+                    break
+
+                status.record(state, datetime.now().astimezone())
+                _resolve_waiters(active, state)
+                if state != EngineState.OK:
+                    err(f'run failed ({EngineState(state).name.lower()})')
+
+                # wait for the next run, planning again after a reload
+                while not stopping.is_set() and not refreshing.is_set():
+                    reloaded.clear()
+                    status.next_run = _next_run(settings.schedule,
+                        settings.interval)
+                    delay = max(status.next_run.timestamp() - time.time(), 0)
+                    verbose('next run at {:%Y-%m-%d %H:%M:%S} (in {:.0f} '
+                        'seconds)', status.next_run, delay)
+
+                    events = [stopping, refreshing, reloaded]
+                    if not await _wait_any(events, delay):
+                        break
+    finally:
+        _resolve_waiters(active + waiters, None)
+        for signum in signals:
+            loop.remove_signal_handler(signum)
+        if watcher:
+            watcher.stop()
+        if status_server:
+            await status_server.stop()
+        if metrics_server:
+            metrics_server.stop()
+
+    log('daemon stopped')
+    return EngineState.OK
+
+
+def _load_settings(args: Namespace) -> DaemonSettings | None:
+    """
+    load the settings of the daemon
+
+    Args:
+        args: arguments provided at runtime
+
+    Returns:
+        the settings; ``None`` if the configuration is invalid
+    """
+
+    cfg = load_config(args)
+    if not cfg:
+        return None
+
+    interval = cfg.interval()
+    if interval is None:
+        interval = DEFAULT_INTERVAL
+    elif interval < MIN_INTERVAL:
+        interval = MIN_INTERVAL
+
+    raw_schedule = cfg.schedule()
+    schedule = None
+    if raw_schedule:
+        try:
+            schedule = CronSchedule(raw_schedule)
+            schedule.next_run(datetime.now(tz=timezone.utc))
+        except ScheduleError as e:
+            err(f'(config) invalid schedule: {raw_schedule}\n{e}')
+            return None
+
+    verbose('(config) interval: {}', interval)
+    verbose('(config) schedule: {}', raw_schedule)
+
+    return DaemonSettings(cfg=cfg, interval=interval, schedule=schedule)
+
+
+def _next_run(schedule: CronSchedule | None, interval: int) -> datetime:
+    """
+    determine the time of the next run
+
+    Args:
+        schedule: the schedule of runs (if any)
+        interval: the interval between runs (without a schedule)
+
+    Returns:
+        the time of the next run (in local time)
+    """
+    # schedules are evaluated against the local (wall clock) time
+    now = datetime.now(tz=timezone.utc).astimezone().replace(tzinfo=None)
+    if schedule:
+        return schedule.next_run(now).astimezone()
+
+    return (now + timedelta(seconds=interval)).astimezone()
+
+
+async def _until_stopped(run: Awaitable[int],
+        stopping: asyncio.Event) -> int | None:
+    """
+    wait on a run until it completes or the daemon is stopped
+
+    Args:
+        run: the run
+        stopping: the event set when the daemon is stopped
+
+    Returns:
+        the exit code of the run; ``None`` if the run was abandoned
+    """
+    run_task = asyncio.ensure_future(run)
+    stop_task = asyncio.ensure_future(stopping.wait())
+    await asyncio.wait({run_task, stop_task},
+        return_when=asyncio.FIRST_COMPLETED)
+    stop_task.cancel()
+
+    if run_task.done():
+        return run_task.result()
+
+    run_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await run_task
+    return None
+
+
+def _resolve_waiters(waiters: list[asyncio.Future[int | None]],
+        state: int | None) -> None:
+    """
+    provide the outcome of a run to requests waiting on it
+
+    Args:
+        waiters: the waiting requests
+        state: the exit code of the run; ``None`` if the run was abandoned
+    """
+    for waiter in waiters:
+        if not waiter.done():
+            waiter.set_result(state)
+
+
+async def _wait_any(events: list[asyncio.Event], timeout: float) -> bool:
+    """
+    wait until any of the provided events is set
+
+    Args:
+        events: the events
+        timeout: the time to wait
+
+    Returns:
+        whether an event was set (before the timeout)
+    """
+    tasks = [asyncio.ensure_future(event.wait()) for event in events]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=timeout,
+            return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return bool(done)
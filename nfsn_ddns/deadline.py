@@ -0,0 +1,116 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from requests.exceptions import Timeout
+import time
+
+
+# raised when a request is attempted after its deadline has expired
+class DeadlineExceeded(Timeout):
+    pass
+
+
+class Deadline:
+    def __init__(self, budget: float | None = None, *,
+            parent: Deadline | None = None) -> None:
+        """
+        a deadline bounding the duration of a run (or a phase of a run)
+
+        A deadline expires once its budget (in seconds) has elapsed from its
+        creation. A deadline created for a phase of a run (see `child`)
+        inherits the deadline of its parent, expiring at whichever deadline
+        comes first. A deadline without a budget (or parent) never expires.
+
+        Requests made under a deadline have their timeouts capped by the
+        time remaining (see `limit` and `request_timeout`), allowing a run to
+        complete within a known bound even when sources degrade.
+
+        Args:
+            budget (optional): the seconds until the deadline expires
+            parent (optional): the deadline this deadline is bound by
+        """
+        self.expires = None  # type: float | None
+        if budget is not None:
+            self.expires = time.monotonic() + max(budget, 0)
+
+        if parent and parent.expires is not None:
+            if self.expires is None:
+                self.expires = parent.expires
+            else:
+                self.expires = min(self.expires, parent.expires)
+
+    def child(self, budget: float | None = None) -> Deadline:
+        """
+        create a deadline for a phase of this deadline
+
+        Args:
+            budget (optional): the seconds given to the phase
+
+        Returns:
+            the deadline of the phase
+        """
+        return Deadline(budget, parent=self)
+
+    def expired(self) -> bool:
+        """
+        returns whether the deadline has expired
+
+        Returns:
+            whether the deadline has expired
+        """
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def limit(self, timeout: float) -> float:
+        """
+        cap a timeout to the time remaining
+
+        Args:
+            timeout: the timeout
+
+        Returns:
+            the capped timeout (zero once expired)
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+
+        return max(min(timeout, remaining), 0)
+
+    def remaining(self) -> float | None:
+        """
+        returns the time remaining until the deadline expires
+
+        Returns:
+            the seconds remaining; ``None`` if the deadline never expires
+        """
+        if self.expires is None:
+            return None
+
+        return self.expires - time.monotonic()
+
+    def request_timeout(self, read: float,
+            connect: float | None = None) -> float | tuple[float, float]:
+        """
+        build the timeout of a web request made under this deadline
+
+        Args:
+            read: the read timeout
+            connect (optional): the connect timeout (defaults to the read
+                                timeout)
+
+        Returns:
+            the timeout (a connect/read tuple if a connect timeout is set)
+
+        Raises:
+            ``DeadlineExceeded`` is raised if the deadline has expired
+        """
+        if self.expired():
+            msg = 'deadline exceeded'
+            raise DeadlineExceeded(msg)
+
+        if connect is None:
+            return self.limit(read)
+
+        return self.limit(connect), self.limit(read)
@@ -0,0 +1,135 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from nfsn_ddns.defs import DEFAULT_DEBOUNCE_SAMPLES
+from nfsn_ddns.defs import DEFAULT_FLAP_THRESHOLD
+from nfsn_ddns.log import verbose
+from nfsn_ddns.log import warn
+from typing import NamedTuple
+import time
+
+
+class Candidate(NamedTuple):
+    # the observed address
+    address: str
+    # when the address was first observed (epoch seconds)
+    since: float
+    # the number of times the address has been observed
+    samples: int
+    # the number of times a candidate was replaced before being confirmed
+    flaps: int
+
+
+class Debouncer:
+    def __init__(self, window: float, *,
+            samples: int = DEFAULT_DEBOUNCE_SAMPLES,
+            flaps: int = DEFAULT_FLAP_THRESHOLD) -> None:
+        """
+        address change debouncer
+
+        Tracks newly observed addresses of records, only confirming a change
+        once the new address has remained stable for the provided window or
+        has been observed over the provided number of samples. An address
+        reverting to the existing value of a record discards any pending
+        change.
+
+        A record whose pending address keeps changing before being confirmed
+        is considered flapping. Once the number of flaps reaches the provided
+        threshold, a change is only confirmed after remaining stable for the
+        entire window (samples alone no longer confirm a change).
+
+        Args:
+            window: seconds an address must remain stable
+            samples (optional): observations confirming an address (if any)
+            flaps (optional): flaps before a record is considered flapping
+        """
+        self.window = window
+        self.samples = samples
+        self.flaps = flaps
+        self.candidates = {}  # type: dict[tuple[str, str], Candidate]
+
+    def confirm(self, entry: str, rr_type: str, address: str, *,
+            now: float | None = None) -> bool:
+        """
+        observe a changed address of a record
+
+        Args:
+            entry: the ddns entry
+            rr_type: the record type
+            address: the newly observed address
+            now (optional): the current time (epoch seconds)
+
+        Returns:
+            whether the change is confirmed
+        """
+        now = time.time() if now is None else now
+        key = (entry, rr_type)
+
+        candidate = self.candidates.get(key)
+        if candidate and candidate.address == address:
+            candidate = candidate._replace(samples=candidate.samples + 1)
+        else:
+            flaps = candidate.flaps + 1 if candidate else 0
+            if flaps == self.flaps:
+                warn(f'record ({entry}; {rr_type}) is flapping; '
+                    f'changes require {self.window} seconds of stability')
+            candidate = Candidate(address, now, 1, flaps)
+
+        flapping = candidate.flaps >= self.flaps
+        stable = now - candidate.since >= self.window
+        sampled = bool(self.samples) and candidate.samples >= self.samples
+        if stable or (sampled and not flapping):
+            self.candidates.pop(key, None)
+            return True
+
+        self.candidates[key] = candidate
+        verbose('record ({}; {}) change pending: {} (samples: {})',
+            entry, rr_type, address, candidate.samples)
+        return False
+
+    def reset(self, entry: str, rr_type: str) -> None:
+        """
+        discard any pending change of a record
+
+        Args:
+            entry: the ddns entry
+            rr_type: the record type
+        """
+        if self.candidates.pop((entry, rr_type), None):
+            verbose('record ({}; {}) pending change discarded', entry, rr_type)
+
+    def dump(self) -> dict[str, list]:
+        """
+        dump the pending changes (e.g. to persist between runs)
+
+        Returns:
+            the pending changes
+        """
+        return {
+            f'{entry};{rr_type}': list(candidate)
+            for (entry, rr_type), candidate in self.candidates.items()
+        }
+
+    def load(self, data: object) -> None:
+        """
+        load pending changes previously dumped
+
+        Any invalid entry is ignored.
+
+        Args:
+            data: the pending changes
+        """
+        if not isinstance(data, dict):
+            return
+
+        for key, value in data.items():
+            entry, _, rr_type = str(key).partition(';')
+            try:
+                address, since, samples, flaps = value
+                candidate = Candidate(str(address), float(since),
+                    int(samples), int(flaps))
+            except (TypeError, ValueError):
+                continue
+
+            self.candidates[(entry, rr_type)] = candidate
@@ -32,6 +32,27 @@ else:
 # default file for configuration data
 DEFAULT_CFG_FILE = Path('config.yaml')
 
+# default number of ddns entries to process concurrently
+DEFAULT_CONCURRENCY = 8
+
+# default number of observations confirming a debounced address change
+DEFAULT_DEBOUNCE_SAMPLES = 2
+
+# default number of unconfirmed address changes before a record is flapping
+DEFAULT_FLAP_THRESHOLD = 2
+
+# default age (in seconds) a result shared between instances is reused
+DEFAULT_FLIGHT_MAX_AGE = 60
+
+# default time (in seconds) to wait on an operation held by another instance
+DEFAULT_FLIGHT_WAIT = 30
+
+# default delay (in seconds) before hedging a read until latencies are known
+DEFAULT_HEDGE_DELAY = 1
+
+# default number of recent read latencies tracked to derive a hedge delay
+DEFAULT_HEDGE_SAMPLES = 50
+
 # default api endpoints to fetch current ipv4 address
 DEFAULT_IP_FETCH_URLS_V4 = [
     'https://api.ipify.org',
@@ -44,27 +65,92 @@ DEFAULT_IP_FETCH_URLS_V6 = [
     'https://v6.ipinfo.io/ip',
 ]
 
+# default interval (in seconds) between runs when running as a daemon
+DEFAULT_INTERVAL = 3600
+
+# default address to serve metrics on
+DEFAULT_METRICS_ADDRESS = '127.0.0.1'
+
+# default length of a delegated ipv6 prefix
+DEFAULT_PREFIX_LENGTH = 64
+
+# default address to receive dyndns2 updates on
+DEFAULT_RECEIVER_ADDRESS = '127.0.0.1'
+
+# default interval (in seconds) between writes of a record pushed to a receiver
+DEFAULT_RECEIVER_INTERVAL = 300
+
+# default port to receive dyndns2 updates on
+DEFAULT_RECEIVER_PORT = 8245
+
+# default window (in seconds) to coalesce pushed updates before applying
+DEFAULT_RECEIVER_WINDOW = 1
+
+# default time (in seconds) an expired host resolution may be used for when
+# the resolver fails (one day)
+DEFAULT_RESOLVER_STALE = 86400
+
+# default time (in seconds) a host resolution is cached for
+DEFAULT_RESOLVER_TTL = 300
+
+# default window (in seconds) to coalesce streamed updates before applying
+DEFAULT_STREAM_WINDOW = 1
+
 # default timeout for any requests made
 DEFAULT_TIMEOUT = 10
 
+# mininum interval between runs when running as a daemon (thirty seconds)
+MIN_INTERVAL = 30
+
+# maximum percentile of read latencies to hedge after
+MAX_HEDGE_PERCENTILE = 99
+
+# mininum length of a delegated ipv6 prefix
+MIN_PREFIX_LENGTH = 8
+
 # mininum timeout for any requests made (one second)
 MIN_TIMEOUT = 1
 
 # maximum timeout for any requests made (two minutes)
 MAX_TIMEOUT = 120
 
+# maximum time (in seconds) to wait for changed records to propagate (one
+# hour)
+MAX_PROPAGATION_TIMEOUT = 3600
+
+# maximum number of streamed lines queued before reading is paused
+MAX_STREAM_QUEUE = 1024
+
+# maximum number of coalesced records before a streamed batch is applied
+MAX_STREAM_PENDING = 1000
+
 # http header required for api authentication
 NFSN_AUTH_HEADER = 'X-NFSN-Authentication'
 
 # prefix to use for environment-provided configuration options
 NFSN_DDNS_ENV_PREFIX = 'NFSN_DDNS_'
 
+# schemes of address endpoints queried over a socket (instead of the web)
+SOCKET_ENDPOINT_SCHEMES = ('dns', 'stun')
+
 
 class Action(Enum):
     # only attempt to check interaction with nfsn
     CHECK = 'check'
+    # run continuously, updating records on an interval
+    DAEMON = 'daemon'
     # only attempt to fetch my external ip
     IP = 'ip'
+    # receive addresses pushed by dyndns2 clients
+    RECEIVE = 'receive'
+    # request an immediate run of a running daemon
+    REFRESH = 'refresh'
+    # request a running daemon to reload its configuration
+    RELOAD = 'reload'
+    # report the status of a running daemon
+    STATUS = 'status'
+    # apply record addresses streamed from an input
+    STREAM = 'stream'
 
     def __str__(self) -> str:
         return self.value
@@ -0,0 +1,385 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from typing import NamedTuple
+from typing import TYPE_CHECKING
+import asyncio
+import ipaddress
+import random
+import socket
+import struct
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+# dns record types supported by this resolver
+QTYPE_A = 1
+QTYPE_NS = 2
+QTYPE_CNAME = 5
+QTYPE_TXT = 16
+QTYPE_AAAA = 28
+
+# dns internet class
+QCLASS_IN = 1
+
+# standard dns port
+DNS_PORT = 53
+
+# dns response code for a successful query
+RCODE_NOERROR = 0
+
+# dns response code for a non-existent domain
+RCODE_NXDOMAIN = 3
+
+
+class DnsError(Exception):
+    pass
+
+
+class DnsAnswer(NamedTuple):
+    # the owner name of the answer
+    name: str
+    # the record type of the answer
+    type: int
+    # time-to-live (in seconds) of the answer
+    ttl: int
+    # the decoded value of the answer
+    value: str
+
+
+class DnsResponse(NamedTuple):
+    # the identifier of the query this response is for
+    id: int
+    # the response code
+    rcode: int
+    # whether the response is authoritative
+    authoritative: bool
+    # answers provided in the response
+    answers: list[DnsAnswer]
+
+
+def build_query(name: str, qtype: int, *, qid: int | None = None,
+        recursion: bool = True) -> tuple[int, bytes]:
+    """
+    build a dns query message
+
+    Builds a wire-format DNS query for a single question.
+
+    Args:
+        name: the name to query
+        qtype: the record type to query
+        qid (optional): an explicit identifier to use for the query
+        recursion (optional): whether to request recursion
+
+    Returns:
+        a 2-tuple (query identifier, message)
+    """
+    if qid is None:
+        qid = random.getrandbits(16)
+
+    flags = 0x0100 if recursion else 0x0000
+    header = struct.pack('!HHHHHH', qid, flags, 1, 0, 0, 0)
+    question = encode_name(name) + struct.pack('!HH', qtype, QCLASS_IN)
+    return qid, header + question
+
+
+def encode_name(name: str) -> bytes:
+    """
+    encode a domain name into its wire format
+
+    Args:
+        name: the domain name
+
+    Returns:
+        the encoded name
+
+    Raises:
+        ``DnsError`` is raised if a label is not encodable
+    """
+    encoded = b''
+    for label in name.strip('.').split('.'):
+        if not label:
+            continue
+
+        raw_label = label.encode('idna')
+        if len(raw_label) > 63:
+            msg = f'dns label too long: {label}'
+            raise DnsError(msg)
+
+        encoded += bytes([len(raw_label)]) + raw_label
+
+    return encoded + b'\x00'
+
+
+def parse_response(data: bytes) -> DnsResponse:
+    """
+    parse a dns response message
+
+    Parses a wire-format DNS response, decoding the answer section. Answers of
+    an unsupported type are returned with an empty value.
+
+    Args:
+        data: the raw message
+
+    Returns:
+        the response
+
+    Raises:
+        ``DnsError`` is raised if the message is malformed
+    """
+    try:
+        qid, flags, qdcount, ancount, _, _ = struct.unpack_from('!HHHHHH', data)
+        offset = 12
+
+        for _ in range(qdcount):
+            _, offset = _decode_name(data, offset)
+            offset += 4
+
+        answers = []
+        for _ in range(ancount):
+            name, offset = _decode_name(data, offset)
+            rtype, _, ttl, rdlength = struct.unpack_from('!HHIH', data, offset)
+            offset += 10
+            rdata = data[offset:offset + rdlength]
+            if len(rdata) != rdlength:
+                msg = 'truncated dns answer'
+                raise DnsError(msg)
+
+            value = _decode_rdata(data, offset, rtype, rdata)
+            answers.append(DnsAnswer(name, rtype, ttl, value))
+            offset += rdlength
+    except (IndexError, struct.error, UnicodeError) as e:
+        msg = 'malformed dns response'
+        raise DnsError(msg) from e
+
+    return DnsResponse(
+        id=qid,
+        rcode=flags & 0x000f,
+        authoritative=bool(flags & 0x0400),
+        answers=answers,
+    )
+
+
+async def query_async(server: str, name: str, qtype: int, *,
+        port: int = DNS_PORT, family: int = socket.AF_UNSPEC,
+        timeout: float = 3, recursion: bool = True) -> DnsResponse:
+    """
+    issue a dns query over udp (asynchronous)
+
+    Sends a single query to the provided server and waits for a matching
+    response. When a family is provided, the server is contacted over that
+    address family.
+
+    Args:
+        server: the host or address of the server to query
+        name: the name to query
+        qtype: the record type to query
+        port (optional): the port of the server
+        family (optional): the address family used to reach the server
+        timeout (optional): timeout for the query
+        recursion (optional): whether to request recursion (not requested
+                              when querying an authoritative server)
+
+    Returns:
+        the response
+
+    Raises:
+        ``DnsError`` is raised if the query fails
+        ``TimeoutError`` is raised if no response is received in time
+    """
+    loop = asyncio.get_running_loop()
+    qid, message = build_query(name, qtype, recursion=recursion)
+
+    try:
+        addrinfo = await loop.getaddrinfo(server, port,
+            family=family, type=socket.SOCK_DGRAM)
+    except OSError as e:
+        msg = f'unable to resolve dns server: {server}'
+        raise DnsError(msg) from e
+
+    if not addrinfo:
+        msg = f'unable to resolve dns server: {server}'
+        raise DnsError(msg)
+
+    addr_family, _, _, _, sockaddr = addrinfo[0]
+    response = await udp_exchange(sockaddr, addr_family, message,
+        lambda data: _match_id(data, qid), timeout=timeout)
+    return parse_response(response)
+
+
+def query(server: str, name: str, qtype: int, *, port: int = DNS_PORT,
+        family: int = socket.AF_UNSPEC, timeout: float = 3) -> DnsResponse:
+    """
+    issue a dns query over udp
+
+    A synchronous variant of `query_async`.
+
+    Args:
+        server: the host or address of the server to query
+        name: the name to query
+        qtype: the record type to query
+        port (optional): the port of the server
+        family (optional): the address family used to reach the server
+        timeout (optional): timeout for the query
+
+    Returns:
+        the response
+
+    Raises:
+        ``DnsError`` is raised if the query fails
+        ``TimeoutError`` is raised if no response is received in time
+    """
+    return asyncio.run(query_async(server, name, qtype,
+        port=port, family=family, timeout=timeout))
+
+
+async def udp_exchange(sockaddr: tuple, family: int, message: bytes,
+        matcher: Callable[[bytes], bool], *, timeout: float) -> bytes:
+    """
+    send a udp datagram and wait for a matching reply
+
+    Args:
+        sockaddr: the address to send to
+        family: the address family of the address
+        message: the datagram to send
+        matcher: callback to check if a received datagram is the reply
+        timeout: timeout for the exchange
+
+    Returns:
+        the reply datagram
+
+    Raises:
+        ``TimeoutError`` is raised if no reply is received in time
+    """
+    loop = asyncio.get_running_loop()
+    reply = loop.create_future()
+
+    class Protocol(asyncio.DatagramProtocol):
+        def datagram_received(self, data: bytes, addr: tuple) -> None:  # noqa: ARG002
+            if not reply.done() and matcher(data):
+                reply.set_result(data)
+
+        def error_received(self, exc: Exception) -> None:
+            if not reply.done():
+                reply.set_exception(exc)
+
+    transport, _ = await loop.create_datagram_endpoint(
+        Protocol, family=family, remote_addr=sockaddr[:2])
+    try:
+        transport.sendto(message)
+        return await asyncio.wait_for(reply, timeout)
+    except asyncio.TimeoutError as e:
+        raise TimeoutError from e
+    finally:
+        transport.close()
+
+
+def to_address(answer: DnsAnswer) -> str:
+    """
+    extract an ip address from a dns answer
+
+    Returns the address held by an `A`/`AAAA` answer, or an address found in
+    the contents of a `TXT` answer.
+
+    Args:
+        answer: the answer
+
+    Returns:
+        the address; empty string if the answer holds no address
+    """
+    if answer.type not in (QTYPE_A, QTYPE_AAAA, QTYPE_TXT):
+        return ''
+
+    try:
+        return str(ipaddress.ip_address(answer.value.strip()))
+    except ValueError:
+        return ''
+
+
+def _decode_name(data: bytes, offset: int) -> tuple[str, int]:
+    """
+    decode a (possibly compressed) domain name
+
+    Args:
+        data: the raw message
+        offset: the offset of the name
+
+    Returns:
+        a 2-tuple (name, offset after the name)
+    """
+    labels = []
+    end_offset = None
+    jumps = 0
+
+    while True:
+        length = data[offset]
+        if length & 0xc0 == 0xc0:
+            if end_offset is None:
+                end_offset = offset + 2
+
+            jumps += 1
+            if jumps > 64:
+                msg = 'dns name compression loop'
+                raise DnsError(msg)
+
+            offset = struct.unpack_from('!H', data, offset)[0] & 0x3fff
+            continue
+
+        offset += 1
+        if not length:
+            break
+
+        labels.append(data[offset:offset + length].decode('ascii'))
+        offset += length
+
+    return '.'.join(labels), end_offset if end_offset is not None else offset
+
+
+def _decode_rdata(data: bytes, offset: int, rtype: int, rdata: bytes) -> str:
+    """
+    decode the record data of an answer
+
+    Args:
+        data: the raw message
+        offset: the offset of the record data
+        rtype: the record type
+        rdata: the record data
+
+    Returns:
+        the decoded value
+    """
+    if rtype == QTYPE_A and len(rdata) == 4:
+        return str(ipaddress.IPv4Address(rdata))
+
+    if rtype == QTYPE_AAAA and len(rdata) == 16:
+        return str(ipaddress.IPv6Address(rdata))
+
+    if rtype in (QTYPE_NS, QTYPE_CNAME):
+        return _decode_name(data, offset)[0]
+
+    if rtype == QTYPE_TXT:
+        strings = []
+        idx = 0
+        while idx < len(rdata):
+            length = rdata[idx]
+            strings.append(rdata[idx + 1:idx + 1 + length].decode('utf-8',
+                errors='replace'))
+            idx += 1 + length
+        return ''.join(strings)
+
+    return ''
+
+
+def _match_id(data: bytes, qid: int) -> bool:
+    """
+    check if a datagram is a dns response for a given query identifier
+
+    Args:
+        data: the datagram
+        qid: the query identifier
+
+    Returns:
+        whether the datagram matches
+    """
+    return len(data) >= 12 and struct.unpack_from('!H', data)[0] == qid
@@ -2,40 +2,126 @@
 # Copyright nfsn-ddns Contributors
 
 from __future__ import annotations
+from contextlib import asynccontextmanager
+from contextlib import nullcontext
 from datetime import datetime
 from datetime import timezone
 from enum import IntEnum
-from nfsn_ddns.auth import NfsnAuth
+from functools import partial
+from nfsn_ddns.cassette import Cassette
+from nfsn_ddns.cassette import CassetteMode
+from nfsn_ddns.client import NfsnClient
 from nfsn_ddns.config import Config
+from nfsn_ddns.deadline import Deadline
+from nfsn_ddns.fingerprint import local_fingerprint
+from nfsn_ddns.debounce import Debouncer
 from nfsn_ddns.defs import API_DNS_ENDPOINT
 from nfsn_ddns.defs import Action
 from nfsn_ddns.defs import DEFAULT_CACHE_DAYS
 from nfsn_ddns.defs import DEFAULT_CACHE_FILES
 from nfsn_ddns.defs import DEFAULT_CFG_FILE
+from nfsn_ddns.defs import DEFAULT_DEBOUNCE_SAMPLES
+from nfsn_ddns.defs import DEFAULT_FLIGHT_MAX_AGE
+from nfsn_ddns.defs import DEFAULT_FLIGHT_WAIT
+from nfsn_ddns.defs import DEFAULT_IP_FETCH_URLS_V4
+from nfsn_ddns.defs import DEFAULT_IP_FETCH_URLS_V6
+from nfsn_ddns.defs import DEFAULT_PREFIX_LENGTH
+from nfsn_ddns.defs import DEFAULT_RESOLVER_TTL
 from nfsn_ddns.defs import DEFAULT_TIMEOUT
 from nfsn_ddns.defs import MAX_CACHE_DAYS
+from nfsn_ddns.defs import MAX_HEDGE_PERCENTILE
 from nfsn_ddns.defs import MAX_TIMEOUT
 from nfsn_ddns.defs import MIN_CACHE_DAYS
+from nfsn_ddns.defs import MIN_PREFIX_LENGTH
 from nfsn_ddns.defs import MIN_TIMEOUT
+from nfsn_ddns.flight import FileLock
+from nfsn_ddns.flight import SingleFlight
+from nfsn_ddns.flight import atomic_write
+from nfsn_ddns.hedge import LatencyTracker
 from nfsn_ddns.log import err
 from nfsn_ddns.log import log
 from nfsn_ddns.log import success
 from nfsn_ddns.log import verbose
 from nfsn_ddns.log import warn
-from nfsn_ddns.myip import fetch_myipv4
-from nfsn_ddns.myip import fetch_myipv6
-from nfsn_ddns.myip_cmd import fetch_myipv4_cmd
-from nfsn_ddns.myip_cmd import fetch_myipv6_cmd
+from nfsn_ddns.metrics import CACHE_CHECKS
+from nfsn_ddns.metrics import LAST_RUN
+from nfsn_ddns.metrics import LAST_SUCCESS
+from nfsn_ddns.metrics import RECORDS
+from nfsn_ddns.metrics import RECORD_PROPAGATION
+from nfsn_ddns.metrics import RUNS
+from nfsn_ddns.myip_async import fetch_myipv4_async
+from nfsn_ddns.myip_async import fetch_myipv6_async
+from nfsn_ddns.prefix import detect_interface_prefix
+from nfsn_ddns.prefix import detect_prefix
+from nfsn_ddns.prefix import prefix_zones
+from nfsn_ddns.report import RunReport
+from nfsn_ddns.report import report_address
+from nfsn_ddns.report import report_cache
+from nfsn_ddns.report import report_record
+from nfsn_ddns.resolver import ResolverCache
+from nfsn_ddns.resolver import ResolvingAdapter
+from nfsn_ddns.resolver import endpoint_host
+from nfsn_ddns.resolver import pin_endpoint
+from nfsn_ddns.session import new_session
+from nfsn_ddns.timing import Profiler
+from nfsn_ddns.timing import phase
+from nfsn_ddns.sync import ChangeAction
+from nfsn_ddns.sync import ZoneSyncer
+from nfsn_ddns.updater import DdnsUpdater
+from nfsn_ddns.updater import UpdateAction
+from nfsn_ddns.utils import split_ddns_entry
+from nfsn_ddns.verify import PropagationChecker
+from nfsn_ddns.verify import PropagationRecord
+from nfsn_ddns.verify import RecordVerifier
+from nfsn_ddns.verify import parse_nameserver
 from pathlib import Path
 from requests.exceptions import HTTPError
+from requests.exceptions import RequestException
+from typing import NamedTuple
 from typing import TYPE_CHECKING
+import asyncio
+import hashlib
 import json
 import os
-import requests
+import socket
 import sys
+import time
 
 if TYPE_CHECKING:
     from argparse import Namespace
+    from collections.abc import AsyncIterator
+    from collections.abc import Awaitable
+    from collections.abc import Callable
+    from ipaddress import IPv6Network
+    from nfsn_ddns.sync import RecordSet
+    from nfsn_ddns.sync import ZoneResult
+    from nfsn_ddns.updater import UpdateResult
+    from nfsn_ddns.verify import Nameserver
+    from nfsn_ddns.verify import PropagationResult
+    from requests import Session
+
+
+class EngineProfile(NamedTuple):
+    # the name of the profile (empty for a default profile)
+    name: str
+    # the nfsn api endpoint
+    api_endpoint: str
+    # the api login to authenticate with
+    api_login: str
+    # the api token to authenticate with
+    api_token: str
+    # the ddns entries to process
+    domains: list[str]
+    # whether to process ipv4 (`A` records)
+    ipv4: bool
+    # whether to process ipv6 (`AAAA` records)
+    ipv6: bool
+    # the authoritative nameservers to verify records of ddns entries with
+    nameservers: list[Nameserver]
+    # the interface identifiers of ddns entries within a delegated prefix
+    prefix_hosts: dict[str, str]
+    # the desired record sets of zones to synchronize (by domain)
+    zones: dict[str, list[RecordSet]]
 
 
 class EngineState(IntEnum):
@@ -57,49 +143,226 @@ def engine(args: Namespace) -> int:
     """
     the nfsn-ddns engine
 
+    Runs the asynchronous engine (see `engine_async`) to completion.
+
     Args:
         args: arguments provided at runtime
 
     Returns:
         the exit code
     """
+    return asyncio.run(engine_async(args))
 
-    # prepare configuration
-    cfg = Config()
 
-    cfg_file = args.cfg or DEFAULT_CFG_FILE
-    if not cfg.load(cfg_file, expected=args.cfg):
-        return EngineState.BAD_CONFIG
+async def engine_async(args: Namespace,
+        session: Session | None = None,
+        debouncer: Debouncer | None = None,
+        addresses: dict[str, str] | None = None,
+        cfg: Config | None = None) -> int:
+    """
+    the nfsn-ddns engine (asynchronous)
 
-    cfg.accept(args)
+    Public addresses are detected concurrently for each enabled address
+    family, followed by the concurrent processing of each configured ddns
+    entry. Blocking web requests are dispatched to the event loop's executor,
+    where each request is bound by the configured timeout. All web requests
+    made in a run share a single (pooled) session.
 
-    if not cfg.validate():
-        return EngineState.BAD_CONFIG
+    When multiple profiles are configured, addresses are detected once and
+    each profile is processed concurrently using its own credentials.
+
+    When the NFSN API is expected to be queried (i.e. the cache cannot end
+    the run), the reads of each profile are issued while addresses are
+    detected, overlapping the connection to the API and its reads with
+    address detection.
+
+    When profiling is requested, the duration of each phase of the run
+    (configuration, cache handling, address detection and each NFSN API call)
+    is reported as a timing tree once the run completes.
+
+    When a report is requested, a structured (json) report of the run is
+    written once the run completes (see ``RunReport``).
+
+    Web interactions can be recorded into (or replayed from) a cassette file,
+    allowing runs to be repeated without network access (see ``Cassette``).
+    A cassette only applies to sessions created by the run.
+
+    When a deadline is configured, the run completes within the deadline
+    even when sources degrade: the timeout of every request is capped by the
+    time remaining, and requests are no longer attempted once the deadline
+    has expired. Address detection and NFSN API calls can each be given
+    their own budget, which is bound by the run's deadline.
+
+    When debouncing is configured, address changes of existing records are
+    deferred until confirmed stable (see ``Debouncer``). Pending changes are
+    kept by a provided debouncer (e.g. kept between runs) or, otherwise, in
+    the cache.
+
+    Args:
+        args: arguments provided at runtime
+        session (optional): a session to use (e.g. kept between runs)
+        debouncer (optional): a debouncer to use (e.g. kept between runs)
+        addresses (optional): a dictionary to populate with the addresses
+                              (and delegated prefix) known to the run
+        cfg (optional): a validated configuration to use
+
+    Returns:
+        the exit code
+    """
+
+    # prepare any cassette to record/replay web interactions with
+    cassette = None
+    if http_record := getattr(args, 'http_record', None):
+        cassette = Cassette(http_record, CassetteMode.RECORD)
+    elif http_replay := getattr(args, 'http_replay', None):
+        cassette = Cassette(http_replay, CassetteMode.REPLAY,
+            latency=getattr(args, 'http_replay_latency', False))
+
+    # prepare a structured report of the run (if requested)
+    report = None
+    if getattr(args, 'report', None):
+        report = RunReport()
+
+    with report or nullcontext():
+        if cassette and cassette.mode == CassetteMode.REPLAY \
+                and not cassette.load():
+            state = EngineState.BAD_CONFIG  # type: int
+        else:
+            with cassette or nullcontext():
+                state = await _profiled_run(args, session, debouncer,
+                    addresses, cfg, report)
+
+    if report:
+        report.complete(EngineState(state).name.lower())
+        report_file = getattr(args, 'report_file', None)
+        if not report.write(report_file):
+            warn(f'unable to write run report: {report_file}')
+
+    now = time.time()
+    RUNS.inc(state=EngineState(state).name.lower())
+    LAST_RUN.set(now)
+    if state == EngineState.OK:
+        LAST_SUCCESS.set(now)
+
+    return state
+
+
+async def _profiled_run(args: Namespace, session: Session | None,
+        debouncer: Debouncer | None,
+        addresses: dict[str, str] | None,
+        cfg: Config | None, report: RunReport | None) -> int:
+    """
+    perform a single run of the engine (profiled, if requested)
+
+    Phases are timed when profiling or when a report is requested (which
+    includes the timings of each phase).
+
+    Args:
+        args: arguments provided at runtime
+        session: a session to use (if any)
+        debouncer: a debouncer to use (if any)
+        addresses: a dictionary to populate with known addresses (if any)
+        cfg: a validated configuration to use (if any)
+        report: a report of the run (if any)
+
+    Returns:
+        the exit code
+    """
+
+    profile_stats = getattr(args, 'profile_stats', None)
+    profile_memory = getattr(args, 'profile_memory', None)
+    profiling = getattr(args, 'profile', False) or profile_stats \
+        or profile_memory
+    if not profiling and not report:
+        return await _run(args, session, debouncer, addresses, cfg)
+
+    profiler = Profiler('run', stats_file=profile_stats,
+        memory_file=profile_memory)
+    with profiler:
+        state = await _run(args, session, debouncer, addresses, cfg)
+
+    if report:
+        report.attach_timings(profiler.root)
+
+    if not profiling:
+        return state
+
+    log('(profile) timings:\n' + profiler.render())
+    if profiler.stats_file:
+        log(f'(profile) cprofile statistics: {profiler.stats_file}')
+    if profiler.memory_file:
+        log(f'(profile) tracemalloc snapshot: {profiler.memory_file}')
+
+    return state
+
+
+async def _run(args: Namespace, session: Session | None,
+        debouncer: Debouncer | None,
+        addresses: dict[str, str] | None,
+        cfg: Config | None) -> int:
+    """
+    perform a single run of the engine
+
+    Args:
+        args: arguments provided at runtime
+        session: a session to use (if any)
+        debouncer: a debouncer to use (if any)
+        addresses: a dictionary to populate with known addresses (if any)
+        cfg: a validated configuration to use (if any)
+
+    Returns:
+        the exit code
+    """
+
+    # prepare configuration (unless already provided)
+    with phase('config'):
+        if cfg is None:
+            cfg = load_config(args)
+            if cfg is None:
+                return EngineState.BAD_CONFIG
 
-    api_endpoint = cfg.nfsn_api_endpoint()
-    api_login = cfg.api_login()
-    api_token = cfg.api_token()
     allow_caching = cfg.cache()
     cache_days = cfg.cache_days()
     cache_file = cfg.cache_file()
-    ddns_domains = cfg.ddns_domains()
-    ipv4 = cfg.ipv4()
-    ipv6 = cfg.ipv6()
+    connect_timeout = cfg.connect_timeout()
+    debounce = cfg.debounce()
+    detect_budget = cfg.detect_budget()
+    fingerprint_files = cfg.fingerprint_files() or []
+    hedge_percentile = cfg.hedge_percentile()
+    nfsn_budget = cfg.nfsn_budget()
+    prefix_interface = cfg.prefix_interface()
+    prefix_length = cfg.prefix_length()
+    propagation_timeout = cfg.propagation_timeout()
+    resolver_ttl = cfg.resolver_ttl()
+    run_budget = cfg.deadline()
+    shared_result_age = cfg.shared_result_age()
     timeout = cfg.timeout()
+    use_fingerprint = cfg.fingerprint()
 
-    # verified via cfg.validate()
-    assert isinstance(api_login, str)
-    assert isinstance(api_token, str)
-    assert isinstance(ddns_domains, list)
+    # the run (and each phase of the run) is bound by any configured budget
+    deadline = Deadline(_budget(run_budget))
+
+    # resolve each profile (or a single default profile) to process
+    profiles = [
+        resolve_profile(name, profile_cfg)
+        for name, profile_cfg in (cfg.profiles() or {'': cfg}).items()
+    ]
+
+    # detect addresses for any family enabled by a profile
+    ipv4 = any(profile.ipv4 for profile in profiles)
+    ipv6 = any(profile.ipv6 for profile in profiles)
+
+    # detect a delegated prefix if any profile has prefix hosts; where,
+    # without an interface, the prefix is derived from the detected ipv6
+    # address
+    delegation = any(profile.prefix_hosts for profile in profiles)
+    detect_ipv6 = ipv6 or (delegation and not prefix_interface)
 
     if sys.platform != 'win32':
         uid = os.getuid()
     else:
         uid = 1000
 
-    if not api_endpoint:
-        api_endpoint = API_DNS_ENDPOINT
-
     if cache_days is None:
         cache_days = DEFAULT_CACHE_DAYS
     elif cache_days < MIN_CACHE_DAYS:
@@ -109,9 +372,14 @@ def engine(args: Namespace) -> int:
 
     cache_files = [cache_file] if cache_file else DEFAULT_CACHE_FILES
 
-    # query ipv4 by default is not configured
-    if ipv4 is None:
-        ipv4 = True
+    if prefix_length is None:
+        prefix_length = DEFAULT_PREFIX_LENGTH
+
+    if resolver_ttl is None:
+        resolver_ttl = DEFAULT_RESOLVER_TTL
+
+    if shared_result_age is None:
+        shared_result_age = DEFAULT_FLIGHT_MAX_AGE
 
     if timeout is None:
         timeout = DEFAULT_TIMEOUT
@@ -120,232 +388,1138 @@ def engine(args: Namespace) -> int:
     elif timeout > MAX_TIMEOUT:
         timeout = MAX_TIMEOUT
 
-    token_value = '(set)' if api_token else '(noset)'
+    if connect_timeout is not None:
+        connect_timeout = min(max(connect_timeout, MIN_TIMEOUT), MAX_TIMEOUT)
+
     cache_file_value = cache_file or '(default)'
-    verbose(f'(config) api-endpoint: {api_endpoint}')
-    verbose(f'(config) api-login: {api_login}')
-    verbose(f'(config) api-token: {token_value}')
-    verbose(f'(config) caching: {allow_caching}')
-    verbose(f'(config) cache-days: {cache_days}')
-    verbose(f'(config) cache-file: {cache_file_value}')
-    verbose(f'(config) domains: {ddns_domains}')
-    verbose(f'(config) ipv4: {ipv4}')
-    verbose(f'(config) ipv6: {ipv6}')
-    verbose(f'(config) timeout: {timeout}')
+    verbose('(config) caching: {}', allow_caching)
+    verbose('(config) cache-days: {}', cache_days)
+    verbose('(config) cache-file: {}', cache_file_value)
+    verbose('(config) connect-timeout: {}', connect_timeout)
+    verbose('(config) deadline: {}', run_budget)
+    verbose('(config) debounce: {}', debounce)
+    verbose('(config) detect-budget: {}', detect_budget)
+    verbose('(config) fingerprint: {}', use_fingerprint)
+    verbose('(config) fingerprint-files: {}', fingerprint_files)
+    verbose('(config) hedge-percentile: {}', hedge_percentile)
+    verbose('(config) nfsn-budget: {}', nfsn_budget)
+    verbose('(config) prefix-interface: {}', prefix_interface)
+    verbose('(config) prefix-length: {}', prefix_length)
+    verbose('(config) propagation-timeout: {}', propagation_timeout)
+    verbose('(config) resolver-ttl: {}', resolver_ttl)
+    verbose('(config) shared-result-age: {}', shared_result_age)
+    verbose('(config) timeout: {}', timeout)
+
+    for profile in profiles:
+        prefix = f'(config) ({profile.name})' if profile.name else '(config)'
+        token_value = '(set)' if profile.api_token else '(noset)'
+        verbose('{} api-endpoint: {}', prefix, profile.api_endpoint)
+        verbose('{} api-login: {}', prefix, profile.api_login)
+        verbose('{} api-token: {}', prefix, token_value)
+        verbose('{} domains: {}', prefix, profile.domains)
+        verbose('{} ipv4: {}', prefix, profile.ipv4)
+        verbose('{} ipv6: {}', prefix, profile.ipv6)
+        verbose('{} prefix-hosts: {}', prefix, list(profile.prefix_hosts))
+        verbose('{} verify-nameservers: {}', prefix,
+            [f'{host}:{port}' for host, port in profile.nameservers])
+        verbose('{} zones: {}', prefix, list(profile.zones))
 
     # ensure we have at least one operating mode
-    if args.action != Action.CHECK and not ipv4 and not ipv6:
+    if args.action != Action.CHECK and not ipv4 and not ipv6 \
+            and not delegation:
         err('both ipv4 and ipv6 querying is disabled by configuration')
         return EngineState.BAD_CONFIG
 
+    if delegation and not MIN_PREFIX_LENGTH <= prefix_length <= 128:
+        err(f'(config) invalid prefix length: {prefix_length}')
+        return EngineState.BAD_CONFIG
+
+    if propagation_timeout and not all(
+            profile.nameservers for profile in profiles):
+        err('(config) propagation checks require verify nameservers')
+        return EngineState.BAD_CONFIG
+
     # acquire the current timestamp for cache checks (and debug prints)
     datetime_now = datetime.now(tz=timezone.utc)
 
     # verbose print timestamp for logs which may not have dates
     debug_timestamp = datetime_now.strftime('%Y-%m-%d %H:%M:%S %Z')
-    verbose(f'timestamp: {debug_timestamp}')
+    verbose('timestamp: {}', debug_timestamp)
 
     # load any previously cached ip
     cached_data = {}
     if allow_caching:
-        # find the first available file
-        found_cache_file = None
-        for cache_file_entry in cache_files:
-            cache_file = Path(str(cache_file_entry).format(uid=uid))
-            if cache_file.is_file():
-                found_cache_file = cache_file
-                break
+        with phase('cache-load'):
+            cached_data = _load_cache(cache_files, uid, cache_days,
+                datetime_now)
+
+    # when caching, instances on a host share detected addresses and record
+    # checks to avoid repeating work another instance has just completed
+    flight = None
+    if allow_caching and shared_result_age:
+        state_dir = _resolve_state_dir(cache_files, uid)
+        if state_dir:
+            verbose('shared state directory: {}', state_dir)
+            flight = SingleFlight(state_dir, max_age=shared_result_age,
+                wait=deadline.limit(DEFAULT_FLIGHT_WAIT))
+
+    # track pending address changes between runs using the cache (unless a
+    # debouncer is kept by the caller)
+    if debouncer is None and debounce:
+        debounce_samples = cfg.debounce_samples()
+        debouncer = Debouncer(debounce, samples=DEFAULT_DEBOUNCE_SAMPLES
+            if debounce_samples is None else debounce_samples)
+        debouncer.load(cached_data.get('debounce'))
+
+    # hedge slow reads after a percentile of recent read latencies, which
+    # are kept in the cache between runs
+    hedge = None
+    if hedge_percentile and hedge_percentile > 0:
+        ratio = min(hedge_percentile, MAX_HEDGE_PERCENTILE) / 100
+        hedge = LatencyTracker(ratio)
+        hedge.load(cached_data.get('latency'))
 
-        if found_cache_file:
-            try:
-                # if the cache file has not been updated in over a day,
-                # consider it stale
-                verbose(f'checking if cache file is stale: {found_cache_file}')
-                mtime = found_cache_file.stat().st_mtime
-                modified_dt = datetime.fromtimestamp(mtime, tz=timezone.utc)
-                duration = datetime_now - modified_dt
-                stale = duration.days >= cache_days
-
-                if not stale:
-                    remaining = cache_days - duration.days
-                    verbose(f'cache not stale for another {remaining} days')
-                    verbose('attempting to load cached ip from file')
-                    with found_cache_file.open() as f:
-                        cached_data = json.load(f)
-            except (json.JSONDecodeError, OSError):
-                pass
+    zones_digest = _zones_digest(profiles)
+
+    # when the local network state (interface addresses, default gateways
+    # and any lease files) has not changed since the cached addresses were
+    # detected, the public addresses are expected to be unchanged and the
+    # run ends without detecting any address
+    fingerprint = None
+    if allow_caching and use_fingerprint and not args.action:
+        with phase('fingerprint'):
+            fingerprint = await asyncio.to_thread(local_fingerprint,
+                fingerprint_files)
+
+        if fingerprint and cached_data.get('fingerprint') == fingerprint \
+                and (not ipv4 or cached_data.get('ipv4')) \
+                and (not detect_ipv6 or cached_data.get('ipv6')) \
+                and (not delegation or cached_data.get('prefix')) \
+                and cached_data.get('zones') == zones_digest \
+                and 'debounce' not in cached_data:
+            verbose('local fingerprint matches cache; stopping')
+            for family in ('ipv4', 'ipv6', 'prefix'):
+                if cached_data.get(family):
+                    report_address(family, cached_data[family], 'cache')
+                    report_cache(family, 'fingerprint')
+            if addresses is not None:
+                _track_addresses(addresses, cached_data.get('ipv4', ''),
+                    cached_data.get('ipv6', ''), cached_data.get('prefix', ''))
+            return EngineState.OK
+
+    # when the cache cannot end the run once addresses are detected (caching
+    # is disabled, no address is cached or the zones have changed), the
+    # nfsn api is expected to be queried
+    speculate = not args.action and (not allow_caching
+        or (ipv4 and not cached_data.get('ipv4'))
+        or (ipv6 and not cached_data.get('ipv6'))
+        or cached_data.get('zones') != zones_digest)
 
     # acquire the known external ip address for this instance
     active_ipv4 = ''
     active_ipv6 = ''
+    delegated_prefix = None
     ip_fetch_state = EngineState.OK
 
-    if not args.action or args.action == Action.IP:
-        if ipv4:
-            myipv4_cmd = cfg.myipv4_api_endpoint_cmd()
-            if myipv4_cmd:
-                active_ipv4 = fetch_myipv4_cmd(myipv4_cmd)
-            else:
-                endpoints = cfg.myipv4_api_endpoints()
-                active_ipv4 = fetch_myipv4(endpoints=endpoints, timeout=timeout)
-
-            if not active_ipv4:
-                ip_fetch_state = EngineState.MYIP_FETCH_FAILURE
-            elif args.action == Action.IP:
-                success(f'detected ipv4: {active_ipv4}')
-
-        if ipv6:
-            myipv6_cmd = cfg.myipv6_api_endpoint_cmd()
-            if myipv6_cmd:
-                active_ipv6 = fetch_myipv6_cmd(myipv6_cmd)
+    # all web requests made in a run share a single session, where
+    # configured endpoints are pre-resolved while the run continues
+    async with _run_session(session, cfg, profiles,
+            resolver_ttl=resolver_ttl, ipv4=ipv4,
+            ipv6=detect_ipv6) as session, _speculative_clients() as clients:
+        # if the nfsn api is expected to be queried, connect to the api and
+        # issue each profile's reads (which do not depend on the detected
+        # addresses) while addresses are detected
+        def lead() -> None:
+            if speculate and not clients:
+                for profile in profiles:
+                    clients[profile.name] = _speculate(profile, session,
+                        timeout, connect_timeout=connect_timeout,
+                        deadline=deadline, hedge=hedge,
+                        entries=not profile.nameservers)
+
+        # when coordinating with other instances, reads are only issued by
+        # the instance detecting addresses (other instances reuse its
+        # detected addresses and record checks)
+        if not flight:
+            lead()
+
+        if not args.action or args.action == Action.IP:
+            detect_deadline = deadline.child(_budget(detect_budget))
+
+            fetches = []
+            if ipv4:
+                fetches.append(_detect(flight, 'ipv4',
+                    partial(fetch_myipv4_async,
+                        endpoints=cfg.myipv4_api_endpoints(),
+                        cmd=cfg.myipv4_api_endpoint_cmd(),
+                        timeout=timeout,
+                        session=session,
+                        connect_timeout=connect_timeout,
+                        deadline=detect_deadline), lead))
+
+            if detect_ipv6:
+                fetches.append(_detect(flight, 'ipv6',
+                    partial(fetch_myipv6_async,
+                        endpoints=cfg.myipv6_api_endpoints(),
+                        cmd=cfg.myipv6_api_endpoint_cmd(),
+                        timeout=timeout,
+                        session=session,
+                        connect_timeout=connect_timeout,
+                        deadline=detect_deadline), lead))
+
+            results = await asyncio.gather(*fetches)
+
+            if ipv4:
+                active_ipv4 = results.pop(0)
+                if not active_ipv4:
+                    ip_fetch_state = EngineState.MYIP_FETCH_FAILURE
+                elif args.action == Action.IP:
+                    success(f'detected ipv4: {active_ipv4}')
+
+            if detect_ipv6:
+                active_ipv6 = results.pop(0)
+                if not active_ipv6:
+                    ip_fetch_state = EngineState.MYIP_FETCH_FAILURE
+                elif args.action == Action.IP:
+                    success(f'detected ipv6: {active_ipv6}')
+
+            if delegation and ip_fetch_state == EngineState.OK:
+                with phase('prefix'):
+                    if prefix_interface:
+                        delegated_prefix = await asyncio.to_thread(
+                            detect_interface_prefix, prefix_interface,
+                            prefix_length)
+                    else:
+                        delegated_prefix = detect_prefix(active_ipv6,
+                            prefix_length)
+
+                if delegated_prefix:
+                    report_address('prefix', str(delegated_prefix),
+                        f'interface:{prefix_interface}' if prefix_interface
+                        else 'ipv6')
+
+                if not delegated_prefix:
+                    ip_fetch_state = EngineState.MYIP_FETCH_FAILURE
+                elif args.action == Action.IP:
+                    success(f'detected prefix: {delegated_prefix}')
+                else:
+                    verbose('detected prefix: {}', delegated_prefix)
+
+        if addresses is not None:
+            _track_addresses(addresses, active_ipv4, active_ipv6,
+                str(delegated_prefix) if delegated_prefix else '')
+
+        # do not process any records without a detected address
+        if args.action == Action.IP or ip_fetch_state != EngineState.OK:
+            return ip_fetch_state
+
+        # if the active ip matches the cached ip, we may not have to interact
+        # with nfsn's api
+        ipv4_cache_hit = cached_data.get('ipv4') == active_ipv4
+        ipv6_cache_hit = cached_data.get('ipv6') == active_ipv6
+        prefix_value = str(delegated_prefix) if delegated_prefix else ''
+        prefix_cache_hit = cached_data.get('prefix', '') == prefix_value
+        zones_cache_hit = cached_data.get('zones') == zones_digest
+        cache_checks = [
+            ('ipv4', ipv4, ipv4_cache_hit),
+            ('ipv6', ipv6, ipv6_cache_hit),
+            ('prefix', delegation, prefix_cache_hit),
+        ]
+        for family, enabled, cache_hit in cache_checks:
+            if not enabled:
+                continue
+
+            if not allow_caching:
+                report_cache(family, 'disabled')
+                continue
+
+            cache_result = 'hit' if cache_hit else 'miss'
+            if family != 'prefix':
+                CACHE_CHECKS.inc(family=family, result=cache_result)
+            report_cache(family, cache_result)
+
+        if allow_caching:
+            if ipv4 and not ipv4_cache_hit:
+                verbose('ipv4 cache was not a match')
+            elif ipv6 and not ipv6_cache_hit:
+                verbose('ipv6 cache was not a match')
+            elif not prefix_cache_hit:
+                verbose('delegated prefix cache was not a match')
+            elif not zones_cache_hit:
+                verbose('zones have changed since last cached')
             else:
-                endpoints = cfg.myipv6_api_endpoints()
-                active_ipv6 = fetch_myipv6(endpoints=endpoints, timeout=timeout)
+                verbose('cached public ip matches detected; stopping')
 
-            if not active_ipv6:
-                ip_fetch_state = EngineState.MYIP_FETCH_FAILURE
-            elif args.action == Action.IP:
-                success(f'detected ipv6: {active_ipv6}')
+                # track a changed local fingerprint (without extending the
+                # age of the cache)
+                if fingerprint and \
+                        cached_data.get('fingerprint') != fingerprint:
+                    with phase('cache-save'):
+                        _save_cache(cache_files, uid,
+                            {**cached_data, 'fingerprint': fingerprint},
+                            keep_mtime=True)
 
-    if args.action == Action.IP:
-        return ip_fetch_state
+                return EngineState.OK
 
-    # if the active ip matches the cached ip, we may not have to interact
-    # with nfsn's api
-    ipv4_cache_hit = cached_data.get('ipv4') == active_ipv4
-    ipv6_cache_hit = cached_data.get('ipv6') == active_ipv6
-    if allow_caching:
-        if ipv4 and not ipv4_cache_hit:
-            verbose('ipv4 cache was not a match')
-        elif ipv6 and not ipv6_cache_hit:
-            verbose('ipv6 cache was not a match')
-        else:
-            verbose('cached public ip matches detected; stopping')
-            return EngineState.OK
+        # process each profile concurrently, each with its own client while
+        # sharing the session's connection pool
+        nfsn_deadline = deadline.child(_budget(nfsn_budget))
+
+        # records of ddns entries are first verified through the zones'
+        # authoritative nameservers of each profile (if configured)
+        verifiers = {
+            profile.name: RecordVerifier(profile.nameservers,
+                deadline=nfsn_deadline)
+            for profile in profiles
+            if profile.nameservers
+        }
+
+        # records changed by each profile (if checking their propagation)
+        propagation = {}  # type: dict[str, list[PropagationRecord]]
+        if propagation_timeout:
+            propagation = {profile.name: [] for profile in profiles}
+
+        states = await asyncio.gather(*[
+            _process_profile(profile, session, args.action, timeout,
+                debouncer, flight, ipv4=active_ipv4, ipv6=active_ipv6,
+                delegated_prefix=delegated_prefix,
+                connect_timeout=connect_timeout, deadline=nfsn_deadline,
+                hedge=hedge, client=clients.get(profile.name),
+                verifier=verifiers.get(profile.name),
+                propagation=propagation.get(profile.name))
+            for profile in profiles
+        ])
+
+        for state in states:
+            if state != EngineState.OK:
+                return state
+
+        # wait for every changed record to be served by the nameservers of
+        # its profile
+        if any(propagation.values()):
+            assert propagation_timeout is not None
+            checks = [
+                PropagationChecker(profile.nameservers,
+                    timeout=propagation_timeout,
+                    deadline=deadline).check_async(propagation[profile.name])
+                for profile in profiles
+                if propagation[profile.name]
+            ]
+            with phase('propagation'):
+                propagation_results = [
+                    result
+                    for results in await asyncio.gather(*checks)
+                    for result in results
+                ]
+
+            _process_propagation_results(propagation_results,
+                propagation_timeout)
+
+        # save the newly detected ip if it has changed; although, while any
+        # address change is pending, no address is cached to ensure the next
+        # run checks the records again
+        pending = debouncer.dump() if debouncer else {}
+        if allow_caching and (not ipv4_cache_hit or not ipv6_cache_hit
+                or not prefix_cache_hit or not zones_cache_hit or pending
+                or 'debounce' in cached_data):
+            cache_data = {
+                'ipv4': '' if pending else active_ipv4,
+                'ipv6': '' if pending else active_ipv6,
+            }  # type: dict[str, object]
+            if prefix_value:
+                cache_data['prefix'] = '' if pending else prefix_value
+            if zones_digest:
+                cache_data['zones'] = zones_digest
+            if fingerprint:
+                cache_data['fingerprint'] = fingerprint
+            if pending:
+                cache_data['debounce'] = pending
+            if hedge:
+                cache_data['latency'] = hedge.dump()
+
+            with phase('cache-save'):
+                _save_cache(cache_files, uid, cache_data)
+
+        return EngineState.OK
+
+
+def load_config(args: Namespace) -> Config | None:
+    """
+    load and validate the configuration of a run
+
+    Args:
+        args: arguments provided at runtime
+
+    Returns:
+        the configuration; ``None`` if the configuration is invalid
+    """
+
+    cfg = Config()
+
+    cfg_file = args.cfg or DEFAULT_CFG_FILE
+    if not cfg.load(cfg_file, expected=args.cfg):
+        return None
+
+    cfg.accept(args)
+
+    if not cfg.validate():
+        return None
+
+    return cfg
+
+
+def resolve_profile(name: str, cfg: Config) -> EngineProfile:
+    """
+    resolve the options of a profile
+
+    Args:
+        name: the name of the profile
+        cfg: the configuration of the profile
+
+    Returns:
+        the profile
+    """
+
+    api_login = cfg.api_login()
+    api_token = cfg.api_token()
+    domains = cfg.ddns_domains()
+    ipv4 = cfg.ipv4()
+    nameservers = [
+        parse_nameserver(entry) for entry in cfg.verify_nameservers() or []]
+
+    # verified via cfg.validate()
+    assert isinstance(api_login, str)
+    assert isinstance(api_token, str)
+
+    return EngineProfile(
+        name=name,
+        api_endpoint=cfg.nfsn_api_endpoint() or API_DNS_ENDPOINT,
+        api_login=api_login,
+        api_token=api_token,
+        domains=domains or [],
+        # query ipv4 by default is not configured
+        ipv4=True if ipv4 is None else ipv4,
+        ipv6=bool(cfg.ipv6()),
+        nameservers=[nameserver for nameserver in nameservers if nameserver],
+        prefix_hosts=cfg.prefix_hosts() or {},
+        zones=cfg.zones() or {},
+    )
+
+
+async def _process_profile(profile: EngineProfile, session: Session,
+        action: Action | None, timeout: int, debouncer: Debouncer | None,
+        flight: SingleFlight | None, *, ipv4: str, ipv6: str,
+        delegated_prefix: IPv6Network | None = None,
+        connect_timeout: int | None = None,
+        deadline: Deadline | None = None,
+        hedge: LatencyTracker | None = None,
+        client: NfsnClient | None = None,
+        verifier: RecordVerifier | None = None,
+        propagation: list[PropagationRecord] | None = None) -> EngineState:
+    """
+    process the ddns entries of a profile
+
+    Any ddns entries are updated to the detected addresses, while any zones
+    are synchronized to their desired record sets (concurrently).
+
+    The ``AAAA`` records of any prefix hosts are synchronized alongside the
+    zones, where hosts are grouped by zone (a single query of each zone's
+    records serves every host of the zone).
+
+    Args:
+        profile: the profile
+        session: the session to issue requests on
+        action: the action being performed (if any)
+        timeout: timeout for any requests made
+        debouncer: the debouncer to confirm address changes with (if any)
+        flight: the coordinator to share results with other instances (if any)
+        ipv4: the detected ipv4 address
+        ipv6: the detected ipv6 address
+        delegated_prefix (optional): the detected delegated prefix
+        connect_timeout (optional): connect timeout for any requests made
+        deadline (optional): the deadline bounding any requests made
+        hedge (optional): the latency tracker used to hedge reads
+        client (optional): the client of the profile (e.g. holding
+                           speculative reads)
+        verifier (optional): the verifier to check records of ddns entries
+                             with
+        propagation (optional): the list to track changed records in (for
+                                checking their propagation)
+
+    Returns:
+        the state of the profile
+    """
+
+    prefix = f'({profile.name}) ' if profile.name else ''
 
     # prepare interaction with nfsn api endpoint
-    session = requests.session()
-    session.auth = NfsnAuth(api_login, api_token)
-
-    for ddns_entry in ddns_domains:
-        resource, _, tld = ddns_entry.rpartition('.')
-        ddns_record, _, domain = resource.rpartition('.')
-        ddns_domain = f'{domain}.{tld}'
-        verbose('processing ddns entry...')
-        verbose(f'ddns-domain: {ddns_domain}')
-        verbose(f'ddns-record: {ddns_record}')
-
-        # api endpoint for this domain
-        base_url = f'{api_endpoint}/{ddns_domain}'
-
-        # query the dns record for the existing ip address (if any)
-        verbose(f'querying dns record: {ddns_record}')
-        opts = {
-            'name': ddns_record,
+    if client:
+        client.deadline = deadline or Deadline()
+    else:
+        client = NfsnClient(profile.api_login, profile.api_token,
+            endpoint=profile.api_endpoint, timeout=timeout,
+            connect_timeout=connect_timeout, deadline=deadline, hedge=hedge,
+            session=session)
+
+    with phase(f'nfsn ({profile.name})' if profile.name else 'nfsn'):
+        if action == Action.CHECK:
+            entry = profile.domains[0] if profile.domains \
+                else next(iter(profile.zones or profile.prefix_hosts))
+            return await _check(client, entry, prefix)
+
+        updater = DdnsUpdater(client, debouncer=debouncer, flight=flight,
+            verifier=verifier)
+        syncer = ZoneSyncer(client)
+        zones = _resolve_zones(profile.zones, prefix,
+            ipv4=ipv4 if profile.ipv4 else '',
+            ipv6=ipv6 if profile.ipv6 else '')
+
+        if profile.prefix_hosts and delegated_prefix:
+            hosts = prefix_zones(profile.prefix_hosts, delegated_prefix)
+            for domain, record_sets in hosts.items():
+                zones[domain] = [*zones.get(domain, []), *record_sets]
+
+        results, zone_results = await asyncio.gather(
+            updater.update_async(profile.domains,
+                ipv4=ipv4 if profile.ipv4 else None,
+                ipv6=ipv6 if profile.ipv6 else None),
+            syncer.sync_async(zones),
+        )
+
+    if propagation is not None:
+        propagation.extend(_propagation_records(results, zone_results, zones))
+
+    state = _process_results(results, prefix)
+    zone_state = _process_zone_results(zone_results, prefix)
+    return state if state != EngineState.OK else zone_state
+
+
+def _propagation_records(results: list[UpdateResult],
+        zone_results: list[ZoneResult],
+        zones: dict[str, list[RecordSet]]) -> list[PropagationRecord]:
+    """
+    determine the address records changed by an update
+
+    Args:
+        results: the results of an update
+        zone_results: the results of a zone synchronization
+        zones: the desired record sets (by domain) of the synchronization
+
+    Returns:
+        the changed records (with their desired addresses)
+    """
+    records = [
+        PropagationRecord(result.entry, result.type, frozenset({result.value}))
+        for result in results
+        if result.action in (UpdateAction.UPDATED, UpdateAction.CREATED)
+    ]
+
+    # only record sets fully synchronized are checked
+    for result in zone_results:
+        if result.error:
+            continue
+
+        changed = {(change.name, change.type) for change in result.applied}
+        for record_set in zones.get(result.domain, []):
+            if record_set.type not in ('A', 'AAAA') or \
+                    (record_set.name, record_set.type) not in changed:
+                continue
+
+            entry = f'{record_set.name}.{result.domain}' if record_set.name \
+                else result.domain
+            records.append(PropagationRecord(entry, record_set.type,
+                record_set.data))
+
+    return records
+
+
+def _speculate(profile: EngineProfile, session: Session, timeout: int, *,
+        connect_timeout: int | None, deadline: Deadline,
+        hedge: LatencyTracker | None, entries: bool = True) -> NfsnClient:
+    """
+    speculatively issue the reads of a profile
+
+    The records of each ddns entry and of each zone (including the zones of
+    prefix hosts) are read in the background (see ``speculate_rrs``), which
+    also establishes a connection to the nfsn api. Speculative reads are
+    bound by the run's deadline. The records of ddns entries are not read
+    when they are expected to be verified through nameservers instead.
+
+    Args:
+        profile: the profile
+        session: the session to issue requests on
+        timeout: timeout for any requests made
+        connect_timeout: connect timeout for any requests made (if any)
+        deadline: the deadline of the run
+        hedge: the latency tracker used to hedge reads (if any)
+        entries (optional): whether to read the records of ddns entries
+
+    Returns:
+        the client holding the speculative reads
+    """
+    client = NfsnClient(profile.api_login, profile.api_token,
+        endpoint=profile.api_endpoint, timeout=timeout,
+        connect_timeout=connect_timeout, deadline=deadline, hedge=hedge,
+        session=session)
+
+    if entries and (profile.ipv4 or profile.ipv6):
+        for entry in profile.domains:
+            record, domain = split_ddns_entry(entry)
+            client.speculate_rrs(domain, record)
+
+    zones = dict.fromkeys(profile.zones)
+    for entry in profile.prefix_hosts:
+        zones[split_ddns_entry(entry)[1]] = None
+
+    for domain in zones:
+        client.speculate_rrs(domain)
+
+    return client
+
+
+def _prepare_resolver(session: Session, cfg: Config,
+        profiles: list[EngineProfile], *, ipv4: bool,
+        ipv6: bool) -> asyncio.Future[None] | None:
+    """
+    prepare a session's resolver cache for a run
+
+    Address detection endpoints are pinned to the address family they
+    detect, ensuring an endpoint serving both families reports the address
+    of the expected family. The hosts of the address detection endpoints
+    and the NFSN API are then pre-resolved in the background (on the event
+    loop's executor). Sessions not resolving hosts through a resolver cache
+    are left as is.
+
+    Args:
+        session: the session of the run
+        cfg: the configuration
+        profiles: the profiles of the run
+        ipv4: whether ipv4 addresses are detected
+        ipv6: whether ipv6 addresses are detected
+
+    Returns:
+        the pending pre-resolution; ``None`` if the session does not resolve
+        hosts through a resolver cache
+    """
+    adapter = session.get_adapter('https://')
+    if not isinstance(adapter, ResolvingAdapter):
+        return None
+
+    endpoints = []  # type: list[tuple[str, int]]
+    if ipv4:
+        endpoints.extend((endpoint, socket.AF_INET) for endpoint in
+            cfg.myipv4_api_endpoints() or DEFAULT_IP_FETCH_URLS_V4)
+    if ipv6:
+        endpoints.extend((endpoint, socket.AF_INET6) for endpoint in
+            cfg.myipv6_api_endpoints() or DEFAULT_IP_FETCH_URLS_V6)
+
+    hosts = []  # type: list[tuple[str, int, int]]
+    for endpoint, family in endpoints:
+        host = endpoint_host(endpoint)
+        if host and pin_endpoint(session, endpoint, family):
+            hosts.append((*host, family))
+
+    for profile in profiles:
+        host = endpoint_host(profile.api_endpoint)
+        if host:
+            hosts.append((*host, socket.AF_UNSPEC))
+
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(None, adapter.resolver.prefetch,
+        list(dict.fromkeys(hosts)))
+
+
+@asynccontextmanager
+async def _run_session(session: Session | None, cfg: Config,
+        profiles: list[EngineProfile], *, resolver_ttl: int, ipv4: bool,
+        ipv6: bool) -> AsyncIterator[Session]:
+    """
+    provide the session of a run
+
+    Provides the session shared by all web requests of a run; either the
+    provided session or a new session (resolving hosts through a resolver
+    cache, unless disabled). The session's resolver cache is prepared for
+    the run (see ``_prepare_resolver``). Once the run ends, a pre-resolution
+    which has yet to complete is cancelled.
+
+    Args:
+        session: the session to use (if any)
+        cfg: the configuration
+        profiles: the profiles of the run
+        resolver_ttl: the seconds a resolution is cached for
+        ipv4: whether ipv4 addresses are detected
+        ipv6: whether ipv6 addresses are detected
+
+    Yields:
+        the session
+    """
+    resolver = None
+    if not session and resolver_ttl > 0:
+        resolver = ResolverCache(ttl=resolver_ttl)
+
+    with nullcontext(session) if session else \
+            new_session(resolver=resolver) as run_session:
+        prefetch = _prepare_resolver(run_session, cfg, profiles, ipv4=ipv4,
+            ipv6=ipv6)
+        try:
+            yield run_session
+        finally:
+            if prefetch and not prefetch.cancel() and prefetch.exception():
+                verbose('(resolver) pre-resolution failed: {}',
+                    prefetch.exception())
+
+
+@asynccontextmanager
+async def _speculative_clients() -> AsyncIterator[dict[str, NfsnClient]]:
+    """
+    provide the speculative clients of a run
+
+    Provides the clients holding the speculative reads of a run (by profile
+    name). Once the run ends, each client is closed; cancelling any
+    speculative read which has yet to be issued.
+
+    Yields:
+        the clients
+    """
+    clients = {}  # type: dict[str, NfsnClient]
+    try:
+        yield clients
+    finally:
+        for client in clients.values():
+            client.close()
+
+
+def _budget(value: int | None) -> int | None:
+    """
+    resolve a configured budget
+
+    Args:
+        value: the configured budget (in seconds)
+
+    Returns:
+        the budget; ``None`` if no budget applies (unset or not positive)
+    """
+    return value if value and value > 0 else None
+
+
+def _resolve_zones(zones: dict[str, list[RecordSet]], prefix: str, *,
+        ipv4: str, ipv6: str) -> dict[str, list[RecordSet]]:
+    """
+    resolve address placeholders of zones
+
+    Record set values of ``{ipv4}`` or ``{ipv6}`` are replaced with the
+    respective detected address. Record sets referring to an address which
+    is not available are skipped.
+
+    Args:
+        zones: the record sets (by domain)
+        prefix: the prefix to apply to logged messages
+        ipv4: the detected ipv4 address (if any)
+        ipv6: the detected ipv6 address (if any)
+
+    Returns:
+        the resolved record sets (by domain)
+    """
+
+    addresses = {
+        '{ipv4}': ipv4,
+        '{ipv6}': ipv6,
+    }
+
+    resolved = {}
+    for domain, record_sets in zones.items():
+        resolved_sets = []
+        for record_set in record_sets:
+            data = set()
+            for value in record_set.data:
+                if value in addresses:
+                    value = addresses[value]  # noqa: PLW2901
+                    if not value:
+                        break
+                data.add(value)
+            else:
+                resolved_sets.append(record_set._replace(
+                    data=frozenset(data)))
+                continue
+
+            warn(f'{prefix}no address available for record set '
+                f'({record_set.name}.{domain}; {record_set.type}); skipped')
+
+        resolved[domain] = resolved_sets
+
+    return resolved
+
+
+def _track_addresses(addresses: dict[str, str], ipv4: str, ipv6: str,
+        prefix: str) -> None:
+    """
+    track the addresses known to a run
+
+    Only known addresses are tracked, retaining any previously tracked
+    address of a family which could not be detected.
+
+    Args:
+        addresses: the dictionary to track addresses in
+        ipv4: the ipv4 address (if any)
+        ipv6: the ipv6 address (if any)
+        prefix: the delegated prefix (if any)
+    """
+    known = {'ipv4': ipv4, 'ipv6': ipv6, 'prefix': prefix}
+    addresses.update({key: value for key, value in known.items() if value})
+
+
+def _zones_digest(profiles: list[EngineProfile]) -> str | None:
+    """
+    generate a digest of the zones (and prefix hosts) of all profiles
+
+    The digest is cached alongside detected addresses, allowing changes to
+    configured zones to be applied even when addresses have not changed.
+
+    Args:
+        profiles: the profiles
+
+    Returns:
+        the digest; ``None`` if no zones are configured
+    """
+
+    zones = {
+        profile.name: {
+            domain: sorted(
+                [rs.name, rs.type, sorted(rs.data), rs.ttl]
+                for rs in record_sets
+            )
+            for domain, record_sets in profile.zones.items()
         }
-        target_url = f'{base_url}/listRRs'
-        verbose(f'(request) {target_url}')
-        rsp = session.post(target_url, data=opts, timeout=timeout)
+        for profile in profiles if profile.zones
+    }
+
+    # prefix hosts are only included when configured (retaining the digest
+    # of existing caches)
+    prefix_hosts = {
+        profile.name: profile.prefix_hosts
+        for profile in profiles if profile.prefix_hosts
+    }
+
+    if not zones and not prefix_hosts:
+        return None
+
+    raw = json.dumps({'zones': zones, 'prefix-hosts': prefix_hosts}
+        if prefix_hosts else zones, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+async def _detect(flight: SingleFlight | None, family: str,
+        fetch: Callable[[], Awaitable[str]],
+        lead: Callable[[], None] | None = None) -> str:
+    """
+    detect an address (coordinated with other instances)
+
+    If another instance on the host has detected the address recently, its
+    result is reused. Otherwise, the address is detected and shared.
+
+    Args:
+        flight: the coordinator to share results with (if any)
+        family: the address family of the detection
+        fetch: the call to detect the address
+        lead (optional): the call invoked when this instance detects the
+                         address (instead of reusing a shared result)
+
+    Returns:
+        the address
+    """
+    if not flight:
+        return await fetch()
+
+    async with flight.hold(f'my{family}') as shared:
+        address = (shared.data or {}).get('address')
+        if address:
+            verbose('reusing address detected by another instance: {}',
+                address)
+            report_address(family, address, 'shared')
+            return address
+
+        if lead:
+            lead()
+
+        address = await fetch()
+        if address:
+            shared.publish({'address': address})
+
+    return address
+
+
+def _resolve_state_dir(cache_files: list[Path], uid: int) -> Path | None:
+    """
+    resolve a state directory shared by instances on a host
+
+    The state directory is placed alongside the first cache file which
+    allows a writable state directory.
+
+    Args:
+        cache_files: the candidate cache files
+        uid: the user identifier used to resolve cache file paths
+
+    Returns:
+        the state directory (if any)
+    """
+
+    for cache_file_entry in cache_files:
+        cache_file = Path(str(cache_file_entry).format(uid=uid))
+        state_dir = cache_file.with_name(f'{cache_file.name}.state')
+
         try:
-            rsp.raise_for_status()
-        except HTTPError as e:
-            err(f'failed to query the dns record\n{e}')
-            match e.response.status_code:
-                case 401:
-                    return EngineState.NFSN_API_FAILURE_AUTH
-                case _:
-                    return EngineState.NFSN_API_FAILURE_INIT
-
-        if args.action == Action.CHECK:
-            success('verified connection with nfsn')
-            return EngineState.OK
+            state_dir.mkdir(parents=True, exist_ok=True)
+        except OSError:
+            continue
+
+        if os.access(state_dir, os.W_OK):
+            return state_dir
+
+    return None
+
+
+def _load_cache(cache_files: list[Path], uid: int, cache_days: int,
+        datetime_now: datetime) -> dict[str, str]:
+    """
+    load any previously cached ip
+
+    Finds the first available cache file and loads its contents, if the cache
+    file has not become stale.
+
+    Args:
+        cache_files: the candidate cache files
+        uid: the user identifier used to resolve cache file paths
+        cache_days: number of days before a cache is considered stale
+        datetime_now: the current timestamp
+
+    Returns:
+        the cached data
+    """
 
-        # populate desired record entries
-        pending_cfgs = {}
-        if ipv4:
-            pending_cfgs['A'] = active_ipv4
-        if ipv6:
-            pending_cfgs['AAAA'] = active_ipv6
+    # find the first available file
+    found_cache_file = None
+    for cache_file_entry in cache_files:
+        cache_file = Path(str(cache_file_entry).format(uid=uid))
+        if cache_file.is_file():
+            found_cache_file = cache_file
+            break
 
+    if found_cache_file:
         try:
-            rsp_data = rsp.json()
-
-            # if we have a dns record, process each response record into a
-            # dictionary that we can use for comparisions
-            reported_rrs = {}
-            if rsp_data:
-                for rr_entry in rsp_data:
-                    rr_type = rr_entry.get('type')
-                    rr_data = rr_entry.get('data')
-                    if rr_type and rr_data:
-                        reported_rrs[rr_type] = rr_data
-
-            # cycle through pending configurations and update any record that
-            # has stale data
-            for rr_type in list(pending_cfgs):
-                new_value = pending_cfgs[rr_type]
-                persisted_ip = reported_rrs.get(rr_type)
-                if not persisted_ip:
-                    continue
-
-                if persisted_ip == new_value:
-                    verbose(f'ddns record ({rr_type}) matches external address')
-                else:
-                    verbose(f'ip do not match for record: {ddns_record}')
-                    opts = {
-                        'name': ddns_record,
-                        'type': rr_type,
-                        'data': new_value,
-                    }
-                    target_url = f'{base_url}/replaceRR'
-                    verbose(f'(request) {target_url}')
-                    rsp = session.post(target_url, data=opts, timeout=timeout)
-                    rsp.raise_for_status()
-                    log(f'record ({rr_type}) has been updated: {new_value}')
-
-                del pending_cfgs[rr_type]
-
-            # for any entries that do not have a ddns record setup, add it now
-            for rr_type, new_value in pending_cfgs.items():
-                warn(f'no record found ({ddns_record}; {rr_type}); creating...')
-                opts = {
-                    'name': ddns_record,
-                    'type': rr_type,
-                    'data': new_value,
-                }
-                target_url = f'{base_url}/addRR'
-                verbose(f'(request) {target_url}')
-                rsp = session.post(target_url, data=opts, timeout=timeout)
-                rsp.raise_for_status()
-        except HTTPError as e:
-            err(f'failed to query the dns record\n{e}')
-            match e.response.status_code:
-                case 401:
-                    return EngineState.NFSN_API_FAILURE_AUTH
-                case _:
-                    return EngineState.NFSN_API_FAILURE_INIT
-
-    # save the newly detected ip if it has changed
-    if allow_caching and (not ipv4_cache_hit or not ipv6_cache_hit):
-        for cache_file_entry in cache_files:
-            cache_file = Path(str(cache_file_entry).format(uid=uid))
-
-            try:
-                cache_container = cache_file.parent
-                if not cache_container.exists():
-                    verbose(f'preparing cache container: {cache_container}')
-                    cache_container.mkdir(parents=True)
-
-                verbose(f'persisting cache: {cache_file}')
-                with cache_file.open('w') as f:
-                    json.dump({
-                        'ipv4': active_ipv4,
-                        'ipv6': active_ipv6,
-                    }, f)
-
-                # if we are able to write to this catch file, we are done!
+            # if the cache file has not been updated in over a day,
+            # consider it stale
+            verbose('checking if cache file is stale: {}', found_cache_file)
+            mtime = found_cache_file.stat().st_mtime
+            modified_dt = datetime.fromtimestamp(mtime, tz=timezone.utc)
+            duration = datetime_now - modified_dt
+            stale = duration.days >= cache_days
+
+            if not stale:
+                remaining = cache_days - duration.days
+                verbose('cache not stale for another {} days', remaining)
+                verbose('attempting to load cached ip from file')
+                with found_cache_file.open() as f:
+                    return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            pass
+
+    return {}
+
+
+def _save_cache(cache_files: list[Path], uid: int,
+        data: dict[str, object], *, keep_mtime: bool = False) -> None:
+    """
+    persist cache data
+
+    Writes the cache data into the first cache file that is writable. Writes
+    are serialized between instances using a lock file and the cache file is
+    replaced atomically, preventing a torn cache file.
+
+    Args:
+        cache_files: the candidate cache files
+        uid: the user identifier used to resolve cache file paths
+        data: the data to cache
+        keep_mtime (optional): whether to retain the modification time of an
+                               existing cache file (retaining its staleness)
+    """
+
+    for cache_file_entry in cache_files:
+        cache_file = Path(str(cache_file_entry).format(uid=uid))
+
+        try:
+            cache_container = cache_file.parent
+            if not cache_container.exists():
+                verbose('preparing cache container: {}', cache_container)
+                cache_container.mkdir(parents=True)
+
+            verbose('persisting cache: {}', cache_file)
+            lock_file = cache_file.with_name(f'{cache_file.name}.lock')
+            with FileLock(lock_file):
+                mtime = None
+                if keep_mtime and cache_file.is_file():
+                    mtime = cache_file.stat().st_mtime
+
+                written = atomic_write(cache_file, json.dumps(data))
+                if written and mtime is not None:
+                    os.utime(cache_file, (mtime, mtime))
+
+            # if we are able to write to this catch file, we are done!
+            if written:
                 break
-            except OSError:
-                pass
+        except OSError:
+            pass
+
+
+async def _check(client: NfsnClient, ddns_entry: str,
+        prefix: str) -> EngineState:
+    """
+    check interaction with nfsn
 
+    Args:
+        client: the client used to interact with nfsn
+        ddns_entry: the ddns entry to query
+        prefix: the prefix to apply to logged messages
+
+    Returns:
+        the state of the check
+    """
+
+    ddns_record, ddns_domain = split_ddns_entry(ddns_entry)
+    verbose('querying dns record: {}', ddns_entry)
+
+    try:
+        await asyncio.to_thread(client.list_rrs, ddns_domain,
+            name=ddns_record)
+    except HTTPError as e:
+        err(f'{prefix}failed to query the dns record\n{e}')
+        if e.response is not None and e.response.status_code == 401:
+            return EngineState.NFSN_API_FAILURE_AUTH
+        return EngineState.NFSN_API_FAILURE_INIT
+    except RequestException as e:
+        err(f'{prefix}failed to query the dns record\n{e}')
+        return EngineState.NFSN_API_FAILURE_INIT
+
+    success(f'{prefix}verified connection with nfsn')
     return EngineState.OK
+
+
+def _process_propagation_results(results: list[PropagationResult],
+        timeout: int) -> None:
+    """
+    report the results of a propagation check
+
+    Logs the time taken by each changed record to propagate to every
+    nameserver. A record not propagating in time is only warned about (the
+    record has been changed through the NFSN API).
+
+    Args:
+        results: the results of a propagation check
+        timeout: the configured propagation timeout
+    """
+
+    for result in results:
+        record = result.record
+        if result.elapsed is None:
+            warn(f'record ({record.name}; {record.type}) has not propagated '
+                f'within {timeout} seconds')
+            continue
+
+        RECORD_PROPAGATION.observe(result.elapsed, type=record.type)
+        log(f'record ({record.name}; {record.type}) has propagated in '
+            f'{result.elapsed:.2f} seconds')
+
+
+def _process_results(results: list[UpdateResult],
+        prefix: str) -> EngineState:
+    """
+    report the results of an update
+
+    Logs the outcome of each processed record and determines the engine state
+    from the first failure (if any).
+
+    Args:
+        results: the results of an update
+        prefix: the prefix to apply to logged messages
+
+    Returns:
+        the engine state
+    """
+
+    state = EngineState.OK
+
+    for result in results:
+        RECORDS.inc(type=result.type, action=str(result.action))
+        report_record(result.entry, result.type, str(result.action),
+            result.value, result.previous)
+
+        match result.action:
+            case UpdateAction.UPDATED:
+                log(f'{prefix}record ({result.entry}; {result.type}) '
+                    f'has been updated: {result.value}')
+            case UpdateAction.CREATED:
+                warn(f'{prefix}no record found ({result.entry}; '
+                    f'{result.type}); created')
+            case UpdateAction.DEFERRED:
+                log(f'{prefix}record ({result.entry}; {result.type}) '
+                    f'change deferred until stable: {result.value}')
+            case UpdateAction.FAILED:
+                err(f'{prefix}failed to update the dns record ({result.entry}; '
+                    f'{result.type})\n{result.error}')
+
+                if state == EngineState.OK:
+                    if result.status == 401:
+                        state = EngineState.NFSN_API_FAILURE_AUTH
+                    elif result.status:
+                        state = EngineState.NFSN_API_FAILURE_INIT
+                    else:
+                        state = EngineState.NFSN_API_FAILURE
+
+    return state
+
+
+def _process_zone_results(results: list[ZoneResult],
+        prefix: str) -> EngineState:
+    """
+    report the results of a zone synchronization
+
+    Logs the changes applied to each zone and determines the engine state
+    from the first failure (if any).
+
+    Args:
+        results: the results of a synchronization
+        prefix: the prefix to apply to logged messages
+
+    Returns:
+        the engine state
+    """
+
+    state = EngineState.OK
+
+    for result in results:
+        for change in result.applied:
+            RECORDS.inc(type=change.type, action=f'sync-{change.action}')
+            entry = f'{change.name}.{result.domain}' if change.name \
+                else result.domain
+            report_record(entry, change.type, f'sync-{change.action}',
+                change.data)
+            verb = {
+                ChangeAction.ADD: 'added',
+                ChangeAction.REPLACE: 'replaced',
+                ChangeAction.REMOVE: 'removed',
+            }[change.action]
+            log(f'{prefix}record ({entry}; {change.type}) has been {verb}: '
+                f'{change.data}')
+
+        if result.error:
+            err(f'{prefix}failed to synchronize zone ({result.domain})\n'
+                f'{result.error}')
+
+            if state == EngineState.OK:
+                if result.status == 401:
+                    state = EngineState.NFSN_API_FAILURE_AUTH
+                elif result.status and not result.applied:
+                    state = EngineState.NFSN_API_FAILURE_INIT
+                else:
+                    state = EngineState.NFSN_API_FAILURE
+
+    return state
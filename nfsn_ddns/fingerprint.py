@@ -0,0 +1,202 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from nfsn_ddns.log import verbose
+from pathlib import Path
+import hashlib
+import ipaddress
+import json
+
+# directory of the kernel's network state listings (linux)
+PROC_NET_DIR = Path('/proc/net')
+
+
+def local_fingerprint(lease_files: list[Path] | None = None, *,
+        proc_net: Path = PROC_NET_DIR) -> str | None:
+    """
+    generate a fingerprint of the host's local network state
+
+    The fingerprint covers the addresses assigned to each interface, the
+    default gateways (of both address families) and the contents of any
+    provided lease files (e.g. a DHCP lease or PPP session file). Where a
+    public address only changes along with the local network state, an
+    unchanged fingerprint indicates an unchanged public address. State is
+    read from the kernel's network state listings, which are only available
+    on Linux.
+
+    Args:
+        lease_files (optional): files holding lease information to include
+        proc_net (optional): the directory of network state listings to read
+
+    Returns:
+        the fingerprint; ``None`` if the network state could not be read
+    """
+
+    if_inet6 = _read(proc_net / 'if_inet6')
+    fib_trie = _read(proc_net / 'fib_trie')
+    if if_inet6 is None and fib_trie is None:
+        verbose('(fingerprint) unable to read the local network state')
+        return None
+
+    state = {
+        'addresses': sorted(_inet_addresses(fib_trie or '')
+            | _inet6_addresses(if_inet6 or '')),
+        'gateways': sorted(_inet_gateways(_read(proc_net / 'route') or '')
+            | _inet6_gateways(_read(proc_net / 'ipv6_route') or '')),
+        'leases': {
+            str(lease_file): _digest_file(lease_file)
+            for lease_file in lease_files or []
+        },
+    }
+
+    raw_state = json.dumps(state, sort_keys=True).encode()
+    return hashlib.sha256(raw_state).hexdigest()
+
+
+def _digest_file(path: Path) -> str:
+    """
+    generate a digest of the contents of a file
+
+    Args:
+        path: the file
+
+    Returns:
+        the digest; an empty string if the file could not be read
+    """
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return ''
+
+
+def _inet_addresses(fib_trie: str) -> set[str]:
+    """
+    extract the local ipv4 addresses from a fib trie listing
+
+    Args:
+        fib_trie: the contents of the listing
+
+    Returns:
+        the addresses
+    """
+    addresses = set()
+    candidate = None
+    for line in fib_trie.splitlines():
+        parts = line.split()
+        if len(parts) == 2 and parts[0] == '|--':
+            candidate = parts[1]
+        elif candidate and parts[-2:] == ['host', 'LOCAL']:
+            addresses.add(candidate)
+
+    return addresses
+
+
+def _inet6_addresses(if_inet6: str) -> set[str]:
+    """
+    extract the ipv6 addresses of each interface from an address listing
+
+    Args:
+        if_inet6: the contents of the listing
+
+    Returns:
+        the addresses (each prefixed by its interface)
+    """
+    addresses = set()
+    for line in if_inet6.splitlines():
+        parts = line.split()
+        if len(parts) != 6:
+            continue
+
+        address = _hex_address(parts[0], little_endian=False)
+        if address:
+            addresses.add(f'{parts[5]} {address}/{int(parts[2], 16)}')
+
+    return addresses
+
+
+def _inet_gateways(route: str) -> set[str]:
+    """
+    extract the default ipv4 gateways from a route listing
+
+    Args:
+        route: the contents of the listing
+
+    Returns:
+        the gateways (each prefixed by its interface)
+    """
+    gateways = set()
+    for line in route.splitlines()[1:]:
+        parts = line.split()
+        if len(parts) < 8 or parts[1] != '00000000' or parts[7] != '00000000':
+            continue
+
+        gateway = _hex_address(parts[2], little_endian=True)
+        if gateway:
+            gateways.add(f'{parts[0]} {gateway}')
+
+    return gateways
+
+
+def _inet6_gateways(ipv6_route: str) -> set[str]:
+    """
+    extract the default ipv6 gateways from a route listing
+
+    Args:
+        ipv6_route: the contents of the listing
+
+    Returns:
+        the gateways (each prefixed by its interface)
+    """
+    gateways = set()
+    for line in ipv6_route.splitlines():
+        parts = line.split()
+        if len(parts) != 10 or int(parts[0], 16) or int(parts[1], 16):
+            continue
+
+        gateway = _hex_address(parts[4], little_endian=False)
+        if gateway:
+            gateways.add(f'{parts[9]} {gateway}')
+
+    return gateways
+
+
+def _hex_address(value: str, *, little_endian: bool) -> str | None:
+    """
+    decode an address from its hexadecimal form in a network state listing
+
+    Args:
+        value: the hexadecimal address
+        little_endian: whether the address is in host (little-endian) order
+
+    Returns:
+        the address; ``None`` if the value is not an address
+    """
+    try:
+        raw = bytes.fromhex(value)
+    except ValueError:
+        return None
+
+    if little_endian:
+        raw = raw[::-1]
+
+    try:
+        return str(ipaddress.ip_address(raw))
+    except ValueError:
+        return None
+
+
+def _read(path: Path) -> str | None:
+    """
+    read a network state listing
+
+    Args:
+        path: the listing
+
+    Returns:
+        the contents; ``None`` if the listing could not be read
+    """
+    try:
+        return path.read_text(encoding='utf-8')
+    except OSError:
+        return None
@@ -0,0 +1,284 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from contextlib import asynccontextmanager
+from contextlib import suppress
+from nfsn_ddns.defs import DEFAULT_FLIGHT_MAX_AGE
+from nfsn_ddns.defs import DEFAULT_FLIGHT_WAIT
+from nfsn_ddns.log import verbose
+from nfsn_ddns.log import warn
+from typing import TYPE_CHECKING
+import asyncio
+import json
+import os
+import re
+import time
+
+# file locking is only supported on platforms providing fcntl
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+    from pathlib import Path
+    from types import TracebackType
+    from typing import TextIO  # noqa: F401
+
+# interval (in seconds) between attempts to acquire a held lock
+LOCK_POLL_INTERVAL = 0.05
+
+
+class FileLock:
+    def __init__(self, path: Path) -> None:
+        """
+        an advisory inter-process file lock
+
+        Provides an exclusive lock using ``fcntl.flock`` on the provided lock
+        file, which is shared by any process using the same file. On
+        platforms without ``fcntl`` (e.g. Windows), locking is a no-op.
+
+        .. code-block:: python
+
+            with FileLock(Path('state.lock')):
+                ...
+
+        Args:
+            path: the lock file
+        """
+        self.path = path
+        self._file = None  # type: TextIO | None
+
+    def __enter__(self) -> FileLock:  # noqa: PYI034
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None,
+            exc_value: BaseException | None,
+            traceback: TracebackType | None) -> None:
+        self.release()
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        """
+        acquire the lock
+
+        Args:
+            blocking (optional): whether to wait for a held lock
+
+        Returns:
+            whether the lock was acquired
+
+        Raises:
+            ``OSError`` is raised if the lock file cannot be opened
+        """
+        if not fcntl:
+            return True
+
+        if not self._file:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self.path.open('a')
+
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(self._file.fileno(), flags)
+        except BlockingIOError:
+            return False
+
+        return True
+
+    def release(self) -> None:
+        """
+        release the lock
+        """
+        if self._file:
+            if fcntl:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+class Flight:
+    def __init__(self, data: dict | None) -> None:
+        """
+        a single-flight operation in progress
+
+        Provides any fresh result published by another instance and allows
+        the holder to publish a new result.
+
+        Args:
+            data: the fresh result of another instance (if any)
+        """
+        self.data = data
+        self.published = None  # type: dict | None
+
+    def publish(self, data: dict) -> None:
+        """
+        publish the result of this operation for other instances
+
+        Args:
+            data: the result
+        """
+        self.published = data
+
+
+class SingleFlight:
+    def __init__(self, state_dir: Path, *,
+            max_age: float = DEFAULT_FLIGHT_MAX_AGE,
+            wait: float = DEFAULT_FLIGHT_WAIT) -> None:
+        """
+        inter-process single-flight coordination
+
+        Allows multiple instances on a host to share the results of an
+        operation (e.g. detecting an address). Only a single instance holds
+        an operation's lock at a time, where other instances wait for the
+        operation to complete and can reuse its result (if still fresh)
+        instead of repeating the operation. Results are stored in the state
+        directory and replaced atomically.
+
+        .. code-block:: python
+
+            async with flight.hold('myipv4') as shared:
+                if shared.data:
+                    return shared.data['address']
+
+                address = await detect()
+                shared.publish({'address': address})
+
+        Args:
+            state_dir: the directory to hold locks and results
+            max_age (optional): seconds a published result is reused
+            wait (optional): maximum seconds to wait for a held operation
+        """
+        self.state_dir = state_dir
+        self.max_age = max_age
+        self.wait = wait
+
+    @asynccontextmanager
+    async def hold(self, key: str) -> AsyncIterator[Flight]:
+        """
+        hold the lock of an operation
+
+        Waits for any other instance holding the operation, providing a
+        fresh result it published (if any). Once released, any result
+        published by the holder is stored for other instances.
+
+        If the lock cannot be acquired in time (or the state directory is
+        not usable), the operation proceeds without coordination.
+
+        Args:
+            key: the operation's key
+
+        Yields:
+            the flight
+        """
+        name = re.sub(r'[^A-Za-z0-9.-]', '_', key)
+        lock = FileLock(self.state_dir / f'{name}.lock')
+        result_file = self.state_dir / f'{name}.json'
+
+        locked = False
+        try:
+            locked = await self._acquire(lock)
+        except OSError as e:
+            verbose('(flight) unable to lock operation ({}): {}', key, e)
+
+        if not locked:
+            warn(f'(flight) proceeding without lock: {key}')
+
+        try:
+            flight = Flight(self._load(result_file))
+            if flight.data is not None:
+                verbose('(flight) reusing shared result: {}', key)
+
+            yield flight
+
+            if flight.published is not None:
+                self._save(result_file, flight.published)
+        finally:
+            lock.release()
+
+    async def _acquire(self, lock: FileLock) -> bool:
+        """
+        acquire a lock without blocking the event loop
+
+        Args:
+            lock: the lock
+
+        Returns:
+            whether the lock was acquired
+        """
+        deadline = time.monotonic() + self.wait
+        while not lock.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+
+        return True
+
+    def _load(self, result_file: Path) -> dict | None:
+        """
+        load a fresh result
+
+        Args:
+            result_file: the result file
+
+        Returns:
+            the result; ``None`` if missing or stale
+        """
+        try:
+            with result_file.open(encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(stored, dict):
+            return None
+
+        age = time.time() - stored.get('time', 0)
+        if not 0 <= age <= self.max_age:
+            return None
+
+        data = stored.get('data')
+        return data if isinstance(data, dict) else None
+
+    def _save(self, result_file: Path, data: dict) -> None:
+        """
+        store a result (atomically)
+
+        Args:
+            result_file: the result file
+            data: the result
+        """
+        atomic_write(result_file, json.dumps({
+            'time': time.time(),
+            'data': data,
+        }))
+
+
+def atomic_write(path: Path, content: str) -> bool:
+    """
+    write a file atomically
+
+    Content is written to a temporary file which then replaces the target,
+    ensuring readers never observe a partially written file.
+
+    Args:
+        path: the file to write
+        content: the content
+
+    Returns:
+        whether the file was written
+    """
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    try:
+        with tmp_path.open('w', encoding='utf-8') as f:
+            f.write(content)
+        tmp_path.replace(path)
+    except OSError as e:
+        verbose('unable to write file: {}\n{}', path, e)
+        with suppress(OSError):
+            tmp_path.unlink()
+        return False
+
+    return True
@@ -0,0 +1,88 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from collections import deque
+from nfsn_ddns.defs import DEFAULT_HEDGE_DELAY
+from nfsn_ddns.defs import DEFAULT_HEDGE_SAMPLES
+from nfsn_ddns.utils import percentile
+import threading
+
+# minimum number of observed latencies before a percentile is trusted
+HEDGE_MIN_SAMPLES = 5
+
+
+class LatencyTracker:
+    def __init__(self, ratio: float, *,
+            samples: int = DEFAULT_HEDGE_SAMPLES,
+            fallback: float = DEFAULT_HEDGE_DELAY) -> None:
+        """
+        latency tracker deciding when to hedge a request
+
+        Tracks the latencies of recent requests, where the delay before
+        hedging a request is the provided percentile of those latencies
+        (e.g. with a ratio of ``0.95``, only the slowest 5% of requests are
+        expected to be hedged). Until enough latencies have been observed,
+        the fallback delay is used. Observations are thread-safe.
+
+        Args:
+            ratio: the percentile of latencies to hedge after (as a ratio)
+            samples (optional): the number of recent latencies to track
+            fallback (optional): the delay used until latencies are known
+        """
+        self.ratio = ratio
+        self.fallback = fallback
+        self._latencies = deque(maxlen=samples)  # type: deque[float]
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        """
+        returns the delay before a request should be hedged
+
+        Returns:
+            the delay (in seconds)
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return self.fallback
+
+        return percentile(latencies, self.ratio)
+
+    def observe(self, latency: float) -> None:
+        """
+        observe the latency of a completed request
+
+        Args:
+            latency: the latency (in seconds)
+        """
+        with self._lock:
+            self._latencies.append(latency)
+
+    def dump(self) -> list[float]:
+        """
+        dump the tracked latencies (e.g. to persist between runs)
+
+        Returns:
+            the latencies (in seconds)
+        """
+        with self._lock:
+            return [round(latency, 4) for latency in self._latencies]
+
+    def load(self, data: object) -> None:
+        """
+        load latencies previously dumped
+
+        Any invalid entry is ignored.
+
+        Args:
+            data: the latencies
+        """
+        if not isinstance(data, list):
+            return
+
+        with self._lock:
+            for value in data:
+                if isinstance(value, int | float) and value >= 0:
+                    self._latencies.append(float(value))
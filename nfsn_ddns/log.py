@@ -2,7 +2,14 @@
 # Copyright nfsn-ddns Contributors
 
 from __future__ import annotations
-
+from datetime import datetime
+from datetime import timezone
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
 
 # flag to track the disablement of colorized messages
 NFSN_DDNS_LOG_NOCOLOR_FLAG = False
@@ -10,8 +17,33 @@ NFSN_DDNS_LOG_NOCOLOR_FLAG = False
 # flag to track the enablement of verbose messages
 NFSN_DDNS_LOG_VERBOSE_FLAG = False
 
+# supported formats of logged messages
+LOG_FORMATS = ['json', 'logfmt', 'text']
+
+# level of success messages (between informational and warning messages)
+SUCCESS = 25
+
+# prefix and color applied to text messages of each level
+TEXT_STYLES = {
+    logging.DEBUG: ('(verbose) ', '\033[2m'),
+    logging.INFO: ('', ''),
+    SUCCESS: ('(success) ', '\033[1;32m'),
+    logging.WARNING: ('(warn) ', '\033[1;35m'),
+    logging.ERROR: ('(error) ', '\033[1;31m'),
+}
+
+logging.addLevelName(SUCCESS, 'SUCCESS')
 
-def log(msg: str, *args: str) -> None:
+# the logger of all nfsn-ddns messages
+LOGGER = logging.getLogger('nfsn_ddns')
+LOGGER.propagate = False
+LOGGER.setLevel(logging.INFO)
+
+# the background writer of logged messages (if enabled)
+_LISTENER = None  # type: logging.handlers.QueueListener | None
+
+
+def log(msg: str, *args: object) -> None:
     """
     log a message
 
@@ -26,14 +58,14 @@ def log(msg: str, *args: str) -> None:
         *args: an arbitrary set of positional and keyword arguments used when
             generating a formatted message
     """
-    __log('', '', msg, *args)
+    __log(logging.INFO, msg, *args)
 
 
-def err(msg: str, *args: str) -> None:
+def err(msg: str, *args: object) -> None:
     """
     log an error message
 
-    Logs an error message to standard error with a trailing new line and (if
+    Logs an error message to standard out with a trailing new line and (if
     enabled) a red colorization.
 
     .. code-block:: python
@@ -45,14 +77,14 @@ def err(msg: str, *args: str) -> None:
         *args: an arbitrary set of positional and keyword arguments used when
             generating a formatted message
     """
-    __log('(error) ', '\033[1;31m', msg, *args)
+    __log(logging.ERROR, msg, *args)
 
 
-def success(msg: str, *args: str) -> None:
+def success(msg: str, *args: object) -> None:
     """
     log a success message
 
-    Logs a success message to standard error with a trailing new line and (if
+    Logs a success message to standard out with a trailing new line and (if
     enabled) a green colorization.
 
     .. code-block:: python
@@ -64,10 +96,10 @@ def success(msg: str, *args: str) -> None:
         *args: an arbitrary set of positional and keyword arguments used when
             generating a formatted message
     """
-    __log('(success) ', '\033[1;32m', msg, *args)
+    __log(SUCCESS, msg, *args)
 
 
-def verbose(msg: str, *args: str) -> None:
+def verbose(msg: str, *args: object) -> None:
     """
     log a verbose message
 
@@ -75,24 +107,27 @@ def verbose(msg: str, *args: str) -> None:
     enabled) an inverted colorization. By default, verbose messages will not be
     output to standard out unless the instance is configured with verbosity.
 
+    Arguments are only formatted into the message when verbose messages are
+    enabled; callers should provide arguments instead of formatting a message
+    themselves.
+
     .. code-block:: python
 
-        verbose('this is a verbose message')
+        verbose('this is a verbose message: {}', value)
 
     Args:
         msg: the message
         *args: an arbitrary set of positional and keyword arguments used when
             generating a formatted message
     """
-    if NFSN_DDNS_LOG_VERBOSE_FLAG:
-        __log('(verbose) ', '\033[2m', msg, *args)
+    __log(logging.DEBUG, msg, *args)
 
 
-def warn(msg: str, *args: str) -> None:
+def warn(msg: str, *args: object) -> None:
     """
     log a warning message
 
-    Logs a warning message to standard error with a trailing new line and (if
+    Logs a warning message to standard out with a trailing new line and (if
     enabled) a purple colorization.
 
     .. code-block:: python
@@ -104,33 +139,128 @@ def warn(msg: str, *args: str) -> None:
         *args: an arbitrary set of positional and keyword arguments used when
             generating a formatted message
     """
-    __log('(warn) ', '\033[1;35m', msg, *args)
+    __log(logging.WARNING, msg, *args)
 
-def __log(prefix: str, color: str, msg: str, *args: str) -> None:
+
+def __log(level: int, msg: str, *args: object) -> None:
     """
     utility logging method
 
-    A log method to help format a message based on provided prefix and color.
+    Issues a message to the logger at the provided level. A message (and any
+    arguments) is only formatted if the level is enabled.
 
     Args:
-        prefix: prefix to add to the message
-        color: the color to apply to the message
+        level: the level of the message
         msg: the message
         *args: an arbitrary set of positional and keyword arguments used when
             generating a formatted message
     """
-    if NFSN_DDNS_LOG_NOCOLOR_FLAG:
-        color = ''
-        post = ''
-    else:
-        post = '\033[0m'
-    msg = str(msg)
-    if args:
-        msg = msg.format(*args)
-    print(f'{color}{prefix}{msg}{post}', flush=True)
+    if LOGGER.isEnabledFor(level):
+        LOGGER.log(level, _Message(msg, args))
+
+
+class _Message:
+    def __init__(self, msg: str, args: tuple[object, ...]) -> None:
+        """
+        a lazily formatted message
+
+        A message is formatted (using ``str.format``) once rendered, and
+        only when arguments are provided.
+
+        Args:
+            msg: the message
+            args: arguments used when formatting the message
+        """
+        self.msg = msg
+        self.args = args
+
+    def __str__(self) -> str:
+        msg = str(self.msg)
+        if self.args:
+            msg = msg.format(*self.args)
+        return msg
+
 
+class _JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps({
+            'time': _timestamp(record),
+            'level': record.levelname.lower(),
+            'message': record.getMessage(),
+        })
 
-def nfsn_ddns_log_configuration(*, nocolor: bool, verbose_: bool) -> None:
+
+class _LogfmtFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {
+            'time': _timestamp(record),
+            'level': record.levelname.lower(),
+            'msg': record.getMessage(),
+        }
+        return ' '.join(
+            f'{key}={_logfmt_value(value)}' for key, value in fields.items())
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        prefix, color = TEXT_STYLES.get(record.levelno, ('', ''))
+        if NFSN_DDNS_LOG_NOCOLOR_FLAG or not color:
+            return f'{prefix}{record.getMessage()}'
+
+        return f'{color}{prefix}{record.getMessage()}\033[0m'
+
+
+class _StdoutHandler(logging.Handler):
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        write a message to standard out
+
+        The active standard out is resolved for every message (allowing
+        output to be redirected).
+
+        Args:
+            record: the message
+        """
+        try:
+            msg = self.format(record)
+            sys.stdout.write(msg + '\n')
+            sys.stdout.flush()
+        except Exception:  # noqa: BLE001
+            self.handleError(record)
+
+
+def _logfmt_value(value: str) -> str:
+    """
+    format a value of a logfmt message
+
+    Args:
+        value: the value
+
+    Returns:
+        the value (quoted, if required)
+    """
+    if value and not any(c in value for c in ' ="\\') and value.isprintable():
+        return value
+
+    return json.dumps(value)
+
+
+def _timestamp(record: logging.LogRecord) -> str:
+    """
+    format the timestamp of a message
+
+    Args:
+        record: the message
+
+    Returns:
+        the iso 8601 formatted timestamp
+    """
+    created = datetime.fromtimestamp(record.created, tz=timezone.utc)
+    return created.isoformat(timespec='milliseconds')
+
+
+def nfsn_ddns_log_configuration(*, nocolor: bool, verbose_: bool,
+        fmt: str = 'text', background: bool = False) -> None:
     """
     configure the global logging state of the running instance
 
@@ -139,11 +269,75 @@ def nfsn_ddns_log_configuration(*, nocolor: bool, verbose_: bool) -> None:
     process's life cycle to provide consistent logging output. This method does
     not required to be invoked to invoke provided logging methods.
 
+    Messages are written to standard out as text (colorized, unless
+    disabled), as json objects or as logfmt lines. When writing in the
+    background, messages are queued by the caller and written by a dedicated
+    thread, ensuring callers never block on output (see
+    ``nfsn_ddns_log_shutdown``).
+
     Args:
         nocolor: toggle the disablement of colorized messages
         verbose_: toggle the enablement of verbose messages
+        fmt (optional): the format of messages
+        background (optional): whether messages are written in the background
     """
     global NFSN_DDNS_LOG_NOCOLOR_FLAG  # noqa: PLW0603
     global NFSN_DDNS_LOG_VERBOSE_FLAG  # noqa: PLW0603
+    global _LISTENER  # noqa: PLW0603
     NFSN_DDNS_LOG_NOCOLOR_FLAG = nocolor
     NFSN_DDNS_LOG_VERBOSE_FLAG = verbose_
+
+    nfsn_ddns_log_shutdown()
+
+    writer = _StdoutHandler()
+    if fmt == 'json':
+        writer.setFormatter(_JsonFormatter())
+    elif fmt == 'logfmt':
+        writer.setFormatter(_LogfmtFormatter())
+    else:
+        writer.setFormatter(_TextFormatter())
+
+    handler = writer  # type: logging.Handler
+    if background:
+        messages = queue.SimpleQueue()  # type: queue.SimpleQueue[logging.LogRecord]
+        handler = logging.handlers.QueueHandler(messages)
+        _LISTENER = logging.handlers.QueueListener(messages, writer)
+        _LISTENER.start()
+
+    _install(handler)
+    LOGGER.setLevel(logging.DEBUG if verbose_ else logging.INFO)
+
+
+def nfsn_ddns_log_shutdown() -> None:
+    """
+    stop writing messages in the background
+
+    Waits until all queued messages have been written. Any messages issued
+    afterwards are written directly.
+    """
+    global _LISTENER  # noqa: PLW0603
+    if _LISTENER:
+        listener = _LISTENER
+        _LISTENER = None
+        _install(*listener.handlers)
+        listener.stop()
+
+
+def _install(handler: logging.Handler) -> None:
+    """
+    install the handler of all messages
+
+    Args:
+        handler: the handler
+    """
+    for existing in list(LOGGER.handlers):
+        LOGGER.removeHandler(existing)
+    LOGGER.addHandler(handler)
+
+
+# default to writing text messages (before any configuration)
+_DEFAULT_HANDLER = _StdoutHandler()
+_DEFAULT_HANDLER.setFormatter(_TextFormatter())
+_install(_DEFAULT_HANDLER)
+
+atexit.register(nfsn_ddns_log_shutdown)
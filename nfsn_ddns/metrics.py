@@ -0,0 +1,376 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from nfsn_ddns.log import verbose
+from typing import Generic
+from typing import TypeVar
+import bisect
+import threading
+
+# value tracked for each series of a metric
+V = TypeVar('V')
+
+# default buckets (in seconds) for latency histograms
+DEFAULT_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+# buckets (in seconds) of record propagation times
+PROPAGATION_BUCKETS = (
+    0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+
+# content type of the prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Metric(Generic[V]):
+    def __init__(self, name: str, help_: str, kind: str,
+            labels: tuple[str, ...] = ()) -> None:
+        """
+        a metric tracked by this instance
+
+        Provides the common state for a metric family, where a series is
+        tracked for each unique set of label values.
+
+        Args:
+            name: the name of the metric
+            help_: the description of the metric
+            kind: the prometheus type of the metric
+            labels (optional): the names of the labels of the metric
+        """
+        self.name = name
+        self.help = help_
+        self.kind = kind
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._series = {}  # type: dict[tuple[str, ...], V]
+
+    def render(self) -> list[str]:
+        """
+        render the metric in the prometheus text format
+
+        Returns:
+            the lines of the metric
+        """
+        lines = [
+            f'# HELP {self.name} {self.help}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+
+        with self._lock:
+            for key, value in sorted(self._series.items()):
+                lines.extend(self._render_series(key, value))
+
+        return lines
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        """
+        build a series key from label values
+
+        Args:
+            labels: the label values
+
+        Returns:
+            the key
+        """
+        return tuple(str(labels.get(label, '')) for label in self.labels)
+
+    def _label_str(self, key: tuple[str, ...],
+            extra: tuple[tuple[str, str], ...] = ()) -> str:
+        """
+        build the label set of a series
+
+        Args:
+            key: the series key
+            extra (optional): additional label pairs
+
+        Returns:
+            the label set (empty if no labels)
+        """
+        pairs = list(zip(self.labels, key, strict=True)) + list(extra)
+        if not pairs:
+            return ''
+
+        def escape(value: str) -> str:
+            return value.replace('\\', r'\\').replace('"', r'\"') \
+                .replace('\n', r'\n')
+
+        return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in pairs) + '}'
+
+    def _render_series(self, key: tuple[str, ...], value: V) -> list[str]:
+        return [f'{self.name}{self._label_str(key)} {_fmt(value)}']
+
+
+class Counter(Metric[float]):
+    def __init__(self, name: str, help_: str,
+            labels: tuple[str, ...] = ()) -> None:
+        """
+        a monotonically increasing metric
+
+        Args:
+            name: the name of the metric
+            help_: the description of the metric
+            labels (optional): the names of the labels of the metric
+        """
+        super().__init__(name, help_, 'counter', labels)
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """
+        increment the counter
+
+        Args:
+            amount (optional): the amount to increment by
+            **labels: the label values of the series
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+
+class Gauge(Metric[float]):
+    def __init__(self, name: str, help_: str,
+            labels: tuple[str, ...] = ()) -> None:
+        """
+        a metric which can arbitrarily change
+
+        Args:
+            name: the name of the metric
+            help_: the description of the metric
+            labels (optional): the names of the labels of the metric
+        """
+        super().__init__(name, help_, 'gauge', labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        """
+        set the value of the gauge
+
+        Args:
+            value: the value
+            **labels: the label values of the series
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+
+class HistogramSeries:
+    def __init__(self, size: int) -> None:
+        """
+        the observations of a histogram series
+
+        Args:
+            size: the number of buckets (including the `+Inf` bucket)
+        """
+        self.counts = [0] * size
+        self.total = 0.0
+        self.count = 0
+
+
+class Histogram(Metric[HistogramSeries]):
+    def __init__(self, name: str, help_: str,
+            labels: tuple[str, ...] = (),
+            buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS) -> None:
+        """
+        a metric sampling observations into buckets
+
+        Args:
+            name: the name of the metric
+            help_: the description of the metric
+            labels (optional): the names of the labels of the metric
+            buckets (optional): the upper bounds of the buckets
+        """
+        super().__init__(name, help_, 'histogram', labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        observe a value
+
+        Args:
+            value: the value
+            **labels: the label values of the series
+        """
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = \
+                    HistogramSeries(len(self.buckets) + 1)
+
+            series.counts[idx] += 1
+            series.total += value
+            series.count += 1
+
+    def _render_series(self, key: tuple[str, ...],
+            value: HistogramSeries) -> list[str]:
+        counts, total, count = value.counts, value.total, value.count
+        lines = []
+
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts, strict=False):
+            cumulative += bucket_count
+            label_str = self._label_str(key, (('le', _fmt(bound)),))
+            lines.append(f'{self.name}_bucket{label_str} {cumulative}')
+
+        label_str = self._label_str(key, (('le', '+Inf'),))
+        lines.append(f'{self.name}_bucket{label_str} {count}')
+        lines.append(f'{self.name}_sum{self._label_str(key)} {_fmt(total)}')
+        lines.append(f'{self.name}_count{self._label_str(key)} {count}')
+        return lines
+
+
+# latency of public address queries (by endpoint)
+IP_SOURCE_DURATION = Histogram(
+    'nfsn_ddns_ip_source_duration_seconds',
+    'Latency of public address queries by endpoint.',
+    ('endpoint', 'family', 'result'))
+
+# nfsn api calls (by method and status)
+NFSN_API_REQUESTS = Counter(
+    'nfsn_ddns_nfsn_api_requests_total',
+    'NFSN API calls by method and status.',
+    ('method', 'status'))
+
+# latency of nfsn api calls (by method)
+NFSN_API_DURATION = Histogram(
+    'nfsn_ddns_nfsn_api_duration_seconds',
+    'Latency of NFSN API calls by method.',
+    ('method',))
+
+# hedged nfsn api calls (by method)
+NFSN_API_HEDGES = Counter(
+    'nfsn_ddns_nfsn_api_hedges_total',
+    'NFSN API calls hedged by a second request by method.',
+    ('method',))
+
+# cache checks (by family and result)
+CACHE_CHECKS = Counter(
+    'nfsn_ddns_cache_checks_total',
+    'Cached public address checks by family and result.',
+    ('family', 'result'))
+
+# processed records (by type and action)
+RECORDS = Counter(
+    'nfsn_ddns_records_total',
+    'Processed records by type and action.',
+    ('type', 'action'))
+
+# time for updated records to propagate to every authoritative nameserver
+RECORD_PROPAGATION = Histogram(
+    'nfsn_ddns_record_propagation_seconds',
+    'Time for updated records to propagate to every authoritative nameserver.',
+    ('type',), PROPAGATION_BUCKETS)
+
+# engine runs (by state)
+RUNS = Counter(
+    'nfsn_ddns_runs_total',
+    'Engine runs by resulting state.',
+    ('state',))
+
+# timestamp of the last run
+LAST_RUN = Gauge(
+    'nfsn_ddns_last_run_timestamp_seconds',
+    'Unix timestamp of the last engine run.')
+
+# timestamp of the last successful run
+LAST_SUCCESS = Gauge(
+    'nfsn_ddns_last_success_timestamp_seconds',
+    'Unix timestamp of the last successful engine run.')
+
+# all metrics exposed by this instance
+REGISTRY = [
+    IP_SOURCE_DURATION,
+    NFSN_API_REQUESTS,
+    NFSN_API_DURATION,
+    NFSN_API_HEDGES,
+    CACHE_CHECKS,
+    RECORDS,
+    RECORD_PROPAGATION,
+    RUNS,
+    LAST_RUN,
+    LAST_SUCCESS,
+]  # type: list[Metric]
+
+
+def render() -> str:
+    """
+    render all metrics in the prometheus text format
+
+    Returns:
+        the exposition
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    def __init__(self, address: str, port: int) -> None:
+        """
+        prometheus metrics endpoint
+
+        Provides an HTTP server exposing all metrics (in the Prometheus text
+        format) on `/metrics`. Requests are served from a background thread.
+
+        Args:
+            address: the address to listen on
+            port: the port to listen on
+        """
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+
+                body = render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+                pass
+
+        self.server = ThreadingHTTPServer((address, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever,
+            name='nfsn-ddns-metrics', daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def start(self) -> None:
+        """
+        start serving metrics
+        """
+        verbose('(metrics) serving metrics on port: {}', self.port)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        stop serving metrics
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _fmt(value: object) -> str:
+    """
+    format a sample value
+
+    Args:
+        value: the value
+
+    Returns:
+        the formatted value
+    """
+    return repr(value) if isinstance(value, float) else str(value)
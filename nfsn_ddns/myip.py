@@ -2,12 +2,12 @@
 # Copyright nfsn-ddns Contributors
 
 from __future__ import annotations
-from nfsn_ddns import __version__ as nfsn_ddns_version
 from nfsn_ddns.defs import DEFAULT_IP_FETCH_URLS_V4
 from nfsn_ddns.defs import DEFAULT_IP_FETCH_URLS_V6
 from nfsn_ddns.log import err
 from nfsn_ddns.log import warn
 from nfsn_ddns.log import verbose
+from nfsn_ddns.session import new_session
 import ipaddress
 import random
 import requests
@@ -91,29 +91,70 @@ def _fetch(type_: type[ipaddress.IPv4Address | ipaddress.IPv6Address],
         endpoint_idx = random.randrange(len(available_endpoints))  # noqa: S311
         target = available_endpoints.pop(endpoint_idx)
 
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': f'nfsn-ddns/{nfsn_ddns_version}',
-        })
-
-        try:
-            verbose(f'(myip) attempting to query endpoint: {target}')
-            rsp = session.get(target, timeout=timeout)
-            rsp.raise_for_status()
-
-            try:
-                ip = ipaddress.ip_address(rsp.text.strip())
-            except ValueError:
-                warn(f'(myip) endpoint provided invalid address: {target}')
-            else:
-                if not isinstance(ip, type_):
-                    warn(f'(myip) endpoint provided unexpected ipv: {target}')
-                else:
-                    ip_str = str(ip)
-                    verbose(f'(myip) resolved self address: {ip_str}')
-                    return ip_str
-        except requests.exceptions.RequestException as e:
-            warn(f'(myip) fail to fetch on endpoint: {target}\n{e}')
+        ip_str = fetch_endpoint(type_, target, timeout=timeout)
+        if ip_str:
+            return ip_str
 
     err('(myip) unable to determine self address (exhausted endpoints)')
     return ''
+
+
+def fetch_endpoint(type_: type[ipaddress.IPv4Address | ipaddress.IPv6Address],
+        target: str, timeout: float | tuple[float, float] = 3,
+        session: requests.Session | None = None) -> str:
+    """
+    query a specific endpoint for the external ip address for this instance
+
+    Args:
+        type_: the type of address being fetched
+        target: the endpoint to query
+        timeout (optional): timeout for any requests made (or a
+                            connect/read tuple)
+        session (optional): the session to issue the request on
+
+    Returns:
+        the ip address; empty string on failure
+    """
+
+    if not session:
+        session = new_session()
+
+    try:
+        verbose('(myip) attempting to query endpoint: {}', target)
+        rsp = session.get(target, timeout=timeout)
+        rsp.raise_for_status()
+
+        return parse_address(type_, rsp.text, target)
+    except requests.exceptions.RequestException as e:
+        warn(f'(myip) fail to fetch on endpoint: {target}\n{e}')
+
+    return ''
+
+
+def parse_address(type_: type[ipaddress.IPv4Address | ipaddress.IPv6Address],
+        value: str, target: str) -> str:
+    """
+    parse an ip address reported by an endpoint
+
+    Args:
+        type_: the type of address being fetched
+        value: the raw value reported by the endpoint
+        target: the endpoint which reported the value
+
+    Returns:
+        the ip address; empty string if not a valid address of the type
+    """
+
+    try:
+        ip = ipaddress.ip_address(value.strip())
+    except ValueError:
+        warn(f'(myip) endpoint provided invalid address: {target}')
+    else:
+        if not isinstance(ip, type_):
+            warn(f'(myip) endpoint provided unexpected ipv: {target}')
+        else:
+            ip_str = str(ip)
+            verbose('(myip) resolved self address: {}', ip_str)
+            return ip_str
+
+    return ''
@@ -0,0 +1,322 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from nfsn_ddns import dns
+from nfsn_ddns import stun
+from nfsn_ddns.cassette import active_cassette
+from nfsn_ddns.deadline import Deadline
+from nfsn_ddns.deadline import DeadlineExceeded
+from nfsn_ddns.defs import DEFAULT_IP_FETCH_URLS_V4
+from nfsn_ddns.defs import DEFAULT_IP_FETCH_URLS_V6
+from nfsn_ddns.defs import SOCKET_ENDPOINT_SCHEMES
+from nfsn_ddns.log import err
+from nfsn_ddns.log import verbose
+from nfsn_ddns.log import warn
+from nfsn_ddns.metrics import IP_SOURCE_DURATION
+from nfsn_ddns.myip import fetch_endpoint
+from nfsn_ddns.myip import parse_address
+from nfsn_ddns.myip_cmd import cmd_environment
+from nfsn_ddns.myip_cmd import parse_output
+from nfsn_ddns.report import report_source
+from nfsn_ddns.timing import phase
+from nfsn_ddns.utils import split_socket_endpoint
+from typing import TYPE_CHECKING
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+import asyncio
+import ipaddress
+import random
+import socket
+import time
+
+if TYPE_CHECKING:
+    from requests import Session
+
+
+async def fetch_myipv4_async(endpoints: None | str | list[str] = None,
+        cmd: str | None = None, timeout: float = 3,
+        session: Session | None = None, *,
+        connect_timeout: float | None = None,
+        deadline: Deadline | None = None) -> str:
+    """
+    query for the external ipv4 address for this instance (asynchronous)
+
+    See `_fetch` for more details.
+
+    Args:
+        endpoints (optional): the explicit endpoint(s) to query on
+        cmd (optional): a command to invoke instead of querying endpoints
+        timeout (optional): (read) timeout for any requests made
+        session (optional): the session to issue web requests on
+        connect_timeout (optional): connect timeout for any web requests made
+        deadline (optional): the deadline bounding the detection
+
+    Returns:
+        the ip address; empty string on failure
+    """
+    return await _fetch(ipaddress.IPv4Address, endpoints, cmd, timeout,
+        session, connect_timeout, deadline or Deadline())
+
+
+async def fetch_myipv6_async(endpoints: None | str | list[str] = None,
+        cmd: str | None = None, timeout: float = 3,
+        session: Session | None = None, *,
+        connect_timeout: float | None = None,
+        deadline: Deadline | None = None) -> str:
+    """
+    query for the external ipv6 address for this instance (asynchronous)
+
+    See `_fetch` for more details.
+
+    Args:
+        endpoints (optional): the explicit endpoint(s) to query on
+        cmd (optional): a command to invoke instead of querying endpoints
+        timeout (optional): (read) timeout for any requests made
+        session (optional): the session to issue web requests on
+        connect_timeout (optional): connect timeout for any web requests made
+        deadline (optional): the deadline bounding the detection
+
+    Returns:
+        the ip address; empty string on failure
+    """
+    return await _fetch(ipaddress.IPv6Address, endpoints, cmd, timeout,
+        session, connect_timeout, deadline or Deadline())
+
+
+async def _fetch(type_: type[ipaddress.IPv4Address | ipaddress.IPv6Address],
+        endpoints: None | str | list[str], cmd: str | None,
+        timeout: float, session: Session | None,
+        connect_timeout: float | None, deadline: Deadline) -> str:
+    """
+    query for the external ip address for this instance (asynchronous)
+
+    The asynchronous equivalent of `myip._fetch` and `myip_cmd._fetch`. If a
+    command is provided, the command is used to determine the address.
+    Otherwise, endpoints are selected at random until an address is resolved
+    or there are no longer any endpoints to query. While a cassette is active,
+    endpoints are instead selected in order (so a replay queries the same
+    endpoints which were recorded).
+
+    Endpoints are selected by their scheme:
+
+    - ``http://``/``https://``: a web service reporting the address
+    - ``stun://<host>[:<port>]``: a STUN server's reflexive address
+    - ``dns://<server>[:<port>]/<name>[?type=txt]``: a DNS server which
+       reports the address of a querying client for a given name
+
+    STUN and DNS queries are sent over the address family being fetched.
+    Every attempt is bound to the provided timeout, which is capped by the
+    time remaining until the deadline. Once the deadline expires, no further
+    endpoints are attempted.
+
+    Args:
+        type_: the type of address being fetched
+        endpoints: the explicit endpoint(s) to query on
+        cmd: a command to invoke instead of querying endpoints
+        timeout: (read) timeout for any requests made
+        session: the session to issue web requests on
+        connect_timeout: connect timeout for any web requests made
+        deadline: the deadline bounding the detection
+
+    Returns:
+        the ip address; empty string on failure
+    """
+
+    family = 'ipv6' if type_ == ipaddress.IPv6Address else 'ipv4'
+
+    with phase(f'fetch-{family}'):
+        return await _fetch_any(type_, family, endpoints, cmd, timeout,
+            session, connect_timeout, deadline)
+
+
+async def _fetch_any(
+        type_: type[ipaddress.IPv4Address | ipaddress.IPv6Address],
+        family: str, endpoints: None | str | list[str], cmd: str | None,
+        timeout: float, session: Session | None,
+        connect_timeout: float | None, deadline: Deadline) -> str:
+    """
+    query for the external ip address using any available source
+
+    Args:
+        type_: the type of address being fetched
+        family: the name of the address family being fetched
+        endpoints: the explicit endpoint(s) to query on
+        cmd: a command to invoke instead of querying endpoints
+        timeout: (read) timeout for any requests made
+        session: the session to issue web requests on
+        connect_timeout: connect timeout for any web requests made
+        deadline: the deadline bounding the detection
+
+    Returns:
+        the ip address; empty string on failure
+    """
+
+    if cmd:
+        start = time.monotonic()
+        with phase('cmd'):
+            ip_str = await _fetch_cmd(type_, cmd, deadline.limit(timeout))
+        elapsed = time.monotonic() - start
+        IP_SOURCE_DURATION.observe(elapsed, endpoint='cmd', family=family,
+            result='ok' if ip_str else 'fail')
+        report_source(family, 'cmd', ip_str, elapsed)
+        return ip_str
+
+    if endpoints:
+        if isinstance(endpoints, list):
+            available_endpoints = list(endpoints)
+        else:
+            available_endpoints = [
+                endpoints,
+            ]
+    elif type_ == ipaddress.IPv6Address:
+        available_endpoints = list(DEFAULT_IP_FETCH_URLS_V6)
+    else:
+        available_endpoints = list(DEFAULT_IP_FETCH_URLS_V4)
+
+    while available_endpoints:
+        if deadline.expired():
+            err('(myip) unable to determine self address (deadline exceeded)')
+            return ''
+
+        if active_cassette():
+            endpoint_idx = 0
+        else:
+            endpoint_idx = random.randrange(len(available_endpoints))  # noqa: S311
+        target = available_endpoints.pop(endpoint_idx)
+
+        start = time.monotonic()
+        with phase(target):
+            ip_str = await _fetch_endpoint(type_, target, timeout, session,
+                connect_timeout, deadline)
+        elapsed = time.monotonic() - start
+        IP_SOURCE_DURATION.observe(elapsed, endpoint=target, family=family,
+            result='ok' if ip_str else 'fail')
+        report_source(family, target, ip_str, elapsed)
+        if ip_str:
+            return ip_str
+
+    err('(myip) unable to determine self address (exhausted endpoints)')
+    return ''
+
+
+async def _fetch_cmd(
+        type_: type[ipaddress.IPv4Address | ipaddress.IPv6Address],
+        cmd: str, timeout: float) -> str:
+    """
+    query for the external ip address using a command (asynchronous)
+
+    Args:
+        type_: the type of address being fetched
+        cmd: the command to invoke
+        timeout: timeout for the command to complete
+
+    Returns:
+        the ip address; empty string on failure
+    """
+
+    verbose('(myip-cmd) issuing command: {}', cmd)
+    try:
+        proc = await asyncio.create_subprocess_shell(cmd,
+            env=cmd_environment(type_),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE)
+    except FileNotFoundError:
+        err(f'(myip-cmd) command does not exist: {cmd}')
+        return ''
+
+    try:
+        stdout, _ = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        err(f'(myip-cmd) command timed out: {cmd}')
+        return ''
+
+    output = stdout.decode(errors='replace')
+    if proc.returncode != 0:
+        verbose(output)
+        err(f'(myip-cmd) command failed to run (rv: {proc.returncode})')
+        return ''
+
+    return parse_output(type_, output)
+
+
+async def _fetch_endpoint(
+        type_: type[ipaddress.IPv4Address | ipaddress.IPv6Address],
+        target: str, timeout: float, session: Session | None,
+        connect_timeout: float | None, deadline: Deadline) -> str:
+    """
+    query a specific endpoint for the external ip address (asynchronous)
+
+    Args:
+        type_: the type of address being fetched
+        target: the endpoint to query
+        timeout: (read) timeout for the query
+        session: the session to issue web requests on
+        connect_timeout: connect timeout for a web request
+        deadline: the deadline bounding the query
+
+    Returns:
+        the ip address; empty string on failure
+    """
+
+    parsed = urlparse(target)
+    family = socket.AF_INET6 \
+        if type_ == ipaddress.IPv6Address else socket.AF_INET
+
+    server = None
+    if parsed.scheme in SOCKET_ENDPOINT_SCHEMES:
+        server = split_socket_endpoint(target)
+        if not server:
+            warn(f'(myip) ignoring invalid endpoint: {target}')
+            return ''
+
+    if parsed.scheme == 'stun':
+        assert server is not None
+        verbose('(myip) attempting to query stun server: {}', target)
+        try:
+            value = await stun.query_async(server[0],
+                server[1] or stun.STUN_PORT, family=family,
+                timeout=deadline.limit(timeout))
+        except (OSError, TimeoutError, stun.StunError) as e:
+            warn(f'(myip) fail to fetch on endpoint: {target}\n{e}')
+            return ''
+
+        return parse_address(type_, value, target)
+
+    if parsed.scheme == 'dns':
+        assert server is not None
+        qname = parsed.path.strip('/')
+        qtypes = parse_qs(parsed.query).get('type', [])
+        if qtypes and qtypes[0].lower() == 'txt':
+            qtype = dns.QTYPE_TXT
+        elif type_ == ipaddress.IPv6Address:
+            qtype = dns.QTYPE_AAAA
+        else:
+            qtype = dns.QTYPE_A
+
+        verbose('(myip) attempting to query dns server: {}', target)
+        try:
+            rsp = await dns.query_async(server[0], qname, qtype,
+                port=server[1] or dns.DNS_PORT, family=family,
+                timeout=deadline.limit(timeout))
+        except (OSError, TimeoutError, dns.DnsError) as e:
+            warn(f'(myip) fail to fetch on endpoint: {target}\n{e}')
+            return ''
+
+        for answer in rsp.answers:
+            if dns.to_address(answer):
+                return parse_address(type_, answer.value, target)
+
+        warn(f'(myip) endpoint provided no address: {target}')
+        return ''
+
+    try:
+        request_timeout = deadline.request_timeout(timeout, connect_timeout)
+    except DeadlineExceeded as e:
+        warn(f'(myip) fail to fetch on endpoint: {target}\n{e}')
+        return ''
+
+    return await asyncio.to_thread(fetch_endpoint, type_, target,
+        request_timeout, session)
@@ -65,20 +65,10 @@ def _fetch(type_: type[ipaddress.IPv4Address | ipaddress.IPv6Address],
         the ip address; `None` on failure
     """
 
-    cmd_env = os.environ.copy()
-    os.environ.pop('NFSN_DDNS_FETCH_IPV4', None)
-    os.environ.pop('NFSN_DDNS_FETCH_IPV6', None)
-
-    if type_ == ipaddress.IPv4Address:
-        cmd_env['NFSN_DDNS_FETCH_IPV4'] = '1'
-
-    if type_ == ipaddress.IPv6Address:
-        cmd_env['NFSN_DDNS_FETCH_IPV6'] = '1'
-
-    verbose(f'(myip-cmd) issuing command: {cmd}')
+    verbose('(myip-cmd) issuing command: {}', cmd)
     try:
-        result = subprocess.run(cmd, env=cmd_env, shell=True,  # noqa: S602
-            check=False, capture_output=True, text=True)
+        result = subprocess.run(cmd, env=cmd_environment(type_),  # noqa: S602
+            shell=True, check=False, capture_output=True, text=True)
     except FileNotFoundError:
         err(f'(myip-cmd) command does not exist: {cmd}')
         return ''
@@ -88,7 +78,53 @@ def _fetch(type_: type[ipaddress.IPv4Address | ipaddress.IPv6Address],
         err(f'(myip-cmd) command failed to run (rv: {result.returncode})')
         return ''
 
-    raw_output = result.stdout
+    return parse_output(type_, result.stdout)
+
+
+def cmd_environment(
+        type_: type[ipaddress.IPv4Address | ipaddress.IPv6Address],
+        ) -> dict[str, str]:
+    """
+    build the environment for a command fetching an ip address
+
+    The environment of this process is provided to the command, with a
+    `NFSN_DDNS_FETCH_IPV4` or `NFSN_DDNS_FETCH_IPV6` hint indicating the
+    type of address being requested.
+
+    Args:
+        type_: the type of address being fetched
+
+    Returns:
+        the environment
+    """
+
+    cmd_env = os.environ.copy()
+    cmd_env.pop('NFSN_DDNS_FETCH_IPV4', None)
+    cmd_env.pop('NFSN_DDNS_FETCH_IPV6', None)
+
+    if type_ == ipaddress.IPv4Address:
+        cmd_env['NFSN_DDNS_FETCH_IPV4'] = '1'
+
+    if type_ == ipaddress.IPv6Address:
+        cmd_env['NFSN_DDNS_FETCH_IPV6'] = '1'
+
+    return cmd_env
+
+
+def parse_output(type_: type[ipaddress.IPv4Address | ipaddress.IPv6Address],
+        raw_output: str) -> str:
+    """
+    parse the output of a command fetching an ip address
+
+    See `_fetch` for details on the output formats accepted.
+
+    Args:
+        type_: the type of address being fetched
+        raw_output: the standard output of the command
+
+    Returns:
+        the ip address; empty string on failure
+    """
 
     if '=' in raw_output:
         _, raw_output = raw_output.split('=', 1)
@@ -107,7 +143,7 @@ def _fetch(type_: type[ipaddress.IPv4Address | ipaddress.IPv6Address],
             err(f'(myip-cmd) command provided unexpected ipv: {target}')
         else:
             ip_str = str(ip)
-            verbose(f'(myip-cmd) resolved self address: {ip_str}')
+            verbose('(myip-cmd) resolved self address: {}', ip_str)
             return ip_str
 
     return ''
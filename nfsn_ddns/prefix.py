@@ -0,0 +1,139 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from nfsn_ddns.log import err
+from nfsn_ddns.log import verbose
+from nfsn_ddns.sync import RecordSet
+from nfsn_ddns.utils import split_ddns_entry
+from pathlib import Path
+import ipaddress
+
+# file listing the ipv6 addresses of each interface (linux)
+IF_INET6_FILE = Path('/proc/net/if_inet6')
+
+# interface address flags which exclude an address from prefix detection
+# (temporary, deprecated, tentative and dad-failed addresses)
+IF_INET6_EXCLUDED_FLAGS = 0x01 | 0x08 | 0x20 | 0x40
+
+# scope of a global interface address
+IF_INET6_SCOPE_GLOBAL = 0x00
+
+# network of unique local addresses (never a delegated prefix)
+ULA_NETWORK = ipaddress.IPv6Network('fc00::/7')
+
+
+def detect_prefix(address: str, length: int) -> ipaddress.IPv6Network | None:
+    """
+    derive a delegated prefix from an address
+
+    Args:
+        address: an address within the delegated prefix
+        length: the length of the delegated prefix
+
+    Returns:
+        the prefix; ``None`` if the address is not a valid ipv6 address
+    """
+    try:
+        return ipaddress.IPv6Network(f'{address}/{length}', strict=False)
+    except ValueError:
+        return None
+
+
+def detect_interface_prefix(interface: str, length: int,
+        if_inet6: Path = IF_INET6_FILE) -> ipaddress.IPv6Network | None:
+    """
+    detect a delegated prefix from the addresses of a local interface
+
+    The first global, stable (non-temporary) address assigned to the
+    interface, which is not a unique local address, is used to derive the
+    delegated prefix. Addresses are read from the kernel's interface address
+    listing, which is only available on Linux.
+
+    Args:
+        interface: the name of the interface
+        length: the length of the delegated prefix
+        if_inet6 (optional): the interface address listing to read
+
+    Returns:
+        the prefix; ``None`` if no prefix could be detected
+    """
+
+    try:
+        with if_inet6.open(encoding='utf-8') as f:
+            lines = f.readlines()
+    except OSError as e:
+        err(f'unable to read interface addresses: {if_inet6}\n{e}')
+        return None
+
+    for line in lines:
+        parts = line.split()
+        if len(parts) != 6 or parts[5] != interface:
+            continue
+
+        raw_address, _, _, raw_scope, raw_flags, _ = parts
+        try:
+            address = ipaddress.IPv6Address(int(raw_address, 16))
+            scope = int(raw_scope, 16)
+            flags = int(raw_flags, 16)
+        except ValueError:
+            continue
+
+        if scope != IF_INET6_SCOPE_GLOBAL or address in ULA_NETWORK \
+                or flags & IF_INET6_EXCLUDED_FLAGS:
+            continue
+
+        verbose('interface ({}) address: {}', interface, address)
+        return detect_prefix(str(address), length)
+
+    err(f'no global ipv6 address found on interface: {interface}')
+    return None
+
+
+def prefix_address(prefix: ipaddress.IPv6Network, interface_id: str) -> str:
+    """
+    combine a delegated prefix with an interface identifier
+
+    The bits of the interface identifier outside the prefix (e.g. a subnet
+    identifier and a host's interface identifier) are applied to the
+    prefix's network address.
+
+    Args:
+        prefix: the delegated prefix
+        interface_id: the interface identifier (e.g. ``::1:0:0:0:10``)
+
+    Returns:
+        the address
+
+    Raises:
+        ``ValueError`` is raised if the interface identifier is invalid
+    """
+    suffix = int(ipaddress.IPv6Address(interface_id)) & int(prefix.hostmask)
+    return str(ipaddress.IPv6Address(int(prefix.network_address) | suffix))
+
+
+def prefix_zones(hosts: dict[str, str],
+        prefix: ipaddress.IPv6Network) -> dict[str, list[RecordSet]]:
+    """
+    build the desired ``AAAA`` record sets of hosts within a prefix
+
+    Record sets are grouped by zone, allowing every host of a zone to be
+    updated from a single query of the zone's records.
+
+    Args:
+        hosts: the interface identifier of each ddns entry
+        prefix: the delegated prefix
+
+    Returns:
+        the record sets (by domain)
+    """
+    zones = {}  # type: dict[str, list[RecordSet]]
+    for entry, interface_id in hosts.items():
+        record, domain = split_ddns_entry(entry)
+        zones.setdefault(domain, []).append(RecordSet(
+            name=record,
+            type='AAAA',
+            data=frozenset([prefix_address(prefix, interface_id)]),
+        ))
+
+    return zones
@@ -0,0 +1,571 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from contextlib import suppress
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from nfsn_ddns.client import NfsnClient
+from nfsn_ddns.config import Config
+from nfsn_ddns.debounce import Debouncer
+from nfsn_ddns.defs import DEFAULT_CFG_FILE
+from nfsn_ddns.defs import DEFAULT_DEBOUNCE_SAMPLES
+from nfsn_ddns.defs import DEFAULT_RECEIVER_ADDRESS
+from nfsn_ddns.defs import DEFAULT_RECEIVER_INTERVAL
+from nfsn_ddns.defs import DEFAULT_RECEIVER_PORT
+from nfsn_ddns.defs import DEFAULT_RECEIVER_WINDOW
+from nfsn_ddns.defs import DEFAULT_RESOLVER_TTL
+from nfsn_ddns.defs import DEFAULT_TIMEOUT
+from nfsn_ddns.defs import MAX_TIMEOUT
+from nfsn_ddns.defs import MIN_INTERVAL
+from nfsn_ddns.defs import MIN_TIMEOUT
+from nfsn_ddns.engine import EngineState
+from nfsn_ddns.engine import resolve_profile
+from nfsn_ddns.log import err
+from nfsn_ddns.log import log
+from nfsn_ddns.log import verbose
+from nfsn_ddns.metrics import RECORDS
+from nfsn_ddns.records import RecordTable
+from nfsn_ddns.resolver import ResolverCache
+from nfsn_ddns.resolver import endpoint_host
+from nfsn_ddns.session import new_session
+from nfsn_ddns.updater import DdnsUpdater
+from nfsn_ddns.updater import UpdateAction
+from nfsn_ddns.utils import split_ddns_entry
+from typing import NamedTuple
+from typing import TYPE_CHECKING
+from urllib.parse import parse_qs
+from urllib.parse import urlsplit
+import asyncio
+import base64
+import binascii
+import hmac
+import ipaddress
+import socket
+import threading
+import time
+
+if TYPE_CHECKING:
+    from argparse import Namespace
+    from nfsn_ddns.config import ReceiverUser
+    from nfsn_ddns.updater import UpdateResult
+
+# path dyndns2 clients push updates to
+DYNDNS2_UPDATE_PATH = '/nic/update'
+
+# maximum number of hostnames accepted in a single update
+DYNDNS2_MAX_HOSTNAMES = 20
+
+
+class ReceiverHost(NamedTuple):
+    # the updater for the hostname's records
+    updater: DdnsUpdater
+    # the prefix to apply to logged messages
+    prefix: str
+    # whether `A` records may be updated
+    ipv4: bool
+    # whether `AAAA` records may be updated
+    ipv6: bool
+
+
+class DyndnsReceiver:
+    def __init__(self, hosts: dict[str, ReceiverHost],
+            users: dict[str, ReceiverUser], *,
+            interval: float = DEFAULT_RECEIVER_INTERVAL,
+            window: float = DEFAULT_RECEIVER_WINDOW) -> None:
+        """
+        dyndns2 update receiver
+
+        Accepts addresses pushed by dyndns2 clients (see `submit`) for a set
+        of known hostnames and applies them to NFSN. Pushes are coalesced,
+        where only the latest address of a record is kept. A record is
+        applied once a push has settled for the provided window, and is
+        written at most once per interval; pushes arriving before a record's
+        interval has elapsed are held until the interval ends. Pushes
+        matching the last applied address are ignored, and each applied
+        record is compared against its existing value, so NFSN only sees
+        real changes. A record which fails to update (or has its change
+        deferred by a debouncer) is retried once its interval has elapsed.
+
+        Args:
+            hosts: the hostnames which can be updated
+            users: the users allowed to push updates (by name)
+            interval (optional): minimum seconds between writes of a record
+            window (optional): seconds to coalesce pushes of a record
+        """
+        self.hosts = hosts
+        self.users = users
+        self.interval = interval
+        self.window = window
+        self._applied = RecordTable()
+        self._event = None  # type: asyncio.Event | None
+        self._last_write = {}  # type: dict[tuple[str, str], float]
+        self._lock = threading.Lock()
+        self._loop = None  # type: asyncio.AbstractEventLoop | None
+        self._pending = {}  # type: dict[tuple[str, str], tuple[str, float]]
+
+    def authenticate(self, authorization: str | None) -> ReceiverUser | None:
+        """
+        authenticate a client from a basic authorization header
+
+        Args:
+            authorization: the value of the authorization header (if any)
+
+        Returns:
+            the authenticated user; ``None`` if not authenticated
+        """
+        scheme, _, credentials = (authorization or '').partition(' ')
+        if scheme.lower() != 'basic':
+            return None
+
+        try:
+            decoded = base64.b64decode(credentials.strip(), validate=True)
+            name, _, password = decoded.decode('utf-8').partition(':')
+        except (binascii.Error, UnicodeDecodeError):
+            return None
+
+        user = self.users.get(name)
+        if not user or not hmac.compare_digest(
+                user.password.encode('utf-8'), password.encode('utf-8')):
+            return None
+
+        return user
+
+    def submit(self, user: ReceiverUser, hostnames: list[str],
+            addresses: list[str]) -> list[str]:
+        """
+        submit an update pushed by a client
+
+        Queues the provided addresses for each hostname, returning a dyndns2
+        response for each hostname (e.g. ``good <ip>``). This call is
+        thread-safe.
+
+        Args:
+            user: the authenticated user
+            hostnames: the hostnames to update
+            addresses: the addresses to apply
+
+        Returns:
+            the responses (one per hostname)
+        """
+        if not hostnames or len(hostnames) > DYNDNS2_MAX_HOSTNAMES:
+            return ['notfqdn' if not hostnames else 'numhost']
+
+        desired = {}  # type: dict[str, str]
+        for value in addresses:
+            try:
+                ip = ipaddress.ip_address(value.strip())
+            except ValueError:
+                return ['911' for _ in hostnames]
+            desired['AAAA' if ip.version == 6 else 'A'] = str(ip)
+
+        replies = []
+        for raw_hostname in hostnames:
+            hostname = raw_hostname.strip().rstrip('.').lower()
+            if '.' not in hostname:
+                replies.append('notfqdn')
+                continue
+
+            host = self.hosts.get(hostname)
+            if not host or (user.hostnames is not None
+                    and hostname not in user.hostnames):
+                replies.append('nohost')
+                continue
+
+            changed = False
+            for rr_type, address in desired.items():
+                if (rr_type == 'A' and not host.ipv4) or \
+                        (rr_type == 'AAAA' and not host.ipv6):
+                    verbose('(receiver) ignoring {} address for host: {}',
+                        rr_type, hostname)
+                    continue
+
+                changed |= self._queue((hostname, rr_type), address)
+
+            status = 'good' if changed else 'nochg'
+            replies.append(f'{status} {",".join(desired.values())}')
+
+        if self._loop and self._event:
+            self._loop.call_soon_threadsafe(self._event.set)
+
+        return replies
+
+    async def run(self) -> None:
+        """
+        apply pushed updates until cancelled
+        """
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+
+        while True:
+            delay = await self.process()
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._event.wait(), delay)
+            self._event.clear()
+
+    async def process(self) -> float | None:
+        """
+        apply any pushed updates which are due
+
+        Returns:
+            seconds until the next update is due (if any)
+        """
+        now = time.monotonic()
+        with self._lock:
+            ready = []
+            for key, (address, since) in list(self._pending.items()):
+                if self._due(key, since) <= now:
+                    ready.append((key, address))
+                    del self._pending[key]
+                    self._last_write[key] = now
+
+        if ready:
+            await self._apply(ready)
+
+        with self._lock:
+            if not self._pending:
+                return None
+
+            now = time.monotonic()
+            return max(0, min(self._due(key, since) - now
+                for key, (_, since) in self._pending.items()))
+
+    def _applied_address(self, key: tuple[str, str]) -> str | None:
+        """
+        find the last applied address of a record
+
+        Args:
+            key: the hostname and record type
+
+        Returns:
+            the address (if any)
+        """
+        hostname, rr_type = key
+        record, domain = split_ddns_entry(hostname)
+        return self._applied.address(domain, record, rr_type)
+
+    def _due(self, key: tuple[str, str], since: float) -> float:
+        """
+        determine when a pending record can be applied
+
+        Args:
+            key: the hostname and record type
+            since: when the record was first pushed
+
+        Returns:
+            the (monotonic) time the record can be applied
+        """
+        last_write = self._last_write.get(key)
+        due = since + self.window
+        if last_write is not None:
+            due = max(due, last_write + self.interval)
+        return due
+
+    def _queue(self, key: tuple[str, str], address: str) -> bool:
+        """
+        queue the address of a record
+
+        Args:
+            key: the hostname and record type
+            address: the address
+
+        Returns:
+            whether the address differs from the last known address
+        """
+        with self._lock:
+            pending = self._pending.get(key)
+            applied = self._applied_address(key)
+            current = pending[0] if pending else applied
+            if address == current:
+                return False
+
+            # reverting to the applied address cancels a pending update
+            if address == applied:
+                del self._pending[key]
+                return False
+
+            since = pending[1] if pending else time.monotonic()
+            self._pending[key] = (address, since)
+            return True
+
+    async def _apply(self, ready: list[tuple[tuple[str, str], str]]) -> None:
+        """
+        apply the addresses of records
+
+        Args:
+            ready: the address of each record (by hostname and record type)
+        """
+        verbose('(receiver) applying {} update(s)', len(ready))
+
+        async def apply(hostname: str, rr_type: str,
+                address: str) -> list[UpdateResult]:
+            updater = self.hosts[hostname].updater
+            if rr_type == 'A':
+                return await updater.update_async([hostname], ipv4=address)
+            return await updater.update_async([hostname], ipv6=address)
+
+        all_results = await asyncio.gather(*[
+            apply(hostname, rr_type, address)
+            for (hostname, rr_type), address in ready
+        ])
+
+        for results in all_results:
+            for result in results:
+                self._report(result)
+
+    def _report(self, result: UpdateResult) -> None:
+        """
+        track and report the result of an applied record
+
+        Args:
+            result: the result
+        """
+        key = (result.entry, result.type)
+        prefix = self.hosts[result.entry].prefix
+        RECORDS.inc(type=result.type, action=str(result.action))
+
+        if result.action in (UpdateAction.FAILED, UpdateAction.DEFERRED):
+            if result.action == UpdateAction.FAILED:
+                err(f'{prefix}failed to update the dns record '
+                    f'({result.entry}; {result.type})\n{result.error}')
+            else:
+                log(f'{prefix}record ({result.entry}; {result.type}) '
+                    f'change deferred until stable: {result.value}')
+
+            # retry once the record's interval has elapsed
+            with self._lock:
+                self._applied.discard(result.domain, result.record,
+                    result.type)
+                self._pending.setdefault(key, (result.value, time.monotonic()))
+            return
+
+        with self._lock:
+            self._applied.set(result.domain, result.record, result.type,
+                result.value)
+
+        if result.action == UpdateAction.UNCHANGED:
+            verbose('{}record ({}; {}) is up-to-date: {}',
+                prefix, result.entry, result.type, result.value)
+        else:
+            log(f'{prefix}record ({result.entry}; {result.type}) '
+                f'has been {result.action}: {result.value}')
+
+
+class ReceiverServer:
+    def __init__(self, address: str, port: int,
+            receiver: DyndnsReceiver) -> None:
+        """
+        dyndns2 update endpoint
+
+        Provides an HTTP server accepting dyndns2 updates on `/nic/update`
+        (e.g. ``/nic/update?hostname=<host>&myip=<ip>``), authenticated using
+        basic authentication. If no address is provided by a client, the
+        address of the client is used. Requests are served from a background
+        thread and handed to the provided receiver.
+
+        Args:
+            address: the address to listen on
+            port: the port to listen on
+            receiver: the receiver to submit updates to
+        """
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                url = urlsplit(self.path)
+                if url.path != DYNDNS2_UPDATE_PATH:
+                    self.send_error(404)
+                    return
+
+                user = receiver.authenticate(
+                    self.headers.get('Authorization'))
+                if not user:
+                    self._reply(401, ['badauth'], {
+                        'WWW-Authenticate': 'Basic realm="nfsn-ddns"',
+                    })
+                    return
+
+                query = parse_qs(url.query)
+                hostnames = [
+                    hostname
+                    for value in query.get('hostname', [])
+                    for hostname in value.split(',') if hostname
+                ]
+                addresses = [
+                    address
+                    for key in ('myip', 'myipv6')
+                    for value in query.get(key, [])
+                    for address in value.split(',') if address
+                ]
+                if not addresses:
+                    addresses = [self.client_address[0]]
+
+                self._reply(200, receiver.submit(user, hostnames, addresses))
+
+            def _reply(self, status: int, lines: list[str],
+                    headers: dict[str, str] | None = None) -> None:
+                body = '\n'.join(lines).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/plain')
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+                pass
+
+        self.server = ThreadingHTTPServer((address, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever,
+            name='nfsn-ddns-receiver', daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def start(self) -> None:
+        """
+        start receiving updates
+        """
+        verbose('(receiver) receiving updates on port: {}', self.port)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        stop receiving updates
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def receiver(args: Namespace) -> int:
+    """
+    the nfsn-ddns receiver
+
+    Runs the asynchronous receiver (see `receiver_async`) until interrupted.
+
+    Args:
+        args: arguments provided at runtime
+
+    Returns:
+        the exit code
+    """
+    return asyncio.run(receiver_async(args))
+
+
+async def receiver_async(args: Namespace) -> int:
+    """
+    the nfsn-ddns receiver (asynchronous)
+
+    Serves a dyndns2 update endpoint, where clients (e.g. routers) push
+    their addresses for any configured ddns domain instead of addresses
+    being polled. Clients authenticate using the configured receiver users.
+    Pushed updates are coalesced and applied over a single session (see
+    `DyndnsReceiver`). The hosts of the NFSN API are pre-resolved at startup
+    and resolutions are cached for the lifetime of the receiver (see
+    ``ResolverCache``).
+
+    Args:
+        args: arguments provided at runtime
+
+    Returns:
+        the exit code
+    """
+
+    cfg = Config()
+
+    cfg_file = args.cfg or DEFAULT_CFG_FILE
+    if not cfg.load(cfg_file, expected=args.cfg):
+        return EngineState.BAD_CONFIG
+
+    cfg.accept(args)
+
+    if not cfg.validate():
+        return EngineState.BAD_CONFIG
+
+    users = cfg.receiver_users()
+    if not users:
+        err('(config) missing receiver users value')
+        return EngineState.BAD_CONFIG
+
+    interval = cfg.interval()
+    if interval is None:
+        interval = DEFAULT_RECEIVER_INTERVAL
+    elif interval < MIN_INTERVAL:
+        interval = MIN_INTERVAL
+
+    timeout = cfg.timeout()
+    if timeout is None:
+        timeout = DEFAULT_TIMEOUT
+    else:
+        timeout = min(max(timeout, MIN_TIMEOUT), MAX_TIMEOUT)
+
+    connect_timeout = cfg.connect_timeout()
+    if connect_timeout is not None:
+        connect_timeout = min(max(connect_timeout, MIN_TIMEOUT), MAX_TIMEOUT)
+
+    address = cfg.receiver_address() or DEFAULT_RECEIVER_ADDRESS
+    port = cfg.receiver_port()
+    if port is None:
+        port = DEFAULT_RECEIVER_PORT
+
+    verbose('(config) interval: {}', interval)
+    verbose('(config) receiver-address: {}', address)
+    verbose('(config) receiver-port: {}', port)
+    verbose('(config) receiver-users: {}', sorted(users))
+
+    debouncer = None
+    debounce = cfg.debounce()
+    if debounce:
+        debounce_samples = cfg.debounce_samples()
+        debouncer = Debouncer(debounce, samples=DEFAULT_DEBOUNCE_SAMPLES
+            if debounce_samples is None else debounce_samples)
+
+    resolver = None
+    resolver_ttl = cfg.resolver_ttl()
+    if resolver_ttl is None:
+        resolver_ttl = DEFAULT_RESOLVER_TTL
+    if resolver_ttl > 0:
+        resolver = ResolverCache(ttl=resolver_ttl)
+
+    with new_session(resolver=resolver) as session:
+        hosts = {}
+        api_hosts = []  # type: list[tuple[str, int, int]]
+        for name, profile_cfg in (cfg.profiles() or {'': cfg}).items():
+            profile = resolve_profile(name, profile_cfg)
+            api_host = endpoint_host(profile.api_endpoint)
+            if api_host:
+                api_hosts.append((*api_host, socket.AF_UNSPEC))
+            client = NfsnClient(profile.api_login, profile.api_token,
+                endpoint=profile.api_endpoint, timeout=timeout,
+                connect_timeout=connect_timeout, session=session)
+            host = ReceiverHost(
+                updater=DdnsUpdater(client, debouncer=debouncer),
+                prefix=f'({name}) ' if name else '',
+                ipv4=profile.ipv4,
+                ipv6=profile.ipv6,
+            )
+
+            for entry in profile.domains:
+                hosts[entry.rstrip('.').lower()] = host
+
+        if resolver:
+            await asyncio.to_thread(resolver.prefetch,
+                list(dict.fromkeys(api_hosts)))
+
+        dyndns = DyndnsReceiver(hosts, users, interval=interval)
+
+        try:
+            server = ReceiverServer(address, port, dyndns)
+        except OSError as e:
+            err(f'unable to receive updates on port: {port}\n{e}')
+            return EngineState.BAD_CONFIG
+
+        server.start()
+        try:
+            await dyndns.run()
+        finally:
+            server.stop()
+
+    return EngineState.OK
@@ -0,0 +1,320 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from array import array
+from enum import IntEnum
+from typing import NamedTuple
+from typing import TYPE_CHECKING
+import socket
+import sys
+import time
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+# number of bytes reserved for each packed address
+ADDRESS_SIZE = 16
+
+
+class RecordType(IntEnum):
+    # an ipv4 address record
+    A = 4
+    # an ipv6 address record
+    AAAA = 6
+
+    def __str__(self) -> str:
+        return self.name
+
+
+# record type, address family and address size of each stored type value
+_LAYOUTS = {
+    RecordType.A.value: (RecordType.A, socket.AF_INET, 4),
+    RecordType.AAAA.value: (RecordType.AAAA, socket.AF_INET6, 16),
+}
+
+# record types by (upper-cased) name
+_TYPE_NAMES = {rr_type.name: rr_type for rr_type in RecordType}
+
+
+class RecordState(NamedTuple):
+    # the domain of the zone holding the record
+    zone: str
+    # the name of the record (relative to the domain)
+    name: str
+    # the type of the record
+    type: RecordType
+    # the address of the record
+    address: str
+    # when the record was last checked (epoch seconds)
+    checked: float
+
+
+class RecordTable:
+    def __init__(self) -> None:
+        """
+        compact table of record states
+
+        Tracks the known address of address records for long-lived processes
+        (e.g. a receiver tracking thousands of records). Instead of an object
+        per record, each record occupies a row of array-backed columns: an
+        interned zone and name identifier, a record type, a packed address
+        and the time the record was last checked. Records are looked up by
+        zone, name and type in constant time.
+
+        Zone and name strings are interned once and are kept for the lifetime
+        of the table (a process tracks a bounded set of records).
+        """
+        self._addresses = bytearray()
+        self._checked = array('d')
+        self._ids = {}  # type: dict[str, int]
+        self._index = {}  # type: dict[int, int]
+        self._names = array('I')
+        self._strings = []  # type: list[str]
+        self._types = array('B')
+        self._zones = array('I')
+
+    def __len__(self) -> int:
+        return len(self._types)
+
+    def __iter__(self) -> Iterator[RecordState]:
+        for row in range(len(self)):
+            yield self._state(row)
+
+    def address(self, zone: str, name: str,
+            rr_type: RecordType | str) -> str | None:
+        """
+        get the address of a record
+
+        Avoids building the complete state of a record when only its address
+        is needed.
+
+        Args:
+            zone: the domain of the zone
+            name: the name of the record
+            rr_type: the type of the record
+
+        Returns:
+            the address of the record (if tracked)
+        """
+        key = self._key(zone, name, rr_type)
+        row = self._index.get(key) if key is not None else None
+        if row is None:
+            return None
+
+        _, family, size = _LAYOUTS[self._types[row]]
+        offset = row * ADDRESS_SIZE
+        return socket.inet_ntop(family,
+            bytes(self._addresses[offset:offset + size]))
+
+    def get(self, zone: str, name: str,
+            rr_type: RecordType | str) -> RecordState | None:
+        """
+        get the state of a record
+
+        Args:
+            zone: the domain of the zone
+            name: the name of the record
+            rr_type: the type of the record
+
+        Returns:
+            the state of the record (if tracked)
+        """
+        key = self._key(zone, name, rr_type)
+        row = self._index.get(key) if key is not None else None
+        return self._state(row) if row is not None else None
+
+    def set(self, zone: str, name: str, rr_type: RecordType | str,
+            address: str, checked: float | None = None) -> None:
+        """
+        set the state of a record
+
+        Args:
+            zone: the domain of the zone
+            name: the name of the record
+            rr_type: the type of the record
+            address: the address of the record
+            checked (optional): when the record was checked (default: now)
+
+        Raises:
+            ``ValueError`` is raised if the address is invalid for the type
+        """
+        rr_type = _record_type(rr_type)
+        try:
+            packed = socket.inet_pton(_LAYOUTS[rr_type][1], address)
+        except OSError:
+            msg = f'address does not match record type: {address}'
+            raise ValueError(msg) from None
+
+        packed = packed.ljust(ADDRESS_SIZE, b'\0')
+        checked = time.time() if checked is None else checked
+
+        key = self._intern_key(zone, name, rr_type)
+        row = self._index.get(key)
+        if row is None:
+            self._index[key] = len(self)
+            self._zones.append(self._ids[zone])
+            self._names.append(self._ids[name])
+            self._types.append(rr_type)
+            self._addresses += packed
+            self._checked.append(checked)
+        else:
+            offset = row * ADDRESS_SIZE
+            self._addresses[offset:offset + ADDRESS_SIZE] = packed
+            self._checked[row] = checked
+
+    def discard(self, zone: str, name: str,
+            rr_type: RecordType | str) -> bool:
+        """
+        stop tracking a record
+
+        Args:
+            zone: the domain of the zone
+            name: the name of the record
+            rr_type: the type of the record
+
+        Returns:
+            whether the record was tracked
+        """
+        key = self._key(zone, name, rr_type)
+        row = self._index.pop(key, None) if key is not None else None
+        if row is None:
+            return False
+
+        # move the last row into the removed row's position
+        last = len(self) - 1
+        if row != last:
+            self._zones[row] = self._zones[last]
+            self._names[row] = self._names[last]
+            self._types[row] = self._types[last]
+            self._checked[row] = self._checked[last]
+            offset = row * ADDRESS_SIZE
+            last_offset = last * ADDRESS_SIZE
+            self._addresses[offset:offset + ADDRESS_SIZE] = \
+                self._addresses[last_offset:last_offset + ADDRESS_SIZE]
+            self._index[_pack_key(self._zones[row], self._names[row],
+                self._types[row])] = row
+
+        self._zones.pop()
+        self._names.pop()
+        self._types.pop()
+        self._checked.pop()
+        del self._addresses[last * ADDRESS_SIZE:]
+        return True
+
+    def _key(self, zone: str, name: str,
+            rr_type: RecordType | str) -> int | None:
+        """
+        build the lookup key of a record
+
+        Args:
+            zone: the domain of the zone
+            name: the name of the record
+            rr_type: the type of the record
+
+        Returns:
+            the key; ``None`` if a string is unknown
+        """
+        zone_id = self._ids.get(zone)
+        name_id = self._ids.get(name)
+        if zone_id is None or name_id is None:
+            return None
+
+        return _pack_key(zone_id, name_id, _record_type(rr_type))
+
+    def _intern_key(self, zone: str, name: str,
+            rr_type: RecordType | str) -> int:
+        """
+        build the lookup key of a record (interning any unknown strings)
+
+        Args:
+            zone: the domain of the zone
+            name: the name of the record
+            rr_type: the type of the record
+
+        Returns:
+            the key
+        """
+        zone_id = self._intern(zone)
+        name_id = self._intern(name)
+        return _pack_key(zone_id, name_id, _record_type(rr_type))
+
+    def _intern(self, value: str) -> int:
+        """
+        intern a string
+
+        Args:
+            value: the string
+
+        Returns:
+            the identifier of the string
+        """
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            interned = sys.intern(value)
+            self._strings.append(interned)
+            self._ids[interned] = string_id
+
+        return string_id
+
+    def _state(self, row: int) -> RecordState:
+        """
+        build the state of a row
+
+        Args:
+            row: the row
+
+        Returns:
+            the state
+        """
+        rr_type, family, size = _LAYOUTS[self._types[row]]
+        offset = row * ADDRESS_SIZE
+        packed = bytes(self._addresses[offset:offset + size])
+
+        return RecordState(
+            zone=self._strings[self._zones[row]],
+            name=self._strings[self._names[row]],
+            type=rr_type,
+            address=socket.inet_ntop(family, packed),
+            checked=self._checked[row],
+        )
+
+
+def _pack_key(zone_id: int, name_id: int, rr_type: int) -> int:
+    """
+    pack the identifiers of a record into a single lookup key
+
+    Args:
+        zone_id: the identifier of the zone
+        name_id: the identifier of the name
+        rr_type: the record type
+
+    Returns:
+        the key
+    """
+    return (zone_id << 35) | (name_id << 3) | rr_type
+
+
+def _record_type(rr_type: RecordType | str) -> RecordType:
+    """
+    resolve a record type
+
+    Args:
+        rr_type: the record type (or its name)
+
+    Returns:
+        the record type
+
+    Raises:
+        ``ValueError`` is raised if the type is not an address record type
+    """
+    if isinstance(rr_type, RecordType):
+        return rr_type
+
+    resolved = _TYPE_NAMES.get(rr_type) or _TYPE_NAMES.get(rr_type.upper())
+    if resolved is None:
+        msg = f'unsupported record type: {rr_type}'
+        raise ValueError(msg)
+
+    return resolved
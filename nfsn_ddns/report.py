@@ -0,0 +1,282 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from contextvars import ContextVar
+from datetime import datetime
+from datetime import timezone
+from nfsn_ddns.flight import atomic_write
+from typing import TYPE_CHECKING
+import json
+import sys
+import threading
+import time
+
+if TYPE_CHECKING:
+    from contextvars import Token  # noqa: F401
+    from nfsn_ddns.timing import TimingNode
+    from pathlib import Path
+    from types import TracebackType
+
+# the active run report (if reporting is enabled)
+_ACTIVE_REPORT = ContextVar('nfsn_ddns_run_report', default=None)  # type: ContextVar[RunReport | None]
+
+# version of the report's structure
+REPORT_VERSION = 1
+
+
+class RunReport:
+    def __init__(self) -> None:
+        """
+        a structured report of a run
+
+        Collects the outcome of a run while active: the detected addresses
+        (and the source providing each), every address source attempted, the
+        cache decision of each address family, every NFSN API call (with its
+        latency and status), the records changed, the timings of each phase
+        and the final state. Events are recorded through the ``report_*``
+        calls, which have no effect when no report is active. As with phase
+        timings (see ``phase``), a report is tracked with a context variable,
+        allowing events from concurrent tasks (or from threads dispatched
+        with ``asyncio.to_thread``) to be attributed to the report.
+
+        .. code-block:: python
+
+            with RunReport() as report:
+                ...
+            print(json.dumps(report.render()))
+        """
+        self.addresses = {}  # type: dict[str, dict[str, str]]
+        self.cache = {}  # type: dict[str, str]
+        self.calls = []  # type: list[dict[str, object]]
+        self.elapsed = None  # type: float | None
+        self.records = []  # type: list[dict[str, object]]
+        self.sources = []  # type: list[dict[str, object]]
+        self.started = None  # type: datetime | None
+        self.state = None  # type: str | None
+        self.timings = None  # type: TimingNode | None
+        self._lock = threading.Lock()
+        self._start = 0.0
+        self._token = None  # type: Token[RunReport | None] | None
+
+    def __enter__(self) -> RunReport:  # noqa: PYI034
+        self.start()
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None,
+            exc_value: BaseException | None,
+            traceback: TracebackType | None) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """
+        start collecting events into this report
+        """
+        self.started = datetime.now(tz=timezone.utc)
+        self._start = time.perf_counter()
+        self._token = _ACTIVE_REPORT.set(self)
+
+    def stop(self) -> None:
+        """
+        stop collecting events into this report
+        """
+        self.elapsed = time.perf_counter() - self._start
+
+        if self._token is not None:
+            _ACTIVE_REPORT.reset(self._token)
+            self._token = None
+
+    def add(self, section: str, entry: object, *,
+            key: str | None = None) -> None:
+        """
+        add an event to a section of the report
+
+        Args:
+            section: the section (e.g. ``calls``)
+            entry: the event
+            key (optional): the key of the event (for keyed sections)
+        """
+        with self._lock:
+            if key is None:
+                getattr(self, section).append(entry)
+            else:
+                getattr(self, section)[key] = entry
+
+    def attach_timings(self, timings: TimingNode) -> None:
+        """
+        attach the timed phases of the run
+
+        Args:
+            timings: the root phase of the run (see ``Profiler``)
+        """
+        with self._lock:
+            self.timings = timings
+
+    def complete(self, state: str) -> None:
+        """
+        complete the report with the final state of the run
+
+        Args:
+            state: the final state of the run
+        """
+        with self._lock:
+            self.state = state
+
+    def render(self) -> dict[str, object]:
+        """
+        render the report
+
+        Returns:
+            the report (serializable as json)
+        """
+        with self._lock:
+            return {
+                'version': REPORT_VERSION,
+                'started': self.started.isoformat() if self.started else None,
+                'elapsed': _round(self.elapsed),
+                'state': self.state,
+                'addresses': {
+                    family: dict(entry)
+                    for family, entry in self.addresses.items()
+                },
+                'sources': list(self.sources),
+                'cache': dict(self.cache),
+                'calls': list(self.calls),
+                'records': list(self.records),
+                'phases': self.timings.dump() if self.timings else None,
+            }
+
+    def write(self, path: Path | None = None) -> bool:
+        """
+        write the report as json
+
+        The report is written as a single line to standard output, or
+        (atomically) replaces the contents of a provided file.
+
+        Args:
+            path (optional): the file to write the report to
+
+        Returns:
+            whether the report was written
+        """
+        content = json.dumps(self.render())
+        if path:
+            return atomic_write(path, content + '\n')
+
+        sys.stdout.write(content + '\n')
+        sys.stdout.flush()
+        return True
+
+
+def report_address(family: str, address: str, source: str) -> None:
+    """
+    report the address used by a run for an address family
+
+    Args:
+        family: the address family (or ``prefix`` for a delegated prefix)
+        address: the address
+        source: the source of the address (e.g. an endpoint, ``cmd``,
+                ``cache`` or ``shared``)
+    """
+    report = _ACTIVE_REPORT.get()
+    if report:
+        report.add('addresses', {'address': address, 'source': source},
+            key=family)
+
+
+def report_cache(family: str, decision: str) -> None:
+    """
+    report the cache decision of an address family
+
+    Args:
+        family: the address family
+        decision: the decision (e.g. ``hit``, ``miss`` or ``fingerprint``)
+    """
+    report = _ACTIVE_REPORT.get()
+    if report:
+        report.add('cache', decision, key=family)
+
+
+def report_call(method: str, domain: str, status: str,
+        elapsed: float) -> None:
+    """
+    report an NFSN API call
+
+    Args:
+        method: the api method
+        domain: the domain the call is for
+        status: the http status of the call (or ``error``)
+        elapsed: the duration of the call (in seconds)
+    """
+    report = _ACTIVE_REPORT.get()
+    if report:
+        report.add('calls', {
+            'method': method,
+            'domain': domain,
+            'status': status,
+            'latency': _round(elapsed),
+        })
+
+
+def report_record(entry: str, type_: str, action: str, value: str,
+        previous: str | None = None) -> None:
+    """
+    report a record processed by a run
+
+    Args:
+        entry: the record's entry (e.g. ``ddns.example.com``)
+        type_: the record type
+        action: the action taken on the record
+        value: the desired value of the record
+        previous (optional): the value held before the change (if any)
+    """
+    report = _ACTIVE_REPORT.get()
+    if report:
+        report.add('records', {
+            'entry': entry,
+            'type': type_,
+            'action': action,
+            'value': value,
+            'previous': previous,
+        })
+
+
+def report_source(family: str, source: str, address: str,
+        elapsed: float) -> None:
+    """
+    report an attempt to detect an address from a source
+
+    A successful attempt also reports the detected address (see
+    ``report_address``).
+
+    Args:
+        family: the address family
+        source: the source attempted (an endpoint or ``cmd``)
+        address: the detected address; an empty string on failure
+        elapsed: the duration of the attempt (in seconds)
+    """
+    report = _ACTIVE_REPORT.get()
+    if report:
+        report.add('sources', {
+            'family': family,
+            'source': source,
+            'result': 'ok' if address else 'fail',
+            'latency': _round(elapsed),
+        })
+
+        if address:
+            report.add('addresses', {'address': address, 'source': source},
+                key=family)
+
+
+def _round(value: float | None) -> float | None:
+    """
+    round a duration for a report
+
+    Args:
+        value: the duration (in seconds; if any)
+
+    Returns:
+        the duration rounded to a tenth of a millisecond
+    """
+    return None if value is None else round(value, 4)
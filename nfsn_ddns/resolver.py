@@ -0,0 +1,416 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from nfsn_ddns.defs import DEFAULT_RESOLVER_STALE
+from nfsn_ddns.defs import DEFAULT_RESOLVER_TTL
+from nfsn_ddns.log import verbose
+from nfsn_ddns.log import warn
+from requests.adapters import DEFAULT_POOLSIZE
+from requests.adapters import HTTPAdapter
+from typing import NamedTuple
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+from urllib3 import PoolManager
+from urllib3.connection import HTTPConnection
+from urllib3.connection import HTTPSConnection
+from urllib3.exceptions import ConnectTimeoutError
+from urllib3.exceptions import NameResolutionError
+from urllib3.exceptions import NewConnectionError
+from urllib3.util import connection
+import ipaddress
+import socket
+import sys
+import threading
+import time
+
+if TYPE_CHECKING:
+    from requests import Session
+    from typing import Any
+    from urllib3.connectionpool import HTTPConnectionPool
+
+    # the mixin is checked as the connection classes it is mixed into
+    _ConnectionBase = HTTPConnection
+else:
+    _ConnectionBase = object
+
+# default port of each web scheme
+WEB_PORTS = {
+    'http': 80,
+    'https': 443,
+}
+
+# maximum number of hosts pre-resolved concurrently
+PREFETCH_WORKERS = 4
+
+
+class ResolverEntry(NamedTuple):
+    # the resolved addresses (each an address family and socket address)
+    addresses: tuple[tuple[int, tuple], ...]
+    # when the entry expires (monotonic seconds)
+    expires: float
+
+
+class ResolverCache:
+    def __init__(self, *, ttl: float = DEFAULT_RESOLVER_TTL,
+            stale: float = DEFAULT_RESOLVER_STALE) -> None:
+        """
+        in-process cache of host name resolutions
+
+        Caches the addresses of hosts (e.g. address detection endpoints and
+        the NFSN API) resolved through the system resolver, avoiding a
+        resolver query for every connection made by a long-lived process.
+        The system resolver does not report the time-to-live of the records
+        it resolves, so each resolution is kept for the configured
+        time-to-live. Resolutions of a host are keyed by port and address
+        family, allowing an endpoint to be pinned to a family.
+
+        If the resolver fails to resolve a host with an expired entry, the
+        expired (stale) entry is used for up to the configured stale period;
+        allowing runs to continue through an outage of an upstream resolver.
+
+        Concurrent resolutions of the same host are coalesced into a single
+        resolver query. Resolutions are thread-safe.
+
+        Args:
+            ttl (optional): the seconds a resolution is used for
+            stale (optional): the seconds an expired resolution may be used
+                              for when the resolver fails
+        """
+        self.ttl = ttl
+        self.stale = stale
+        self._entries = {}  # type: dict[tuple[str, int, int], ResolverEntry]
+        self._key_locks = {}  # type: dict[tuple[str, int, int], threading.Lock]
+        self._lock = threading.Lock()
+
+    def get(self, host: str, port: int,
+            family: int = socket.AF_UNSPEC) -> ResolverEntry | None:
+        """
+        get the cached entry of a host (fresh or expired)
+
+        Args:
+            host: the host
+            port: the port
+            family (optional): the address family
+
+        Returns:
+            the entry (if cached)
+        """
+        return self._entries.get((host, port, family))
+
+    def set(self, host: str, port: int, family: int,
+            addresses: tuple[tuple[int, tuple], ...],
+            ttl: float | None = None) -> None:
+        """
+        set the cached addresses of a host
+
+        Args:
+            host: the host
+            port: the port
+            family: the address family
+            addresses: the addresses (each an address family and socket
+                       address)
+            ttl (optional): the seconds the addresses are used for (defaults
+                            to the configured time-to-live)
+        """
+        ttl = self.ttl if ttl is None else ttl
+        self._entries[(host, port, family)] = ResolverEntry(addresses,
+            time.monotonic() + ttl)
+
+    def resolve(self, host: str, port: int,
+            family: int = socket.AF_UNSPEC) -> tuple[tuple[int, tuple], ...]:
+        """
+        resolve the addresses of a host
+
+        Args:
+            host: the host
+            port: the port
+            family (optional): the address family to resolve
+
+        Returns:
+            the addresses (each an address family and socket address)
+
+        Raises:
+            ``OSError`` is raised if the host cannot be resolved (and no
+            stale entry can be used)
+        """
+        key = (host, port, family)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry and now < entry.expires:
+                return entry.addresses
+
+            try:
+                infos = socket.getaddrinfo(host, port, family,
+                    socket.SOCK_STREAM)
+            except OSError as e:
+                if entry and now < entry.expires + self.stale:
+                    warn(f'(resolver) using stale addresses for: {host}\n{e}')
+                    return entry.addresses
+                raise
+
+            addresses = tuple(dict.fromkeys(
+                (info[0], info[4]) for info in infos))
+            if not addresses:
+                msg = f'no addresses resolved for host: {host}'
+                raise socket.gaierror(msg)
+
+            self._entries[key] = ResolverEntry(addresses, now + self.ttl)
+            return addresses
+
+    def prefetch(self, hosts: list[tuple[str, int, int]]) -> None:
+        """
+        pre-resolve the addresses of hosts
+
+        Hosts are resolved concurrently. Hosts with a fresh entry are not
+        resolved again, and hosts failing to resolve are ignored (a failure
+        is reported when a connection to the host is made).
+
+        Args:
+            hosts: the host, port and address family of each host
+        """
+        if not hosts:
+            return
+
+        with ThreadPoolExecutor(max_workers=PREFETCH_WORKERS,
+                thread_name_prefix='nfsn-resolver') as executor:
+            for host, port, family in hosts:
+                executor.submit(self._prefetch, host, port, family)
+
+    def _prefetch(self, host: str, port: int, family: int) -> None:
+        """
+        pre-resolve the addresses of a host
+
+        Args:
+            host: the host
+            port: the port
+            family: the address family to resolve
+        """
+        try:
+            addresses = self.resolve(host, port, family)
+        except OSError as e:
+            verbose('(resolver) unable to pre-resolve host: {}\n{}', host, e)
+            return
+
+        values = ', '.join(str(sockaddr[0]) for _, sockaddr in addresses)
+        verbose('(resolver) {}: {}', host, values)
+
+
+class _ResolvingConnectionMixin(_ConnectionBase):
+    def __init__(self, *args: Any, resolver: ResolverCache,  # noqa: ANN401
+            family: int = socket.AF_UNSPEC,
+            **kwargs: Any) -> None:  # noqa: ANN401
+        super().__init__(*args, **kwargs)
+        self.resolver = resolver
+        self.family = family
+
+    def _new_conn(self) -> socket.socket:
+        """
+        establish a socket connection to a host's cached addresses
+
+        Each resolved address is attempted in order until a connection is
+        established. Failures are raised as the errors urllib3 raises for
+        its own connections.
+
+        Returns:
+            the socket
+        """
+        try:
+            addresses = self.resolver.resolve(self._dns_host, self.port,
+                self.family)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        except OSError as e:
+            msg = f'Failed to establish a new connection: {e}'
+            raise NewConnectionError(self, msg) from e
+
+        errors = []  # type: list[OSError]
+        for _, sockaddr in addresses:
+            sock = self._connect(sockaddr[0], errors)
+            if sock:
+                break
+        else:
+            error = errors[-1]
+            if isinstance(error, TimeoutError):
+                msg = (f'Connection to {self.host} timed out. '
+                    f'(connect timeout={self.timeout})')
+                raise ConnectTimeoutError(self, msg) from error
+
+            msg = f'Failed to establish a new connection: {error}'
+            raise NewConnectionError(self, msg) from error
+
+        sys.audit('http.client.connect', self, self.host, self.port)
+        return sock
+
+    def _connect(self, address: str,
+            errors: list[OSError]) -> socket.socket | None:
+        """
+        attempt a socket connection to an address
+
+        Args:
+            address: the address
+            errors: the list to track a failed attempt's error in
+
+        Returns:
+            the socket; ``None`` on failure
+        """
+        try:
+            return connection.create_connection((address, self.port),
+                self.timeout, source_address=self.source_address,
+                socket_options=self.socket_options)
+        except OSError as e:
+            errors.append(e)
+            return None
+
+
+class _ResolvingHTTPConnection(_ResolvingConnectionMixin, HTTPConnection):
+    pass
+
+
+class _ResolvingHTTPSConnection(_ResolvingConnectionMixin, HTTPSConnection):
+    pass
+
+
+# connection class of each web scheme resolving through a resolver cache
+_CONNECTION_CLASSES = {
+    'http': _ResolvingHTTPConnection,
+    'https': _ResolvingHTTPSConnection,
+}
+
+
+class _ResolvingPoolManager(PoolManager):
+    def __init__(self, *, resolver: ResolverCache, family: int,
+            **kwargs: Any) -> None:  # noqa: ANN401
+        super().__init__(**kwargs)
+        self.resolver = resolver
+        self.family = family
+
+    def _new_pool(self, scheme: str, host: str, port: int,
+            request_context: dict | None = None) -> HTTPConnectionPool:
+        pool = super()._new_pool(scheme, host, port, request_context)
+        pool.ConnectionCls = _CONNECTION_CLASSES[scheme]
+        pool.conn_kw['resolver'] = self.resolver
+        pool.conn_kw['family'] = self.family
+        return pool
+
+
+class ResolvingAdapter(HTTPAdapter):
+    def __init__(self, resolver: ResolverCache, *,
+            family: int = socket.AF_UNSPEC,
+            pool_connections: int = DEFAULT_POOLSIZE,
+            pool_maxsize: int = DEFAULT_POOLSIZE) -> None:
+        """
+        a requests transport adapter resolving through a resolver cache
+
+        Connections made through this adapter resolve hosts using the
+        provided resolver cache (instead of the system resolver for every
+        new connection). If an address family is provided, connections are
+        only made over that family.
+
+        Args:
+            resolver: the resolver cache
+            family (optional): the address family connections are made over
+            pool_connections (optional): the number of pools to cache
+            pool_maxsize (optional): the maximum connections of each pool
+        """
+        self.resolver = resolver
+        self.family = family
+        super().__init__(pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize)
+
+    def init_poolmanager(self, connections: int, maxsize: int,
+            block: bool = False, **pool_kwargs: object) -> None:  # noqa: FBT001,FBT002
+        # save these values for pickling (as done by the ``HTTPAdapter``)
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+
+        self.poolmanager = _ResolvingPoolManager(num_pools=connections,
+            maxsize=maxsize, block=block, resolver=self.resolver,
+            family=self.family, **pool_kwargs)
+
+
+def endpoint_host(endpoint: str) -> tuple[str, int] | None:
+    """
+    extract the host of a web endpoint
+
+    Args:
+        endpoint: the endpoint (e.g. ``https://api.ipify.org``)
+
+    Returns:
+        2-tuple of the host and port; ``None`` if not a web endpoint
+    """
+    try:
+        parsed = urlsplit(endpoint)
+        port = parsed.port
+    except ValueError:
+        return None
+
+    if parsed.scheme not in WEB_PORTS or not parsed.hostname:
+        return None
+
+    return parsed.hostname, port or WEB_PORTS[parsed.scheme]
+
+
+def pin_endpoint(session: Session, endpoint: str, family: int) -> bool:
+    """
+    pin the address family used for requests to an endpoint
+
+    Requests made on the session to the endpoint (and any URL starting with
+    the endpoint) only connect over the provided address family; ensuring,
+    for example, an address detection endpoint serving both families
+    reports the address of the expected family. Pinning only applies to a
+    session resolving through a resolver cache (see ``new_session``) and to
+    endpoints addressed by a host name. An endpoint already pinned keeps its
+    original family.
+
+    Args:
+        session: the session
+        endpoint: the endpoint
+        family: the address family
+
+    Returns:
+        whether requests to the endpoint are pinned to the family
+    """
+    host = endpoint_host(endpoint)
+    if host is None or _is_address(host[0]):
+        return False
+
+    adapter = session.get_adapter(endpoint)
+    if not isinstance(adapter, ResolvingAdapter):
+        return False
+
+    if adapter.family == family:
+        return True
+
+    if endpoint in session.adapters:
+        verbose('(resolver) endpoint already pinned: {}', endpoint)
+        return False
+
+    session.mount(endpoint, ResolvingAdapter(adapter.resolver, family=family,
+        pool_connections=adapter._pool_connections,  # noqa: SLF001
+        pool_maxsize=adapter._pool_maxsize))  # noqa: SLF001
+    return True
+
+
+def _is_address(host: str) -> bool:
+    """
+    returns whether a host is an ip address
+
+    Args:
+        host: the host
+
+    Returns:
+        whether the host is an ip address
+    """
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+
+    return True
@@ -0,0 +1,207 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from datetime import datetime
+from datetime import timedelta
+
+# schedules equivalent to each supported nickname
+CRON_NICKNAMES = {
+    '@annually': '0 0 1 1 *',
+    '@daily': '0 0 * * *',
+    '@hourly': '0 * * * *',
+    '@midnight': '0 0 * * *',
+    '@monthly': '0 0 1 * *',
+    '@weekly': '0 0 * * 0',
+    '@yearly': '0 0 1 1 *',
+}
+
+# names accepted for each month
+CRON_MONTHS = {
+    name: idx for idx, name in enumerate([
+        'jan', 'feb', 'mar', 'apr', 'may', 'jun',
+        'jul', 'aug', 'sep', 'oct', 'nov', 'dec',
+    ], start=1)
+}
+
+# names accepted for each day of the week
+CRON_WEEKDAYS = {
+    name: idx for idx, name in enumerate([
+        'sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat',
+    ])
+}
+
+# maximum number of years searched for the next run of a schedule
+MAX_SEARCH_YEARS = 5
+
+
+class ScheduleError(Exception):
+    pass
+
+
+class CronSchedule:
+    def __init__(self, expression: str) -> None:
+        """
+        a cron schedule
+
+        Provides the run times of a standard (five field) cron expression:
+        minute, hour, day of the month, month and day of the week. Fields
+        support wildcards (``*``), values, ranges (``1-5``), steps (``*/15``
+        or ``0-30/10``) and lists (``0,30``), along with month and weekday
+        names (``jan``, ``mon``). Nicknames (e.g. ``@hourly``) are also
+        supported. As with cron, when both the day of the month and the day
+        of the week are restricted, a day matching either field is a match.
+
+        Times are evaluated in the host's local time.
+
+        Args:
+            expression: the cron expression
+
+        Raises:
+            ``ScheduleError`` is raised if the expression is invalid
+        """
+        self.expression = expression
+
+        fields = CRON_NICKNAMES.get(expression.strip().lower(),
+            expression).split()
+        if len(fields) != 5:
+            msg = f'expected five fields in schedule: {expression}'
+            raise ScheduleError(msg)
+
+        self.minutes = _parse_field(fields[0], 0, 59)
+        self.hours = _parse_field(fields[1], 0, 23)
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12, CRON_MONTHS)
+        # sunday is accepted as either zero or seven
+        self.weekdays = {
+            day % 7 for day in _parse_field(fields[4], 0, 7, CRON_WEEKDAYS)
+        }
+        self.any_day = fields[2].startswith('*')
+        self.any_weekday = fields[4].startswith('*')
+
+    def next_run(self, after: datetime) -> datetime:
+        """
+        returns the next run time of the schedule
+
+        Args:
+            after: the time to find the next run after
+
+        Returns:
+            the next run time (strictly after the provided time)
+
+        Raises:
+            ``ScheduleError`` is raised if the schedule never runs
+        """
+        candidate = after.replace(second=0, microsecond=0) + \
+            timedelta(minutes=1)
+        limit = after.year + MAX_SEARCH_YEARS
+
+        while candidate.year <= limit:
+            if candidate.month not in self.months:
+                month = candidate.month % 12 + 1
+                year = candidate.year + (candidate.month == 12)
+                candidate = candidate.replace(year=year, month=month, day=1,
+                    hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + \
+                    timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+
+        msg = f'schedule never runs: {self.expression}'
+        raise ScheduleError(msg)
+
+    def _day_matches(self, candidate: datetime) -> bool:
+        """
+        returns whether the day of a time matches the schedule
+
+        Args:
+            candidate: the time
+
+        Returns:
+            whether the day matches
+        """
+        day = candidate.day in self.days
+        weekday = (candidate.weekday() + 1) % 7 in self.weekdays
+
+        if self.any_day or self.any_weekday:
+            return day and weekday
+
+        return day or weekday
+
+
+def _parse_field(field: str, low: int, high: int,
+        names: dict[str, int] | None = None) -> set[int]:
+    """
+    parse a field of a cron expression
+
+    Args:
+        field: the field
+        low: the lowest value of the field
+        high: the highest value of the field
+        names (optional): names accepted for values of the field
+
+    Returns:
+        the values of the field
+
+    Raises:
+        ``ScheduleError`` is raised if the field is invalid
+    """
+    values = set()  # type: set[int]
+    for part in field.lower().split(','):
+        base, sep, raw_step = part.partition('/')
+        step = _parse_value(raw_step, 1, high, None) if sep else 1
+
+        if base == '*':
+            start, end = low, high
+        elif '-' in base:
+            raw_start, raw_end = base.split('-', 1)
+            start = _parse_value(raw_start, low, high, names)
+            end = _parse_value(raw_end, low, high, names)
+        else:
+            start = _parse_value(base, low, high, names)
+            end = high if sep else start
+
+        if start > end:
+            msg = f'invalid range in schedule: {part}'
+            raise ScheduleError(msg)
+
+        values.update(range(start, end + 1, step))
+
+    return values
+
+
+def _parse_value(value: str, low: int, high: int,
+        names: dict[str, int] | None) -> int:
+    """
+    parse a value of a cron expression field
+
+    Args:
+        value: the value
+        low: the lowest accepted value
+        high: the highest accepted value
+        names: names accepted for the value (if any)
+
+    Returns:
+        the value
+
+    Raises:
+        ``ScheduleError`` is raised if the value is invalid
+    """
+    if names and value in names:
+        return names[value]
+
+    try:
+        parsed = int(value)
+    except ValueError:
+        parsed = None
+
+    if parsed is None or not low <= parsed <= high:
+        msg = f'invalid value in schedule: {value}'
+        raise ScheduleError(msg)
+
+    return parsed
@@ -0,0 +1,59 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from nfsn_ddns import __version__ as nfsn_ddns_version
+from nfsn_ddns.cassette import CassetteAdapter
+from nfsn_ddns.cassette import active_cassette
+from nfsn_ddns.defs import DEFAULT_CONCURRENCY
+from nfsn_ddns.resolver import ResolvingAdapter
+from requests.adapters import HTTPAdapter
+from typing import TYPE_CHECKING
+import requests
+
+if TYPE_CHECKING:
+    from nfsn_ddns.resolver import ResolverCache
+
+
+def new_session(pool_size: int = DEFAULT_CONCURRENCY,
+        resolver: ResolverCache | None = None) -> requests.Session:
+    """
+    create a new session for web requests
+
+    Creates a Requests session which pools connections for each host, up to
+    the provided size. A session is expected to be shared by all requests
+    made in a run, allowing connections to be reused.
+
+    If a cassette is active (see ``Cassette``), the session's interactions
+    are recorded into (or replayed from) the cassette.
+
+    If a resolver cache is provided, new connections resolve hosts through
+    the cache (see ``ResolverCache``); unless a cassette is active.
+
+    Args:
+        pool_size (optional): the number of connections pooled per host
+        resolver (optional): the resolver cache to resolve hosts with
+
+    Returns:
+        the session
+    """
+    session = requests.Session()
+    session.headers.update({
+        'User-Agent': f'nfsn-ddns/{nfsn_ddns_version}',
+    })
+
+    cassette = active_cassette()
+    if cassette:
+        adapter = CassetteAdapter(cassette,
+            pool_connections=pool_size,
+            pool_maxsize=pool_size)  # type: HTTPAdapter
+    elif resolver:
+        adapter = ResolvingAdapter(resolver,
+            pool_connections=pool_size, pool_maxsize=pool_size)
+    else:
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    return session
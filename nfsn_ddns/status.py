@@ -0,0 +1,342 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from contextlib import suppress
+from nfsn_ddns.config import Config
+from nfsn_ddns.defs import DEFAULT_CFG_FILE
+from nfsn_ddns.engine import EngineState
+from nfsn_ddns.log import err
+from nfsn_ddns.log import log
+from nfsn_ddns.log import verbose
+from typing import TYPE_CHECKING
+import asyncio
+import json
+import sys
+
+if TYPE_CHECKING:
+    from argparse import Namespace
+    from collections.abc import Awaitable
+    from collections.abc import Callable
+    from datetime import datetime
+    from pathlib import Path
+
+# timeout (in seconds) of a refresh request (waiting on a complete run)
+REFRESH_TIMEOUT = 600
+
+# maximum size (in bytes) of a status request
+STATUS_REQUEST_LIMIT = 1024
+
+# timeout (in seconds) of a status request
+STATUS_TIMEOUT = 5
+
+
+class DaemonStatus:
+    def __init__(self) -> None:
+        """
+        status of a running daemon
+
+        Tracks the outcome of the daemon's runs, when the next run is
+        scheduled, when the configuration was last reloaded and the most
+        recently detected addresses.
+        """
+        self.addresses = {}  # type: dict[str, str]
+        self.last_reload = None  # type: datetime | None
+        self.last_run = None  # type: datetime | None
+        self.last_state = None  # type: int | None
+        self.last_success = None  # type: datetime | None
+        self.next_run = None  # type: datetime | None
+        self.running = False
+
+    def healthy(self) -> bool:
+        """
+        returns whether the daemon is healthy
+
+        A daemon is healthy until a run fails (and until a run succeeds
+        again).
+
+        Returns:
+            whether the daemon is healthy
+        """
+        return self.last_state in (None, EngineState.OK)
+
+    def record(self, state: int, now: datetime) -> None:
+        """
+        record the outcome of a run
+
+        Args:
+            state: the state of the run
+            now: the time the run completed
+        """
+        self.last_run = now
+        self.last_state = state
+        if state == EngineState.OK:
+            self.last_success = now
+
+    def render(self) -> dict[str, object]:
+        """
+        render the status
+
+        Returns:
+            the status (serializable as json)
+        """
+        last_state = None
+        if self.last_state is not None:
+            last_state = EngineState(self.last_state).name.lower()
+
+        return {
+            'healthy': self.healthy(),
+            'running': self.running,
+            'last-reload': _isoformat(self.last_reload),
+            'last-run': _isoformat(self.last_run),
+            'last-state': last_state,
+            'last-success': _isoformat(self.last_success),
+            'next-run': _isoformat(self.next_run),
+            'addresses': dict(self.addresses),
+        }
+
+
+class StatusServer:
+    def __init__(self, path: Path,
+            handler: Callable[[str], Awaitable[dict[str, object]]]) -> None:
+        """
+        status socket of a running daemon
+
+        Serves requests on a Unix socket. A client sends a single command
+        line (an empty line requests the status) and receives a single line
+        holding the json response of the command. Commands are processed by
+        the provided handler.
+
+        Args:
+            path: the path of the socket
+            handler: the handler of each command
+        """
+        self.path = path
+        self.handler = handler
+        self.server = None  # type: asyncio.AbstractServer | None
+
+    async def start(self) -> None:
+        """
+        start serving the socket
+
+        Any stale socket left by a previous instance is replaced.
+
+        Raises:
+            ``OSError`` is raised if the socket cannot be served
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.is_socket():
+            self.path.unlink()
+
+        self.server = await asyncio.start_unix_server(self._handle,
+            path=str(self.path), limit=STATUS_REQUEST_LIMIT)
+        verbose('(status) serving status on socket: {}', self.path)
+
+    async def stop(self) -> None:
+        """
+        stop serving the socket
+        """
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+        with suppress(OSError):
+            self.path.unlink()
+
+    async def _handle(self, reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter) -> None:
+        """
+        handle a connection to the socket
+
+        Args:
+            reader: the reader of the connection
+            writer: the writer of the connection
+        """
+        try:
+            raw_command = await asyncio.wait_for(reader.readline(),
+                STATUS_TIMEOUT)
+            command = raw_command.decode('utf-8').strip() or 'status'
+            response = await self.handler(command)
+            writer.write(json.dumps(response).encode('utf-8') + b'\n')
+            await writer.drain()
+        except (OSError, UnicodeError, ValueError, asyncio.TimeoutError) as e:
+            verbose('(status) failed to handle request: {}',
+                e or type(e).__name__)
+        finally:
+            writer.close()
+            with suppress(OSError):
+                await writer.wait_closed()
+
+
+def refresh(args: Namespace) -> int:
+    """
+    request an immediate run of a running daemon
+
+    Issues a ``refresh`` command to the status socket of a running daemon
+    (see ``daemon``), waiting on the outcome of the triggered run.
+
+    Args:
+        args: arguments provided at runtime
+
+    Returns:
+        the exit code (the exit code of the daemon's run)
+    """
+
+    response = _command(args, 'refresh', timeout=REFRESH_TIMEOUT)
+    if response is None:
+        return 1
+
+    log(json.dumps(response, indent=2))
+
+    raw_state = response.get('state')
+    if not isinstance(raw_state, str) or \
+            raw_state.upper() not in EngineState.__members__:
+        err(f'daemon run unavailable: {response.get("error")}')
+        return 1
+
+    return EngineState[raw_state.upper()]
+
+
+def reload(args: Namespace) -> int:
+    """
+    request a running daemon to reload its configuration
+
+    Issues a ``reload`` command to the status socket of a running daemon
+    (see ``daemon``).
+
+    Args:
+        args: arguments provided at runtime
+
+    Returns:
+        the exit code (non-zero if the configuration was not reloaded)
+    """
+
+    response = _command(args, 'reload')
+    if response is None:
+        return 1
+
+    if not response.get('reloaded'):
+        err(f'daemon failed to reload: {response.get("error")}')
+        return EngineState.BAD_CONFIG
+
+    log('daemon configuration reloaded')
+    return 0
+
+
+def status(args: Namespace) -> int:
+    """
+    report the status of a running daemon
+
+    Queries the status socket of a running daemon (see ``daemon``) and
+    reports its status, allowing the health of a daemon to be checked (e.g.
+    by a container's health check).
+
+    Args:
+        args: arguments provided at runtime
+
+    Returns:
+        the exit code (non-zero if the daemon is unavailable or unhealthy)
+    """
+
+    response = _command(args, 'status')
+    if response is None:
+        return 1
+
+    log(json.dumps(response, indent=2))
+    return 0 if response.get('healthy') else 1
+
+
+async def request_async(path: Path, command: str, *,
+        timeout: float = STATUS_TIMEOUT) -> dict[str, object]:
+    """
+    issue a command to the status socket of a running daemon
+
+    Args:
+        path: the path of the socket
+        command: the command
+        timeout (optional): timeout for the request
+
+    Returns:
+        the response
+
+    Raises:
+        ``OSError`` is raised if the socket cannot be reached
+        ``TimeoutError`` is raised if no response is received in time
+        ``ValueError`` is raised if the response is invalid
+    """
+    if sys.platform == 'win32':
+        msg = 'status sockets are not supported on windows'
+        raise OSError(msg)
+
+    async def exchange() -> bytes:
+        reader, writer = await asyncio.open_unix_connection(str(path))
+        try:
+            writer.write(command.encode('utf-8') + b'\n')
+            await writer.drain()
+            return await reader.readline()
+        finally:
+            writer.close()
+            with suppress(OSError):
+                await writer.wait_closed()
+
+    try:
+        raw_response = await asyncio.wait_for(exchange(), timeout)
+    except asyncio.TimeoutError as e:
+        raise TimeoutError from e
+
+    response = json.loads(raw_response)
+    if not isinstance(response, dict):
+        msg = 'unexpected status response'
+        raise ValueError(msg)  # noqa: TRY004
+
+    return response
+
+
+def _command(args: Namespace, command: str, *,
+        timeout: float = STATUS_TIMEOUT) -> dict[str, object] | None:
+    """
+    issue a command to the configured status socket of a running daemon
+
+    Args:
+        args: arguments provided at runtime
+        command: the command
+        timeout (optional): timeout for the request
+
+    Returns:
+        the response; ``None`` if the daemon could not be reached
+    """
+
+    cfg = Config()
+
+    cfg_file = args.cfg or DEFAULT_CFG_FILE
+    if not cfg.load(cfg_file, expected=args.cfg):
+        return None
+
+    cfg.accept(args)
+
+    status_socket = cfg.status_socket()
+    if not status_socket:
+        err('no status socket configured')
+        return None
+
+    try:
+        return asyncio.run(request_async(status_socket, command,
+            timeout=timeout))
+    except (OSError, ValueError, TimeoutError) as e:
+        err(f'unable to reach daemon: {status_socket}\n'
+            f'{e or type(e).__name__}')
+        return None
+
+
+def _isoformat(value: datetime | None) -> str | None:
+    """
+    format an optional timestamp
+
+    Args:
+        value: the timestamp (if any)
+
+    Returns:
+        the iso 8601 formatted timestamp; ``None`` if no timestamp
+    """
+    return value.isoformat(timespec='seconds') if value else None
@@ -0,0 +1,361 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from nfsn_ddns.client import NfsnClient
+from nfsn_ddns.config import Config
+from nfsn_ddns.defs import API_DNS_ENDPOINT
+from nfsn_ddns.defs import DEFAULT_CFG_FILE
+from nfsn_ddns.defs import DEFAULT_STREAM_WINDOW
+from nfsn_ddns.defs import DEFAULT_TIMEOUT
+from nfsn_ddns.defs import MAX_STREAM_PENDING
+from nfsn_ddns.defs import MAX_STREAM_QUEUE
+from nfsn_ddns.defs import MAX_TIMEOUT
+from nfsn_ddns.defs import MIN_TIMEOUT
+from nfsn_ddns.engine import EngineState
+from nfsn_ddns.log import err
+from nfsn_ddns.log import log
+from nfsn_ddns.log import verbose
+from nfsn_ddns.log import warn
+from nfsn_ddns.session import new_session
+from nfsn_ddns.sync import RecordSet
+from nfsn_ddns.sync import ZoneSyncer
+from nfsn_ddns.utils import percentile
+from nfsn_ddns.utils import split_ddns_entry
+from typing import TYPE_CHECKING
+import asyncio
+import ipaddress
+import json
+import sys
+import threading
+import time
+
+if TYPE_CHECKING:
+    from argparse import Namespace
+    from typing import TextIO
+
+
+class StreamStats:
+    def __init__(self) -> None:
+        """
+        statistics of a stream
+
+        Tracks the number of processed inputs, the outcome of each applied
+        update and the latency of each zone synchronization.
+        """
+        self.lines = 0
+        self.rejected = 0
+        self.superseded = 0
+        self.updates = 0
+        self.changed = 0
+        self.failed = 0
+        self.zone_latencies = []  # type: list[float]
+
+    def report(self, elapsed: float) -> list[str]:
+        """
+        build a report of these statistics
+
+        Args:
+            elapsed: the duration of the stream (in seconds)
+
+        Returns:
+            the lines of the report
+        """
+        rate = self.updates / elapsed if elapsed > 0 else 0
+        lines = [
+            f'inputs: {self.lines} (rejected: {self.rejected}; '
+                f'superseded: {self.superseded})',
+            f'updates: {self.updates} (changed: {self.changed}; '
+                f'failed: {self.failed})',
+            f'elapsed: {elapsed:.3f}s ({rate:.1f} updates/s)',
+        ]
+
+        if self.zone_latencies:
+            latencies = sorted(self.zone_latencies)
+            p50 = percentile(latencies, 0.50) * 1000
+            p95 = percentile(latencies, 0.95) * 1000
+            p_max = latencies[-1] * 1000
+            lines.append(f'zone latency: p50 {p50:.1f}ms; p95 {p95:.1f}ms; '
+                f'max {p_max:.1f}ms ({len(latencies)} zone syncs)')
+
+        return lines
+
+
+def stream(args: Namespace) -> int:
+    """
+    the nfsn-ddns stream processor
+
+    Runs the asynchronous stream processor (see `stream_async`) until the
+    input has been consumed.
+
+    Args:
+        args: arguments provided at runtime
+
+    Returns:
+        the exit code
+    """
+    return asyncio.run(stream_async(args))
+
+
+async def stream_async(args: Namespace) -> int:
+    """
+    the nfsn-ddns stream processor (asynchronous)
+
+    Reads record addresses from an input (standard input by default), where
+    each line provides a ddns entry and an address (``<entry> <address>``)
+    or a JSON object (``{"record": "<entry>", "ip": "<address>"}``).
+    Addresses are validated and the record type (`A`/`AAAA`) is determined
+    from the address.
+
+    Updates are coalesced over a short window, where only the latest address
+    of a record is kept. Each window is applied as a batch of zone
+    synchronizations, where each zone is queried once and only records with
+    a stale address are written. A window is applied early once it holds
+    many records, and reading the input is paused while lines are queued
+    faster than they can be processed. All requests share a single pooled
+    session. Statistics are reported once the input has been consumed.
+
+    Streamed records are applied with the top-level api credentials;
+    configurations with profiles are not supported.
+
+    Args:
+        args: arguments provided at runtime
+
+    Returns:
+        the exit code
+    """
+
+    cfg = Config()
+
+    cfg_file = args.cfg or DEFAULT_CFG_FILE
+    if not cfg.load(cfg_file, expected=args.cfg):
+        return EngineState.BAD_CONFIG
+
+    cfg.accept(args)
+
+    if cfg.profiles():
+        err('(config) profiles are not supported when streaming')
+        return EngineState.BAD_CONFIG
+
+    api_login = cfg.api_login()
+    api_token = cfg.api_token()
+    if not api_login or not api_token:
+        err('(config) missing api credentials')
+        return EngineState.BAD_CONFIG
+
+    timeout = cfg.timeout()
+    if timeout is None:
+        timeout = DEFAULT_TIMEOUT
+    else:
+        timeout = min(max(timeout, MIN_TIMEOUT), MAX_TIMEOUT)
+
+    connect_timeout = cfg.connect_timeout()
+    if connect_timeout is not None:
+        connect_timeout = min(max(connect_timeout, MIN_TIMEOUT), MAX_TIMEOUT)
+
+    input_path = getattr(args, 'input', None)
+    if input_path and str(input_path) != '-':
+        try:
+            source = input_path.open(encoding='utf-8')
+        except OSError as e:
+            err(f'unable to open input: {input_path}\n{e}')
+            return EngineState.BAD_CONFIG
+    else:
+        source = sys.stdin
+
+    stats = StreamStats()
+    state = EngineState.OK
+    start = time.monotonic()
+
+    try:
+        with new_session() as session:
+            client = NfsnClient(api_login, api_token,
+                endpoint=cfg.nfsn_api_endpoint() or API_DNS_ENDPOINT,
+                timeout=timeout, connect_timeout=connect_timeout,
+                session=session)
+            syncer = ZoneSyncer(client)
+            state = await _process(source, syncer, stats)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    for line in stats.report(time.monotonic() - start):
+        log(f'(stream) {line}')
+
+    return state
+
+
+async def _process(source: TextIO, syncer: ZoneSyncer,
+        stats: StreamStats) -> EngineState:
+    """
+    process the lines of an input
+
+    Args:
+        source: the input
+        syncer: the syncer to apply updates with
+        stats: the statistics to populate
+
+    Returns:
+        the state of the stream
+    """
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(MAX_STREAM_QUEUE)  # type: asyncio.Queue[str | None]
+
+    # read the input on a dedicated thread, handing lines to the event loop
+    # (blocking the thread while the queue is full)
+    def reader() -> None:
+        def put(line: str | None) -> None:
+            asyncio.run_coroutine_threadsafe(queue.put(line), loop).result()
+
+        try:
+            for line in source:
+                put(line)
+        finally:
+            put(None)
+
+    threading.Thread(target=reader, name='nfsn-ddns-stream',
+        daemon=True).start()
+
+    state = EngineState.OK
+    pending = {}  # type: dict[tuple[str, str], str]
+    deadline = None
+
+    while True:
+        wait = None if deadline is None else max(0, deadline - loop.time())
+        try:
+            line = await asyncio.wait_for(queue.get(), wait)
+        except asyncio.TimeoutError:
+            # coalescing window has elapsed
+            pass
+        else:
+            if line is None:
+                break
+
+            stats.lines += 1
+            try:
+                entry, address, rr_type = parse_line(line)
+            except ValueError as e:
+                stats.rejected += 1
+                warn(f'(stream) ignoring input (line: {stats.lines}): {e}')
+            else:
+                if entry:
+                    if (entry, rr_type) in pending:
+                        stats.superseded += 1
+                    pending[(entry, rr_type)] = address
+
+                    if deadline is None:
+                        deadline = loop.time() + DEFAULT_STREAM_WINDOW
+
+        if pending and deadline is not None \
+                and (loop.time() >= deadline
+                    or len(pending) >= MAX_STREAM_PENDING):
+            batch_state = await _apply(syncer, pending, stats)
+            state = state if state != EngineState.OK else batch_state
+            pending = {}
+            deadline = None
+
+    if pending:
+        batch_state = await _apply(syncer, pending, stats)
+        state = state if state != EngineState.OK else batch_state
+
+    return state
+
+
+async def _apply(syncer: ZoneSyncer, pending: dict[tuple[str, str], str],
+        stats: StreamStats) -> EngineState:
+    """
+    apply a batch of coalesced updates
+
+    Args:
+        syncer: the syncer to apply updates with
+        pending: the latest address of each record (by entry and type)
+        stats: the statistics to populate
+
+    Returns:
+        the state of the batch
+    """
+
+    zones = {}  # type: dict[str, list[RecordSet]]
+    for (entry, rr_type), address in pending.items():
+        record, domain = split_ddns_entry(entry)
+        zones.setdefault(domain, []).append(
+            RecordSet(record, rr_type, frozenset({address})))
+
+    verbose('(stream) applying {} updates over {} zones',
+        len(pending), len(zones))
+
+    results = await syncer.sync_async(zones)
+
+    state = EngineState.OK
+    stats.updates += len(pending)
+    for result in results:
+        stats.zone_latencies.append(result.elapsed)
+        stats.changed += len(result.applied)
+        for change in result.applied:
+            verbose('(stream) record ({}.{}; {}) has been updated: {}',
+                change.name, result.domain, change.type, change.data)
+
+        if result.error:
+            failed = len(result.changes) - len(result.applied) \
+                if result.changes else len(zones[result.domain])
+            stats.failed += failed
+            err(f'(stream) failed to update zone ({result.domain})\n'
+                f'{result.error}')
+
+            if state == EngineState.OK:
+                if result.status == 401:
+                    state = EngineState.NFSN_API_FAILURE_AUTH
+                else:
+                    state = EngineState.NFSN_API_FAILURE
+
+    return state
+
+
+def parse_line(line: str) -> tuple[str, str, str]:
+    """
+    parse a line of a stream
+
+    Accepts either ``<entry> <address>`` or a JSON object providing a
+    ``record`` and an ``ip`` (or ``address``). Blank lines and comments
+    (``#``) provide an empty entry.
+
+    Args:
+        line: the line
+
+    Returns:
+        3-tuple of the entry, the (normalized) address and the record type
+
+    Raises:
+        ``ValueError`` is raised if the line is invalid
+    """
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return '', '', ''
+
+    if line.startswith('{'):
+        data = json.loads(line)
+        if not isinstance(data, dict):
+            msg = 'not an object'
+            raise ValueError(msg)
+
+        entry = data.get('record')
+        value = data.get('ip', data.get('address'))
+        if not isinstance(entry, str) or not isinstance(value, str):
+            msg = 'missing record or ip'
+            raise ValueError(msg)
+    else:
+        parts = line.split()
+        if len(parts) != 2:
+            msg = 'expected "<record> <ip>"'
+            raise ValueError(msg)
+        entry, value = parts
+
+    entry = entry.strip().rstrip('.').lower()
+    if '.' not in entry:
+        msg = f'invalid record: {entry}'
+        raise ValueError(msg)
+
+    address = ipaddress.ip_address(value.strip())
+    rr_type = 'AAAA' if address.version == 6 else 'A'
+    return entry, str(address), rr_type
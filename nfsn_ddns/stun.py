@@ -0,0 +1,173 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from nfsn_ddns.dns import udp_exchange
+import asyncio
+import ipaddress
+import os
+import socket
+import struct
+
+# standard stun port
+STUN_PORT = 3478
+
+# stun binding request message type
+STUN_BINDING_REQUEST = 0x0001
+
+# stun binding (success) response message type
+STUN_BINDING_RESPONSE = 0x0101
+
+# stun magic cookie (rfc 5389)
+STUN_MAGIC_COOKIE = 0x2112A442
+
+# stun mapped-address attribute
+STUN_ATTR_MAPPED_ADDRESS = 0x0001
+
+# stun xor-mapped-address attribute
+STUN_ATTR_XOR_MAPPED_ADDRESS = 0x0020
+
+
+class StunError(Exception):
+    pass
+
+
+def build_binding_request() -> tuple[bytes, bytes]:
+    """
+    build a stun binding request
+
+    Returns:
+        a 2-tuple (transaction identifier, message)
+    """
+    txid = os.urandom(12)
+    header = struct.pack('!HHI', STUN_BINDING_REQUEST, 0, STUN_MAGIC_COOKIE)
+    return txid, header + txid
+
+
+def parse_binding_response(data: bytes, txid: bytes) -> str:
+    """
+    parse a stun binding response for the reflexive address
+
+    Extracts the address reported by a STUN server, preferring an
+    XOR-MAPPED-ADDRESS attribute over a (legacy) MAPPED-ADDRESS attribute.
+
+    Args:
+        data: the raw message
+        txid: the transaction identifier of the request
+
+    Returns:
+        the reflexive ip address
+
+    Raises:
+        ``StunError`` is raised if the message is not a valid response
+    """
+    try:
+        mtype, length, cookie = struct.unpack_from('!HHI', data)
+    except struct.error as e:
+        msg = 'malformed stun response'
+        raise StunError(msg) from e
+
+    if mtype != STUN_BINDING_RESPONSE or cookie != STUN_MAGIC_COOKIE:
+        msg = 'unexpected stun response'
+        raise StunError(msg)
+
+    if data[8:20] != txid:
+        msg = 'stun transaction mismatch'
+        raise StunError(msg)
+
+    mapped = None
+    offset = 20
+    end = min(len(data), 20 + length)
+    while offset + 4 <= end:
+        attr_type, attr_len = struct.unpack_from('!HH', data, offset)
+        value = data[offset + 4:offset + 4 + attr_len]
+        offset += 4 + attr_len + (-attr_len % 4)
+
+        if attr_type == STUN_ATTR_XOR_MAPPED_ADDRESS:
+            return _decode_address(value, txid, xor=True)
+
+        if attr_type == STUN_ATTR_MAPPED_ADDRESS:
+            mapped = _decode_address(value, txid, xor=False)
+
+    if mapped:
+        return mapped
+
+    msg = 'stun response missing a mapped address'
+    raise StunError(msg)
+
+
+async def query_async(host: str, port: int = STUN_PORT, *,
+        family: int = socket.AF_UNSPEC, timeout: float = 3) -> str:
+    """
+    query a stun server for the reflexive address of this instance
+
+    Args:
+        host: the stun server
+        port (optional): the port of the stun server
+        family (optional): the address family used to reach the server
+        timeout (optional): timeout for the query
+
+    Returns:
+        the reflexive ip address
+
+    Raises:
+        ``StunError`` is raised if the query fails
+        ``TimeoutError`` is raised if no response is received in time
+    """
+    loop = asyncio.get_running_loop()
+
+    try:
+        addrinfo = await loop.getaddrinfo(host, port,
+            family=family, type=socket.SOCK_DGRAM)
+    except OSError as e:
+        msg = f'unable to resolve stun server: {host}'
+        raise StunError(msg) from e
+
+    if not addrinfo:
+        msg = f'unable to resolve stun server: {host}'
+        raise StunError(msg)
+
+    addr_family, _, _, _, sockaddr = addrinfo[0]
+    txid, message = build_binding_request()
+    response = await udp_exchange(sockaddr, addr_family, message,
+        lambda data: data[8:20] == txid, timeout=timeout)
+    return parse_binding_response(response, txid)
+
+
+def _decode_address(value: bytes, txid: bytes, *, xor: bool) -> str:
+    """
+    decode a stun address attribute
+
+    Args:
+        value: the attribute value
+        txid: the transaction identifier of the request
+        xor: whether the address is xor-obfuscated
+
+    Returns:
+        the ip address
+
+    Raises:
+        ``StunError`` is raised if the attribute is malformed
+    """
+    try:
+        _, family = struct.unpack_from('!BB', value)
+    except struct.error as e:
+        msg = 'malformed stun address'
+        raise StunError(msg) from e
+
+    raw = value[4:]
+    cls: type[ipaddress.IPv4Address | ipaddress.IPv6Address]
+    if family == 0x01 and len(raw) == 4:
+        mask = struct.pack('!I', STUN_MAGIC_COOKIE)
+        cls = ipaddress.IPv4Address
+    elif family == 0x02 and len(raw) == 16:
+        mask = struct.pack('!I', STUN_MAGIC_COOKIE) + txid
+        cls = ipaddress.IPv6Address
+    else:
+        msg = 'unsupported stun address family'
+        raise StunError(msg)
+
+    if xor:
+        raw = bytes(a ^ b for a, b in zip(raw, mask, strict=True))
+
+    return str(cls(raw))
@@ -0,0 +1,281 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from enum import Enum
+from nfsn_ddns.defs import DEFAULT_CONCURRENCY
+from nfsn_ddns.log import verbose
+from requests.exceptions import HTTPError
+from requests.exceptions import RequestException
+from typing import NamedTuple
+from typing import TYPE_CHECKING
+import asyncio
+import time
+
+if TYPE_CHECKING:
+    from nfsn_ddns.client import NfsnClient
+    from nfsn_ddns.client import ResourceRecord
+
+
+class RecordSet(NamedTuple):
+    # the name of the records (relative to the domain; empty for the apex)
+    name: str
+    # the type of the records (e.g. `A`)
+    type: str
+    # the desired values (an empty set removes all records)
+    data: frozenset[str]
+    # the desired time-to-live (if any; otherwise left unmanaged)
+    ttl: int | None = None
+
+
+class ChangeAction(Enum):
+    # add a record
+    ADD = 'add'
+    # replace all records of a name/type with a single record
+    REPLACE = 'replace'
+    # remove a record
+    REMOVE = 'remove'
+
+    def __str__(self) -> str:
+        return self.value
+
+
+class ZoneChange(NamedTuple):
+    # the action to perform
+    action: ChangeAction
+    # the name of the record
+    name: str
+    # the type of the record
+    type: str
+    # the data of the record
+    data: str
+    # the time-to-live of the record (if any)
+    ttl: int | None = None
+
+
+class ZoneResult(NamedTuple):
+    # the domain of the zone
+    domain: str
+    # the planned changes
+    changes: list[ZoneChange]
+    # the changes applied (in order of completion)
+    applied: list[ZoneChange]
+    # the http status of a failed call (if any)
+    status: int | None = None
+    # a description of the failure (if any)
+    error: str | None = None
+    # the time taken to synchronize the zone (in seconds)
+    elapsed: float = 0.0
+
+
+class ZoneSyncer:
+    def __init__(self, client: NfsnClient, *,
+            concurrency: int = DEFAULT_CONCURRENCY) -> None:
+        """
+        declarative zone synchronizer
+
+        Synchronizes the records of zones to a desired state, using a provided
+        NFSN client. For each zone, existing records are queried once and
+        compared against the desired record sets, where only the calls needed
+        to reach the desired state are made. Zones and the changes of
+        different record sets are applied concurrently (up to the provided
+        number of calls in flight), while the changes of a single record set
+        are applied in order.
+
+        Only records with a name/type of a desired record set are managed;
+        any other record of a zone is left untouched.
+
+        Args:
+            client: the client used to interact with nfsn
+            concurrency (optional): number of calls made concurrently
+        """
+        self.client = client
+        self.concurrency = concurrency
+
+    def sync(self, zones: dict[str, list[RecordSet]]) -> list[ZoneResult]:
+        """
+        synchronize zones to the provided record sets
+
+        See `sync_async` for more details.
+
+        Args:
+            zones: the desired record sets (by domain)
+
+        Returns:
+            the results (one per zone)
+        """
+        return asyncio.run(self.sync_async(zones))
+
+    async def sync_async(self,
+            zones: dict[str, list[RecordSet]]) -> list[ZoneResult]:
+        """
+        synchronize zones to the provided record sets (asynchronous)
+
+        Results are returned in the order of the provided zones.
+
+        Args:
+            zones: the desired record sets (by domain)
+
+        Returns:
+            the results (one per zone)
+        """
+        limiter = asyncio.Semaphore(self.concurrency)
+
+        return list(await asyncio.gather(*[
+            self._process(domain, record_sets, limiter)
+            for domain, record_sets in zones.items()
+        ]))
+
+    async def _process(self, domain: str, record_sets: list[RecordSet],
+            limiter: asyncio.Semaphore) -> ZoneResult:
+        """
+        synchronize a single zone
+
+        Args:
+            domain: the domain of the zone
+            record_sets: the desired record sets
+            limiter: the limiter of concurrent calls
+
+        Returns:
+            the result of the zone
+        """
+        start = time.monotonic()
+
+        def failure(e: RequestException, changes: list[ZoneChange],
+                applied: list[ZoneChange]) -> ZoneResult:
+            status = None
+            if isinstance(e, HTTPError) and e.response is not None:
+                status = e.response.status_code
+
+            return ZoneResult(domain, changes, applied, status, str(e),
+                time.monotonic() - start)
+
+        try:
+            async with limiter:
+                verbose('synchronizing zone: {}', domain)
+                current = await asyncio.to_thread(self.client.list_rrs,
+                    domain)
+        except RequestException as e:
+            return failure(e, [], [])
+
+        changes = plan_changes(record_sets, current)
+        verbose('zone ({}) requires {} change(s)', domain, len(changes))
+
+        # changes of different record sets are independent of each other
+        groups = {}  # type: dict[tuple[str, str], list[ZoneChange]]
+        for change in changes:
+            groups.setdefault((change.name, change.type), []).append(change)
+
+        applied = []
+        errors = []
+
+        async def apply(group: list[ZoneChange]) -> None:
+            for change in group:
+                try:
+                    async with limiter:
+                        await self._apply(domain, change)
+                except RequestException as e:
+                    errors.append(e)
+                    return
+
+                applied.append(change)
+
+        await asyncio.gather(*[apply(group) for group in groups.values()])
+
+        if errors:
+            return failure(errors[0], changes, applied)
+
+        return ZoneResult(domain, changes, applied,
+            elapsed=time.monotonic() - start)
+
+    async def _apply(self, domain: str, change: ZoneChange) -> None:
+        """
+        apply a single change
+
+        Args:
+            domain: the domain of the zone
+            change: the change
+        """
+        match change.action:
+            case ChangeAction.ADD:
+                await asyncio.to_thread(self.client.add_rr, domain,
+                    change.name, change.type, change.data, change.ttl)
+            case ChangeAction.REPLACE:
+                await asyncio.to_thread(self.client.replace_rr, domain,
+                    change.name, change.type, change.data, change.ttl)
+            case ChangeAction.REMOVE:
+                await asyncio.to_thread(self.client.remove_rr, domain,
+                    change.name, change.type, change.data)
+
+
+def plan_changes(record_sets: list[RecordSet],
+        current: list[ResourceRecord]) -> list[ZoneChange]:
+    """
+    plan the changes needed to reach desired record sets
+
+    For each desired record set, the existing records of the same name/type
+    are compared against the desired values. An existing record matches a
+    desired value if the data is the same and, if a time-to-live is desired,
+    the time-to-live is the same.
+
+    The plan uses the fewest calls possible for each record set: either
+    adding each missing value and removing each unwanted record, or
+    replacing all records with a single value (and adding any remaining
+    values), whichever requires fewer calls. Removals are ordered after any
+    additions.
+
+    Args:
+        record_sets: the desired record sets
+        current: the existing records of the zone
+
+    Returns:
+        the changes
+    """
+    existing = {}  # type: dict[tuple[str, str], list[ResourceRecord]]
+    for rr in current:
+        existing.setdefault((rr.name, rr.type.upper()), []).append(rr)
+
+    changes = []
+    for record_set in record_sets:
+        rr_type = record_set.type.upper()
+        records = existing.get((record_set.name, rr_type), [])
+
+        def matches(rr: ResourceRecord, rs: RecordSet = record_set) -> bool:
+            return rr.data in rs.data and (rs.ttl is None or rr.ttl == rs.ttl)
+
+        kept = {rr.data for rr in records if matches(rr)}
+        missing = sorted(record_set.data - kept)
+        unwanted = [rr for rr in records if not matches(rr)]
+
+        if not missing and not unwanted:
+            continue
+
+        # a replace drops all existing records for a single value; which is
+        # also required when a value is only changing its time-to-live (since
+        # removing the stale record would also remove the new record)
+        values = sorted(record_set.data)
+        diff_cost = len(missing) + len(unwanted)
+        ttl_change = any(rr.data in record_set.data for rr in unwanted)
+        if values and (ttl_change or len(values) < diff_cost):
+            first, *others = values
+            changes.append(ZoneChange(ChangeAction.REPLACE, record_set.name,
+                rr_type, first, record_set.ttl))
+            changes.extend(
+                ZoneChange(ChangeAction.ADD, record_set.name, rr_type, value,
+                    record_set.ttl)
+                for value in others
+            )
+            continue
+
+        changes.extend(
+            ZoneChange(ChangeAction.ADD, record_set.name, rr_type, value,
+                record_set.ttl)
+            for value in missing
+        )
+        changes.extend(
+            ZoneChange(ChangeAction.REMOVE, record_set.name, rr_type, rr.data,
+                rr.ttl)
+            for rr in unwanted
+        )
+
+    return changes
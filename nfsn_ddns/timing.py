@@ -0,0 +1,225 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from contextlib import contextmanager
+from contextvars import ContextVar
+from nfsn_ddns.log import err
+from typing import TYPE_CHECKING
+import cProfile
+import threading
+import time
+import tracemalloc
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from contextvars import Token  # noqa: F401
+    from pathlib import Path
+    from types import TracebackType
+
+# the active timing node (if timing is enabled)
+_ACTIVE_NODE = ContextVar('nfsn_ddns_timing_node', default=None)  # type: ContextVar[TimingNode | None]
+
+
+class TimingNode:
+    def __init__(self, name: str) -> None:
+        """
+        a timed phase
+
+        Tracks the duration of a phase along with any phases started while
+        this phase was active.
+
+        Args:
+            name: the name of the phase
+        """
+        self.name = name
+        self.children = []  # type: list[TimingNode]
+        self.elapsed = None  # type: float | None
+        self._lock = threading.Lock()
+
+    def add(self, name: str) -> TimingNode:
+        """
+        add a child phase
+
+        Args:
+            name: the name of the phase
+
+        Returns:
+            the child node
+        """
+        node = TimingNode(name)
+        with self._lock:
+            self.children.append(node)
+        return node
+
+    def dump(self) -> dict[str, object]:
+        """
+        dump this phase (and its children)
+
+        Returns:
+            the phase (serializable as json)
+        """
+        return {
+            'name': self.name,
+            'elapsed': None if self.elapsed is None else round(self.elapsed, 4),
+            'children': [child.dump() for child in self.children],
+        }
+
+    def render(self, indent: int = 0) -> list[str]:
+        """
+        render this phase (and its children) as a tree
+
+        Args:
+            indent (optional): the depth of this node
+
+        Returns:
+            the lines of the tree
+        """
+        if self.elapsed is None:
+            duration = '(incomplete)'
+        else:
+            duration = f'{self.elapsed * 1000:9.1f} ms'
+
+        lines = [f'{duration}  {"  " * indent}{self.name}']
+        for child in self.children:
+            lines.extend(child.render(indent + 1))
+        return lines
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    time a phase
+
+    Records the duration of the provided block as a child of the currently
+    active phase. When timing is not enabled (see ``Profiler``), this has no
+    effect beyond a context variable lookup.
+
+    Phases are tracked using context variables, allowing phases started from
+    concurrent tasks (or from threads dispatched with ``asyncio.to_thread``)
+    to be attributed to the phase which started them.
+
+    .. code-block:: python
+
+        with phase('fetch-ipv4'):
+            ...
+
+    Args:
+        name: the name of the phase
+    """
+    parent = _ACTIVE_NODE.get()
+    if parent is None:
+        yield
+        return
+
+    node = parent.add(name)
+    token = _ACTIVE_NODE.set(node)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        node.elapsed = time.perf_counter() - start
+        _ACTIVE_NODE.reset(token)
+
+
+class Profiler:
+    def __init__(self, name: str, *, stats_file: Path | None = None,
+            memory_file: Path | None = None) -> None:
+        """
+        profile a run
+
+        Enables the timing of phases (see ``phase``) while active. Optionally,
+        a cProfile capture and/or a tracemalloc snapshot can be written to
+        files when the profiler is stopped.
+
+        Note that cProfile only captures activity of the thread which started
+        the profiler (i.e. the event loop).
+
+        .. code-block:: python
+
+            with Profiler('run') as profiler:
+                ...
+            print(profiler.render())
+
+        Args:
+            name: the name of the root phase
+            stats_file (optional): file to write cProfile statistics to
+            memory_file (optional): file to write a tracemalloc snapshot to
+        """
+        self.root = TimingNode(name)
+        self.stats_file = stats_file
+        self.memory_file = memory_file
+        self._cprofile = None  # type: cProfile.Profile | None
+        self._start = 0.0
+        self._token = None  # type: Token[TimingNode | None] | None
+        self._tracing = False
+
+    def __enter__(self) -> Profiler:  # noqa: PYI034
+        self.start()
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None,
+            exc_value: BaseException | None,
+            traceback: TracebackType | None) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """
+        start profiling
+        """
+        if self.memory_file and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+
+        if self.stats_file:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+        self._token = _ACTIVE_NODE.set(self.root)
+        self._start = time.perf_counter()
+
+    def stop(self) -> None:
+        """
+        stop profiling
+
+        Completes the root phase and writes any requested capture files. A
+        capture file which cannot be written is reported and cleared (from
+        `stats_file` or `memory_file`).
+        """
+        self.root.elapsed = time.perf_counter() - self._start
+
+        if self._token is not None:
+            _ACTIVE_NODE.reset(self._token)
+            self._token = None
+
+        if self._cprofile:
+            self._cprofile.disable()
+            if self.stats_file:
+                try:
+                    self._cprofile.dump_stats(self.stats_file)
+                except OSError as e:
+                    err(f'(profile) unable to write cprofile statistics: '
+                        f'{self.stats_file}\n{e}')
+                    self.stats_file = None
+            self._cprofile = None
+
+        if self.memory_file and tracemalloc.is_tracing():
+            try:
+                tracemalloc.take_snapshot().dump(str(self.memory_file))
+            except OSError as e:
+                err(f'(profile) unable to write tracemalloc snapshot: '
+                    f'{self.memory_file}\n{e}')
+                self.memory_file = None
+
+            if self._tracing:
+                tracemalloc.stop()
+                self._tracing = False
+
+    def render(self) -> str:
+        """
+        render the timing tree
+
+        Returns:
+            the timing tree
+        """
+        return '\n'.join(self.root.render())
@@ -0,0 +1,290 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from enum import Enum
+from nfsn_ddns.defs import DEFAULT_CONCURRENCY
+from nfsn_ddns.log import verbose
+from nfsn_ddns.utils import split_ddns_entry
+from requests.exceptions import HTTPError
+from requests.exceptions import RequestException
+from typing import NamedTuple
+from typing import TYPE_CHECKING
+import asyncio
+
+if TYPE_CHECKING:
+    from nfsn_ddns.client import NfsnClient
+    from nfsn_ddns.debounce import Debouncer
+    from nfsn_ddns.flight import SingleFlight
+    from nfsn_ddns.verify import RecordVerifier
+
+
+class UpdateAction(Enum):
+    # the record already holds the desired address
+    UNCHANGED = 'unchanged'
+    # the record has been updated to the desired address
+    UPDATED = 'updated'
+    # the record did not exist and has been created
+    CREATED = 'created'
+    # the record could not be checked or updated
+    FAILED = 'failed'
+    # the change of the record is pending until the address is stable
+    DEFERRED = 'deferred'
+
+    def __str__(self) -> str:
+        return self.value
+
+
+class UpdateResult(NamedTuple):
+    # the ddns entry (e.g. `ddns.example.com`)
+    entry: str
+    # the domain of the entry (e.g. `example.com`)
+    domain: str
+    # the record name of the entry (e.g. `ddns`)
+    record: str
+    # the record type (e.g. `A`)
+    type: str
+    # the desired address
+    value: str
+    # the address the record held before the update (if any)
+    previous: str | None
+    # the action taken on the record
+    action: UpdateAction
+    # the http status of a failed call (if any)
+    status: int | None = None
+    # a description of the failure (if any)
+    error: str | None = None
+
+
+class DdnsUpdater:
+    def __init__(self, client: NfsnClient, *,
+            concurrency: int = DEFAULT_CONCURRENCY,
+            debouncer: Debouncer | None = None,
+            flight: SingleFlight | None = None,
+            verifier: RecordVerifier | None = None) -> None:
+        """
+        ddns record updater
+
+        Updates the `A`/`AAAA` records of ddns entries to provided addresses,
+        using a provided NFSN client. For each entry, existing records are
+        queried and compared against the desired addresses. Records holding
+        a stale address are replaced and missing records are created. Entries
+        are processed concurrently (up to the provided concurrency).
+
+        When a debouncer is provided, the replacement of a stale address is
+        deferred until the debouncer confirms the new address is stable.
+        Missing records are always created immediately.
+
+        When a single-flight coordinator is provided, an entry is only
+        processed by one instance on a host at a time, where other instances
+        reuse a fresh result (if the entry already holds the desired
+        addresses) instead of querying NFSN again.
+
+        When a record verifier is provided, the records of an entry are first
+        verified through the zone's authoritative nameservers. Only if the
+        records cannot be verified to hold the desired addresses are the
+        records queried through the NFSN API.
+
+        Args:
+            client: the client used to interact with nfsn
+            concurrency (optional): number of entries processed concurrently
+            debouncer (optional): the debouncer to confirm changes with
+            flight (optional): the coordinator to share results with
+            verifier (optional): the verifier to check records with
+        """
+        self.client = client
+        self.concurrency = concurrency
+        self.debouncer = debouncer
+        self.flight = flight
+        self.verifier = verifier
+
+    def update(self, entries: list[str], *, ipv4: str | None = None,
+            ipv6: str | None = None) -> list[UpdateResult]:
+        """
+        update ddns entries to the provided addresses
+
+        See `update_async` for more details.
+
+        Args:
+            entries: the ddns entries to update
+            ipv4 (optional): the address for `A` records
+            ipv6 (optional): the address for `AAAA` records
+
+        Returns:
+            the results (one per entry and record type)
+        """
+        return asyncio.run(self.update_async(entries, ipv4=ipv4, ipv6=ipv6))
+
+    async def update_async(self, entries: list[str], *,
+            ipv4: str | None = None,
+            ipv6: str | None = None) -> list[UpdateResult]:
+        """
+        update ddns entries to the provided addresses (asynchronous)
+
+        Only record types with a provided address are processed. Results are
+        returned in the order of the provided entries.
+
+        Args:
+            entries: the ddns entries to update
+            ipv4 (optional): the address for `A` records
+            ipv6 (optional): the address for `AAAA` records
+
+        Returns:
+            the results (one per entry and record type)
+        """
+        desired = {}
+        if ipv4:
+            desired['A'] = ipv4
+        if ipv6:
+            desired['AAAA'] = ipv6
+
+        if not desired:
+            return []
+
+        limiter = asyncio.Semaphore(self.concurrency)
+
+        async def process(entry: str) -> list[UpdateResult]:
+            async with limiter:
+                return await self._process(entry, desired)
+
+        entry_results = await asyncio.gather(*[
+            process(entry) for entry in entries
+        ])
+
+        return [result for results in entry_results for result in results]
+
+    async def _process(self, entry: str,
+            desired: dict[str, str]) -> list[UpdateResult]:
+        """
+        process a single ddns entry (coordinated with other instances)
+
+        Args:
+            entry: the ddns entry
+            desired: the desired addresses (by record type)
+
+        Returns:
+            the results of the entry
+        """
+        if not self.flight:
+            return await self._update(entry, desired)
+
+        async with self.flight.hold(f'record-{entry}') as shared:
+            if shared.data and all(shared.data.get(rr_type) == value
+                    for rr_type, value in desired.items()):
+                record, domain = split_ddns_entry(entry)
+                verbose('ddns entry recently verified by another instance: {}',
+                    entry)
+                return [
+                    UpdateResult(
+                        entry=entry,
+                        domain=domain,
+                        record=record,
+                        type=rr_type,
+                        value=value,
+                        previous=value,
+                        action=UpdateAction.UNCHANGED,
+                    )
+                    for rr_type, value in desired.items()
+                ]
+
+            results = await self._update(entry, desired)
+            shared.publish({
+                result.type: result.value
+                for result in results
+                if result.action in (UpdateAction.UNCHANGED,
+                    UpdateAction.UPDATED, UpdateAction.CREATED)
+            })
+
+        return results
+
+    async def _update(self, entry: str,
+            desired: dict[str, str]) -> list[UpdateResult]:
+        """
+        update a single ddns entry
+
+        Args:
+            entry: the ddns entry
+            desired: the desired addresses (by record type)
+
+        Returns:
+            the results of the entry
+        """
+        record, domain = split_ddns_entry(entry)
+        verbose('processing ddns entry: {}', entry)
+
+        def result(rr_type: str, previous: str | None, action: UpdateAction,
+                e: RequestException | None = None) -> UpdateResult:
+            status = None
+            if isinstance(e, HTTPError) and e.response is not None:
+                status = e.response.status_code
+
+            return UpdateResult(
+                entry=entry,
+                domain=domain,
+                record=record,
+                type=rr_type,
+                value=desired[rr_type],
+                previous=previous,
+                action=action,
+                status=status,
+                error=str(e) if e else None,
+            )
+
+        # if the zone's nameservers already answer with the desired
+        # addresses, no query of the api is needed
+        if self.verifier and await self.verifier.verify_async(entry, desired):
+            verbose('ddns entry verified by nameservers: {}', entry)
+            if self.debouncer:
+                for rr_type in desired:
+                    self.debouncer.reset(entry, rr_type)
+
+            return [
+                result(rr_type, value, UpdateAction.UNCHANGED)
+                for rr_type, value in desired.items()
+            ]
+
+        # query the dns record for the existing ip address (if any)
+        try:
+            records = await asyncio.to_thread(self.client.list_rrs, domain,
+                name=record)
+        except RequestException as e:
+            return [
+                result(rr_type, None, UpdateAction.FAILED, e)
+                for rr_type in desired
+            ]
+
+        # process each response record into a dictionary that we can use
+        # for comparisons
+        reported_rrs = {rr.type: rr.data for rr in records}
+
+        results = []
+        for rr_type, new_value in desired.items():
+            persisted_ip = reported_rrs.get(rr_type)
+
+            try:
+                if persisted_ip == new_value:
+                    verbose('ddns record ({}) matches external address',
+                        rr_type)
+                    if self.debouncer:
+                        self.debouncer.reset(entry, rr_type)
+                    action = UpdateAction.UNCHANGED
+                elif persisted_ip and self.debouncer and \
+                        not self.debouncer.confirm(entry, rr_type, new_value):
+                    action = UpdateAction.DEFERRED
+                elif persisted_ip:
+                    verbose('ip do not match for record: {}', entry)
+                    await asyncio.to_thread(self.client.replace_rr, domain,
+                        record, rr_type, new_value)
+                    action = UpdateAction.UPDATED
+                else:
+                    verbose('no record found ({}; {})', entry, rr_type)
+                    await asyncio.to_thread(self.client.add_rr, domain,
+                        record, rr_type, new_value)
+                    action = UpdateAction.CREATED
+            except RequestException as e:
+                results.append(result(rr_type, persisted_ip,
+                    UpdateAction.FAILED, e))
+            else:
+                results.append(result(rr_type, persisted_ip, action))
+
+        return results
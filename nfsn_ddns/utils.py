@@ -3,6 +3,8 @@
 
 from calendar import timegm
 from time import gmtime
+from urllib.parse import urlparse
+import math
 import random
 import string
 
@@ -43,6 +45,66 @@ def generate_nfsn_api_timestamp() -> str:
     return str(timegm(gmtime()))
 
 
+def percentile(values: list[float], ratio: float) -> float:
+    """
+    find the percentile of sorted values (nearest rank)
+
+    Args:
+        values: the sorted values
+        ratio: the percentile (as a ratio)
+
+    Returns:
+        the value
+    """
+    idx = min(len(values) - 1, max(0, math.ceil(ratio * len(values)) - 1))
+    return values[idx]
+
+
+def split_ddns_entry(entry: str) -> tuple[str, str]:
+    """
+    split a ddns entry into its record and domain
+
+    A ddns entry (e.g. ``ddns.example.com``) is a record name followed by
+    the domain hosted on NFSN (e.g. ``ddns`` and ``example.com``). An entry
+    for the domain itself provides an empty record name.
+
+    Args:
+        entry: the ddns entry
+
+    Returns:
+        a 2-tuple (record, domain)
+    """
+    resource, _, tld = entry.rpartition('.')
+    record, _, domain = resource.rpartition('.')
+    return record, f'{domain}.{tld}'
+
+
+def split_socket_endpoint(endpoint: str) -> tuple[str, int | None] | None:
+    """
+    split a socket endpoint into its host and port
+
+    A socket endpoint (e.g. ``stun://stun.example.com:3478``) provides a
+    host and an optional port.
+
+    Args:
+        endpoint: the endpoint
+
+    Returns:
+        a 2-tuple (host, port); ``None`` if the endpoint has no host or an
+        invalid port
+    """
+    parsed = urlparse(endpoint)
+    try:
+        port = parsed.port
+    except ValueError:
+        return None
+
+    if not parsed.hostname:
+        return None
+
+    return parsed.hostname, port
+
+
 def str2bool(value: str) -> bool:
     """
     returns the boolean value for a string
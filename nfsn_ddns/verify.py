@@ -0,0 +1,420 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from nfsn_ddns import dns
+from nfsn_ddns.log import verbose
+from typing import NamedTuple
+from typing import TYPE_CHECKING
+import asyncio
+import ipaddress
+import random
+import socket
+import time
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from nfsn_ddns.deadline import Deadline
+
+# initial interval (in seconds) between polls of propagating records
+PROPAGATION_INTERVAL = 0.25
+
+# maximum interval (in seconds) between polls of propagating records
+PROPAGATION_MAX_INTERVAL = 8
+
+# maximum number of records (on a nameserver) polled over a single socket
+PROPAGATION_MAX_QUERIES = 4096
+
+# timeout (in seconds) of a query to a nameserver
+VERIFY_TIMEOUT = 2
+
+# query type of each verifiable record type
+_QTYPES = {
+    'A': dns.QTYPE_A,
+    'AAAA': dns.QTYPE_AAAA,
+}
+
+
+class Nameserver(NamedTuple):
+    # the host or address of the nameserver
+    host: str
+    # the port of the nameserver
+    port: int = dns.DNS_PORT
+
+
+class PropagationRecord(NamedTuple):
+    # the fully qualified name of the record (e.g. `ddns.example.com`)
+    name: str
+    # the record type (e.g. `A`)
+    type: str
+    # the desired addresses (an empty set for a removed record)
+    addresses: frozenset[str]
+
+
+class PropagationResult(NamedTuple):
+    # the record
+    record: PropagationRecord
+    # the seconds taken until every nameserver served the desired addresses
+    # (``None`` if the record did not propagate in time)
+    elapsed: float | None
+
+
+class PropagationChecker:
+    def __init__(self, nameservers: list[Nameserver], *, timeout: float,
+            interval: float = PROPAGATION_INTERVAL,
+            max_interval: float = PROPAGATION_MAX_INTERVAL,
+            deadline: Deadline | None = None) -> None:
+        """
+        checker of the propagation of updated records
+
+        Polls the authoritative nameservers of the zones until updated
+        records are served with their desired addresses, measuring the time
+        taken for each record to propagate to every nameserver.
+
+        All records are polled on all nameservers concurrently over a single
+        UDP socket (one per address family in use), where every poll sends a
+        batch of queries for the records still pending on each nameserver.
+        Each record is queried on a nameserver with the same query
+        identifier on every poll, allowing a late reply to an earlier poll
+        to be accepted. Many records are spread over additional sockets,
+        bounding the number of identifiers in use on a socket. Polls are
+        spaced exponentially (starting at the initial interval and doubling
+        up to the maximum interval). Polling stops when every record has
+        propagated or when the timeout (or deadline) is reached.
+
+        Args:
+            nameservers: the authoritative nameservers of the zones
+            timeout: the overall time (in seconds) to wait for records
+            interval (optional): the initial interval between polls
+            max_interval (optional): the maximum interval between polls
+            deadline (optional): the deadline bounding the polling
+
+        Raises:
+            ``ValueError`` is raised if the timeout or an interval is not
+            positive
+        """
+        if timeout <= 0 or interval <= 0 or max_interval < interval:
+            msg = 'invalid propagation timeout or intervals'
+            raise ValueError(msg)
+
+        self.nameservers = nameservers
+        self.timeout = timeout
+        self.interval = interval
+        self.max_interval = max_interval
+        self.deadline = deadline
+
+    async def check_async(self,
+            records: list[PropagationRecord]) -> list[PropagationResult]:
+        """
+        wait for records to propagate (asynchronous)
+
+        Args:
+            records: the records to wait on
+
+        Returns:
+            the result of each record (in order of the provided records)
+        """
+        if not records or not self.nameservers:
+            return [PropagationResult(record, None) for record in records]
+
+        start = time.monotonic()
+        timeout = self.timeout
+        if self.deadline:
+            timeout = self.deadline.limit(timeout)
+        end = start + timeout
+
+        targets = await asyncio.gather(*[
+            self._resolve(nameserver) for nameserver in self.nameservers])
+        resolved = [target for target in targets if target]
+
+        # each (resolved) nameserver must confirm each record
+        pending = sorted(
+            (record_idx, ns_idx)
+            for record_idx, record in enumerate(records)
+            for ns_idx in range(len(resolved))
+            if record.type in _QTYPES
+        )
+
+        confirmed = {}  # type: dict[tuple[int, int], float]
+        await asyncio.gather(*[
+            self._poll(records, resolved,
+                pending[idx:idx + PROPAGATION_MAX_QUERIES], confirmed,
+                start=start, end=end)
+            for idx in range(0, len(pending), PROPAGATION_MAX_QUERIES)
+        ])
+
+        # a record has only propagated once every nameserver (including any
+        # which could not be resolved) has confirmed it
+        results = []
+        for record_idx, record in enumerate(records):
+            keys = [(record_idx, ns_idx) for ns_idx in range(len(resolved))]
+            elapsed = None
+            if record.type in _QTYPES and len(resolved) == len(targets) \
+                    and all(key in confirmed for key in keys):
+                elapsed = max(confirmed[key] for key in keys)
+            results.append(PropagationResult(record, elapsed))
+
+        return results
+
+    async def _poll(self, records: list[PropagationRecord],
+            targets: list[tuple[int, tuple]],
+            keys: list[tuple[int, int]],
+            confirmed: dict[tuple[int, int], float], *, start: float,
+            end: float) -> None:
+        """
+        poll nameservers until records have propagated
+
+        Records are polled over dedicated sockets, where each record is
+        queried on a nameserver with a fixed (unique) query identifier.
+
+        Args:
+            records: the records
+            targets: the resolved address of each nameserver
+            keys: the record and nameserver (indexes) of each record to poll
+            confirmed: the dictionary to populate with the time taken by
+                       each confirmed record
+            start: when the check started (monotonic seconds)
+            end: when polling stops (monotonic seconds)
+        """
+        loop = asyncio.get_running_loop()
+        pending = set(keys)
+        queries = dict(zip(random.sample(range(1 << 16), len(keys)), keys,
+            strict=True))
+        done = loop.create_future()
+
+        def received(data: bytes, addr: tuple) -> None:
+            try:
+                rsp = dns.parse_response(data)
+            except dns.DnsError:
+                return
+
+            key = queries.get(rsp.id)
+            if key not in pending:
+                return
+
+            record = records[key[0]]
+            target = targets[key[1]]
+            if addr[:2] != target[1][:2] or not rsp.authoritative or \
+                    rsp.rcode not in (dns.RCODE_NOERROR, dns.RCODE_NXDOMAIN):
+                return
+
+            qtype = _QTYPES[record.type]
+            addresses = {
+                answer.value for answer in rsp.answers
+                if answer.type == qtype and answer.value
+            }
+            if addresses != record.addresses:
+                return
+
+            pending.discard(key)
+            confirmed[key] = time.monotonic() - start
+            if not pending and not done.done():
+                done.set_result(None)
+
+        transports = {}  # type: dict[int, asyncio.DatagramTransport]
+        try:
+            for family in {targets[ns_idx][0] for _, ns_idx in keys}:
+                transports[family], _ = await loop.create_datagram_endpoint(
+                    lambda: _PropagationProtocol(received), family=family)
+
+            interval = self.interval
+            while pending:
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                # send a batch of queries for every pending record
+                for qid, (record_idx, ns_idx) in queries.items():
+                    if (record_idx, ns_idx) not in pending:
+                        continue
+
+                    record = records[record_idx]
+                    family, sockaddr = targets[ns_idx]
+                    _, message = dns.build_query(record.name,
+                        _QTYPES[record.type], qid=qid, recursion=False)
+                    transports[family].sendto(message, sockaddr)
+
+                await asyncio.wait([done], timeout=min(interval, remaining))
+                interval = min(interval * 2, self.max_interval)
+        finally:
+            for transport in transports.values():
+                transport.close()
+
+    async def _resolve(self, nameserver: Nameserver) -> tuple[int, tuple] | None:
+        """
+        resolve the socket address of a nameserver
+
+        Args:
+            nameserver: the nameserver
+
+        Returns:
+            the address family and socket address; ``None`` if unresolved
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            addrinfo = await loop.getaddrinfo(nameserver.host, nameserver.port,
+                type=socket.SOCK_DGRAM)
+        except OSError as e:
+            verbose('(propagation) unable to resolve nameserver ({}): {}',
+                nameserver.host, e)
+            return None
+
+        if not addrinfo:
+            return None
+
+        family, _, _, _, sockaddr = addrinfo[0]
+        return family, sockaddr
+
+
+class _PropagationProtocol(asyncio.DatagramProtocol):
+    def __init__(self, received: Callable[[bytes, tuple], None]) -> None:
+        self.received = received
+
+    def datagram_received(self, data: bytes, addr: tuple) -> None:
+        self.received(data, addr)
+
+    def error_received(self, exc: Exception) -> None:
+        verbose('(propagation) nameserver query failed: {}', exc)
+
+
+class RecordVerifier:
+    def __init__(self, nameservers: list[Nameserver], *,
+            timeout: float = VERIFY_TIMEOUT,
+            deadline: Deadline | None = None) -> None:
+        """
+        verifier of records through authoritative nameservers
+
+        Verifies whether the address records of a ddns entry hold desired
+        addresses by querying the zone's authoritative nameservers directly
+        (over UDP), instead of listing the records through the NFSN API.
+        Every record type of an entry is queried on every nameserver
+        concurrently.
+
+        A record is only verified when every nameserver authoritatively
+        answers with exactly the desired address. Any other outcome (an
+        unavailable nameserver, a non-authoritative answer, nameservers
+        disagreeing or a different address) leaves the record unverified,
+        where the caller is expected to fall back to the NFSN API.
+
+        Args:
+            nameservers: the authoritative nameservers of the zones
+            timeout (optional): timeout of a query to a nameserver
+            deadline (optional): the deadline bounding any queries made
+        """
+        self.nameservers = nameservers
+        self.timeout = timeout
+        self.deadline = deadline
+
+    async def verify_async(self, entry: str, desired: dict[str, str]) -> bool:
+        """
+        verify the address records of a ddns entry (asynchronous)
+
+        Args:
+            entry: the ddns entry
+            desired: the desired addresses (by record type)
+
+        Returns:
+            whether every record holds its desired address
+        """
+        if not self.nameservers or not desired or \
+                any(rr_type not in _QTYPES for rr_type in desired):
+            return False
+
+        checks = [
+            (rr_type, self._query(nameserver, entry, rr_type))
+            for rr_type in desired
+            for nameserver in self.nameservers
+        ]
+        answers = await asyncio.gather(*[query for _, query in checks])
+
+        for (rr_type, _), addresses in zip(checks, answers, strict=True):
+            if addresses != {desired[rr_type]}:
+                verbose('(verify) unable to verify record ({}; {}): {}',
+                    entry, rr_type, sorted(addresses or []))
+                return False
+
+        return True
+
+    async def _query(self, nameserver: Nameserver, entry: str,
+            rr_type: str) -> set[str] | None:
+        """
+        query a nameserver for the addresses of a record
+
+        Args:
+            nameserver: the nameserver
+            entry: the ddns entry
+            rr_type: the record type
+
+        Returns:
+            the addresses; ``None`` if no authoritative answer was received
+        """
+        timeout = self.timeout
+        if self.deadline:
+            if self.deadline.expired():
+                return None
+            timeout = self.deadline.limit(timeout)
+
+        qtype = _QTYPES[rr_type]
+        try:
+            rsp = await dns.query_async(nameserver.host, entry, qtype,
+                port=nameserver.port, timeout=timeout, recursion=False)
+        except (OSError, TimeoutError, dns.DnsError) as e:
+            verbose('(verify) nameserver query failed ({}): {}',
+                nameserver.host, e or type(e).__name__)
+            return None
+
+        if not rsp.authoritative or rsp.rcode not in \
+                (dns.RCODE_NOERROR, dns.RCODE_NXDOMAIN):
+            return None
+
+        return {
+            answer.value for answer in rsp.answers
+            if answer.type == qtype and answer.value
+        }
+
+
+def parse_nameserver(value: str) -> Nameserver | None:
+    """
+    parse a configured nameserver
+
+    Args:
+        value: the nameserver (a host or address, with an optional port;
+               e.g. ``ns.example.net:53`` or ``[2001:db8::53]:53``)
+
+    Returns:
+        the nameserver; ``None`` if the value is invalid
+    """
+    value = value.strip()
+    host = value
+    port = None
+
+    if value.startswith('['):
+        host, sep, remaining = value[1:].partition(']')
+        if not sep or (remaining and not remaining.startswith(':')):
+            return None
+        port = remaining[1:] or None
+    elif value.count(':') == 1:
+        host, port = value.split(':')
+
+    if not host:
+        return None
+
+    # a bare ipv6 address without a port
+    if ':' in host:
+        try:
+            ipaddress.IPv6Address(host)
+        except ValueError:
+            return None
+
+    if port is None:
+        return Nameserver(host)
+
+    try:
+        port_value = int(port)
+    except ValueError:
+        return None
+
+    if not 0 < port_value < 65536:
+        return None
+
+    return Nameserver(host, port_value)
@@ -0,0 +1,144 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from contextlib import suppress
+from nfsn_ddns.log import verbose
+from typing import TYPE_CHECKING
+import asyncio
+import ctypes
+import os
+import struct
+import sys
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+# inotify events signaling a file has been written, moved into place or
+# created (editors and tools often replace a file instead of writing to it)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+
+# inotify instance flags (non-blocking, close-on-exec)
+IN_NONBLOCK = 0o0004000
+IN_CLOEXEC = 0o2000000
+
+# size (in bytes) of a read of inotify events
+WATCH_READ_SIZE = 65536
+
+# delay (in seconds) to coalesce changes of a watched file
+WATCH_DELAY = 0.5
+
+# header of an inotify event (watch descriptor, mask, cookie, name length)
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class FileWatcher:
+    def __init__(self, path: Path, callback: Callable[[], object], *,
+            delay: float = WATCH_DELAY) -> None:
+        """
+        watcher of changes to a file
+
+        Watches the directory of a file (using inotify) and invokes the
+        provided callback on the event loop when the file is written,
+        replaced or created. Watching the directory allows files replaced by
+        editors (or moved into place) to be tracked. Changes within the
+        provided delay are coalesced into a single callback. Watching files
+        is only supported on Linux.
+
+        Args:
+            path: the file to watch
+            callback: the callback to invoke when the file changes
+            delay (optional): the delay to coalesce changes over
+        """
+        self.path = path
+        self.callback = callback
+        self.delay = delay
+        self._fd = None  # type: int | None
+        self._handle = None  # type: asyncio.TimerHandle | None
+        self._loop = None  # type: asyncio.AbstractEventLoop | None
+
+    def start(self) -> bool:
+        """
+        start watching the file
+
+        Returns:
+            whether the file is watched
+        """
+        if not sys.platform.startswith('linux'):
+            verbose('(watch) watching files requires inotify (linux)')
+            return False
+
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        except (AttributeError, OSError) as e:
+            verbose('(watch) inotify is not available: {}', e)
+            return False
+
+        if fd < 0:
+            verbose('(watch) unable to create an inotify instance: {}',
+                os.strerror(ctypes.get_errno()))
+            return False
+
+        directory = self.path.absolute().parent
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+            verbose('(watch) unable to watch directory: {}: {}',
+                directory, os.strerror(ctypes.get_errno()))
+            os.close(fd)
+            return False
+
+        self._fd = fd
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(fd, self._read)
+        verbose('(watch) watching file: {}', self.path)
+        return True
+
+    def stop(self) -> None:
+        """
+        stop watching the file
+        """
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+
+        if self._fd is not None:
+            if self._loop:
+                self._loop.remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+
+    def _read(self) -> None:
+        """
+        read pending inotify events
+        """
+        assert self._fd is not None
+        data = b''
+        with suppress(BlockingIOError):
+            data = os.read(self._fd, WATCH_READ_SIZE)
+
+        name = os.fsencode(self.path.name)
+        offset = 0
+        changed = False
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            raw_name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            changed = changed or raw_name == name
+
+        if changed and self._loop:
+            if self._handle:
+                self._handle.cancel()
+            self._handle = self._loop.call_later(self.delay, self._changed)
+
+    def _changed(self) -> None:
+        """
+        report a (coalesced) change of the file
+        """
+        self._handle = None
+        verbose('(watch) file has changed: {}', self.path)
+        self.callback()
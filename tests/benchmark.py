@@ -0,0 +1,228 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from collections import Counter
+from contextlib import ExitStack
+from contextlib import redirect_stdout
+from nfsn_ddns.__main__ import argument_parser
+from nfsn_ddns.cassette import Cassette
+from nfsn_ddns.cassette import CassetteMode
+from nfsn_ddns.engine import EngineState
+from nfsn_ddns.engine import engine
+from pathlib import Path
+from tests.fakes import FAKE_LOGIN
+from tests.fakes import FAKE_TOKEN
+from tests.fakes import FakeIpServer
+from tests.fakes import FakeNfsnServer
+from typing import NamedTuple
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+# default record counts to benchmark
+DEFAULT_SIZES = [1, 10, 100, 1000]
+
+# scenarios performed for each record count (in order)
+SCENARIOS = [
+    # no records exist; each record is created
+    ('create', '203.0.113.1'),
+    # the address has changed; each record is replaced
+    ('update', '203.0.113.2'),
+    # the address has not changed; records are only queried
+    ('unchanged', '203.0.113.2'),
+]
+
+
+class BenchmarkResult(NamedTuple):
+    # the number of records processed
+    records: int
+    # the name of the scenario
+    scenario: str
+    # the resulting engine state
+    state: int
+    # the wall time of the run (in seconds)
+    wall: float
+    # the peak memory allocated during the run (in bytes)
+    peak: int
+    # requests made (by endpoint)
+    requests: dict[str, int]
+
+
+def main() -> int:
+    """
+    process main for benchmarks
+
+    Runs the engine against a local fake NFSN API and a fake IP echo service
+    for a series of record counts, reporting the wall time, requests made per
+    endpoint and peak memory of each run.
+
+    Interactions can be recorded into cassettes (one per record count) and
+    later replayed, allowing runs to be compared without any network access
+    (optionally preserving the recorded latencies).
+
+    Returns:
+        the exit code
+    """
+    parser = argparse.ArgumentParser(prog='python -m tests.benchmark')
+    parser.add_argument('--error-rate', type=float, default=0,
+        help='ratio of api requests failing with a server error')
+    parser.add_argument('--latency', type=float, default=0,
+        help='seconds to delay each api response')
+    parser.add_argument('--record', type=Path,
+        help='directory to record cassettes into')
+    parser.add_argument('--replay', type=Path,
+        help='directory to replay cassettes from')
+    parser.add_argument('--replay-latency', action='store_true',
+        help='preserve recorded latencies when replaying')
+    parser.add_argument('--seed', type=int, default=0,
+        help='seed used when injecting errors')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+        help='record counts to benchmark')
+    parser.add_argument('--zone-size', type=int, default=0,
+        help='filler records added to each zone')
+    parser.add_argument('--zones', type=int, default=10,
+        help='maximum number of zones records are spread over')
+    args = parser.parse_args()
+
+    if args.record:
+        args.record.mkdir(parents=True, exist_ok=True)
+
+    print(f'{"records":>8} {"scenario":<10} {"state":<22} {"wall (s)":>9} '
+        f'{"peak (KiB)":>11}  requests')
+
+    failed = False
+    for size in args.sizes:
+        cassette = None
+        if args.record:
+            cassette = Cassette(args.record / f'records-{size}.json',
+                CassetteMode.RECORD)
+        elif args.replay:
+            cassette = Cassette(args.replay / f'records-{size}.json',
+                CassetteMode.REPLAY, latency=args.replay_latency)
+            if not cassette.load():
+                return 1
+
+        results = benchmark(size,
+            cassette=cassette,
+            error_rate=args.error_rate,
+            latency=args.latency,
+            seed=args.seed,
+            zone_size=args.zone_size,
+            zones=args.zones)
+
+        for result in results:
+            state = EngineState(result.state).name
+            requests = ', '.join(
+                f'{k}={v}' for k, v in sorted(result.requests.items()))
+            print(f'{result.records:>8} {result.scenario:<10} {state:<22} '
+                f'{result.wall:>9.3f} {result.peak / 1024:>11.1f}  {requests}')
+
+            if result.state != EngineState.OK and not args.error_rate:
+                failed = True
+
+    return 1 if failed else 0
+
+
+def benchmark(records: int, *, cassette: Cassette | None = None,
+        error_rate: float = 0, latency: float = 0, seed: int | None = None,
+        zone_size: int = 0, zones: int = 10) -> list[BenchmarkResult]:
+    """
+    benchmark the engine for a number of records
+
+    When replaying a cassette, no fake services are started and requests are
+    counted from the replayed interactions.
+
+    Args:
+        records: the number of records to process
+        cassette (optional): a cassette to record into or replay from
+        error_rate (optional): ratio of api requests failing
+        latency (optional): seconds to delay each api response
+        seed (optional): seed used when injecting errors
+        zone_size (optional): filler records added to each zone
+        zones (optional): maximum number of zones records are spread over
+
+    Returns:
+        the result of each scenario
+    """
+    zone_count = max(1, min(records, zones))
+    domains = [f'zone{idx}.example' for idx in range(zone_count)]
+    entries = [
+        f'host{idx}.{domains[idx % zone_count]}' for idx in range(records)
+    ]
+
+    replaying = cassette and cassette.mode == CassetteMode.REPLAY
+
+    results = []
+    with ExitStack() as stack:
+        if replaying:
+            nfsn = ip = None
+            nfsn_url = cassette.meta['nfsn']
+            ip_url = cassette.meta['ip']
+        else:
+            nfsn = FakeNfsnServer(latency=latency, error_rate=error_rate,
+                seed=seed)
+            for domain in domains:
+                nfsn.populate(domain, zone_size)
+
+            ip = FakeIpServer()
+            stack.enter_context(nfsn)
+            stack.enter_context(ip)
+            nfsn_url = nfsn.url
+            ip_url = ip.url
+
+        if cassette:
+            cassette.meta.update(nfsn=nfsn_url, ip=ip_url)
+            stack.enter_context(cassette)
+
+        os.environ['NFSN_DDNS_NFSN_API_ENDPOINT'] = f'{nfsn_url}/dns'
+        os.environ['NFSN_DDNS_MYIPV4_API_ENDPOINTS'] = f'{ip_url}/ip'
+
+        args = argument_parser().parse_args([
+            '--api-login', FAKE_LOGIN,
+            '--api-token', FAKE_TOKEN,
+            '--no-cache',
+            '--no-ipv6',
+            '--ddns-domain', *entries,
+        ])
+
+        for scenario, address in SCENARIOS:
+            if replaying:
+                cassette.replayed.clear()
+            else:
+                ip.address = address
+                ip.requests = 0
+                nfsn.requests.clear()
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                state = engine(args)
+            wall = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            if replaying:
+                requests = Counter(interaction['url'].rsplit('/', 1)[-1]
+                    for interaction in cassette.replayed)
+            else:
+                requests = Counter(nfsn.requests)
+                requests['ip'] = ip.requests
+
+            results.append(BenchmarkResult(
+                records=records,
+                scenario=scenario,
+                state=state,
+                wall=wall,
+                peak=peak,
+                requests=dict(requests),
+            ))
+
+    return results
+
+
+if __name__ == '__main__':
+    sys.exit(main())
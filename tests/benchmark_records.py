@@ -0,0 +1,152 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from nfsn_ddns.records import RecordTable
+from typing import TYPE_CHECKING
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from collections.abc import Iterator
+
+# default record counts to benchmark
+DEFAULT_SIZES = [10_000, 100_000]
+
+
+def main() -> int:
+    """
+    process main for record table benchmarks
+
+    Compares the memory held and the lookup time of a record table against
+    a dictionary of per-record dictionaries, for a series of record counts.
+
+    Returns:
+        the exit code
+    """
+    parser = argparse.ArgumentParser(prog='python -m tests.benchmark_records')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+        help='record counts to benchmark')
+    parser.add_argument('--zones', type=int, default=100,
+        help='number of zones records are spread over')
+    args = parser.parse_args()
+
+    print(f'{"records":>8} {"store":<8} {"memory (KiB)":>13} '
+        f'{"bytes/record":>13} {"lookup (ns)":>12}')
+
+    for size in args.sizes:
+        for store, build, lookup in [
+                ('dict', _build_dict, _lookup_dict),
+                ('table', _build_table, _lookup_table),
+                ]:
+            memory, container = _measure(
+                lambda b=build, n=size: b(_records(n, args.zones)))
+            lookup_ns = _time_lookups(container,
+                list(_records(size, args.zones)), lookup)
+            print(f'{size:>8} {store:<8} {memory / 1024:>13.1f} '
+                f'{memory / size:>13.1f} {lookup_ns:>12.1f}')
+
+    return 0
+
+
+def _records(size: int, zones: int) -> Iterator[tuple[str, str, str, str]]:
+    """
+    generate records to track
+
+    Each record is generated with its own strings (as if parsed from a
+    response or a pushed update).
+
+    Args:
+        size: the number of records
+        zones: the number of zones records are spread over
+
+    Yields:
+        the zone, name, type and address of each record
+    """
+    for idx in range(size):
+        if idx % 2:
+            yield (f'zone{idx % zones}.example', f'host{idx}', 'AAAA',
+                f'2001:db8::{idx % 65536:x}')
+        else:
+            yield (f'zone{idx % zones}.example', f'host{idx}', 'A',
+                f'10.{idx >> 16 & 255}.{idx >> 8 & 255}.{idx & 255}')
+
+
+def _build_dict(records: Iterator[tuple[str, str, str, str]]) -> dict:
+    now = time.time()
+    return {
+        (zone, name, rr_type): {
+            'zone': zone,
+            'name': name,
+            'type': rr_type,
+            'data': address,
+            'checked': now,
+        }
+        for zone, name, rr_type, address in records
+    }
+
+
+def _build_table(
+        records: Iterator[tuple[str, str, str, str]]) -> RecordTable:
+    now = time.time()
+    table = RecordTable()
+    for zone, name, rr_type, address in records:
+        table.set(zone, name, rr_type, address, now)
+    return table
+
+
+def _lookup_dict(container: dict, zone: str, name: str, rr_type: str) -> str:
+    return container[(zone, name, rr_type)]['data']
+
+
+def _lookup_table(container: RecordTable, zone: str, name: str,
+        rr_type: str) -> str:
+    return container.address(zone, name, rr_type)
+
+
+def _measure(build: Callable[[], object]) -> tuple[int, object]:
+    """
+    measure the memory held by a built container
+
+    Only the memory retained by the container once built is measured.
+
+    Args:
+        build: the call building the container
+
+    Returns:
+        2-tuple of the bytes held and the container
+    """
+    gc.collect()
+    tracemalloc.start()
+    container = build()
+    gc.collect()
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return memory, container
+
+
+def _time_lookups(container: object, records: list[tuple[str, ...]],
+        lookup: Callable[..., str]) -> float:
+    """
+    measure the average time of a record lookup
+
+    Args:
+        container: the container
+        records: the records to look up
+        lookup: the call to look up a record
+
+    Returns:
+        the average time (in nanoseconds)
+    """
+    start = time.perf_counter_ns()
+    for zone, name, rr_type, _ in records:
+        lookup(container, zone, name, rr_type)
+    return (time.perf_counter_ns() - start) / len(records)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,351 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from abc import ABC
+from abc import abstractmethod
+from collections import Counter
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from nfsn_ddns.defs import NFSN_AUTH_HEADER
+from socketserver import BaseRequestHandler
+from socketserver import ThreadingUDPServer
+from typing import TYPE_CHECKING
+from urllib.parse import parse_qs
+import hashlib
+import ipaddress
+import json
+import random
+import struct
+import threading
+import time
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+# api login accepted by fake nfsn instances (by default)
+FAKE_LOGIN = 'fake-login'
+
+# api token accepted by fake nfsn instances (by default)
+FAKE_TOKEN = 'fake-token'  # noqa: S105
+
+
+class FakeServer(ABC):
+    def __init__(self) -> None:
+        """
+        a local fake http server
+
+        Provides a threaded HTTP server on an ephemeral loopback port, where
+        requests are dispatched to the implementation's ``handle`` method.
+        """
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            disable_nagle_algorithm = True
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self) -> None:
+                self._dispatch(b'')
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get('Content-Length', 0))
+                self._dispatch(self.rfile.read(length))
+
+            def _dispatch(self, body: bytes) -> None:
+                status, payload = owner.handle(self, body)
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever,
+            daemon=True)
+
+    def __enter__(self) -> FakeServer:  # noqa: PYI034
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None,
+            exc_value: BaseException | None,
+            traceback: TracebackType | None) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    @abstractmethod
+    def handle(self, request: BaseHTTPRequestHandler,
+            body: bytes) -> tuple[int, bytes]:
+        """
+        handle a request
+
+        Args:
+            request: the request handler
+            body: the body of the request
+
+        Returns:
+            2-tuple of the response status and body
+        """
+
+
+class FakeDnsServer:
+    def __init__(self, *, authoritative: bool = True) -> None:
+        """
+        a local fake authoritative dns server
+
+        Answers ``A``/``AAAA`` queries over UDP (on an ephemeral loopback
+        port) from an in-memory set of records, standing in for a zone's
+        authoritative nameservers. Names without any record are answered
+        with ``NXDOMAIN``.
+
+        Args:
+            authoritative (optional): whether answers are authoritative
+        """
+        owner = self
+
+        class Handler(BaseRequestHandler):
+            def handle(self) -> None:
+                data, sock = self.request
+                owner.clients.add(self.client_address)
+                reply = owner.answer(data)
+                if reply:
+                    sock.sendto(reply, self.client_address)
+
+        self.authoritative = authoritative
+        # the addresses queries have been received from
+        self.clients = set()  # type: set[tuple[str, int]]
+        # the addresses of each record (by name and type)
+        self.records = {}  # type: dict[tuple[str, str], list[str]]
+        self.requests = 0
+        self.server = ThreadingUDPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever,
+            daemon=True)
+
+    def __enter__(self) -> FakeDnsServer:  # noqa: PYI034
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None,
+            exc_value: BaseException | None,
+            traceback: TracebackType | None) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def nameserver(self) -> str:
+        return f'127.0.0.1:{self.server.server_address[1]}'
+
+    def answer(self, query: bytes) -> bytes | None:
+        """
+        answer a query
+
+        Args:
+            query: the query message
+
+        Returns:
+            the response message (if the query is valid)
+        """
+        try:
+            qid = struct.unpack_from('!H', query)[0]
+            labels = []
+            offset = 12
+            while query[offset]:
+                length = query[offset]
+                labels.append(query[offset + 1:offset + 1 + length].decode())
+                offset += 1 + length
+            qtype = struct.unpack_from('!H', query, offset + 1)[0]
+        except (IndexError, UnicodeError, struct.error):
+            return None
+
+        self.requests += 1
+        name = '.'.join(labels).lower()
+        rr_type = {1: 'A', 28: 'AAAA'}.get(qtype, '')
+        values = self.records.get((name, rr_type), [])
+        exists = any(key[0] == name for key in self.records)
+
+        flags = 0x8000 | (0x0400 if self.authoritative else 0) \
+            | (0 if exists else 3)
+        header = struct.pack('!HHHHHH', qid, flags, 1, len(values), 0, 0)
+        answers = b''
+        for value in values:
+            raw = ipaddress.ip_address(value).packed
+            answers += b'\xc0\x0c' + struct.pack('!HHIH', qtype, 1, 60,
+                len(raw)) + raw
+
+        return header + query[12:offset + 5] + answers
+
+
+class FakeIpServer(FakeServer):
+    def __init__(self, address: str | None = None, *,
+            latency: float = 0) -> None:
+        """
+        a local fake ip echo service
+
+        Responds to any request with the address of the requesting client
+        (or a configured address).
+
+        Args:
+            address (optional): the address to report
+            latency (optional): seconds to delay each response
+        """
+        super().__init__()
+        self.address = address
+        self.latency = latency
+        self.requests = 0
+
+    def handle(self, request: BaseHTTPRequestHandler,
+            body: bytes) -> tuple[int, bytes]:  # noqa: ARG002
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        address = self.address or request.client_address[0]
+        return 200, address.encode('utf-8')
+
+
+class FakeNfsnServer(FakeServer):
+    def __init__(self, login: str = FAKE_LOGIN, token: str = FAKE_TOKEN, *,
+            latency: float = 0, error_rate: float = 0,
+            seed: int | None = None) -> None:
+        """
+        a local fake nfsn dns api
+
+        Provides an in-memory implementation of NFSN's DNS API calls used by
+        this utility (``listRRs``, ``addRR``, ``replaceRR`` and ``removeRR``).
+        Every request must provide a valid ``X-NFSN-Authentication`` header
+        for the configured credentials, else a 401 response is returned.
+
+        Args:
+            login (optional): the api login to accept
+            token (optional): the api token to accept
+            latency (optional): seconds to delay each response
+            error_rate (optional): ratio of requests failing with a 500
+            seed (optional): seed used when injecting errors
+        """
+        super().__init__()
+        self.login = login
+        self.token = token
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = Counter()  # type: Counter[str]
+        # latencies of the next requests (overriding the configured latency)
+        self.delays = []  # type: list[float]
+        self.zones = {}  # type: dict[str, list[dict[str, str | int]]]
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)  # noqa: S311
+
+    def populate(self, domain: str, count: int,
+            prefix: str = 'filler') -> None:
+        """
+        populate a zone with filler records
+
+        Args:
+            domain: the domain of the zone
+            count: the number of records to add
+            prefix (optional): the prefix of each record's name
+        """
+        zone = self.zones.setdefault(domain, [])
+        for idx in range(count):
+            zone.append({
+                'name': f'{prefix}{idx}',
+                'type': 'TXT',
+                'data': f'filler record {idx}',
+                'ttl': 3600,
+            })
+
+    def handle(self, request: BaseHTTPRequestHandler,
+            body: bytes) -> tuple[int, bytes]:
+        path = request.path.split('?', 1)[0]
+        parts = path.strip('/').split('/')
+        method = parts[-1]
+        domain = parts[-2] if len(parts) >= 2 else ''
+
+        with self._lock:
+            self.requests[method] += 1
+            inject_error = self._random.random() < self.error_rate
+            latency = self.delays.pop(0) if self.delays else self.latency
+
+        if latency:
+            time.sleep(latency)
+
+        if not self._verify(request, path, body):
+            return 401, b'{"error":"Authentication Error"}'
+
+        if inject_error:
+            return 500, b'{"error":"Internal Server Error"}'
+
+        opts = {k: v[0] for k, v in parse_qs(body.decode('utf-8')).items()}
+
+        with self._lock:
+            zone = self.zones.setdefault(domain, [])
+            match method:
+                case 'listRRs':
+                    rrs = [rr for rr in zone if all(
+                        str(rr[key]) == opts[key]
+                        for key in ('name', 'type', 'data') if key in opts
+                    )]
+                    return 200, json.dumps(rrs).encode('utf-8')
+                case 'addRR':
+                    zone.append(self._rr(opts))
+                case 'replaceRR':
+                    zone[:] = [rr for rr in zone if not (
+                        rr['name'] == opts.get('name', '') and
+                        rr['type'] == opts.get('type'))]
+                    zone.append(self._rr(opts))
+                case 'removeRR':
+                    zone[:] = [rr for rr in zone if not (
+                        rr['name'] == opts.get('name', '') and
+                        rr['type'] == opts.get('type') and
+                        rr['data'] == opts.get('data'))]
+                case _:
+                    return 404, b'{"error":"Not Found"}'
+
+        return 200, b''
+
+    def _verify(self, request: BaseHTTPRequestHandler, path: str,
+            body: bytes) -> bool:
+        """
+        verify the authentication header of a request
+
+        Args:
+            request: the request handler
+            path: the path of the request
+            body: the body of the request
+
+        Returns:
+            whether the request is authenticated
+        """
+        header = request.headers.get(NFSN_AUTH_HEADER, '')
+        parts = header.split(';')
+        if len(parts) != 4:
+            return False
+
+        login, timestamp, salt, hashed = parts
+        if login != self.login or len(salt) != 16:
+            return False
+
+        expected = hashlib.sha1(';'.join([  # noqa: S324
+            login,
+            timestamp,
+            salt,
+            self.token,
+            path,
+            hashlib.sha1(body).hexdigest(),  # noqa: S324
+        ]).encode('utf-8')).hexdigest()
+        return hashed == expected
+
+    @staticmethod
+    def _rr(opts: dict[str, str]) -> dict[str, str | int]:
+        return {
+            'name': opts.get('name', ''),
+            'type': opts.get('type', ''),
+            'data': opts.get('data', ''),
+            'ttl': int(opts.get('ttl', 3600)),
+        }
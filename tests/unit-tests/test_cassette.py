@@ -0,0 +1,58 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from nfsn_ddns.cassette import Cassette
+from nfsn_ddns.cassette import CassetteMode
+from nfsn_ddns.session import new_session
+from pathlib import Path
+from tests import NfsnDdnsTestCase
+from tests.fakes import FakeIpServer
+import requests
+import tempfile
+
+
+class TestCassette(NfsnDdnsTestCase):
+    def test_cassette_record_replay(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir:
+            cassette_file = Path(work_dir) / 'test.cassette'
+
+            with FakeIpServer('203.0.113.1') as ip:
+                target = f'{ip.url}/ip'
+                with Cassette(cassette_file, CassetteMode.RECORD), \
+                        new_session() as session:
+                    rsp = session.get(target)
+                    self.assertEqual(rsp.text, '203.0.113.1')
+
+                    ip.address = '203.0.113.2'
+                    rsp = session.post(target, data={'value': 1})
+                    self.assertEqual(rsp.text, '203.0.113.2')
+
+            self.assertTrue(cassette_file.is_file())
+
+            # replay (with no server running)
+            cassette = Cassette(cassette_file, CassetteMode.REPLAY)
+            self.assertTrue(cassette.load())
+            with cassette, new_session() as session:
+                rsp = session.post(target, data={'value': 1})
+                self.assertEqual(rsp.status_code, 200)
+                self.assertEqual(rsp.text, '203.0.113.2')
+
+                rsp = session.get(target)
+                self.assertEqual(rsp.text, '203.0.113.1')
+
+                # differing request bodies are not matched
+                with self.assertRaises(requests.ConnectionError):
+                    session.post(target, data={'value': 2})
+
+                # each interaction is only replayed once
+                with self.assertRaises(requests.ConnectionError):
+                    session.get(target)
+
+    def test_cassette_invalid(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir:
+            cassette_file = Path(work_dir) / 'test.cassette'
+            cassette = Cassette(cassette_file, CassetteMode.REPLAY)
+            self.assertFalse(cassette.load())
+
+            cassette_file.write_text('{"version": 0}')
+            self.assertFalse(cassette.load())
@@ -3,8 +3,11 @@
 
 from __future__ import annotations
 from nfsn_ddns.config import Config
+from nfsn_ddns.config import ReceiverUser
 from pathlib import Path
 from tests import NfsnDdnsTestCase
+from tests.fakes import FAKE_LOGIN
+from tests.fakes import FAKE_TOKEN
 from typing import TYPE_CHECKING
 import os
 
@@ -48,6 +51,7 @@ class TestConfiguration(NfsnDdnsTestCase):
         self.assertIsNone(self.cfg.myipv4_api_endpoints())
         self.assertIsNone(self.cfg.myipv6_api_endpoint_cmd())
         self.assertIsNone(self.cfg.myipv6_api_endpoints())
+        self.assertIsNone(self.cfg.profiles())
         self.assertIsNone(self.cfg.timeout())
 
     def test_config_args_api_login(self) -> None:
@@ -210,6 +214,19 @@ class TestConfiguration(NfsnDdnsTestCase):
         os.environ['NFSN_DDNS_MYIP_API_ENDPOINTS'] = value  # legacy
         self.assertListEqual(self.cfg.myipv4_api_endpoints(), expected)
 
+    def test_config_env_myipv4_api_endpoints_invalid(self) -> None:
+        os.environ['NFSN_DDNS_API_LOGIN'] = FAKE_LOGIN
+        os.environ['NFSN_DDNS_API_TOKEN'] = FAKE_TOKEN
+        os.environ['NFSN_DDNS_DOMAINS'] = 'ddns.example.com'
+
+        os.environ['NFSN_DDNS_MYIPV4_API_ENDPOINTS'] = 'stun://example.com:3478'
+        self.assertTrue(self.cfg.validate())
+
+        # socket endpoints without a host or with a bad port are rejected
+        for value in ['stun://', 'stun://example.com:abc', 'dns://:53']:
+            os.environ['NFSN_DDNS_MYIPV4_API_ENDPOINTS'] = value
+            self.assertFalse(self.cfg.validate())
+
     def test_config_env_myipv6_api_endpoint_cmd(self) -> None:
         expected = 'fuschia-steel-labrador'
         os.environ['NFSN_DDNS_MYIPV6_API_ENDPOINT_CMD'] = expected
@@ -231,6 +248,26 @@ class TestConfiguration(NfsnDdnsTestCase):
         os.environ['NFSN_DDNS_MYIPV6_API_ENDPOINTS'] = value
         self.assertListEqual(self.cfg.myipv6_api_endpoints(), expected)
 
+    def test_config_env_propagation_timeout(self) -> None:
+        os.environ['NFSN_DDNS_API_LOGIN'] = FAKE_LOGIN
+        os.environ['NFSN_DDNS_API_TOKEN'] = FAKE_TOKEN
+        os.environ['NFSN_DDNS_DOMAINS'] = 'ddns.example.com'
+
+        os.environ['NFSN_DDNS_PROPAGATION_TIMEOUT'] = '30'
+        self.assertEqual(self.cfg.propagation_timeout(), 30)
+        self.assertTrue(self.cfg.validate())
+
+        # non-positive or excessive timeouts are rejected
+        for value in ['0', '-1', '86400']:
+            os.environ['NFSN_DDNS_PROPAGATION_TIMEOUT'] = value
+            self.assertFalse(self.cfg.validate())
+
+    def test_config_env_receiver_users(self) -> None:
+        os.environ['NFSN_DDNS_RECEIVER_USERS'] = 'red-router:a:b;invalid'
+        self.assertEqual(self.cfg.receiver_users(), {
+            'red-router': ReceiverUser('a:b'),
+        })
+
     def test_config_env_timeout(self) -> None:
         expected = 2
         os.environ['NFSN_DDNS_TIMEOUT'] = '2'
@@ -246,6 +283,60 @@ class TestConfiguration(NfsnDdnsTestCase):
         loaded = self.cfg.load(fname, expected=True)
         self.assertFalse(loaded)
 
+    def test_config_file_profiles(self) -> None:
+        fname = self.dataset / 'profiles.yaml'
+        loaded = self.cfg.load(fname, expected=True)
+        self.assertTrue(loaded)
+        self.assertTrue(self.cfg.validate())
+
+        profiles = self.cfg.profiles()
+        self.assertListEqual(list(profiles), ['personal', 'work'])
+
+        personal = profiles['personal']
+        self.assertEqual(personal.api_login(), 'my-personal-login')
+        self.assertEqual(personal.api_token(), 'my-shared-api-token')
+        self.assertEqual(personal.ddns_domains(), ['my-record1.my-domain1'])
+        self.assertEqual(personal.ipv6(), True)
+
+        work = profiles['work']
+        self.assertEqual(work.api_login(), 'my-work-login')
+        self.assertEqual(work.api_token(), 'my-work-api-token')
+        self.assertEqual(work.ddns_domains(), ['my-record2.my-domain2'])
+        self.assertEqual(work.ipv6(), False)
+
+    def test_config_file_zones(self) -> None:
+        fname = self.dataset / 'zones.yaml'
+        loaded = self.cfg.load(fname, expected=True)
+        self.assertTrue(loaded)
+        self.assertTrue(self.cfg.validate())
+
+        zones = self.cfg.zones()
+        self.assertListEqual(list(zones), ['my-domain1'])
+
+        record_sets = zones['my-domain1']
+        self.assertEqual(len(record_sets), 3)
+
+        self.assertEqual(record_sets[0].name, 'my-record1')
+        self.assertEqual(record_sets[0].type, 'A')
+        self.assertEqual(record_sets[0].data, frozenset({'{ipv4}'}))
+        self.assertEqual(record_sets[0].ttl, 300)
+
+        self.assertEqual(record_sets[1].name, '')
+        self.assertEqual(record_sets[1].data, frozenset({
+            '10 mx1.my-domain1.',
+            '20 mx2.my-domain1.',
+        }))
+        self.assertIsNone(record_sets[1].ttl)
+
+        self.assertEqual(record_sets[2].data, frozenset())
+
+    def test_config_file_zones_invalid(self) -> None:
+        fname = self.dataset / 'zones-invalid.yaml'
+        loaded = self.cfg.load(fname, expected=True)
+        self.assertTrue(loaded)
+        self.assertFalse(self.cfg.validate())
+        self.assertEqual(self.cfg.zones(), {'my-domain1': []})
+
     def test_config_file_sample(self) -> None:
         fname = self.dataset / 'sample.yaml'
         loaded = self.cfg.load(fname, expected=True)
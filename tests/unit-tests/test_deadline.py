@@ -0,0 +1,57 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from nfsn_ddns.client import NfsnClient
+from nfsn_ddns.deadline import Deadline
+from nfsn_ddns.deadline import DeadlineExceeded
+from tests import NfsnDdnsTestCase
+from tests.fakes import FAKE_LOGIN
+from tests.fakes import FAKE_TOKEN
+from tests.fakes import FakeNfsnServer
+
+
+class TestDeadline(NfsnDdnsTestCase):
+    def test_deadline_child(self) -> None:
+        deadline = Deadline(10)
+
+        # a phase is bound by its own budget and by its parent's deadline
+        self.assertLessEqual(deadline.child(5).remaining(), 5)
+        self.assertLessEqual(deadline.child(60).remaining(), 10)
+        self.assertLessEqual(deadline.child().remaining(), 10)
+
+        unbounded = Deadline()
+        self.assertIsNone(unbounded.remaining())
+        self.assertIsNone(unbounded.child().remaining())
+        self.assertFalse(unbounded.expired())
+        self.assertEqual(unbounded.limit(3), 3)
+
+    def test_deadline_expired(self) -> None:
+        deadline = Deadline(0)
+
+        self.assertTrue(deadline.expired())
+        self.assertTrue(deadline.child(60).expired())
+        self.assertEqual(deadline.limit(3), 0)
+
+        with self.assertRaises(DeadlineExceeded):
+            deadline.request_timeout(3)
+
+        # calls are not attempted once a deadline has expired
+        with FakeNfsnServer() as nfsn:
+            client = NfsnClient(FAKE_LOGIN, FAKE_TOKEN,
+                endpoint=f'{nfsn.url}/dns', deadline=deadline)
+
+            with self.assertRaises(DeadlineExceeded):
+                client.list_rrs('example.com')
+
+        self.assertEqual(nfsn.requests['listRRs'], 0)
+
+    def test_deadline_request_timeout(self) -> None:
+        deadline = Deadline(2)
+
+        self.assertLessEqual(deadline.request_timeout(10), 2)
+        self.assertEqual(Deadline().request_timeout(10), 10)
+        self.assertEqual(Deadline().request_timeout(10, 3), (3, 10))
+
+        connect, read = deadline.request_timeout(10, 1)
+        self.assertEqual(connect, 1)
+        self.assertLessEqual(read, 2)
@@ -0,0 +1,53 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from contextlib import redirect_stdout
+from nfsn_ddns.debounce import Debouncer
+from tests import NfsnDdnsTestCase
+import io
+
+
+class TestDebounce(NfsnDdnsTestCase):
+    def test_debounce_flapping(self) -> None:
+        debouncer = Debouncer(300)
+        entry = 'ddns.example.com'
+
+        # a link alternating between addresses is never confirmed by samples
+        with redirect_stdout(io.StringIO()):
+            self.assertFalse(debouncer.confirm(entry, 'A', '203.0.113.2',
+                now=0))
+            self.assertFalse(debouncer.confirm(entry, 'A', '203.0.113.3',
+                now=60))
+            self.assertFalse(debouncer.confirm(entry, 'A', '203.0.113.2',
+                now=120))
+            self.assertFalse(debouncer.confirm(entry, 'A', '203.0.113.2',
+                now=180))
+            self.assertTrue(debouncer.confirm(entry, 'A', '203.0.113.2',
+                now=420))
+
+        self.assertEqual(debouncer.candidates, {})
+
+    def test_debounce_persist(self) -> None:
+        debouncer = Debouncer(300, samples=0)
+        entry = 'ddns.example.com'
+
+        self.assertFalse(debouncer.confirm(entry, 'A', '203.0.113.2', now=0))
+
+        restored = Debouncer(300, samples=0)
+        restored.load(debouncer.dump())
+        self.assertEqual(restored.candidates, debouncer.candidates)
+
+        self.assertFalse(restored.confirm(entry, 'A', '203.0.113.2', now=60))
+        self.assertTrue(restored.confirm(entry, 'A', '203.0.113.2', now=300))
+
+        restored.load({'invalid': 'value'})
+        self.assertEqual(restored.candidates, {})
+
+    def test_debounce_reset(self) -> None:
+        debouncer = Debouncer(300)
+        entry = 'ddns.example.com'
+
+        self.assertFalse(debouncer.confirm(entry, 'A', '203.0.113.2', now=0))
+        debouncer.reset(entry, 'A')
+        self.assertFalse(debouncer.confirm(entry, 'A', '203.0.113.2', now=60))
+        self.assertTrue(debouncer.confirm(entry, 'A', '203.0.113.2', now=120))
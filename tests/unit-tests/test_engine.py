@@ -0,0 +1,477 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from argparse import Namespace
+from contextlib import redirect_stdout
+from nfsn_ddns.__main__ import argument_parser
+from nfsn_ddns.engine import EngineState
+from nfsn_ddns.engine import engine
+from nfsn_ddns.engine import engine_async
+from tests import NfsnDdnsTestCase
+from tests.fakes import FAKE_LOGIN
+from tests.fakes import FAKE_TOKEN
+from tests.fakes import FakeDnsServer
+from tests.fakes import FakeIpServer
+from tests.fakes import FakeNfsnServer
+from pathlib import Path
+import asyncio
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+
+class TestEngine(NfsnDdnsTestCase):
+    def run_engine(self, nfsn: FakeNfsnServer, ip: FakeIpServer,
+            *extra: str, cache: Path | None = None) -> int:
+        os.environ['NFSN_DDNS_NFSN_API_ENDPOINT'] = f'{nfsn.url}/dns'
+        os.environ['NFSN_DDNS_MYIPV4_API_ENDPOINTS'] = f'{ip.url}/ip'
+
+        args = argument_parser().parse_args([
+            '--api-login', FAKE_LOGIN,
+            *(['--cache', '--cache-file', str(cache)] if cache
+                else ['--no-cache']),
+            '--no-ipv6',
+            *extra,
+        ])
+
+        with redirect_stdout(io.StringIO()):
+            return engine(args)
+
+    def test_engine_auth_failure(self) -> None:
+        with FakeNfsnServer() as nfsn, FakeIpServer('203.0.113.1') as ip:
+            state = self.run_engine(nfsn, ip,
+                '--api-token', 'invalid',
+                '--ddns-domain', 'ddns.example.com')
+
+        self.assertEqual(state, EngineState.NFSN_API_FAILURE_AUTH)
+        self.assertEqual(nfsn.requests['addRR'], 0)
+
+    def test_engine_cassette(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir:
+            cassette_file = Path(work_dir) / 'run.cassette'
+
+            with FakeNfsnServer() as nfsn, \
+                    FakeIpServer('203.0.113.1') as ip1, \
+                    FakeIpServer('203.0.113.2') as ip2:
+                endpoints = f'{ip1.url}/ip;{ip2.url}/ip'
+                os.environ['NFSN_DDNS_NFSN_API_ENDPOINT'] = f'{nfsn.url}/dns'
+                os.environ['NFSN_DDNS_MYIPV4_API_ENDPOINTS'] = endpoints
+
+                args = argument_parser().parse_args([
+                    '--api-login', FAKE_LOGIN,
+                    '--api-token', FAKE_TOKEN,
+                    '--ddns-domain', 'ddns.example.com',
+                    '--no-cache',
+                    '--no-ipv6',
+                    '--http-record', str(cassette_file),
+                ])
+
+                # endpoints are queried in order while recording
+                with redirect_stdout(io.StringIO()):
+                    state = engine(args)
+                self.assertEqual(state, EngineState.OK)
+                self.assertEqual(ip1.requests, 1)
+                self.assertEqual(ip2.requests, 0)
+                self.assertEqual(nfsn.zones['example.com'][0]['data'],
+                    '203.0.113.1')
+
+            # replay the run (with no servers running), which must query the
+            # same endpoints in the same order
+            args.http_record = None
+            args.http_replay = cassette_file
+
+            output = io.StringIO()
+            with redirect_stdout(output):
+                state = engine(args)
+            self.assertEqual(state, EngineState.OK)
+            self.assertNotIn('no recorded interaction', output.getvalue())
+
+    def test_engine_deadline(self) -> None:
+        with FakeNfsnServer(latency=3) as nfsn, \
+                FakeIpServer('203.0.113.1') as ip:
+            start = time.monotonic()
+            state = self.run_engine(nfsn, ip,
+                '--api-token', FAKE_TOKEN,
+                '--ddns-domain', 'ddns.example.com',
+                '--deadline', '1')
+            elapsed = time.monotonic() - start
+
+        # a degraded api is abandoned once the run's deadline expires
+        self.assertEqual(state, EngineState.NFSN_API_FAILURE)
+        self.assertLess(elapsed, 3)
+        self.assertEqual(nfsn.requests['addRR'], 0)
+
+    def test_engine_debounce(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir, \
+                FakeNfsnServer() as nfsn, FakeIpServer('203.0.113.1') as ip:
+            os.environ['NFSN_DDNS_SHARED_RESULT_AGE'] = '0'
+
+            cache_file = Path(work_dir) / 'cache'
+            extra = [
+                '--api-token', FAKE_TOKEN,
+                '--ddns-domain', 'ddns.example.com',
+                '--debounce', '3600',
+            ]
+
+            # first-time records are created immediately
+            state = self.run_engine(nfsn, ip, *extra, cache=cache_file)
+            self.assertEqual(state, EngineState.OK)
+            self.assertEqual(nfsn.requests['addRR'], 1)
+
+            # a flap back to the original address never writes
+            ip.address = '203.0.113.2'
+            state = self.run_engine(nfsn, ip, *extra, cache=cache_file)
+            self.assertEqual(state, EngineState.OK)
+
+            ip.address = '203.0.113.1'
+            state = self.run_engine(nfsn, ip, *extra, cache=cache_file)
+            self.assertEqual(state, EngineState.OK)
+            self.assertEqual(nfsn.requests['replaceRR'], 0)
+
+            # a change confirmed by a second run is written
+            ip.address = '203.0.113.2'
+            for _ in range(2):
+                state = self.run_engine(nfsn, ip, *extra, cache=cache_file)
+                self.assertEqual(state, EngineState.OK)
+
+            self.assertEqual(nfsn.requests['replaceRR'], 1)
+            self.assertEqual(nfsn.zones['example.com'][0]['data'],
+                '203.0.113.2')
+
+    @unittest.skipUnless(Path('/proc/net').is_dir(), 'requires /proc/net')
+    def test_engine_fingerprint(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir, \
+                FakeNfsnServer() as nfsn, FakeIpServer('203.0.113.1') as ip:
+            cache = Path(work_dir) / 'cached-ip'
+            lease = Path(work_dir) / 'lease'
+            lease.write_text('lease-1')
+            os.environ['NFSN_DDNS_FINGERPRINT'] = 'true'
+            os.environ['NFSN_DDNS_FINGERPRINT_FILES'] = str(lease)
+            os.environ['NFSN_DDNS_SHARED_RESULT_AGE'] = '0'
+
+            args = ['--api-token', FAKE_TOKEN,
+                '--ddns-domain', 'ddns.example.com']
+            state = self.run_engine(nfsn, ip, *args, cache=cache)
+            self.assertEqual(state, EngineState.OK)
+            self.assertEqual(ip.requests, 1)
+            self.assertEqual(nfsn.requests['addRR'], 1)
+
+            # an unchanged local state skips address detection
+            state = self.run_engine(nfsn, ip, *args, cache=cache)
+            self.assertEqual(state, EngineState.OK)
+            self.assertEqual(ip.requests, 1)
+
+            # a renewed lease detects the address again, where the new
+            # fingerprint is tracked without extending the age of the cache
+            os.utime(cache, (0, time.time() - 60))
+            mtime = cache.stat().st_mtime
+            lease.write_text('lease-2')
+            state = self.run_engine(nfsn, ip, *args, cache=cache)
+            self.assertEqual(state, EngineState.OK)
+            self.assertEqual(ip.requests, 2)
+            self.assertEqual(cache.stat().st_mtime, mtime)
+
+            state = self.run_engine(nfsn, ip, *args, cache=cache)
+            self.assertEqual(state, EngineState.OK)
+            self.assertEqual(ip.requests, 2)
+
+        # the records are only checked by the first run
+        self.assertEqual(sum(nfsn.requests.values()), 2)
+
+    def test_engine_prefix(self) -> None:
+        with FakeNfsnServer() as nfsn, \
+                FakeIpServer('2001:db8:1:200::5') as ip:
+            os.environ['NFSN_DDNS_MYIPV6_API_ENDPOINTS'] = f'{ip.url}/ip'
+            os.environ['NFSN_DDNS_PREFIX_HOSTS'] = (
+                'nas.example.com=::1:0:0:0:10;'
+                'printer.example.com=::20;'
+                'tv.example.org=::3:0:0:0:30'
+            )
+
+            extra = [
+                '--api-token', FAKE_TOKEN,
+                '--no-ipv4',
+                '--prefix-length', '56',
+            ]
+
+            # a single detection and query of each zone serves every host
+            state = self.run_engine(nfsn, ip, *extra)
+            self.assertEqual(state, EngineState.OK)
+            self.assertEqual(ip.requests, 1)
+            self.assertEqual(nfsn.requests['listRRs'], 2)
+            self.assertEqual(nfsn.requests['addRR'], 3)
+
+            # a rotated prefix replaces every host's address
+            ip.address = '2001:db8:2:200::5'
+            state = self.run_engine(nfsn, ip, *extra)
+            self.assertEqual(state, EngineState.OK)
+            self.assertEqual(nfsn.requests['listRRs'], 4)
+            self.assertEqual(nfsn.requests['replaceRR'], 3)
+
+        records = {
+            (domain, rr['name'], rr['type'], rr['data'])
+            for domain, zone in nfsn.zones.items()
+            for rr in zone
+        }
+        self.assertEqual(records, {
+            ('example.com', 'nas', 'AAAA', '2001:db8:2:201::10'),
+            ('example.com', 'printer', 'AAAA', '2001:db8:2:200::20'),
+            ('example.org', 'tv', 'AAAA', '2001:db8:2:203::30'),
+        })
+
+    def test_engine_pipelined(self) -> None:
+        with FakeNfsnServer(latency=1) as nfsn, \
+                FakeIpServer('203.0.113.1', latency=1) as ip:
+            nfsn.zones['example.com'] = [
+                {'name': 'ddns', 'type': 'A', 'data': '203.0.113.1',
+                    'ttl': 3600},
+            ]
+
+            # reads are issued while the address is detected
+            start = time.monotonic()
+            state = self.run_engine(nfsn, ip,
+                '--api-token', FAKE_TOKEN,
+                '--ddns-domain', 'ddns.example.com')
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(state, EngineState.OK)
+        self.assertLess(elapsed, 1.8)
+        self.assertEqual(nfsn.requests['listRRs'], 1)
+        self.assertEqual(nfsn.requests['replaceRR'], 0)
+
+    def test_engine_pipelined_cache(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir, \
+                FakeNfsnServer(latency=1) as nfsn, \
+                FakeIpServer('203.0.113.1', latency=1) as ip:
+            nfsn.zones['example.com'] = [
+                {'name': 'ddns', 'type': 'A', 'data': '203.0.113.1',
+                    'ttl': 3600},
+            ]
+
+            # reads are also issued while the address is detected by an
+            # instance coordinating with others through a cache
+            start = time.monotonic()
+            state = self.run_engine(nfsn, ip,
+                '--api-token', FAKE_TOKEN,
+                '--ddns-domain', 'ddns.example.com',
+                cache=Path(work_dir) / 'cache')
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(state, EngineState.OK)
+        self.assertLess(elapsed, 1.8)
+        self.assertEqual(nfsn.requests['listRRs'], 1)
+        self.assertEqual(nfsn.requests['replaceRR'], 0)
+
+    def test_engine_propagation(self) -> None:
+        with FakeNfsnServer() as nfsn, FakeDnsServer() as ns, \
+                FakeIpServer('203.0.113.2') as ip:
+            nfsn.zones['example.com'] = [
+                {'name': 'ddns', 'type': 'A', 'data': '203.0.113.1',
+                    'ttl': 3600},
+            ]
+            ns.records[('ddns.example.com', 'A')] = ['203.0.113.1']
+            os.environ['NFSN_DDNS_VERIFY_NAMESERVERS'] = ns.nameserver
+
+            # the nameserver serves the updated record shortly after
+            timer = threading.Timer(1, ns.records.__setitem__,
+                (('ddns.example.com', 'A'), ['203.0.113.2']))
+            timer.start()
+
+            start = time.monotonic()
+            state = self.run_engine(nfsn, ip,
+                '--api-token', FAKE_TOKEN,
+                '--ddns-domain', 'ddns.example.com',
+                '--propagation-timeout', '10')
+            elapsed = time.monotonic() - start
+            timer.join()
+
+        # the run completes once the record has propagated
+        self.assertEqual(state, EngineState.OK)
+        self.assertEqual(nfsn.requests['replaceRR'], 1)
+        self.assertGreater(ns.requests, 2)
+        self.assertLess(elapsed, 5)
+
+    def test_engine_report(self) -> None:
+        os.environ['NFSN_DDNS_SHARED_RESULT_AGE'] = '0'
+
+        with tempfile.TemporaryDirectory() as work_dir, \
+                FakeNfsnServer() as nfsn, FakeIpServer('203.0.113.1') as ip:
+            cache = Path(work_dir) / 'cache'
+            report_file = Path(work_dir) / 'report.json'
+            options = [
+                '--api-token', FAKE_TOKEN,
+                '--ddns-domain', 'ddns.example.com',
+                '--report', 'json',
+                '--report-file', str(report_file),
+            ]
+
+            # a run creating a record
+            state = self.run_engine(nfsn, ip, *options, cache=cache)
+            self.assertEqual(state, EngineState.OK)
+            report = json.loads(report_file.read_text())
+
+            # a run ending on a cache hit
+            state = self.run_engine(nfsn, ip, *options, cache=cache)
+            self.assertEqual(state, EngineState.OK)
+            cached_report = json.loads(report_file.read_text())
+
+        self.assertEqual(report['state'], 'ok')
+        self.assertEqual(report['addresses'], {
+            'ipv4': {'address': '203.0.113.1', 'source': f'{ip.url}/ip'},
+        })
+        self.assertEqual([source['result'] for source in report['sources']],
+            ['ok'])
+        self.assertEqual(report['cache'], {'ipv4': 'miss'})
+        self.assertEqual([
+            (call['method'], call['domain'], call['status'])
+            for call in report['calls']
+        ], [
+            ('listRRs', 'example.com', '200'),
+            ('addRR', 'example.com', '200'),
+        ])
+        self.assertTrue(all(call['latency'] >= 0 for call in report['calls']))
+        self.assertEqual(report['records'], [{
+            'entry': 'ddns.example.com',
+            'type': 'A',
+            'action': 'created',
+            'value': '203.0.113.1',
+            'previous': None,
+        }])
+        self.assertEqual(report['phases']['name'], 'run')
+        self.assertIn('cache-save',
+            [child['name'] for child in report['phases']['children']])
+
+        self.assertEqual(cached_report['state'], 'ok')
+        self.assertEqual(cached_report['cache'], {'ipv4': 'hit'})
+        self.assertEqual(cached_report['calls'], [])
+        self.assertEqual(cached_report['records'], [])
+
+    def test_engine_shared(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir, \
+                FakeNfsnServer() as nfsn, FakeIpServer('203.0.113.1') as ip:
+            os.environ['NFSN_DDNS_NFSN_API_ENDPOINT'] = f'{nfsn.url}/dns'
+            os.environ['NFSN_DDNS_MYIPV4_API_ENDPOINTS'] = f'{ip.url}/ip'
+
+            # concurrent instances on a host sharing a cache file
+            def instance() -> Namespace:
+                return argument_parser().parse_args([
+                    '--api-login', FAKE_LOGIN,
+                    '--api-token', FAKE_TOKEN,
+                    '--cache',
+                    '--cache-file', str(Path(work_dir) / 'cache'),
+                    '--no-ipv6',
+                    '--ddns-domain', 'ddns.example.com',
+                ])
+
+            async def run() -> list[int]:
+                return list(await asyncio.gather(
+                    engine_async(instance()),
+                    engine_async(instance()),
+                ))
+
+            with redirect_stdout(io.StringIO()):
+                states = asyncio.run(run())
+
+        self.assertEqual(states, [EngineState.OK, EngineState.OK])
+        self.assertEqual(ip.requests, 1)
+        self.assertEqual(nfsn.requests['listRRs'], 1)
+        self.assertEqual(nfsn.requests['addRR'], 1)
+
+    def test_engine_update(self) -> None:
+        with FakeNfsnServer() as nfsn, FakeIpServer('203.0.113.1') as ip:
+            nfsn.populate('example.com', 5)
+
+            entries = ['a.example.com', 'b.example.com', 'c.example.org']
+            state = self.run_engine(nfsn, ip,
+                '--api-token', FAKE_TOKEN,
+                '--ddns-domain', *entries)
+            self.assertEqual(state, EngineState.OK)
+            self.assertEqual(nfsn.requests['addRR'], 3)
+
+            ip.address = '203.0.113.2'
+            state = self.run_engine(nfsn, ip,
+                '--api-token', FAKE_TOKEN,
+                '--ddns-domain', *entries)
+            self.assertEqual(state, EngineState.OK)
+            self.assertEqual(nfsn.requests['replaceRR'], 3)
+
+        records = [
+            rr for rr in nfsn.zones['example.com'] if rr['type'] == 'A'
+        ]
+        self.assertEqual(len(records), 2)
+        for rr in records:
+            self.assertEqual(rr['data'], '203.0.113.2')
+
+    def test_engine_verify_profiles(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir, \
+                FakeNfsnServer() as nfsn, FakeIpServer('203.0.113.1') as ip, \
+                FakeDnsServer() as ns1, FakeDnsServer() as ns2:
+            # each zone is served by its own nameserver
+            ns1.records[('ddns.example.com', 'A')] = ['203.0.113.1']
+            ns2.records[('ddns.example.org', 'A')] = ['203.0.113.1']
+
+            cfg_file = Path(work_dir) / 'config.yaml'
+            cfg_file.write_text(f"""
+nfsn-ddns:
+  profiles:
+    com:
+      domains:
+        - ddns.example.com
+      verify-nameservers:
+        - {ns1.nameserver}
+    org:
+      domains:
+        - ddns.example.org
+      verify-nameservers:
+        - {ns2.nameserver}
+""")
+
+            state = self.run_engine(nfsn, ip,
+                '--api-token', FAKE_TOKEN,
+                '--cfg', str(cfg_file))
+
+        # records of each profile are verified through its own nameservers
+        self.assertEqual(state, EngineState.OK)
+        self.assertEqual(nfsn.requests['listRRs'], 0)
+        self.assertGreater(ns1.requests, 0)
+        self.assertGreater(ns2.requests, 0)
+
+    def test_engine_zones(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir, \
+                FakeNfsnServer() as nfsn, FakeIpServer('203.0.113.1') as ip:
+            cfg_file = Path(work_dir) / 'config.yaml'
+            cfg_file.write_text("""
+nfsn-ddns:
+  zones:
+    example.com:
+      - name: www
+        type: A
+        data: '{ipv4}'
+      - name: ''
+        type: TXT
+        data: [a, b]
+""")
+
+            nfsn.zones['example.com'] = [
+                {'name': '', 'type': 'TXT', 'data': 'c', 'ttl': 3600},
+            ]
+
+            state = self.run_engine(nfsn, ip,
+                '--api-token', FAKE_TOKEN,
+                '--cfg', str(cfg_file))
+            self.assertEqual(state, EngineState.OK)
+            self.assertEqual(nfsn.requests['listRRs'], 1)
+
+        records = {
+            (rr['name'], rr['type'], rr['data'])
+            for rr in nfsn.zones['example.com']
+        }
+        self.assertEqual(records, {
+            ('www', 'A', '203.0.113.1'),
+            ('', 'TXT', 'a'),
+            ('', 'TXT', 'b'),
+        })
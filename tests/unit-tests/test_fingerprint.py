@@ -0,0 +1,99 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from nfsn_ddns.fingerprint import local_fingerprint
+from tests import NfsnDdnsTestCase
+from pathlib import Path
+import tempfile
+
+# ipv4 fib trie listing of a host with a single address
+FIB_TRIE = '''Main:
+  +-- 0.0.0.0/0 3 0 5
+     |-- 0.0.0.0
+        /0 universe UNICAST
+     +-- 192.0.2.0/24 2 0 2
+        |-- 192.0.2.0
+           /24 link UNICAST
+        |-- 192.0.2.10
+           /32 host LOCAL
+'''
+
+# ipv6 address listing of a host with a single global address
+IF_INET6 = (
+    '20010db8000000000000000000000010 02 40 00 80     eth0\n'
+    'fe800000000000000000000000000010 02 40 20 80     eth0\n'
+)
+
+# ipv6 route listing with a default route
+IPV6_ROUTE = (
+    '00000000000000000000000000000000 00 00000000000000000000000000000000 00 '
+    'fe800000000000000000000000000001 00000400 00000001 00000000 00000003 '
+    '    eth0\n'
+)
+
+# ipv4 route listing with a default route (through 192.0.2.1)
+ROUTE = (
+    'Iface\tDestination\tGateway \tFlags\tRefCnt\tUse\tMetric\tMask\t\t'
+    'MTU\tWindow\tIRTT\n'
+    'eth0\t00000000\t010200C0\t0003\t0\t0\t0\t00000000\t0\t0\t0\n'
+    'eth0\t000200C0\t00000000\t0001\t0\t0\t0\t00FFFFFF\t0\t0\t0\n'
+)
+
+
+class TestFingerprint(NfsnDdnsTestCase):
+    def test_fingerprint_changes(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir:
+            proc_net = Path(work_dir) / 'net'
+            proc_net.mkdir()
+            (proc_net / 'fib_trie').write_text(FIB_TRIE)
+            (proc_net / 'if_inet6').write_text(IF_INET6)
+            (proc_net / 'ipv6_route').write_text(IPV6_ROUTE)
+            (proc_net / 'route').write_text(ROUTE)
+            lease = Path(work_dir) / 'lease'
+            lease.write_text('lease-1')
+
+            fingerprint = local_fingerprint([lease], proc_net=proc_net)
+            self.assertIsNotNone(fingerprint)
+            self.assertEqual(local_fingerprint([lease], proc_net=proc_net),
+                fingerprint)
+
+            # a renewed lease
+            lease.write_text('lease-2')
+            leased = local_fingerprint([lease], proc_net=proc_net)
+            self.assertNotEqual(leased, fingerprint)
+
+            # a changed default gateway
+            (proc_net / 'route').write_text(ROUTE.replace('010200C0',
+                'FE0200C0'))
+            routed = local_fingerprint([lease], proc_net=proc_net)
+            self.assertNotEqual(routed, leased)
+
+            # a changed interface address
+            (proc_net / 'fib_trie').write_text(FIB_TRIE.replace('192.0.2.10',
+                '192.0.2.11'))
+            addressed = local_fingerprint([lease], proc_net=proc_net)
+            self.assertNotEqual(addressed, routed)
+
+            # a changed ipv6 address
+            (proc_net / 'if_inet6').write_text(IF_INET6.replace(
+                '20010db8000000000000000000000010',
+                '20010db8000000000000000000000011'))
+            self.assertNotEqual(local_fingerprint([lease], proc_net=proc_net),
+                addressed)
+
+    def test_fingerprint_ignored_state(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir:
+            proc_net = Path(work_dir)
+            (proc_net / 'fib_trie').write_text(FIB_TRIE)
+            (proc_net / 'route').write_text(ROUTE)
+            fingerprint = local_fingerprint(proc_net=proc_net)
+
+            # routes other than the default route are not considered
+            (proc_net / 'route').write_text(ROUTE.replace('00FFFFFF',
+                '0000FFFF'))
+            self.assertEqual(local_fingerprint(proc_net=proc_net),
+                fingerprint)
+
+    def test_fingerprint_unavailable(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir:
+            self.assertIsNone(local_fingerprint(proc_net=Path(work_dir)))
@@ -0,0 +1,53 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from nfsn_ddns.flight import SingleFlight
+from nfsn_ddns.flight import atomic_write
+from pathlib import Path
+from tests import NfsnDdnsTestCase
+import asyncio
+import json
+import tempfile
+
+
+class TestFlight(NfsnDdnsTestCase):
+    def test_flight_shared(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir:
+            state_dir = Path(work_dir)
+            calls = []
+
+            async def detect(flight: SingleFlight) -> str:
+                async with flight.hold('myipv4') as shared:
+                    if shared.data:
+                        return shared.data['address']
+
+                    calls.append(1)
+                    await asyncio.sleep(0.2)
+                    shared.publish({'address': '203.0.113.1'})
+                    return '203.0.113.1'
+
+            async def run() -> list[str]:
+                # separate instances contend on the same lock file
+                return list(await asyncio.gather(
+                    detect(SingleFlight(state_dir)),
+                    detect(SingleFlight(state_dir)),
+                ))
+
+            self.assertEqual(asyncio.run(run()),
+                ['203.0.113.1', '203.0.113.1'])
+            self.assertEqual(len(calls), 1)
+
+    def test_flight_stale(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir:
+            state_dir = Path(work_dir)
+            atomic_write(state_dir / 'myipv4.json', json.dumps({
+                'time': 0,
+                'data': {'address': '203.0.113.1'},
+            }))
+
+            async def run() -> dict | None:
+                async with SingleFlight(state_dir).hold('myipv4') as shared:
+                    return shared.data
+
+            self.assertIsNone(asyncio.run(run()))
+            self.assertEqual(list(state_dir.glob('*.tmp')), [])
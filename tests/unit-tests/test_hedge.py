@@ -0,0 +1,68 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from nfsn_ddns.client import NfsnClient
+from nfsn_ddns.hedge import LatencyTracker
+from tests import NfsnDdnsTestCase
+from tests.fakes import FAKE_LOGIN
+from tests.fakes import FAKE_TOKEN
+from tests.fakes import FakeNfsnServer
+import time
+
+
+class TestHedge(NfsnDdnsTestCase):
+    def test_hedge_read(self) -> None:
+        tracker = LatencyTracker(0.95, fallback=0.1)
+
+        with FakeNfsnServer() as nfsn:
+            nfsn.zones['example.com'] = [
+                {'name': 'ddns', 'type': 'A', 'data': '203.0.113.1',
+                    'ttl': 3600},
+            ]
+
+            client = NfsnClient(FAKE_LOGIN, FAKE_TOKEN,
+                endpoint=f'{nfsn.url}/dns', hedge=tracker)
+
+            # a slow read is answered by a second (independently signed)
+            # request
+            nfsn.delays = [2]
+            start = time.monotonic()
+            records = client.list_rrs('example.com', name='ddns')
+            elapsed = time.monotonic() - start
+
+            self.assertLess(elapsed, 2)
+            self.assertEqual(len(records), 1)
+            self.assertEqual(nfsn.requests['listRRs'], 2)
+
+            # a read answered in time is not hedged
+            client.list_rrs('example.com', name='ddns')
+            self.assertEqual(nfsn.requests['listRRs'], 3)
+
+    def test_hedge_tracker(self) -> None:
+        tracker = LatencyTracker(0.9, fallback=1)
+
+        # the fallback applies until enough latencies are known
+        tracker.observe(0.1)
+        self.assertEqual(tracker.delay(), 1)
+
+        for idx in range(2, 11):
+            tracker.observe(idx / 10)
+        self.assertAlmostEqual(tracker.delay(), 0.9)
+
+        restored = LatencyTracker(0.9, fallback=1)
+        restored.load([*tracker.dump(), 'invalid', -1])
+        self.assertEqual(restored.dump(), tracker.dump())
+
+    def test_hedge_write(self) -> None:
+        tracker = LatencyTracker(0.95, fallback=0.1)
+
+        with FakeNfsnServer() as nfsn:
+            client = NfsnClient(FAKE_LOGIN, FAKE_TOKEN,
+                endpoint=f'{nfsn.url}/dns', hedge=tracker)
+
+            # writes are never hedged
+            nfsn.delays = [0.5]
+            client.add_rr('example.com', 'ddns', 'A', '203.0.113.1')
+
+        self.assertEqual(nfsn.requests['addRR'], 1)
+        self.assertEqual(len(nfsn.zones['example.com']), 1)
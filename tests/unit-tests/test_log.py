@@ -0,0 +1,86 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from contextlib import redirect_stdout
+from nfsn_ddns import log as nfsn_ddns_log
+from nfsn_ddns.log import err
+from nfsn_ddns.log import log
+from nfsn_ddns.log import nfsn_ddns_log_configuration
+from nfsn_ddns.log import nfsn_ddns_log_shutdown
+from nfsn_ddns.log import verbose
+from tests import NfsnDdnsTestCase
+import io
+import json
+
+
+class TrackedValue:
+    def __init__(self) -> None:
+        self.formatted = 0
+
+    def __format__(self, spec: str) -> str:
+        self.formatted += 1
+        return 'tracked'
+
+
+class TestLog(NfsnDdnsTestCase):
+    def setUp(self) -> None:
+        self.nocolor = nfsn_ddns_log.NFSN_DDNS_LOG_NOCOLOR_FLAG
+        self.verbose = nfsn_ddns_log.NFSN_DDNS_LOG_VERBOSE_FLAG
+
+    def tearDown(self) -> None:
+        nfsn_ddns_log_configuration(nocolor=self.nocolor,
+            verbose_=self.verbose)
+
+    def capture(self, fmt: str, *, background: bool = False,
+            verbose_: bool = True) -> list[str]:
+        output = io.StringIO()
+        with redirect_stdout(output):
+            nfsn_ddns_log_configuration(nocolor=True, verbose_=verbose_,
+                fmt=fmt, background=background)
+            log('a message: {}', 'value')
+            verbose('a {} message', 'verbose')
+            err('an error {braces}')
+            nfsn_ddns_log_shutdown()
+
+        return output.getvalue().splitlines()
+
+    def test_log_background(self) -> None:
+        lines = self.capture('text', background=True)
+
+        self.assertEqual(lines, [
+            'a message: value',
+            '(verbose) a verbose message',
+            '(error) an error {braces}',
+        ])
+
+    def test_log_json(self) -> None:
+        messages = [json.loads(line) for line in self.capture('json')]
+
+        self.assertEqual([
+            (message['level'], message['message']) for message in messages
+        ], [
+            ('info', 'a message: value'),
+            ('debug', 'a verbose message'),
+            ('error', 'an error {braces}'),
+        ])
+        self.assertTrue(all('time' in message for message in messages))
+
+    def test_log_lazy(self) -> None:
+        value = TrackedValue()
+        with redirect_stdout(io.StringIO()):
+            nfsn_ddns_log_configuration(nocolor=True, verbose_=False)
+            verbose('a verbose message: {}', value)
+            self.assertEqual(value.formatted, 0)
+
+            log('a message: {}', value)
+            self.assertEqual(value.formatted, 1)
+
+    def test_log_logfmt(self) -> None:
+        lines = self.capture('logfmt', verbose_=False)
+
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('time='))
+        self.assertTrue(lines[0].endswith(
+            ' level=info msg="a message: value"'))
+        self.assertTrue(lines[1].endswith(
+            ' level=error msg="an error {braces}"'))
@@ -0,0 +1,50 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from nfsn_ddns.metrics import Counter
+from nfsn_ddns.metrics import Histogram
+from nfsn_ddns.metrics import MetricsServer
+from tests import NfsnDdnsTestCase
+import urllib.error
+import urllib.request
+
+
+class TestMetrics(NfsnDdnsTestCase):
+    def test_metrics_counter(self) -> None:
+        counter = Counter('test_total', 'Test counter.', ('method',))
+        counter.inc(method='listRRs')
+        counter.inc(2, method='listRRs')
+        counter.inc(method='a"b')
+
+        lines = counter.render()
+        self.assertIn('# TYPE test_total counter', lines)
+        self.assertIn('test_total{method="listRRs"} 3', lines)
+        self.assertIn(r'test_total{method="a\"b"} 1', lines)
+
+    def test_metrics_histogram(self) -> None:
+        histogram = Histogram('test_seconds', 'Test histogram.',
+            buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5.0)
+
+        lines = histogram.render()
+        self.assertIn('test_seconds_bucket{le="0.1"} 1', lines)
+        self.assertIn('test_seconds_bucket{le="1.0"} 2', lines)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 3', lines)
+        self.assertIn('test_seconds_sum 5.55', lines)
+        self.assertIn('test_seconds_count 3', lines)
+
+    def test_metrics_server(self) -> None:
+        server = MetricsServer('127.0.0.1', 0)
+        server.start()
+        try:
+            base = f'http://127.0.0.1:{server.port}'
+            with urllib.request.urlopen(f'{base}/metrics') as rsp:  # noqa: S310
+                body = rsp.read().decode('utf-8')
+            self.assertIn('# TYPE nfsn_ddns_runs_total counter', body)
+
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(f'{base}/other')  # noqa: S310
+        finally:
+            server.stop()
@@ -0,0 +1,144 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from __future__ import annotations
+from nfsn_ddns import dns
+from nfsn_ddns import stun
+from nfsn_ddns.myip_async import fetch_myipv4_async
+from nfsn_ddns.myip_async import fetch_myipv6_async
+from pathlib import Path
+from tests import NfsnDdnsTestCase
+from typing import TYPE_CHECKING
+import asyncio
+import ipaddress
+import struct
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from collections.abc import Coroutine
+    from typing import Any
+    from typing import TypeVar
+
+    T = TypeVar('T', bound='NfsnDdnsTestCase')
+
+
+class UdpResponder(asyncio.DatagramProtocol):
+    def __init__(self, handler: Callable[[bytes], bytes | None]) -> None:
+        self.handler = handler
+        self.transport = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr: tuple) -> None:
+        reply = self.handler(data)
+        if reply:
+            self.transport.sendto(reply, addr)
+
+
+def dns_reply(query: bytes, rtype: int, rdata: bytes) -> bytes:
+    qid = struct.unpack_from('!H', query)[0]
+    header = struct.pack('!HHHHHH', qid, 0x8180, 1, 1, 0, 0)
+    answer = b'\xc0\x0c' + struct.pack('!HHIH', rtype, 1, 60, len(rdata))
+    return header + query[12:] + answer + rdata
+
+
+def stun_reply(request: bytes, address: str) -> bytes:
+    txid = request[8:20]
+    cookie = struct.pack('!I', stun.STUN_MAGIC_COOKIE)
+    raw = ipaddress.ip_address(address).packed
+    xored = bytes(a ^ b for a, b in zip(raw, cookie, strict=True))
+    xport = 1234 ^ (stun.STUN_MAGIC_COOKIE >> 16)
+    value = struct.pack('!BBH', 0, 0x01, xport) + xored
+    attr = struct.pack('!HH', stun.STUN_ATTR_XOR_MAPPED_ADDRESS, len(value))
+    header = struct.pack('!HHI', stun.STUN_BINDING_RESPONSE,
+        len(attr) + len(value), stun.STUN_MAGIC_COOKIE)
+    return header + txid + attr + value
+
+
+async def with_responder(handler: Callable[[bytes], bytes | None],
+        func: Callable[[int], Coroutine[Any, Any, str]]) -> str:
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: UdpResponder(handler), local_addr=('127.0.0.1', 0))
+    try:
+        port = transport.get_extra_info('sockname')[1]
+        return await func(port)
+    finally:
+        transport.close()
+
+
+class TestMyIpAsync(NfsnDdnsTestCase):
+    @classmethod
+    def setUpClass(cls: type[T]) -> None:
+        test_dir = Path(__file__).parent
+        cls.assets = test_dir / 'assets'
+
+    def test_myip_async_cmd_valid_ipv4(self) -> None:
+        expected_ip = '203.0.113.45'
+        cmd = f'python {self.assets / "fetch-ipv4.py"}'
+
+        found_ip = asyncio.run(fetch_myipv4_async(cmd=cmd))
+        self.assertEqual(found_ip, expected_ip)
+
+    def test_myip_async_cmd_failed(self) -> None:
+        cmd = f'python {self.assets / "fetch-failed.py"}'
+
+        found_ip = asyncio.run(fetch_myipv4_async(cmd=cmd))
+        self.assertFalse(found_ip)
+
+    def test_myip_async_cmd_unexpected_ipv4(self) -> None:
+        cmd = f'python {self.assets / "fetch-ipv4.py"}'
+
+        found_ip = asyncio.run(fetch_myipv6_async(cmd=cmd))
+        self.assertFalse(found_ip)
+
+    def test_myip_async_dns_valid_ipv4(self) -> None:
+        expected_ip = '203.0.113.5'
+        rdata = ipaddress.IPv4Address(expected_ip).packed
+
+        found_ip = asyncio.run(with_responder(
+            lambda query: dns_reply(query, dns.QTYPE_A, rdata),
+            lambda port: fetch_myipv4_async(
+                endpoints=f'dns://127.0.0.1:{port}/myip.example.com')))
+        self.assertEqual(found_ip, expected_ip)
+
+    def test_myip_async_dns_txt(self) -> None:
+        expected_ip = '203.0.113.6'
+        rdata = bytes([len(expected_ip)]) + expected_ip.encode()
+
+        found_ip = asyncio.run(with_responder(
+            lambda query: dns_reply(query, dns.QTYPE_TXT, rdata),
+            lambda port: fetch_myipv4_async(
+                endpoints=f'dns://127.0.0.1:{port}/myip.example.com?type=txt')))
+        self.assertEqual(found_ip, expected_ip)
+
+    def test_myip_async_dns_timeout(self) -> None:
+        found_ip = asyncio.run(with_responder(
+            lambda _: None,
+            lambda port: fetch_myipv4_async(
+                endpoints=f'dns://127.0.0.1:{port}/myip.example.com',
+                timeout=0.2)))
+        self.assertFalse(found_ip)
+
+    def test_myip_async_stun_invalid_endpoint(self) -> None:
+        expected_ip = '203.0.113.8'
+
+        # endpoints without a host or with a bad port are skipped
+        found_ip = asyncio.run(with_responder(
+            lambda request: stun_reply(request, expected_ip),
+            lambda port: fetch_myipv4_async(endpoints=[
+                'stun://',
+                'stun://127.0.0.1:abc',
+                f'stun://127.0.0.1:{port}',
+            ])))
+        self.assertEqual(found_ip, expected_ip)
+
+    def test_myip_async_stun_valid_ipv4(self) -> None:
+        expected_ip = '203.0.113.7'
+
+        found_ip = asyncio.run(with_responder(
+            lambda request: stun_reply(request, expected_ip),
+            lambda port: fetch_myipv4_async(
+                endpoints=f'stun://127.0.0.1:{port}')))
+        self.assertEqual(found_ip, expected_ip)
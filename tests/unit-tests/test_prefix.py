@@ -0,0 +1,74 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from contextlib import redirect_stderr
+from contextlib import redirect_stdout
+from nfsn_ddns.prefix import detect_interface_prefix
+from nfsn_ddns.prefix import detect_prefix
+from nfsn_ddns.prefix import prefix_address
+from nfsn_ddns.prefix import prefix_zones
+from nfsn_ddns.sync import RecordSet
+from pathlib import Path
+from tests import NfsnDdnsTestCase
+import ipaddress
+import io
+import tempfile
+
+
+class TestPrefix(NfsnDdnsTestCase):
+    def test_prefix_address(self) -> None:
+        prefix = detect_prefix('2001:db8:1:2f0::5', 56)
+        self.assertEqual(prefix, ipaddress.IPv6Network('2001:db8:1:200::/56'))
+
+        self.assertEqual(prefix_address(prefix, '::10'), '2001:db8:1:200::10')
+        self.assertEqual(prefix_address(prefix, '::1:0:0:0:10'),
+            '2001:db8:1:201::10')
+
+        # bits of an interface identifier within the prefix are ignored
+        self.assertEqual(prefix_address(prefix, 'ffff::10'),
+            '2001:db8:1:200::10')
+
+        self.assertIsNone(detect_prefix('203.0.113.1', 56))
+
+    def test_prefix_interface(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir:
+            if_inet6 = Path(work_dir) / 'if_inet6'
+            if_inet6.write_text(
+                # link-local
+                'fe800000000000000000000000000001 02 40 20 80     eth0\n'
+                # unique local
+                'fd000000000000000000000000000001 02 40 00 80     eth0\n'
+                # temporary
+                '20010db8000100020000000000000099 02 40 00 01     eth0\n'
+                # another interface
+                '20010db8000900000000000000000001 03 40 00 80     eth1\n'
+                # global
+                '20010db8000100020000000000000001 02 40 00 80     eth0\n',
+            )
+
+            prefix = detect_interface_prefix('eth0', 56, if_inet6)
+            self.assertEqual(prefix,
+                ipaddress.IPv6Network('2001:db8:1::/56'))
+
+            with redirect_stdout(io.StringIO()), \
+                    redirect_stderr(io.StringIO()):
+                self.assertIsNone(detect_interface_prefix('eth2', 56,
+                    if_inet6))
+
+    def test_prefix_zones(self) -> None:
+        prefix = ipaddress.IPv6Network('2001:db8:1::/48')
+        zones = prefix_zones({
+            'a.example.com': '::1',
+            'b.example.com': '::2',
+            'example.org': '::3',
+        }, prefix)
+
+        self.assertEqual(zones, {
+            'example.com': [
+                RecordSet('a', 'AAAA', frozenset(['2001:db8:1::1'])),
+                RecordSet('b', 'AAAA', frozenset(['2001:db8:1::2'])),
+            ],
+            'example.org': [
+                RecordSet('', 'AAAA', frozenset(['2001:db8:1::3'])),
+            ],
+        })
@@ -0,0 +1,131 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from contextlib import redirect_stdout
+from nfsn_ddns.client import NfsnClient
+from nfsn_ddns.config import ReceiverUser
+from nfsn_ddns.receiver import DyndnsReceiver
+from nfsn_ddns.receiver import ReceiverHost
+from nfsn_ddns.receiver import ReceiverServer
+from nfsn_ddns.updater import DdnsUpdater
+from tests import NfsnDdnsTestCase
+from tests.fakes import FAKE_LOGIN
+from tests.fakes import FAKE_TOKEN
+from tests.fakes import FakeNfsnServer
+import asyncio
+import io
+import requests
+
+
+class TestReceiver(NfsnDdnsTestCase):
+    def test_receiver_coalesce(self) -> None:
+        with FakeNfsnServer() as nfsn:
+            nfsn.zones['example.com'] = [
+                {'name': 'a', 'type': 'A', 'data': '203.0.113.9', 'ttl': 180},
+                {'name': 'b', 'type': 'A', 'data': '203.0.113.2', 'ttl': 180},
+            ]
+
+            receiver = self._receiver(nfsn, ['a.example.com', 'b.example.com'])
+            user = receiver.users['router']
+
+            # a burst of pushes results in a single write of the latest value
+            for address in ['203.0.113.1', '203.0.113.3', '203.0.113.4']:
+                self.assertEqual(
+                    receiver.submit(user, ['a.example.com'], [address]),
+                    [f'good {address}'])
+
+            self.assertEqual(
+                receiver.submit(user, ['b.example.com'], ['203.0.113.2']),
+                ['good 203.0.113.2'])
+
+            with redirect_stdout(io.StringIO()):
+                delay = asyncio.run(receiver.process())
+
+            self.assertIsNone(delay)
+            self.assertEqual(nfsn.requests['listRRs'], 2)
+            self.assertEqual(nfsn.requests['replaceRR'], 1)
+            self.assertEqual(nfsn.zones['example.com'][-1]['data'],
+                '203.0.113.4')
+
+            # repeated pushes of an applied address are not queued
+            self.assertEqual(
+                receiver.submit(user, ['a.example.com'], ['203.0.113.4']),
+                ['nochg 203.0.113.4'])
+
+            # a change within the interval is held until the interval ends
+            self.assertEqual(
+                receiver.submit(user, ['a.example.com'], ['203.0.113.5']),
+                ['good 203.0.113.5'])
+
+            with redirect_stdout(io.StringIO()):
+                delay = asyncio.run(receiver.process())
+
+            self.assertGreater(delay, 0)
+            self.assertEqual(nfsn.requests['listRRs'], 2)
+
+    def test_receiver_reject(self) -> None:
+        receiver = DyndnsReceiver({}, {
+            'router': ReceiverUser('secret', frozenset({'a.example.com'})),
+        })
+        user = receiver.users['router']
+
+        receiver.hosts['a.example.com'] = receiver.hosts['b.example.com'] = \
+            ReceiverHost(None, '', ipv4=True, ipv6=False)
+
+        self.assertEqual(receiver.submit(user, ['b.example.com'],
+            ['203.0.113.1']), ['nohost'])
+        self.assertEqual(receiver.submit(user, ['c.example.com'],
+            ['203.0.113.1']), ['nohost'])
+        self.assertEqual(receiver.submit(user, ['example'],
+            ['203.0.113.1']), ['notfqdn'])
+        self.assertEqual(receiver.submit(user, ['a.example.com'],
+            ['invalid']), ['911'])
+
+        self.assertIsNone(receiver.authenticate(None))
+        self.assertIsNone(receiver.authenticate('Basic cm91dGVyOndyb25n'))
+        self.assertEqual(receiver.authenticate('Basic cm91dGVyOnNlY3JldA=='),
+            user)
+
+    def test_receiver_server(self) -> None:
+        with FakeNfsnServer() as nfsn:
+            receiver = self._receiver(nfsn, ['a.example.com'])
+            server = ReceiverServer('127.0.0.1', 0, receiver)
+            server.start()
+            try:
+                url = f'http://127.0.0.1:{server.port}/nic/update'
+                params = {
+                    'hostname': 'a.example.com',
+                    'myip': '203.0.113.1',
+                }
+
+                rsp = requests.get(url, params=params, timeout=10,
+                    auth=('router', 'wrong'))
+                self.assertEqual(rsp.status_code, 401)
+                self.assertEqual(rsp.text, 'badauth')
+
+                rsp = requests.get(url, params=params, timeout=10,
+                    auth=('router', 'secret'))
+                self.assertEqual(rsp.status_code, 200)
+                self.assertEqual(rsp.text, 'good 203.0.113.1')
+            finally:
+                server.stop()
+
+            with redirect_stdout(io.StringIO()):
+                asyncio.run(receiver.process())
+
+            self.assertEqual(nfsn.zones['example.com'], [
+                {'name': 'a', 'type': 'A', 'data': '203.0.113.1', 'ttl': 3600},
+            ])
+
+    def _receiver(self, nfsn: FakeNfsnServer,
+            hostnames: list[str]) -> DyndnsReceiver:
+        client = NfsnClient(FAKE_LOGIN, FAKE_TOKEN,
+            endpoint=f'{nfsn.url}/dns')
+        host = ReceiverHost(DdnsUpdater(client), '', ipv4=True, ipv6=True)
+
+        return DyndnsReceiver(
+            dict.fromkeys(hostnames, host),
+            {'router': ReceiverUser('secret')},
+            interval=60,
+            window=0,
+        )
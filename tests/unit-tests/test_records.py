@@ -0,0 +1,68 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from nfsn_ddns.records import RecordState
+from nfsn_ddns.records import RecordTable
+from nfsn_ddns.records import RecordType
+from tests import NfsnDdnsTestCase
+
+
+class TestRecords(NfsnDdnsTestCase):
+    def test_records_discard(self) -> None:
+        table = RecordTable()
+        table.set('example.com', 'a', 'A', '203.0.113.1', 1)
+        table.set('example.com', 'b', 'A', '203.0.113.2', 2)
+        table.set('example.com', 'c', 'AAAA', '2001:db8::3', 3)
+
+        # removing a row moves the last row into its position
+        self.assertTrue(table.discard('example.com', 'a', 'A'))
+        self.assertFalse(table.discard('example.com', 'a', 'A'))
+        self.assertFalse(table.discard('example.com', 'unknown', 'A'))
+
+        self.assertEqual(len(table), 2)
+        self.assertIsNone(table.get('example.com', 'a', 'A'))
+        self.assertEqual(table.address('example.com', 'b', 'A'),
+            '203.0.113.2')
+        self.assertEqual(table.get('example.com', 'c', 'AAAA'),
+            RecordState('example.com', 'c', RecordType.AAAA, '2001:db8::3',
+                3))
+
+    def test_records_invalid(self) -> None:
+        table = RecordTable()
+
+        with self.assertRaises(ValueError):
+            table.set('example.com', 'ddns', 'TXT', 'value')
+
+        with self.assertRaises(ValueError):
+            table.set('example.com', 'ddns', 'A', '2001:db8::1')
+
+        with self.assertRaises(ValueError):
+            table.set('example.com', 'ddns', 'AAAA', '203.0.113.1')
+
+        self.assertEqual(len(table), 0)
+
+    def test_records_set(self) -> None:
+        table = RecordTable()
+        table.set('example.com', 'ddns', 'A', '203.0.113.1', 10)
+        table.set('example.com', 'ddns', 'aaaa', '2001:db8::1', 10)
+        table.set('example.org', 'ddns', RecordType.A, '198.51.100.1', 10)
+
+        self.assertEqual(len(table), 3)
+        self.assertEqual(table.get('example.com', 'ddns', 'A'),
+            RecordState('example.com', 'ddns', RecordType.A, '203.0.113.1',
+                10))
+        self.assertEqual(table.address('example.com', 'ddns', 'AAAA'),
+            '2001:db8::1')
+        self.assertEqual(table.address('example.org', 'ddns', 'A'),
+            '198.51.100.1')
+        self.assertIsNone(table.get('example.org', 'ddns', 'AAAA'))
+
+        # updating a record replaces its row
+        table.set('example.com', 'ddns', 'A', '203.0.113.2', 20)
+        self.assertEqual(len(table), 3)
+        self.assertEqual(table.get('example.com', 'ddns', 'A').address,
+            '203.0.113.2')
+        self.assertEqual(table.get('example.com', 'ddns', 'A').checked, 20)
+
+        self.assertEqual(sorted(str(state.type) for state in table),
+            ['A', 'A', 'AAAA'])
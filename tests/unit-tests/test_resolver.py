@@ -0,0 +1,129 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from nfsn_ddns.resolver import ResolverCache
+from nfsn_ddns.resolver import endpoint_host
+from nfsn_ddns.resolver import pin_endpoint
+from nfsn_ddns.session import new_session
+from tests import NfsnDdnsTestCase
+from tests.fakes import FakeIpServer
+from urllib3.exceptions import NameResolutionError
+from urllib3.exceptions import NewConnectionError
+import requests
+import socket
+import time
+
+
+class TestResolver(NfsnDdnsTestCase):
+    def test_resolver_connect(self) -> None:
+        resolver = ResolverCache()
+
+        with FakeIpServer() as ip:
+            port = ip.server.server_address[1]
+            host = 'nfsn-ddns.invalid'
+            endpoint = f'http://{host}:{port}/ip'
+
+            # each resolved address is attempted until a connection is made
+            # (the fake server only listens on 127.0.0.1)
+            resolver.set(host, port, socket.AF_UNSPEC, (
+                (socket.AF_INET, ('127.0.0.2', port)),
+                (socket.AF_INET, ('127.0.0.1', port)),
+            ))
+
+            with new_session(resolver=resolver) as session:
+                rsp = session.get(endpoint, timeout=5)
+                self.assertEqual(rsp.text, '127.0.0.1')
+
+            # failures are raised as urllib3 raises for its own connections
+            resolver.set(host, port, socket.AF_UNSPEC,
+                ((socket.AF_INET, ('127.0.0.2', port)),))
+
+            with new_session(resolver=resolver) as session:
+                with self.assertRaises(
+                        requests.exceptions.ConnectionError) as ctx:
+                    session.get(endpoint, timeout=5)
+                self.assertIsInstance(ctx.exception.args[0].reason,
+                    NewConnectionError)
+
+                with self.assertRaises(
+                        requests.exceptions.ConnectionError) as ctx:
+                    session.get(f'http://{host}:{port + 1}/ip', timeout=5)
+                self.assertIsInstance(ctx.exception.args[0].reason,
+                    NameResolutionError)
+
+            self.assertEqual(ip.requests, 1)
+
+    def test_resolver_endpoint_host(self) -> None:
+        self.assertEqual(endpoint_host('https://api.ipify.org'),
+            ('api.ipify.org', 443))
+        self.assertEqual(endpoint_host('http://[::1]:8080/ip'),
+            ('::1', 8080))
+        self.assertIsNone(endpoint_host('stun://stun.example.com'))
+        self.assertIsNone(endpoint_host('cmd://ip'))
+
+    def test_resolver_pin(self) -> None:
+        resolver = ResolverCache()
+
+        with FakeIpServer() as ip:
+            port = ip.server.server_address[1]
+            endpoint = f'http://localhost:{port}/ip'
+
+            with new_session(resolver=resolver) as session:
+                self.assertTrue(pin_endpoint(session, endpoint,
+                    socket.AF_INET))
+
+                # endpoints addressed by an ip address are never pinned
+                self.assertFalse(pin_endpoint(session, f'{ip.url}/ip',
+                    socket.AF_INET6))
+
+                rsp = session.get(endpoint, timeout=5)
+                self.assertEqual(rsp.text, '127.0.0.1')
+
+                # the request was resolved for the pinned family only
+                self.assertIsNotNone(resolver.get('localhost', port,
+                    socket.AF_INET))
+                self.assertIsNone(resolver.get('localhost', port))
+
+            # an endpoint pinned to ipv6 never connects over ipv4
+            resolver.set('localhost', port, socket.AF_INET6,
+                ((socket.AF_INET6, ('::1', port, 0, 0)),))
+
+            with new_session(resolver=resolver) as session:
+                self.assertTrue(pin_endpoint(session, endpoint,
+                    socket.AF_INET6))
+
+                with self.assertRaises(requests.exceptions.ConnectionError):
+                    session.get(endpoint, timeout=5)
+
+            self.assertEqual(ip.requests, 1)
+
+    def test_resolver_stale(self) -> None:
+        resolver = ResolverCache(ttl=60, stale=60)
+        key = ('nfsn-ddns.invalid', 80, socket.AF_UNSPEC)
+        addresses = ((socket.AF_INET, ('192.0.2.1', 80)),)
+
+        # an expired entry is used when the resolver fails
+        resolver.set(*key, addresses, ttl=-1)
+        self.assertEqual(resolver.resolve(*key), addresses)
+
+        # ...until the stale period has passed
+        resolver.set(*key, addresses, ttl=-61)
+        with self.assertRaises(OSError):
+            resolver.resolve(*key)
+
+    def test_resolver_ttl(self) -> None:
+        resolver = ResolverCache(ttl=60)
+        key = ('localhost', 80, socket.AF_INET)
+
+        addresses = resolver.resolve(*key)
+        self.assertTrue(addresses)
+        entry = resolver.get(*key)
+
+        # a fresh entry is reused
+        resolver.resolve(*key)
+        self.assertIs(resolver.get(*key), entry)
+
+        # an expired entry is resolved again
+        resolver.set(*key, addresses, ttl=-1)
+        resolver.resolve(*key)
+        self.assertGreater(resolver.get(*key).expires, time.monotonic())
@@ -0,0 +1,75 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from datetime import datetime
+from datetime import timezone
+from nfsn_ddns.schedule import CronSchedule
+from nfsn_ddns.schedule import ScheduleError
+from tests import NfsnDdnsTestCase
+
+
+# a monday morning
+NOW = datetime(2026, 10, 19, 8, 30, 15, tzinfo=timezone.utc)
+
+
+class TestSchedule(NfsnDdnsTestCase):
+    def test_schedule_days(self) -> None:
+        # restricting both days matches either day (the 13th or a friday)
+        schedule = CronSchedule('0 0 13 * fri')
+        self.assertEqual(schedule.next_run(NOW), _at(2026, 10, 23))
+        self.assertEqual(schedule.next_run(_at(2026, 11, 12)),
+            _at(2026, 11, 13))
+
+        # restricting a single day only matches that day
+        schedule = CronSchedule('0 0 * * sun')
+        self.assertEqual(schedule.next_run(NOW), _at(2026, 10, 25))
+
+        schedule = CronSchedule('0 0 * * 7')
+        self.assertEqual(schedule.next_run(NOW), _at(2026, 10, 25))
+
+    def test_schedule_fields(self) -> None:
+        expected = {
+            '0 */1 * * *': _at(2026, 10, 19, 9, 0),
+            '*/15 * * * *': _at(2026, 10, 19, 8, 45),
+            '0-30/10 9 * * *': _at(2026, 10, 19, 9, 0),
+            '5,35 * * * *': _at(2026, 10, 19, 8, 35),
+            '0 9 * * mon-fri': _at(2026, 10, 19, 9, 0),
+            '0 0 1 jan *': _at(2027, 1, 1),
+            '30 2 29 2 *': _at(2028, 2, 29, 2, 30),
+            '@daily': _at(2026, 10, 20),
+            '@hourly': _at(2026, 10, 19, 9, 0),
+        }
+
+        for expression, next_run in expected.items():
+            with self.subTest(expression=expression):
+                schedule = CronSchedule(expression)
+                self.assertEqual(schedule.next_run(NOW), next_run)
+
+    def test_schedule_invalid(self) -> None:
+        invalid = [
+            '',
+            '* * * *',
+            '60 * * * *',
+            '* 24 * * *',
+            '* * 0 * *',
+            '* * * 13 *',
+            '* * * * 8',
+            '30-10 * * * *',
+            '*/0 * * * *',
+            '* * * foo *',
+            '@never',
+        ]
+
+        for expression in invalid:
+            with self.subTest(expression=expression), \
+                    self.assertRaises(ScheduleError):
+                CronSchedule(expression)
+
+        # a schedule which never runs
+        schedule = CronSchedule('0 0 30 2 *')
+        with self.assertRaises(ScheduleError):
+            schedule.next_run(NOW)
+
+
+def _at(*args: int) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
@@ -0,0 +1,203 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from contextlib import redirect_stderr
+from contextlib import redirect_stdout
+from nfsn_ddns.__main__ import argument_parser
+from nfsn_ddns.daemon import daemon_async
+from nfsn_ddns.engine import EngineState
+from nfsn_ddns.status import request_async
+from nfsn_ddns.status import status
+from tests import NfsnDdnsTestCase
+from tests.fakes import FAKE_LOGIN
+from tests.fakes import FAKE_TOKEN
+from tests.fakes import FakeIpServer
+from tests.fakes import FakeNfsnServer
+from pathlib import Path
+import asyncio
+import io
+import os
+import signal
+import sys
+import tempfile
+import unittest
+
+
+@unittest.skipIf(sys.platform == 'win32', 'requires unix sockets')
+class TestStatus(NfsnDdnsTestCase):
+    def test_status_daemon(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir, \
+                FakeNfsnServer() as nfsn, FakeIpServer('203.0.113.1') as ip:
+            os.environ['NFSN_DDNS_NFSN_API_ENDPOINT'] = f'{nfsn.url}/dns'
+            os.environ['NFSN_DDNS_MYIPV4_API_ENDPOINTS'] = f'{ip.url}/ip'
+            status_socket = Path(work_dir) / 'status.sock'
+
+            args = argument_parser().parse_args([
+                'daemon',
+                '--api-login', FAKE_LOGIN,
+                '--api-token', FAKE_TOKEN,
+                '--ddns-domain', 'ddns.example.com',
+                '--no-cache',
+                '--no-ipv6',
+                '--schedule', '0 0 1 1 *',
+                '--status-socket', str(status_socket),
+            ])
+
+            async def scenario() -> tuple[dict, dict, int]:
+                daemon = asyncio.ensure_future(daemon_async(args))
+
+                # wait for the initial run to complete
+                response = {}
+                while not response.get('last-run'):
+                    await asyncio.sleep(0.05)
+                    if status_socket.exists():
+                        response = await request_async(status_socket,
+                            'status')
+
+                unknown = await request_async(status_socket, 'unknown')
+
+                # the daemon stops when terminated
+                os.kill(os.getpid(), signal.SIGTERM)
+                return response, unknown, await asyncio.wait_for(daemon, 5)
+
+            with redirect_stdout(io.StringIO()):
+                response, unknown, state = asyncio.run(
+                    asyncio.wait_for(scenario(), 10))
+
+            self.assertEqual(state, EngineState.OK)
+            self.assertFalse(status_socket.exists())
+            self.assertEqual(nfsn.requests['addRR'], 1)
+
+        self.assertTrue(response['healthy'])
+        self.assertFalse(response['running'])
+        self.assertEqual(response['last-state'], 'ok')
+        self.assertEqual(response['last-run'], response['last-success'])
+        self.assertTrue(response['next-run'].startswith(
+            f'{int(response["last-run"][:4]) + 1}-01-01T00:00:00'))
+        self.assertEqual(response['addresses'], {'ipv4': '203.0.113.1'})
+        self.assertIn('error', unknown)
+
+    def test_status_refresh(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir, \
+                FakeNfsnServer() as nfsn, FakeIpServer('203.0.113.1') as ip:
+            os.environ['NFSN_DDNS_NFSN_API_ENDPOINT'] = f'{nfsn.url}/dns'
+            os.environ['NFSN_DDNS_MYIPV4_API_ENDPOINTS'] = f'{ip.url}/ip'
+            status_socket = Path(work_dir) / 'status.sock'
+
+            args = argument_parser().parse_args([
+                'daemon',
+                '--api-login', FAKE_LOGIN,
+                '--api-token', FAKE_TOKEN,
+                '--ddns-domain', 'ddns.example.com',
+                '--no-cache',
+                '--no-ipv6',
+                '--schedule', '0 0 1 1 *',
+                '--status-socket', str(status_socket),
+            ])
+
+            async def scenario() -> tuple[dict, int, int]:
+                daemon = asyncio.ensure_future(daemon_async(args))
+
+                # wait for the initial run to complete
+                runs = 0
+                while not runs:
+                    await asyncio.sleep(0.05)
+                    runs = nfsn.requests['listRRs']
+
+                # a refresh responds with the outcome of a new run
+                response = await request_async(status_socket, 'refresh')
+                refreshed = nfsn.requests['listRRs']
+
+                # a user-defined signal triggers a new run
+                os.kill(os.getpid(), signal.SIGUSR1)
+                signaled = refreshed
+                while signaled == refreshed:
+                    await asyncio.sleep(0.05)
+                    signaled = nfsn.requests['listRRs']
+
+                os.kill(os.getpid(), signal.SIGTERM)
+                await asyncio.wait_for(daemon, 5)
+                return response, runs, refreshed
+
+            with redirect_stdout(io.StringIO()):
+                response, runs, refreshed = asyncio.run(
+                    asyncio.wait_for(scenario(), 10))
+
+            self.assertEqual(refreshed, runs + 1)
+            self.assertEqual(nfsn.requests['addRR'], 1)
+
+        self.assertEqual(response['state'], 'ok')
+        self.assertEqual(response['addresses'], {'ipv4': '203.0.113.1'})
+
+    def test_status_reload(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir, \
+                FakeNfsnServer() as nfsn, FakeIpServer('203.0.113.1') as ip:
+            os.environ['NFSN_DDNS_NFSN_API_ENDPOINT'] = f'{nfsn.url}/dns'
+            os.environ['NFSN_DDNS_MYIPV4_API_ENDPOINTS'] = f'{ip.url}/ip'
+            cfg_file = Path(work_dir) / 'config.yaml'
+            status_socket = Path(work_dir) / 'status.sock'
+
+            def configure(domain: str) -> None:
+                cfg_file.write_text(f"""\
+nfsn-ddns:
+  api-login: {FAKE_LOGIN}
+  api-token: {FAKE_TOKEN}
+  domains: {domain}
+""")
+
+            configure('first.example.com')
+
+            args = argument_parser().parse_args([
+                'daemon',
+                '--cfg', str(cfg_file),
+                '--no-cache',
+                '--no-ipv6',
+                '--schedule', '0 0 1 1 *',
+                '--status-socket', str(status_socket),
+            ])
+
+            async def scenario() -> tuple[dict, dict, dict]:
+                daemon = asyncio.ensure_future(daemon_async(args))
+
+                # wait for the initial run to complete
+                response = {}
+                while not response.get('last-run'):
+                    await asyncio.sleep(0.05)
+                    if status_socket.exists():
+                        response = await request_async(status_socket,
+                            'status')
+
+                # a reloaded configuration applies to following runs
+                configure('second.example.com')
+                reloaded = await request_async(status_socket, 'reload')
+                await request_async(status_socket, 'refresh')
+
+                # an invalid configuration is rejected
+                cfg_file.write_text('nfsn-ddns: [')
+                rejected = await request_async(status_socket, 'reload')
+                response = await request_async(status_socket, 'refresh')
+
+                os.kill(os.getpid(), signal.SIGTERM)
+                await asyncio.wait_for(daemon, 5)
+                return reloaded, rejected, response
+
+            with redirect_stdout(io.StringIO()), \
+                    redirect_stderr(io.StringIO()):
+                reloaded, rejected, response = asyncio.run(
+                    asyncio.wait_for(scenario(), 10))
+
+            self.assertEqual(nfsn.requests['addRR'], 2)
+
+        self.assertTrue(reloaded['reloaded'])
+        self.assertIn('error', rejected)
+        self.assertEqual(response['state'], 'ok')
+
+    def test_status_unavailable(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir:
+            args = argument_parser().parse_args([
+                'status',
+                '--status-socket', str(Path(work_dir) / 'status.sock'),
+            ])
+
+            with redirect_stdout(io.StringIO()):
+                self.assertEqual(status(args), 1)
@@ -0,0 +1,100 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from contextlib import redirect_stdout
+from nfsn_ddns.__main__ import argument_parser
+from nfsn_ddns.engine import EngineState
+from nfsn_ddns.stream import parse_line
+from nfsn_ddns.stream import stream
+from pathlib import Path
+from tests import NfsnDdnsTestCase
+from tests.fakes import FAKE_LOGIN
+from tests.fakes import FAKE_TOKEN
+from tests.fakes import FakeNfsnServer
+import io
+import os
+import tempfile
+
+
+class TestStream(NfsnDdnsTestCase):
+    def test_stream_parse(self) -> None:
+        self.assertEqual(parse_line('site.example.com 203.0.113.1\n'),
+            ('site.example.com', '203.0.113.1', 'A'))
+        self.assertEqual(parse_line('Site.Example.com. 2001:DB8::1'),
+            ('site.example.com', '2001:db8::1', 'AAAA'))
+        self.assertEqual(
+            parse_line('{"record": "site.example.com", "ip": "203.0.113.1"}'),
+            ('site.example.com', '203.0.113.1', 'A'))
+        self.assertEqual(parse_line('# comment'), ('', '', ''))
+        self.assertEqual(parse_line(''), ('', '', ''))
+
+        for line in [
+                'site.example.com',
+                'site.example.com 203.0.113.256',
+                'example 203.0.113.1',
+                '{"record": "site.example.com"}',
+                '{invalid',
+                ]:
+            with self.assertRaises(ValueError):
+                parse_line(line)
+
+    def test_stream_process(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir, \
+                FakeNfsnServer() as nfsn:
+            nfsn.zones['example.com'] = [
+                {'name': 'a', 'type': 'A', 'data': '203.0.113.9', 'ttl': 180},
+                {'name': 'b', 'type': 'A', 'data': '203.0.113.2', 'ttl': 180},
+            ]
+
+            input_file = Path(work_dir) / 'input'
+            input_file.write_text(
+                'a.example.com 203.0.113.1\n'
+                'b.example.com 203.0.113.2\n'
+                'invalid\n'
+                '{"record": "c.example.org", "ip": "2001:db8::1"}\n'
+                'a.example.com 203.0.113.3\n')
+
+            os.environ['NFSN_DDNS_NFSN_API_ENDPOINT'] = f'{nfsn.url}/dns'
+            args = argument_parser().parse_args([
+                'stream',
+                '--api-login', FAKE_LOGIN,
+                '--api-token', FAKE_TOKEN,
+                '--input', str(input_file),
+            ])
+
+            output = io.StringIO()
+            with redirect_stdout(output):
+                state = stream(args)
+
+        self.assertEqual(state, EngineState.OK)
+        self.assertIn('rejected: 1; superseded: 1', output.getvalue())
+
+        # one query per zone; only stale/missing records are written
+        self.assertEqual(nfsn.requests['listRRs'], 2)
+        self.assertEqual(nfsn.requests['replaceRR'], 1)
+        self.assertEqual(nfsn.requests['addRR'], 1)
+
+        records = {
+            (rr['name'], rr['type'], rr['data'])
+            for zone in nfsn.zones.values() for rr in zone
+        }
+        self.assertEqual(records, {
+            ('a', 'A', '203.0.113.3'),
+            ('b', 'A', '203.0.113.2'),
+            ('c', 'AAAA', '2001:db8::1'),
+        })
+
+    def test_stream_profiles(self) -> None:
+        cfg_file = Path(__file__).parent / 'assets' / 'profiles.yaml'
+        args = argument_parser().parse_args([
+            'stream',
+            '--cfg', str(cfg_file),
+            '--input', os.devnull,
+        ])
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            state = stream(args)
+
+        self.assertEqual(state, EngineState.BAD_CONFIG)
+        self.assertIn('profiles are not supported', output.getvalue())
@@ -0,0 +1,112 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from nfsn_ddns.client import NfsnClient
+from nfsn_ddns.client import ResourceRecord
+from nfsn_ddns.sync import ChangeAction
+from nfsn_ddns.sync import RecordSet
+from nfsn_ddns.sync import ZoneChange
+from nfsn_ddns.sync import ZoneSyncer
+from nfsn_ddns.sync import plan_changes
+from tests import NfsnDdnsTestCase
+from tests.fakes import FAKE_LOGIN
+from tests.fakes import FAKE_TOKEN
+from tests.fakes import FakeNfsnServer
+
+
+class TestSync(NfsnDdnsTestCase):
+    def test_sync_plan_add_remove(self) -> None:
+        changes = plan_changes([
+            RecordSet('', 'MX', frozenset({'10 a.', '20 b.', '30 c.'})),
+        ], [
+            ResourceRecord('', 'MX', '10 a.'),
+            ResourceRecord('', 'MX', '20 b.'),
+            ResourceRecord('', 'MX', '40 d.'),
+        ])
+
+        self.assertEqual(changes, [
+            ZoneChange(ChangeAction.ADD, '', 'MX', '30 c.'),
+            ZoneChange(ChangeAction.REMOVE, '', 'MX', '40 d.'),
+        ])
+
+    def test_sync_plan_remove_all(self) -> None:
+        changes = plan_changes([
+            RecordSet('old', 'CNAME', frozenset()),
+        ], [
+            ResourceRecord('old', 'CNAME', 'example.com.'),
+        ])
+
+        self.assertEqual(changes, [
+            ZoneChange(ChangeAction.REMOVE, 'old', 'CNAME', 'example.com.'),
+        ])
+
+    def test_sync_plan_replace(self) -> None:
+        # a single stale value is replaced with a single call
+        changes = plan_changes([
+            RecordSet('www', 'A', frozenset({'203.0.113.2'})),
+        ], [
+            ResourceRecord('www', 'A', '203.0.113.1'),
+            ResourceRecord('www', 'A', '203.0.113.3'),
+            ResourceRecord('mail', 'A', '203.0.113.1'),
+        ])
+
+        self.assertEqual(changes, [
+            ZoneChange(ChangeAction.REPLACE, 'www', 'A', '203.0.113.2'),
+        ])
+
+    def test_sync_plan_ttl(self) -> None:
+        records = [
+            ResourceRecord('www', 'A', '203.0.113.1', 3600),
+        ]
+
+        # unmanaged ttl
+        changes = plan_changes([
+            RecordSet('www', 'A', frozenset({'203.0.113.1'})),
+        ], records)
+        self.assertEqual(changes, [])
+
+        # changed ttl
+        changes = plan_changes([
+            RecordSet('www', 'A', frozenset({'203.0.113.1'}), 300),
+        ], records)
+        self.assertEqual(changes, [
+            ZoneChange(ChangeAction.REPLACE, 'www', 'A', '203.0.113.1', 300),
+        ])
+
+    def test_sync_zones(self) -> None:
+        with FakeNfsnServer() as nfsn:
+            nfsn.populate('example.com', 20)
+            nfsn.zones['example.com'].append({
+                'name': 'www', 'type': 'A', 'data': '203.0.113.1', 'ttl': 180,
+            })
+
+            with NfsnClient(FAKE_LOGIN, FAKE_TOKEN,
+                    endpoint=f'{nfsn.url}/dns') as client:
+                syncer = ZoneSyncer(client)
+                zones = {
+                    'example.com': [
+                        RecordSet('www', 'A', frozenset({'203.0.113.2'})),
+                        RecordSet('', 'TXT', frozenset({'a', 'b'})),
+                    ],
+                    'example.org': [
+                        RecordSet('www', 'A', frozenset({'203.0.113.2'})),
+                    ],
+                }
+
+                results = syncer.sync(zones)
+                self.assertEqual([r.domain for r in results],
+                    ['example.com', 'example.org'])
+                for result in results:
+                    self.assertIsNone(result.error)
+                    self.assertCountEqual(result.applied, result.changes)
+
+                self.assertEqual(nfsn.requests['listRRs'], 2)
+                self.assertEqual(nfsn.requests['replaceRR'], 1)
+                self.assertEqual(nfsn.requests['addRR'], 3)
+
+                # already synchronized
+                nfsn.requests.clear()
+                results = syncer.sync(zones)
+                for result in results:
+                    self.assertEqual(result.changes, [])
+                self.assertEqual(sum(nfsn.requests.values()), 2)
@@ -0,0 +1,74 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from contextlib import redirect_stdout
+from nfsn_ddns.timing import Profiler
+from nfsn_ddns.timing import phase
+from pathlib import Path
+from tests import NfsnDdnsTestCase
+import asyncio
+import io
+import tempfile
+import tracemalloc
+
+
+class TestTiming(NfsnDdnsTestCase):
+    def test_timing_disabled(self) -> None:
+        # phases outside of a profiler are not tracked
+        with phase('ignored'):
+            pass
+
+        with Profiler('run') as profiler:
+            pass
+
+        self.assertEqual(profiler.root.children, [])
+        self.assertIsNotNone(profiler.root.elapsed)
+
+    def test_timing_capture_failure(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            missing = Path(tmp) / 'missing'
+            profiler = Profiler('run',
+                stats_file=missing / 'run.prof',
+                memory_file=missing / 'run.snapshot')
+
+            # unwritable capture files are reported instead of raised
+            output = io.StringIO()
+            with redirect_stdout(output), profiler:
+                pass
+
+        self.assertIn('unable to write cprofile statistics', output.getvalue())
+        self.assertIn('unable to write tracemalloc snapshot',
+            output.getvalue())
+        self.assertIsNone(profiler.stats_file)
+        self.assertIsNone(profiler.memory_file)
+        self.assertIsNotNone(profiler.root.elapsed)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_timing_tree(self) -> None:
+        async def task(name: str) -> None:
+            with phase(name):
+                await asyncio.to_thread(worker, name)
+
+        def worker(name: str) -> None:
+            with phase(f'{name}-thread'):
+                pass
+
+        async def run() -> None:
+            with phase('outer'):
+                await asyncio.gather(task('a'), task('b'))
+
+        with Profiler('run') as profiler:
+            asyncio.run(run())
+
+        outer = profiler.root.children
+        self.assertEqual([node.name for node in outer], ['outer'])
+
+        tasks = sorted(outer[0].children, key=lambda node: node.name)
+        self.assertEqual([node.name for node in tasks], ['a', 'b'])
+        for node in tasks:
+            self.assertEqual(len(node.children), 1)
+            self.assertEqual(node.children[0].name, f'{node.name}-thread')
+            self.assertIsNotNone(node.children[0].elapsed)
+
+        rendered = profiler.render()
+        self.assertIn('    a-thread', rendered)
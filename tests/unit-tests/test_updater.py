@@ -0,0 +1,101 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from nfsn_ddns.client import NfsnClient
+from nfsn_ddns.debounce import Debouncer
+from nfsn_ddns.defs import NFSN_AUTH_HEADER
+from nfsn_ddns.updater import DdnsUpdater
+from nfsn_ddns.updater import UpdateAction
+from tests import NfsnDdnsTestCase
+import json
+import responses
+
+# api endpoint used for tests
+API = 'https://nfsn.example.com/dns'
+
+
+class TestUpdater(NfsnDdnsTestCase):
+    def setUp(self) -> None:
+        self.client = NfsnClient('login', 'token', endpoint=API)
+        self.updater = DdnsUpdater(self.client)
+
+    def tearDown(self) -> None:
+        self.client.close()
+
+    @responses.activate
+    def test_updater_created(self) -> None:
+        responses.post(url=f'{API}/example.com/listRRs', body='[]')
+        add = responses.post(url=f'{API}/example.com/addRR')
+
+        results = self.updater.update(['ddns.example.com'], ipv4='203.0.113.1')
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].action, UpdateAction.CREATED)
+        self.assertIsNone(results[0].previous)
+        self.assertEqual(add.call_count, 1)
+        self.assertIn('data=203.0.113.1', add.calls[0].request.body)
+
+    @responses.activate
+    def test_updater_failed_auth(self) -> None:
+        responses.post(url=f'{API}/example.com/listRRs', status=401)
+
+        results = self.updater.update(['ddns.example.com'],
+            ipv4='203.0.113.1', ipv6='2001:db8::1')
+        self.assertEqual(len(results), 2)
+        for result in results:
+            self.assertEqual(result.action, UpdateAction.FAILED)
+            self.assertEqual(result.status, 401)
+
+    @responses.activate
+    def test_updater_signed(self) -> None:
+        rsp = responses.post(url=f'{API}/example.com/listRRs', body='[]')
+
+        self.client.list_rrs('example.com', name='ddns')
+        self.assertEqual(rsp.call_count, 1)
+        header = rsp.calls[0].request.headers[NFSN_AUTH_HEADER]
+        self.assertTrue(header.startswith('login;'))
+
+    @responses.activate
+    def test_updater_unchanged(self) -> None:
+        responses.post(url=f'{API}/example.com/listRRs', body=json.dumps([
+            {'name': 'ddns', 'type': 'A', 'data': '203.0.113.1', 'ttl': 180},
+        ]))
+
+        results = self.updater.update(['ddns.example.com'], ipv4='203.0.113.1')
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].action, UpdateAction.UNCHANGED)
+        self.assertEqual(results[0].previous, '203.0.113.1')
+
+    @responses.activate
+    def test_updater_updated(self) -> None:
+        responses.post(url=f'{API}/example.com/listRRs', body=json.dumps([
+            {'name': 'ddns', 'type': 'A', 'data': '203.0.113.1'},
+            {'name': 'ddns', 'type': 'AAAA', 'data': '2001:db8::1'},
+        ]))
+        replace = responses.post(url=f'{API}/example.com/replaceRR')
+
+        results = self.updater.update(['ddns.example.com'],
+            ipv4='203.0.113.2', ipv6='2001:db8::1')
+        actions = {result.type: result.action for result in results}
+        self.assertEqual(actions, {
+            'A': UpdateAction.UPDATED,
+            'AAAA': UpdateAction.UNCHANGED,
+        })
+        self.assertEqual(replace.call_count, 1)
+
+    @responses.activate
+    def test_updater_debounced(self) -> None:
+        responses.post(url=f'{API}/example.com/listRRs', body=json.dumps([
+            {'name': 'ddns', 'type': 'A', 'data': '203.0.113.1'},
+        ]))
+        replace = responses.post(url=f'{API}/example.com/replaceRR')
+
+        updater = DdnsUpdater(self.client, debouncer=Debouncer(3600))
+
+        # a new address is deferred until confirmed by a second sample
+        results = updater.update(['ddns.example.com'], ipv4='203.0.113.2')
+        self.assertEqual(results[0].action, UpdateAction.DEFERRED)
+        self.assertEqual(replace.call_count, 0)
+
+        results = updater.update(['ddns.example.com'], ipv4='203.0.113.2')
+        self.assertEqual(results[0].action, UpdateAction.UPDATED)
+        self.assertEqual(replace.call_count, 1)
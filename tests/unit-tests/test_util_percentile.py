@@ -0,0 +1,27 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from nfsn_ddns.utils import percentile
+from tests import NfsnDdnsTestCase
+
+
+class TestUtilPercentile(NfsnDdnsTestCase):
+    def test_util_percentile_bounds(self) -> None:
+        values = [1, 2, 3, 4, 5]
+        self.assertEqual(percentile(values, 0), 1)
+        self.assertEqual(percentile(values, 1), 5)
+        self.assertEqual(percentile([7], 0.5), 7)
+
+    def test_util_percentile_even(self) -> None:
+        values = list(range(1, 31))
+        self.assertEqual(percentile(values, 0.5), 15)
+        self.assertEqual(percentile(values, 0.95), 29)
+        self.assertEqual(percentile([1, 2, 3, 4], 0.5), 2)
+        self.assertEqual(percentile([1, 2, 3, 4], 0.75), 3)
+
+    def test_util_percentile_odd(self) -> None:
+        values = [1, 2, 3, 4, 5]
+        self.assertEqual(percentile(values, 0.5), 3)
+        self.assertEqual(percentile(values, 0.9), 5)
+        self.assertEqual(percentile(values, 0.2), 1)
+        self.assertEqual(percentile(values, 0.21), 2)
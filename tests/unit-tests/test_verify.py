@@ -0,0 +1,217 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from nfsn_ddns.client import NfsnClient
+from nfsn_ddns.updater import DdnsUpdater
+from nfsn_ddns.updater import UpdateAction
+from nfsn_ddns.verify import Nameserver
+from nfsn_ddns.verify import PropagationChecker
+from nfsn_ddns.verify import PropagationRecord
+from nfsn_ddns.verify import RecordVerifier
+from nfsn_ddns.verify import parse_nameserver
+from tests import NfsnDdnsTestCase
+from tests.fakes import FAKE_LOGIN
+from tests.fakes import FAKE_TOKEN
+from tests.fakes import FakeDnsServer
+from tests.fakes import FakeNfsnServer
+import asyncio
+import socket
+import threading
+import time
+
+
+class TestVerify(NfsnDdnsTestCase):
+    def test_propagation(self) -> None:
+        with FakeDnsServer() as ns1, FakeDnsServer() as ns2:
+            ns1.records[('ddns.example.com', 'A')] = ['203.0.113.1']
+            ns1.records[('www.example.com', 'AAAA')] = ['2001:db8::1']
+            ns2.records[('ddns.example.com', 'A')] = ['203.0.113.1']
+
+            # the second nameserver serves the aaaa record later
+            timer = threading.Timer(0.5, ns2.records.__setitem__,
+                (('www.example.com', 'AAAA'), ['2001:db8::1']))
+            timer.start()
+
+            checker = PropagationChecker([
+                parse_nameserver(ns1.nameserver),
+                parse_nameserver(ns2.nameserver),
+            ], timeout=5, interval=0.1)
+            results = asyncio.run(checker.check_async([
+                PropagationRecord('ddns.example.com', 'A',
+                    frozenset({'203.0.113.1'})),
+                PropagationRecord('www.example.com', 'AAAA',
+                    frozenset({'2001:db8::1'})),
+            ]))
+            timer.join()
+
+            # every query is sent from a single socket
+            self.assertEqual(len(ns1.clients | ns2.clients), 1)
+
+        self.assertLess(results[0].elapsed, 0.5)
+        self.assertGreaterEqual(results[1].elapsed, 0.5)
+        self.assertLess(results[1].elapsed, 2)
+
+    def test_propagation_invalid(self) -> None:
+        nameservers = [Nameserver('127.0.0.1')]
+        for kwargs in [
+                {'timeout': 0},
+                {'timeout': 1, 'interval': 0},
+                {'timeout': 1, 'interval': 1, 'max_interval': 0.5},
+                ]:
+            with self.assertRaises(ValueError):
+                PropagationChecker(nameservers, **kwargs)
+
+    def test_propagation_many(self) -> None:
+        # a nameserver never replying to any query
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as ns:
+            ns.bind(('127.0.0.1', 0))
+            ns.settimeout(0)
+
+            checker = PropagationChecker(
+                [Nameserver('127.0.0.1', ns.getsockname()[1])],
+                timeout=1, interval=0.01)
+
+            start = time.monotonic()
+            results = asyncio.run(checker.check_async([
+                PropagationRecord(f'host{idx}.example.com', 'A',
+                    frozenset({'203.0.113.1'}))
+                for idx in range(300)
+            ]))
+            elapsed = time.monotonic() - start
+
+            # each record is queried with the same identifier on every poll
+            qids = {}  # type: dict[bytes, set[bytes]]
+            while True:
+                try:
+                    data = ns.recv(512)
+                except OSError:
+                    break
+                qids.setdefault(data[12:], set()).add(data[:2])
+
+        self.assertTrue(all(result.elapsed is None for result in results))
+        self.assertLess(elapsed, 2)
+        self.assertTrue(qids)
+        self.assertTrue(all(len(ids) == 1 for ids in qids.values()))
+        self.assertEqual(len(set().union(*qids.values())), len(qids))
+
+    def test_propagation_timeout(self) -> None:
+        with FakeDnsServer() as ns:
+            ns.records[('ddns.example.com', 'A')] = ['203.0.113.1']
+
+            checker = PropagationChecker([parse_nameserver(ns.nameserver)],
+                timeout=1, interval=0.1)
+
+            start = time.monotonic()
+            results = asyncio.run(checker.check_async([
+                PropagationRecord('ddns.example.com', 'A',
+                    frozenset({'203.0.113.2'})),
+            ]))
+            elapsed = time.monotonic() - start
+
+            # polls are spaced exponentially (0.1, 0.2, 0.4, ...)
+            self.assertLessEqual(ns.requests, 4)
+
+        self.assertIsNone(results[0].elapsed)
+        self.assertLess(elapsed, 2)
+
+    def test_verify_disagree(self) -> None:
+        with FakeDnsServer() as ns1, FakeDnsServer() as ns2:
+            ns1.records[('ddns.example.com', 'A')] = ['203.0.113.1']
+            ns2.records[('ddns.example.com', 'A')] = ['203.0.113.2']
+
+            verifier = RecordVerifier([
+                parse_nameserver(ns1.nameserver),
+                parse_nameserver(ns2.nameserver),
+            ])
+            verified = asyncio.run(verifier.verify_async('ddns.example.com',
+                {'A': '203.0.113.1'}))
+
+        self.assertFalse(verified)
+
+    def test_verify_fallback(self) -> None:
+        with FakeNfsnServer() as nfsn, FakeDnsServer() as ns:
+            nfsn.zones['example.com'] = [
+                {'name': 'ddns', 'type': 'A', 'data': '203.0.113.1',
+                    'ttl': 3600},
+            ]
+            ns.records[('ddns.example.com', 'A')] = ['203.0.113.1']
+
+            client = NfsnClient(FAKE_LOGIN, FAKE_TOKEN,
+                endpoint=f'{nfsn.url}/dns')
+            verifier = RecordVerifier([parse_nameserver(ns.nameserver)])
+            updater = DdnsUpdater(client, verifier=verifier)
+
+            # a record answered with another address is checked (and
+            # updated) through the api
+            results = updater.update(['ddns.example.com'],
+                ipv4='203.0.113.2')
+            self.assertEqual(results[0].action, UpdateAction.UPDATED)
+            self.assertEqual(results[0].previous, '203.0.113.1')
+            self.assertEqual(nfsn.requests['listRRs'], 1)
+
+            # a record missing from the nameservers is created
+            results = updater.update(['new.example.com'], ipv4='203.0.113.2')
+            self.assertEqual(results[0].action, UpdateAction.CREATED)
+            self.assertEqual(nfsn.requests['listRRs'], 2)
+
+    def test_verify_match(self) -> None:
+        with FakeNfsnServer() as nfsn, \
+                FakeDnsServer() as ns1, FakeDnsServer() as ns2:
+            for ns in (ns1, ns2):
+                ns.records[('ddns.example.com', 'A')] = ['203.0.113.1']
+                ns.records[('ddns.example.com', 'AAAA')] = ['2001:db8::1']
+
+            client = NfsnClient(FAKE_LOGIN, FAKE_TOKEN,
+                endpoint=f'{nfsn.url}/dns')
+            verifier = RecordVerifier([
+                parse_nameserver(ns1.nameserver),
+                parse_nameserver(ns2.nameserver),
+            ])
+            updater = DdnsUpdater(client, verifier=verifier)
+
+            results = updater.update(['ddns.example.com'],
+                ipv4='203.0.113.1', ipv6='2001:db8::1')
+
+            # every record type is queried on every nameserver
+            self.assertEqual(ns1.requests, 2)
+            self.assertEqual(ns2.requests, 2)
+
+        self.assertEqual([result.action for result in results],
+            [UpdateAction.UNCHANGED, UpdateAction.UNCHANGED])
+        self.assertEqual(sum(nfsn.requests.values()), 0)
+
+    def test_verify_non_authoritative(self) -> None:
+        with FakeDnsServer(authoritative=False) as ns:
+            ns.records[('ddns.example.com', 'A')] = ['203.0.113.1']
+
+            verifier = RecordVerifier([parse_nameserver(ns.nameserver)])
+            verified = asyncio.run(verifier.verify_async('ddns.example.com',
+                {'A': '203.0.113.1'}))
+
+        self.assertFalse(verified)
+
+    def test_verify_parse_nameserver(self) -> None:
+        self.assertEqual(parse_nameserver('ns.example.net'),
+            Nameserver('ns.example.net'))
+        self.assertEqual(parse_nameserver('192.0.2.53:5353'),
+            Nameserver('192.0.2.53', 5353))
+        self.assertEqual(parse_nameserver('2001:db8::53'),
+            Nameserver('2001:db8::53'))
+        self.assertEqual(parse_nameserver('[2001:db8::53]:5353'),
+            Nameserver('2001:db8::53', 5353))
+        self.assertIsNone(parse_nameserver(''))
+        self.assertIsNone(parse_nameserver('ns.example.net:invalid'))
+        self.assertIsNone(parse_nameserver('[2001:db8::53'))
+
+    def test_verify_unavailable(self) -> None:
+        # a port without a nameserver
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+
+        verifier = RecordVerifier([Nameserver('127.0.0.1', port)],
+            timeout=0.5)
+        verified = asyncio.run(verifier.verify_async('ddns.example.com',
+            {'A': '203.0.113.1'}))
+
+        self.assertFalse(verified)
@@ -0,0 +1,54 @@
+# SPDX-License-Identifier: BSD-2-Clause
+# Copyright nfsn-ddns Contributors
+
+from nfsn_ddns.watch import FileWatcher
+from tests import NfsnDdnsTestCase
+from pathlib import Path
+import asyncio
+import sys
+import tempfile
+import unittest
+
+
+@unittest.skipUnless(sys.platform.startswith('linux'), 'requires inotify')
+class TestWatch(NfsnDdnsTestCase):
+    def test_watch_changes(self) -> None:
+        with tempfile.TemporaryDirectory() as work_dir:
+            cfg_file = Path(work_dir) / 'config.yaml'
+            cfg_file.write_text('first')
+
+            async def scenario() -> tuple[bool, int, int, int]:
+                changes = asyncio.Queue()
+                watcher = FileWatcher(cfg_file,
+                    lambda: changes.put_nowait(cfg_file), delay=0.1)
+                started = watcher.start()
+                try:
+                    # changes of other files are ignored
+                    (Path(work_dir) / 'other.yaml').write_text('other')
+                    await asyncio.sleep(0.3)
+                    ignored = changes.qsize()
+
+                    # multiple writes are coalesced into a single change
+                    cfg_file.write_text('second')
+                    cfg_file.write_text('third')
+                    await asyncio.wait_for(changes.get(), 5)
+                    await asyncio.sleep(0.3)
+                    coalesced = changes.qsize()
+
+                    # replacing the file is a change
+                    replacement = Path(work_dir) / 'config.yaml.tmp'
+                    replacement.write_text('fourth')
+                    replacement.replace(cfg_file)
+                    await asyncio.wait_for(changes.get(), 5)
+                    replaced = changes.qsize()
+                finally:
+                    watcher.stop()
+
+                return started, ignored, coalesced, replaced
+
+            started, ignored, coalesced, replaced = asyncio.run(scenario())
+
+        self.assertTrue(started)
+        self.assertEqual(ignored, 0)
+        self.assertEqual(coalesced, 0)
+        self.assertEqual(replaced, 0)